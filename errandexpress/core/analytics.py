@@ -0,0 +1,208 @@
+"""
+Dashboard Analytics Rollups for ErrandExpress
+admin_dashboard and system_wallet read AnalyticsRollup rows instead of
+issuing a count()/aggregate() per widget. refresh() (Celery beat) recomputes
+per-day flow counters from the last rolled-up day onwards, so a missed run
+is caught up on the next one, and rewrites today's state snapshot with one
+grouped query per model. Revenue rollups are kept by core.revenue.
+"""
+
+from django.db import transaction
+from django.db.models import Count, Max, Min, Q, Subquery, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from datetime import timedelta
+import time
+import logging
+
+from core.revenue import RevenueLedger
+
+logger = logging.getLogger(__name__)
+
+
+class AnalyticsRollupService:
+    """
+    Usage:
+        AnalyticsRollupService.refresh()            # every 15 minutes
+        stats = AnalyticsRollupService.summary()    # 2 queries
+        stats['tasks']['status:open'], stats['week']['users_joined']
+    """
+
+    # (metric, model label, timestamp field, dimension fields)
+    FLOW_METRICS = [
+        ('tasks_created', 'Task', 'created_at', ('category', 'campus_location', 'payment_method')),
+        ('tasks_completed', 'Task', 'completed_at', ('category', 'campus_location')),
+        ('users_joined', 'User', 'date_joined', ('role',)),
+    ]
+
+    SNAPSHOT_METRICS = ('users', 'tasks', 'skills', 'reports')
+
+    # In-progress tasks untouched this long count as stalled
+    STALLED_AFTER = timedelta(days=7)
+
+    @staticmethod
+    def _model(label):
+        from django.apps import apps
+        return apps.get_model('core', label)
+
+    @staticmethod
+    def _fold(rows, metric, day, dimensions, counts):
+        """Add one grouped row to counts keyed by (day, metric, dimension)"""
+        n = rows['n']
+        for dimension in ('all',) + tuple(f'{field}:{rows[field] or ""}' for field in dimensions):
+            key = (day, metric, dimension)
+            counts[key] = counts.get(key, 0) + n
+
+    @classmethod
+    def flow_counts(cls, start_day, end_day):
+        """Per-day flow counters for [start_day, end_day]. Returns: {(day, metric, dimension): n}"""
+        tz = timezone.get_current_timezone()
+        counts = {}
+        for metric, label, field, dimensions in cls.FLOW_METRICS:
+            rows = (
+                cls._model(label).objects
+                .filter(**{
+                    f'{field}__gte': RevenueLedger.day_start(start_day),
+                    f'{field}__lt': RevenueLedger.day_start(end_day + timedelta(days=1)),
+                })
+                .annotate(rollup_day=TruncDate(field, tzinfo=tz))
+                .values('rollup_day', *dimensions)
+                .annotate(n=Count('pk'))
+            )
+            for row in rows:
+                cls._fold(row, metric, row['rollup_day'], dimensions, counts)
+        return counts
+
+    @classmethod
+    def snapshot_counts(cls, day, now):
+        """Current state counters. Returns: {(day, metric, dimension): n}"""
+        # 'all' rows exist even when zero; they mark the snapshot day
+        counts = {(day, metric, 'all'): 0 for metric in cls.SNAPSHOT_METRICS}
+
+        for row in cls._model('User').objects.values('role', 'is_active').annotate(n=Count('pk')):
+            cls._fold(row, 'users', day, ('role',), counts)
+            if row['is_active']:
+                counts[(day, 'users', 'active')] = counts.get((day, 'users', 'active'), 0) + row['n']
+
+        stalled_before = now - cls.STALLED_AFTER
+        task_dimensions = ('status', 'category', 'campus_location', 'payment_method')
+        for row in cls._model('Task').objects.values(*task_dimensions).annotate(
+            n=Count('pk'),
+            stalled=Count('pk', filter=Q(status='in_progress', updated_at__lte=stalled_before))
+        ):
+            cls._fold(row, 'tasks', day, task_dimensions, counts)
+            if row['stalled']:
+                counts[(day, 'tasks', 'stalled')] = counts.get((day, 'tasks', 'stalled'), 0) + row['stalled']
+
+        for metric, label in (('skills', 'StudentSkill'), ('reports', 'Report')):
+            for row in cls._model(label).objects.values('status').annotate(n=Count('pk')):
+                cls._fold(row, metric, day, ('status',), counts)
+        return counts
+
+    @classmethod
+    def refresh(cls, now=None, since=None):
+        """
+        Recompute flow counters from `since` (default: the last rolled-up
+        day, or the first activity when empty) through today and rewrite
+        today's snapshot.
+
+        Returns: {'days', 'rows', 'elapsed_ms'}
+        """
+        from core.models import AnalyticsRollup
+
+        started = time.monotonic()
+        now = now or timezone.now()
+        today = timezone.localtime(now).date()
+        if since is None:
+            since = AnalyticsRollup.objects.aggregate(last=Max('day'))['last'] or cls.earliest_day()
+        since = min(since, today)
+
+        counts = cls.flow_counts(since, today)
+        counts.update(cls.snapshot_counts(today, now))
+        flow_metrics = [metric for metric, _, _, _ in cls.FLOW_METRICS]
+
+        with transaction.atomic():
+            AnalyticsRollup.objects.filter(
+                Q(metric__in=flow_metrics, day__gte=since, day__lte=today) |
+                Q(metric__in=cls.SNAPSHOT_METRICS, day=today)
+            ).delete()
+            AnalyticsRollup.objects.bulk_create(
+                [
+                    AnalyticsRollup(day=day, metric=metric, dimension=dimension, value=value)
+                    for (day, metric, dimension), value in counts.items()
+                ],
+                batch_size=1000,
+                update_conflicts=True,
+                unique_fields=['day', 'metric', 'dimension'],
+                update_fields=['value', 'updated_at'],
+            )
+
+        result = {
+            'days': (today - since).days + 1,
+            'rows': len(counts),
+            'elapsed_ms': round((time.monotonic() - started) * 1000, 1),
+        }
+        logger.info(f"Analytics rollup refreshed: {result}")
+        return result
+
+    @classmethod
+    def earliest_day(cls):
+        """First local day with any flow activity (backfill start)"""
+        firsts = [
+            cls._model(label).objects.aggregate(first=Min(field))['first']
+            for _, label, field, _ in cls.FLOW_METRICS
+        ]
+        firsts = [first for first in firsts if first]
+        return timezone.localtime(min(firsts)).date() if firsts else timezone.localdate()
+
+    @classmethod
+    def summary(cls, now=None):
+        """
+        Latest snapshot plus flow totals for the last 7 days (2 queries;
+        refreshes synchronously if no snapshot exists yet).
+
+        Returns: {'users', 'tasks', 'skills', 'reports': {dimension: n},
+                  'week': {flow metric: n}, 'refreshed_at'}
+        """
+        from core.models import AnalyticsRollup
+
+        now = now or timezone.now()
+        latest_day = AnalyticsRollup.objects.filter(metric='tasks', dimension='all').order_by('-day').values('day')[:1]
+        snapshot = (
+            AnalyticsRollup.objects.filter(metric__in=cls.SNAPSHOT_METRICS, day=Subquery(latest_day))
+            .values_list('metric', 'dimension', 'value', 'updated_at')
+        )
+        rows = list(snapshot)
+        if not rows:
+            cls.refresh(now)
+            rows = list(snapshot.all())
+
+        stats = {metric: {} for metric in cls.SNAPSHOT_METRICS}
+        for metric, dimension, value, _ in rows:
+            stats[metric][dimension] = value
+        stats['refreshed_at'] = max(updated_at for _, _, _, updated_at in rows)
+
+        week_ago = timezone.localtime(now).date() - timedelta(days=7)
+        stats['week'] = dict(
+            AnalyticsRollup.objects.filter(
+                metric__in=[metric for metric, _, _, _ in cls.FLOW_METRICS],
+                dimension='all',
+                day__gte=week_ago
+            ).values('metric').annotate(total=Sum('value')).values_list('metric', 'total')
+        )
+        return stats
+
+    @staticmethod
+    def breakdown(counts, field):
+        """
+        Snapshot counts for one field, largest first.
+
+        Returns: list of {field: value, 'count': n}
+        """
+        prefix = f'{field}:'
+        items = [
+            {field: dimension[len(prefix):], 'count': value}
+            for dimension, value in counts.items()
+            if dimension.startswith(prefix)
+        ]
+        return sorted(items, key=lambda item: item['count'], reverse=True)
@@ -8,12 +8,15 @@ from django.views.decorators.http import require_http_methods
 from django.contrib.auth.decorators import login_required
 from django.views.decorators.csrf import csrf_exempt
 from django.utils import timezone
+from django.db import transaction
 from django.db.models import Q
 from decimal import Decimal
 import json
 
 from core.models import Task, User, TaskApplication
+from core.notifications import notify
 from core.services import PrioritizationService
+from core.assignment import CandidateSearch
 
 
 @login_required
@@ -64,20 +67,21 @@ def api_get_prioritized_tasks(request):
             tasks = tasks.filter(price__lte=Decimal(max_price))
         
         # Apply prioritization
-        prioritized_tasks = PrioritizationService.get_prioritized_tasks(tasks, user)
+        now = timezone.now()
+        prioritized_tasks = PrioritizationService.get_prioritized_tasks(tasks, user, now=now)
         
         # Get total count before pagination
         total_count = prioritized_tasks.count()
         
         # Apply pagination
-        paginated_tasks = prioritized_tasks[offset:offset + limit]
+        paginated_tasks = list(prioritized_tasks[offset:offset + limit])
+        
+        # ✅ OPTIMIZED: Score breakdowns for the whole page in one batch pass
+        breakdowns = PrioritizationService.get_score_breakdowns(paginated_tasks, user, now=now)
         
         # Build response
         tasks_data = []
-        for task in paginated_tasks:
-            # Get score breakdown for this task
-            breakdown = PrioritizationService.get_score_breakdown(task, user)
-            
+        for task, breakdown in zip(paginated_tasks, breakdowns):
             tasks_data.append({
                 'id': str(task.id),
                 'title': task.title,
@@ -123,11 +127,15 @@ def api_auto_assign_task(request):
     """
     POST /api/tasks/auto-assign/
     
-    Automatically assign the best-matching doer to a task
+    Rank doers for a task and (optionally) assign the best match
     
     Request Body:
     {
-        "task_id": "uuid"
+        "task_id": "uuid",
+        "limit": 5,         # candidates to return (max 50)
+        "offset": 0,        # candidate pagination offset
+        "assign": true,     # assign the top candidate (first page only)
+        "budget_ms": 500    # time budget for the candidate search
     }
     
     Response:
@@ -138,7 +146,10 @@ def api_auto_assign_task(request):
             "id": "uuid",
             "fullname": "John Doe",
             "score": 8.5
-        }
+        },
+        "candidates": [{"id": "uuid", "tier": "campus", "score": {...}}, ...],
+        "has_more": true,
+        "truncated": false
     }
     """
     try:
@@ -159,56 +170,77 @@ def api_auto_assign_task(request):
                 'error': 'task_id is required'
             }, status=400)
         
+        try:
+            limit = int(data.get('limit', CandidateSearch.DEFAULT_LIMIT))
+            offset = int(data.get('offset', 0))
+            budget_ms = min(int(data.get('budget_ms', CandidateSearch.TIME_BUDGET_MS)), CandidateSearch.TIME_BUDGET_MS)
+        except (TypeError, ValueError):
+            return JsonResponse({
+                'error': 'limit, offset and budget_ms must be integers'
+            }, status=400)
+        assign = bool(data.get('assign', True)) and offset == 0
+        
         # Get the task
         try:
-            task = Task.objects.get(id=task_id, poster=user, status='open')
+            task = Task.objects.select_related('poster').get(id=task_id, poster=user, status='open')
         except Task.DoesNotExist:
             return JsonResponse({
                 'error': 'Task not found or not owned by you'
             }, status=404)
         
-        # Get all available doers
-        doers = User.objects.filter(
-            role='task_doer',
-            is_active=True
-        ).exclude(id=user.id)
+        # ✅ OPTIMIZED: Pruned tier scans (constant query count) instead of scoring every doer
+        now = timezone.now()
+        result = CandidateSearch.search(task, limit=limit, offset=offset, budget_ms=budget_ms, now=now)
+        candidates = result['candidates']
         
-        # Score each doer for this task
-        best_doer = None
-        best_score = 0
+        response = {
+            'success': True,
+            'task_id': str(task.id),
+            'limit': limit,
+            'offset': offset,
+            'candidates': candidates,
+            'has_more': result['has_more'],
+            'truncated': result['truncated'],
+            'elapsed_ms': result['elapsed_ms'],
+        }
         
-        for doer in doers:
-            breakdown = PrioritizationService.get_score_breakdown(task, doer)
-            score = breakdown['total_score']
-            
-            if score > best_score:
-                best_score = score
-                best_doer = doer
+        if not assign:
+            return JsonResponse(response)
         
-        if not best_doer:
+        if not candidates:
             return JsonResponse({
                 'error': 'No suitable doer found'
             }, status=404)
         
-        # Assign the task
-        task.doer = best_doer
-        task.status = 'in_progress'
-        task.accepted_at = timezone.now()
-        task.save()
-        
-        # Create notification (if notification system exists)
-        # TODO: Send notification to doer
+        best = candidates[0]
+        with transaction.atomic():
+            # Re-check under lock so two requests cannot both assign the task
+            task = Task.objects.select_for_update().filter(id=task.id, status='open').first()
+            if task is None:
+                return JsonResponse({
+                    'error': 'Task is no longer open'
+                }, status=409)
+            
+            task.doer_id = best['id']
+            task.status = 'in_progress'
+            task.accepted_at = now
+            task.save()
+            
+            notify(
+                best['id'],
+                'task_assigned',
+                title='🎯 Task Assigned to You',
+                message=f'You have been assigned to "{task.title}" by {user.fullname}',
+                related_task=task
+            )
         
-        return JsonResponse({
-            'success': True,
-            'task_id': str(task.id),
-            'assigned_doer': {
-                'id': str(best_doer.id),
-                'fullname': best_doer.fullname,
-                'campus_location': best_doer.campus_location,
-                'score': best_score,
-            }
-        })
+        response['assigned_doer'] = {
+            'id': best['id'],
+            'fullname': best['fullname'],
+            'campus_location': best['campus_location'],
+            'score': best['score']['total_score'],
+        }
+        return JsonResponse(response)
         
     except json.JSONDecodeError:
         return JsonResponse({
@@ -0,0 +1,637 @@
+"""
+Auto-Assignment Engine for ErrandExpress
+Set-based replacement for the per-agent calculate_assignment_score loop:
+candidate features are loaded in a fixed number of bulk queries and
+scored with NumPy arrays, for one task or a whole batch of tasks
+"""
+
+from django.db import transaction
+from django.db.models import Count, Exists, Min, OuterRef, Q, prefetch_related_objects
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from datetime import timedelta
+import numpy as np
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+# SciPy is optional - fall back to the NumPy Hungarian solver below
+try:
+    from scipy.optimize import linear_sum_assignment
+except ImportError:
+    linear_sum_assignment = None
+
+
+def solve_assignment(cost):
+    """
+    Minimum-cost assignment for a rectangular cost matrix
+    (Hungarian algorithm with potentials, inner loop vectorized with NumPy).
+
+    Returns:
+        (row_indices, col_indices) like scipy.optimize.linear_sum_assignment
+    """
+    cost = np.asarray(cost, dtype=np.float64)
+    if cost.size == 0:
+        return np.array([], dtype=int), np.array([], dtype=int)
+    if linear_sum_assignment is not None:
+        return linear_sum_assignment(cost)
+
+    transposed = cost.shape[0] > cost.shape[1]
+    if transposed:
+        cost = cost.T
+    n, m = cost.shape
+
+    u = np.zeros(n + 1)
+    v = np.zeros(m + 1)
+    p = np.zeros(m + 1, dtype=int)    # p[j]: row (1-based) matched to column j
+    way = np.zeros(m + 1, dtype=int)
+
+    for i in range(1, n + 1):
+        p[0] = i
+        j0 = 0
+        minv = np.full(m + 1, np.inf)
+        used = np.zeros(m + 1, dtype=bool)
+        while True:
+            used[j0] = True
+            i0 = p[j0]
+            free = ~used[1:]
+            cur = cost[i0 - 1] - u[i0] - v[1:]
+            better = free & (cur < minv[1:])
+            minv[1:][better] = cur[better]
+            way[1:][better] = j0
+
+            candidates = np.where(free, minv[1:], np.inf)
+            j1 = int(np.argmin(candidates)) + 1
+            delta = candidates[j1 - 1]
+
+            used_cols = np.flatnonzero(used)
+            u[p[used_cols]] += delta
+            v[used_cols] -= delta
+            minv[1:][free] -= delta
+
+            j0 = j1
+            if p[j0] == 0:
+                break
+        # Augment along the alternating path
+        while j0:
+            j1 = way[j0]
+            p[j0] = p[j1]
+            j0 = j1
+
+    cols = np.flatnonzero(p[1:])
+    rows = p[1:][cols] - 1
+    if transposed:
+        rows, cols = cols, rows
+    order = np.argsort(rows)
+    return rows[order], cols[order]
+
+
+class CandidatePool:
+    """
+    Column arrays describing every assignable doer.
+    Row i of every array describes the doer with id ids[i].
+    """
+
+    def __init__(self, ids, names, campus, rating, microtasker, skills, active):
+        self.ids = ids                  # list of doer UUIDs
+        self.names = names              # list of doer full names (for logging)
+        self.campus = campus            # object array of campus_location strings
+        self.rating = rating            # float64 avg_rating
+        self.microtasker = microtasker  # bool: doer_type in microtasker/both
+        self.skills = skills            # {skill_name: bool array of verified skills}
+        self.active = active            # int64 count of assigned/in_progress assignments
+        self.index = {doer_id: i for i, doer_id in enumerate(ids)}
+
+    def __len__(self):
+        return len(self.ids)
+
+
+class AssignmentEngine:
+    """
+    Vectorized auto-assignment.
+
+    Scores match calculate_assignment_score():
+    Total = (Skill Match × 0.35) + (Location Match × 0.20) + (Availability × 0.20) +
+            (Rating × 0.15) + (Workload × 0.10), every factor on a 0-100 scale
+    """
+
+    SKILLED_CATEGORIES = ('typing', 'powerpoint', 'graphics')
+
+    SKILL_WEIGHT = 0.35
+    LOCATION_WEIGHT = 0.20
+    AVAILABILITY_WEIGHT = 0.20
+    RATING_WEIGHT = 0.15
+    WORKLOAD_WEIGHT = 0.10
+
+    ACTIVE_STATUSES = ('assigned', 'in_progress')
+
+    @classmethod
+    def load_candidates(cls):
+        """
+        Load every active, unbanned task doer with their features.
+        Fixed cost: 3 queries regardless of doer population.
+        """
+        from core.models import User, StudentSkill, TaskAssignment
+
+        rows = list(User.objects.filter(
+            role='task_doer',
+            is_active=True,
+            is_banned=False
+        ).order_by('id').values_list('id', 'fullname', 'campus_location', 'avg_rating', 'doer_type'))
+
+        ids = [row[0] for row in rows]
+        index = {doer_id: i for i, doer_id in enumerate(ids)}
+        n = len(ids)
+
+        skills = {skill: np.zeros(n, dtype=bool) for skill in cls.SKILLED_CATEGORIES}
+        for student_id, skill_name in StudentSkill.objects.filter(
+            status='verified',
+            skill_name__in=cls.SKILLED_CATEGORIES,
+            student__role='task_doer'
+        ).values_list('student_id', 'skill_name'):
+            i = index.get(student_id)
+            if i is not None:
+                skills[skill_name][i] = True
+
+        active = np.zeros(n, dtype=np.int64)
+        for agent_id, count in TaskAssignment.objects.filter(
+            status__in=cls.ACTIVE_STATUSES
+        ).values('agent_id').annotate(count=Count('id')).values_list('agent_id', 'count'):
+            i = index.get(agent_id)
+            if i is not None:
+                active[i] = count
+
+        return CandidatePool(
+            ids=ids,
+            names=[row[1] for row in rows],
+            campus=np.array([row[2] or '' for row in rows], dtype=object),
+            rating=np.array([float(row[3] or 0) for row in rows], dtype=np.float64),
+            microtasker=np.array([row[4] in ('microtasker', 'both') for row in rows], dtype=bool),
+            skills=skills,
+            active=active,
+        )
+
+    @classmethod
+    def eligible_mask(cls, task, pool):
+        """Doers allowed to take this task (verified skill, or microtasker for microtasks)"""
+        if task.category in cls.SKILLED_CATEGORIES:
+            mask = pool.skills[task.category].copy()
+        else:
+            mask = pool.microtasker.copy()
+
+        poster_index = pool.index.get(task.poster_id)
+        if poster_index is not None:
+            mask[poster_index] = False
+        return mask
+
+    @classmethod
+    def score(cls, task, pool):
+        """
+        Score every doer in the pool for a task.
+
+        Returns:
+            dict of float64 arrays: skill_match, location_match, availability,
+            rating, workload, total
+        """
+        n = len(pool)
+        if task.category in cls.SKILLED_CATEGORIES:
+            skill_match = pool.skills[task.category] * 100.0
+        elif task.category == 'microtask':
+            skill_match = np.full(n, 100.0)
+        else:
+            skill_match = np.zeros(n)
+
+        if task.campus_location:
+            location_match = (pool.campus == task.campus_location).astype(np.float64) * 100.0
+        else:
+            location_match = np.zeros(n)
+
+        availability = (pool.active == 0) * 100.0
+        rating = pool.rating * 20
+        workload = np.maximum(0, 100 - pool.active * 10).astype(np.float64)
+
+        total = (
+            skill_match * cls.SKILL_WEIGHT +
+            location_match * cls.LOCATION_WEIGHT +
+            availability * cls.AVAILABILITY_WEIGHT +
+            rating * cls.RATING_WEIGHT +
+            workload * cls.WORKLOAD_WEIGHT
+        )
+
+        return {
+            'skill_match': skill_match,
+            'location_match': location_match,
+            'availability': availability,
+            'rating': rating,
+            'workload': workload,
+            'total': np.round(total, 2),
+        }
+
+    @staticmethod
+    def breakdown(scores, i):
+        """Score dict for one doer, same shape as calculate_assignment_score()"""
+        return {
+            'skill_match': int(scores['skill_match'][i]),
+            'location_match': int(scores['location_match'][i]),
+            'availability': int(scores['availability'][i]),
+            'rating': float(scores['rating'][i]),
+            'workload': int(scores['workload'][i]),
+            'total': float(scores['total'][i]),
+        }
+
+    @classmethod
+    def top_k(cls, task, k=5, pool=None, exclude=None):
+        """
+        Best k eligible doers for a task in one pass.
+
+        Returns:
+            list of (doer_id, breakdown) ordered by total score DESC
+        """
+        if pool is None:
+            pool = cls.load_candidates()
+        if not len(pool):
+            return []
+
+        scores = cls.score(task, pool)
+        mask = cls.eligible_mask(task, pool)
+        for doer_id in exclude or ():
+            i = pool.index.get(doer_id)
+            if i is not None:
+                mask[i] = False
+
+        eligible = np.flatnonzero(mask)
+        if not len(eligible):
+            return []
+
+        totals = scores['total'][eligible]
+        k = min(k, len(eligible))
+        if k == 1:
+            top = np.array([np.argmax(totals)])
+        elif k < len(eligible):
+            top = np.argpartition(-totals, k - 1)[:k]
+        else:
+            top = np.arange(len(eligible))
+        # Stable sort keeps pool order on ties, like the legacy first-best loop
+        top = top[np.argsort(-totals[top], kind='stable')]
+
+        return [(pool.ids[eligible[j]], cls.breakdown(scores, eligible[j])) for j in top]
+
+    @classmethod
+    def assign_batch(cls, tasks, assigned_by=None):
+        """
+        Auto-assign a batch of tasks in one pass.
+
+        Candidate features are loaded once; each assignment counts toward
+        the winner's workload for the rest of the batch. Assignments and
+        notifications are written with bulk inserts in one transaction.
+
+        Returns:
+            dict {task_id: TaskAssignment} for tasks that found a doer
+        """
+        from core.models import TaskAssignment
+        from core.notifications import NotificationDispatcher
+
+        tasks = list(tasks)
+        if not tasks:
+            return {}
+        prefetch_related_objects(tasks, 'poster')
+
+        pool = cls.load_candidates()
+        if not len(pool):
+            logger.warning(f"No available agents for {len(tasks)} task(s)")
+            return {}
+
+        # Existing task-agent pairs (unique_together on TaskAssignment)
+        taken = {}
+        for task_id, agent_id in TaskAssignment.objects.filter(
+            task__in=tasks
+        ).values_list('task_id', 'agent_id'):
+            taken.setdefault(task_id, set()).add(agent_id)
+
+        assignments = []
+        notifications = NotificationDispatcher()
+        for task in tasks:
+            best = cls.top_k(task, k=1, pool=pool, exclude=taken.get(task.id))
+            if not best:
+                logger.warning(f"No available agents for task {task.id}")
+                continue
+
+            agent_id, scores = best[0]
+            pool.active[pool.index[agent_id]] += 1
+
+            assignments.append(TaskAssignment(
+                task=task,
+                agent_id=agent_id,
+                assigned_by=assigned_by or task.poster,
+                status='assigned',
+                assignment_method='automatic',
+                skill_match_score=scores['skill_match'],
+                availability_score=scores['availability'],
+                rating_score=scores['rating'],
+                workload_score=scores['workload'],
+                total_match_score=scores['total'],
+                assignment_notes="Auto-assigned based on skill match, rating, and availability"
+            ))
+            notifications.add(
+                agent_id,
+                'task_assigned',
+                title='🎯 Task Assigned to You',
+                message=f'You have been assigned to "{task.title}" by {task.poster.fullname}',
+                related_task=task
+            )
+            logger.info(
+                f"Task {task.id} auto-assigned to {pool.names[pool.index[agent_id]]} "
+                f"with score {scores['total']}"
+            )
+
+        with transaction.atomic():
+            TaskAssignment.objects.bulk_create(assignments)
+            notifications.flush()
+
+        return {assignment.task_id: assignment for assignment in assignments}
+
+
+class ApplicationMatcher:
+    """
+    Batch winner selection for the 3-minute application window.
+
+    Every task whose window closed this tick goes into one
+    task × applicant score matrix (TaskApplication.ranking_score). The
+    matrix is solved as an assignment problem with a per-doer capacity,
+    so one strong doer cannot sweep every task in the same tick.
+    """
+
+    APPLICATION_WINDOW = timedelta(minutes=3)
+
+    # Max tasks a single doer can win per tick
+    DOER_CAPACITY = 1
+
+    # Cost of pairing a task with a doer who did not apply
+    INFEASIBLE_COST = 1e9
+
+    @classmethod
+    def ready_tasks(cls, now=None):
+        """Open auto-assign tasks whose application window has closed (1 query)"""
+        from core.models import Task
+
+        now = now or timezone.now()
+        return list(Task.objects.filter(
+            status='open',
+            auto_assign_enabled=True,
+            doer__isnull=True
+        ).annotate(
+            window_start=Min(
+                Coalesce('applications__first_application_time', 'applications__created_at'),
+                filter=Q(applications__status='pending')
+            )
+        ).filter(
+            window_start__lte=now - cls.APPLICATION_WINDOW
+        ).select_related('poster'))
+
+    @classmethod
+    def build_matrix(cls, tasks, applications, capacity=None):
+        """
+        Score matrix with one row per task and `capacity` columns per doer.
+
+        Returns:
+            (scores, feasible, column_doers, lookup) where lookup maps
+            (task_id, doer_id) -> TaskApplication
+        """
+        capacity = capacity or cls.DOER_CAPACITY
+        task_index = {task.id: i for i, task in enumerate(tasks)}
+
+        doers = []
+        doer_index = {}
+        lookup = {}
+        for app in applications:
+            if app.doer_id not in doer_index:
+                doer_index[app.doer_id] = len(doers)
+                doers.append(app.doer_id)
+            lookup[(app.task_id, app.doer_id)] = app
+
+        scores = np.zeros((len(tasks), len(doers)))
+        feasible = np.zeros((len(tasks), len(doers)), dtype=bool)
+        for (task_id, doer_id), app in lookup.items():
+            i, j = task_index[task_id], doer_index[doer_id]
+            scores[i, j] = float(app.ranking_score)
+            feasible[i, j] = True
+
+        # Doer d occupies columns [d*capacity, (d+1)*capacity)
+        scores = np.repeat(scores, capacity, axis=1)
+        feasible = np.repeat(feasible, capacity, axis=1)
+        column_doers = [doer_id for doer_id in doers for _ in range(capacity)]
+        return scores, feasible, column_doers, lookup
+
+    @classmethod
+    def solve(cls, scores, feasible):
+        """
+        Maximize total ranking score over feasible pairs.
+
+        Returns: list of (task_row, column) pairs
+        """
+        if not feasible.any():
+            return []
+        cost = np.where(feasible, -scores, cls.INFEASIBLE_COST)
+        rows, cols = solve_assignment(cost)
+        return [(int(i), int(j)) for i, j in zip(rows, cols) if feasible[i, j]]
+
+    @classmethod
+    def match(cls, now=None, capacity=None):
+        """
+        Select and commit winners for every task whose window closed.
+
+        Returns:
+            dict {task_id: TaskApplication} of accepted applications
+        """
+        from core.models import TaskApplication
+
+        tasks = cls.ready_tasks(now)
+        if not tasks:
+            return {}
+
+        applications = list(TaskApplication.objects.filter(
+            task__in=tasks,
+            status='pending'
+        ))
+        scores, feasible, column_doers, lookup = cls.build_matrix(tasks, applications, capacity)
+        pairs = cls.solve(scores, feasible)
+
+        winners = {}
+        for i, j in pairs:
+            task = tasks[i]
+            winners[task.id] = (task, lookup[(task.id, column_doers[j])])
+
+        cls.commit(winners.values())
+        logger.info(
+            f"⏳ Matched {len(winners)}/{len(tasks)} closed-window tasks "
+            f"across {len(set(column_doers))} applicants"
+        )
+        return {task_id: app for task_id, (task, app) in winners.items()}
+
+    @classmethod
+    def commit(cls, winners):
+        """Write tasks, applications, assignments and notifications with bulk writes in one transaction"""
+        from core.models import Task, TaskApplication, TaskAssignment
+        from core.notifications import NotificationDispatcher
+        from core.feed import TaskFeedService
+        from core.badges import UserStatsCache
+        from core.dashboard import DashboardService
+
+        winners = list(winners)
+        if not winners:
+            return
+
+        now = timezone.now()
+        tasks, apps, assignments = [], [], []
+        notifications = NotificationDispatcher(now=now)
+        for task, app in winners:
+            task.doer_id = app.doer_id
+            task.status = 'in_progress'
+            tasks.append(task)
+
+            app.status = 'accepted'
+            app.reviewed_at = now
+            apps.append(app)
+
+            score = app.ranking_score
+            assignments.append(TaskAssignment(
+                task=task,
+                agent_id=app.doer_id,
+                status='accepted',  # Pre-accepted since they applied
+                assignment_method='application',
+                total_match_score=score,
+                accepted_at=now,
+                assignment_notes=f"Winner of 3-minute application window (Score: {score})"
+            ))
+            notifications.add(
+                app.doer_id,
+                'application_accepted',
+                title='🎉 Application Accepted!',
+                message=f'You have been selected for "{task.title}"!',
+                related_task=task
+            )
+
+        with transaction.atomic():
+            Task.objects.bulk_update(tasks, ['doer', 'status'])
+            TaskApplication.objects.bulk_update(apps, ['status', 'reviewed_at'])
+            TaskAssignment.objects.bulk_create(assignments, ignore_conflicts=True)
+            notifications.flush()
+            # bulk_update skips post_save, so refresh the feed rows explicitly
+            TaskFeedService.rebuild(Task.objects.filter(id__in=[task.id for task in tasks]))
+
+        # ...and the per-user caches the Task signals would have dropped
+        user_ids = {task.poster_id for task in tasks} | {task.doer_id for task in tasks}
+        UserStatsCache.invalidate(list(user_ids), *UserStatsCache.TASK_FIELDS)
+        DashboardService.invalidate(*user_ids)
+
+
+class CandidateSearch:
+    """
+    Pruned top-k doer search for the v2 auto-assign endpoint.
+
+    Under PrioritizationService only location and preference depend on
+    the doer, so every doer falls into one of three score tiers: the
+    preferred doer, doers on the task's campus, everyone else. Tiers
+    are scanned in order with LIMITed queries on the (role, campus,
+    rating) index until the page is full, so the query count does not
+    grow with the doer population. Within a tier, higher-rated doers
+    come first.
+    """
+
+    DEFAULT_LIMIT = 5
+    MAX_LIMIT = 50
+
+    # Wall-clock budget for the tier scans; checked between queries
+    TIME_BUDGET_MS = 500
+
+    FIELDS = ('id', 'fullname', 'campus_location', 'avg_rating', 'total_ratings')
+
+    @classmethod
+    def eligible_doers(cls, task):
+        """Active, unbanned doers allowed to take the task (verified skill for skilled categories)"""
+        from core.models import User, StudentSkill
+
+        doers = User.objects.filter(
+            role='task_doer',
+            is_active=True,
+            is_banned=False
+        ).exclude(id=task.poster_id)
+
+        if task.category in AssignmentEngine.SKILLED_CATEGORIES:
+            doers = doers.filter(Exists(StudentSkill.objects.filter(
+                student=OuterRef('pk'),
+                skill_name=task.category,
+                status='verified'
+            )))
+        return doers
+
+    @classmethod
+    def tiers(cls, task):
+        """(tier_name, queryset) in descending score order"""
+        doers = cls.eligible_doers(task)
+        tiers = []
+
+        if task.preferred_doer_id:
+            tiers.append(('preferred', doers.filter(id=task.preferred_doer_id)))
+            doers = doers.exclude(id=task.preferred_doer_id)
+
+        if task.campus_location:
+            tiers.append(('campus', doers.filter(campus_location=task.campus_location)))
+            tiers.append(('other', doers.exclude(campus_location=task.campus_location)))
+        else:
+            tiers.append(('other', doers))
+
+        return [(name, qs.order_by('-avg_rating', 'id')) for name, qs in tiers]
+
+    @classmethod
+    def search(cls, task, limit=None, offset=0, budget_ms=None, now=None):
+        """
+        Top-k doers for a task with PrioritizationService breakdowns.
+
+        Returns:
+            dict with candidates (list of dicts), has_more, truncated
+            (time budget ran out before the page was filled) and elapsed_ms
+        """
+        from core.services import PrioritizationService
+
+        limit = max(1, min(limit or cls.DEFAULT_LIMIT, cls.MAX_LIMIT))
+        offset = max(0, offset)
+        budget = (budget_ms or cls.TIME_BUDGET_MS) / 1000
+        started = time.monotonic()
+
+        # One extra row tells us whether another page exists
+        wanted = offset + limit + 1
+        rows = []
+        truncated = False
+        for name, qs in cls.tiers(task):
+            if time.monotonic() - started > budget:
+                truncated = True
+                break
+            for row in qs.values(*cls.FIELDS)[:wanted - len(rows)]:
+                row['tier'] = name
+                rows.append(row)
+            if len(rows) >= wanted:
+                break
+
+        page = rows[offset:offset + limit]
+        breakdowns = PrioritizationService.get_candidate_breakdowns(task, page, now=now)
+        candidates = [
+            {
+                'id': str(row['id']),
+                'fullname': row['fullname'],
+                'campus_location': row['campus_location'],
+                'avg_rating': float(row['avg_rating']),
+                'total_ratings': row['total_ratings'],
+                'tier': row['tier'],
+                'score': breakdown,
+            }
+            for row, breakdown in zip(page, breakdowns)
+        ]
+
+        return {
+            'candidates': candidates,
+            'has_more': len(rows) > offset + limit,
+            'truncated': truncated,
+            'elapsed_ms': round((time.monotonic() - started) * 1000, 1),
+        }
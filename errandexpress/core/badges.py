@@ -0,0 +1,156 @@
+"""
+Navbar Stats Cache for ErrandExpress
+The user_stats context processor reads each user's badge counters from the
+'user_stats' namespace of the 'stats' cache (core.caching), one key per
+counter. Signals and the notification dispatcher update the keys on events:
+unread badges are incremented in place, and counters that depend on other
+tables (tasks, earnings, rating, chat reads) are dropped so the next read
+rebuilds them. A rebuild is one query with scalar subqueries.
+
+Every event also bumps a per-user generation key; a rebuild that sees the
+generation move while it ran drops what it wrote, so an event that landed
+between the rebuild's query and its cache write is never lost.
+
+Counters are exact only when the 'stats' cache is Redis, shared by every
+web and Celery process. On a per-process or per-host backend an event only
+reaches its own process, so entries expire after LOCAL_TIMEOUT instead.
+"""
+
+from django.db.models import Count, IntegerField, DecimalField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+import logging
+
+from core.caching import CacheNamespace, is_shared_backend
+
+logger = logging.getLogger(__name__)
+
+
+class UserStatsCache:
+    """
+    Usage:
+        stats = UserStatsCache.get(user)                       # 0 queries on a hit
+        UserStatsCache.incr(user_id, 'unread_notifications_count')
+        UserStatsCache.invalidate(user_id, 'tasks_completed', 'active_tasks')
+    """
+
+    FIELDS = (
+        'tasks_completed',
+        'user_rating',
+        'total_earned',
+        'active_tasks',
+        'unread_notifications_count',
+        'unread_messages_count',
+    )
+    TASK_FIELDS = ('tasks_completed', 'active_tasks')
+
+    # Per-user event counter checked around rebuilds
+    GENERATION = 'generation'
+
+    # Shared (Redis): events keep keys exact and the timeout only bounds memory.
+    # Otherwise other processes' events are missed, so bound staleness instead.
+    SHARED_TIMEOUT = 24 * 60 * 60
+    LOCAL_TIMEOUT = 60
+    TIMEOUT = SHARED_TIMEOUT if is_shared_backend('stats') else LOCAL_TIMEOUT
+
+    cache = CacheNamespace('user_stats', alias='stats', timeout=TIMEOUT)
+
+    @staticmethod
+    def _count(queryset, group_field):
+        return Coalesce(
+            Subquery(queryset.values(group_field).annotate(n=Count('pk')).values('n')[:1], output_field=IntegerField()),
+            Value(0)
+        )
+
+    @classmethod
+    def build(cls, user):
+        """All counters for a user in one query"""
+        from core.models import User, Task, Payment, Notification, ConversationSummary
+
+        if user.role == 'task_doer':
+            role_field, active_statuses, money_field = 'doer', ['accepted', 'in_progress'], 'receiver'
+        else:
+            role_field, active_statuses, money_field = 'poster', ['open', 'accepted', 'in_progress'], 'payer'
+        tasks = Task.objects.filter(**{role_field: OuterRef('pk')})
+
+        row = User.objects.filter(pk=user.pk).values('avg_rating').annotate(
+            completed=cls._count(tasks.filter(status='completed'), role_field),
+            active=cls._count(tasks.filter(status__in=active_statuses), role_field),
+            earned=Coalesce(Subquery(
+                Payment.objects.filter(**{money_field: OuterRef('pk')}, status='confirmed')
+                .values(money_field).annotate(total=Sum('amount')).values('total')[:1],
+                output_field=DecimalField(max_digits=12, decimal_places=2)
+            ), Value(0, output_field=DecimalField(max_digits=12, decimal_places=2))),
+            unread_notifications=cls._count(Notification.objects.filter(user=OuterRef('pk'), is_read=False), 'user'),
+            unread_messages=Coalesce(Subquery(
+                ConversationSummary.objects.filter(user=OuterRef('pk'))
+                .values('user').annotate(total=Sum('unread_count')).values('total')[:1],
+                output_field=IntegerField()
+            ), Value(0)),
+        ).first()
+        if row is None:
+            return dict.fromkeys(cls.FIELDS, 0)
+
+        is_participant = user.role in ('task_doer', 'task_poster')
+        return {
+            'tasks_completed': row['completed'] if is_participant else 0,
+            'user_rating': float(row['avg_rating'] or 0),
+            'total_earned': float(row['earned']) if is_participant else 0,
+            'active_tasks': row['active'] if is_participant else 0,
+            'unread_notifications_count': row['unread_notifications'],
+            'unread_messages_count': row['unread_messages'],
+        }
+
+    @classmethod
+    def get(cls, user):
+        """Cached counters; any missing key rebuilds all of them"""
+        generation_key = (user.id, cls.GENERATION)
+        cached = cls.cache.get_many([(user.id, field) for field in cls.FIELDS] + [generation_key])
+        generation = cached.pop(generation_key, None)
+        if len(cached) == len(cls.FIELDS):
+            return {field: value for (_, field), value in cached.items()}
+
+        stats = cls.build(user)
+        cls.cache.set_many({(user.id, field): stats[field] for field in cls.FIELDS})
+        if cls.cache.get(generation_key) != generation:
+            # An event ran during the rebuild and may be missing from `stats`
+            cls.cache.delete_many([(user.id, field) for field in cls.FIELDS])
+        return stats
+
+    @classmethod
+    def _bump(cls, user_ids):
+        """Tell rebuilds in flight for these users that an event happened"""
+        for user_id in user_ids:
+            try:
+                cls.cache.incr((user_id, cls.GENERATION))
+            except ValueError:
+                cls.cache.add((user_id, cls.GENERATION), 1)
+
+    @classmethod
+    def incr(cls, user_id, field, delta=1):
+        """Adjust a cached counter in place (no-op when not cached; the next read rebuilds)"""
+        cls._bump([user_id])
+        try:
+            cls.cache.incr((user_id, field), delta)
+        except ValueError:
+            pass
+
+    @classmethod
+    def incr_many(cls, field, deltas):
+        """deltas: {user_id: delta}"""
+        for user_id, delta in deltas.items():
+            if delta:
+                cls.incr(user_id, field, delta)
+
+    @classmethod
+    def set(cls, user_id, field, value):
+        cls._bump([user_id])
+        cls.cache.set((user_id, field), value)
+
+    @classmethod
+    def invalidate(cls, user_ids, *fields):
+        """Drop counters (all fields by default) for one user id or several"""
+        if not isinstance(user_ids, (list, tuple, set)):
+            user_ids = [user_ids]
+        fields = fields or cls.FIELDS
+        cls._bump([user_id for user_id in user_ids if user_id])
+        cls.cache.delete_many([(user_id, field) for user_id in user_ids if user_id for field in fields])
@@ -0,0 +1,280 @@
+"""
+Shared Cache Layer for ErrandExpress
+Cached paths go through a CacheNamespace instead of calling django.core.cache
+directly. A namespace:
+
+- prefixes its keys ('dashboard:v3:widgets:<user id>') so namespaces never
+  collide on a shared backend
+- can be invalidated as a whole by bumping its version (old keys are simply
+  never read again and expire on their own)
+- records hits, misses, writes and time spent per request, so
+  CacheStatsMiddleware can report which cached paths pay off
+
+Backends are picked in settings by CACHE_URL / STATS_CACHE_URL:
+    locmem://                 per-process memory (default)
+    file:///var/tmp/errand    shared by the processes on one host (small caches only)
+    redis://host:6379/1       shared by every worker on every host (production)
+
+Version bumps and shared totals only reach the processes that share the
+backend, and add/incr are only atomic on Redis: elsewhere the totals are
+per process or approximate.
+"""
+
+from django.conf import settings
+from django.core.cache import caches
+from contextlib import contextmanager
+from contextvars import ContextVar
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Per-request collector: {namespace: {'hits', 'misses', 'sets', 'deletes', 'ms'}}
+_request_stats = ContextVar('cache_request_stats', default=None)
+
+# Per-request namespace versions, so a request reads each version once
+_request_versions = ContextVar('cache_request_versions', default=None)
+
+
+class CacheStats:
+    """
+    Usage:
+        with CacheStats.collect() as stats:
+            ...                                        # cached reads
+        stats['dashboard']['hits']
+        CacheStats.totals()                            # across all requests
+    """
+
+    FIELDS = ('hits', 'misses', 'sets', 'deletes', 'ms')
+
+    # Cumulative counters live in the default cache so every worker adds to them
+    ALIAS = 'default'
+    TOTALS_PREFIX = 'cachestats'
+    TOTALS_TIMEOUT = 7 * 24 * 60 * 60
+
+    @staticmethod
+    @contextmanager
+    def collect():
+        stats_token = _request_stats.set({})
+        versions_token = _request_versions.set({})
+        try:
+            yield _request_stats.get()
+        finally:
+            _request_stats.reset(stats_token)
+            _request_versions.reset(versions_token)
+
+    @classmethod
+    def record(cls, namespace, field, amount=1):
+        stats = _request_stats.get()
+        if stats is None:
+            return
+        entry = stats.setdefault(namespace, dict.fromkeys(cls.FIELDS, 0))
+        entry[field] += amount
+
+    @classmethod
+    def add_to_totals(cls, stats):
+        """
+        Fold one request's stats into the shared cumulative counters
+        (exact on Redis, where add/incr are atomic)
+        """
+        if not stats:
+            return
+        store = caches[cls.ALIAS]
+        try:
+            for namespace, entry in stats.items():
+                entry = {**entry, 'ms': round(entry['ms'] * 1000), 'requests': 1}
+                for field, amount in entry.items():
+                    if not amount:
+                        continue
+                    key = f'{cls.TOTALS_PREFIX}:{namespace}:{field}'
+                    if not store.add(key, amount, cls.TOTALS_TIMEOUT):
+                        store.incr(key, amount)
+        except Exception as e:
+            logger.warning(f"Could not record cache stats: {e}")
+
+    @classmethod
+    def totals(cls):
+        """
+        Cumulative counters per namespace that has served requests.
+
+        Returns: {namespace: {'hits', 'misses', 'sets', 'deletes', 'ms', 'requests', 'hit_rate'}}
+        """
+        store = caches[cls.ALIAS]
+        namespaces = sorted(CacheNamespace.registry)
+        fields = cls.FIELDS + ('requests',)
+        raw = store.get_many([f'{cls.TOTALS_PREFIX}:{ns}:{field}' for ns in namespaces for field in fields])
+
+        totals = {}
+        for namespace in namespaces:
+            if not raw.get(f'{cls.TOTALS_PREFIX}:{namespace}:requests'):
+                continue
+            entry = {field: raw.get(f'{cls.TOTALS_PREFIX}:{namespace}:{field}', 0) for field in fields}
+            entry['ms'] = entry['ms'] / 1000  # stored in microseconds
+            reads = entry['hits'] + entry['misses']
+            entry['hit_rate'] = entry['hits'] / reads if reads else None
+            totals[namespace] = entry
+        return totals
+
+    @classmethod
+    def reset_totals(cls):
+        caches[cls.ALIAS].delete_many(
+            [f'{cls.TOTALS_PREFIX}:{ns}:{field}' for ns in CacheNamespace.registry for field in cls.FIELDS + ('requests',)]
+        )
+
+    @staticmethod
+    def server_timing(stats):
+        """Server-Timing header value: one metric per namespace"""
+        return ', '.join(
+            f'cache-{namespace};dur={entry["ms"]:.2f};desc="{entry["hits"]} hit / {entry["misses"]} miss"'
+            for namespace, entry in sorted(stats.items())
+        )
+
+
+def is_shared_backend(alias):
+    """True when every process on every host sees the same keys (Redis)"""
+    return 'redis' in settings.CACHES[alias]['BACKEND'].lower()
+
+
+class CacheNamespace:
+    """
+    Usage:
+        WIDGETS = CacheNamespace('dashboard', timeout=300)
+        WIDGETS.get_or_set(('widgets', user.id), build)
+        WIDGETS.delete_many([('widgets', user_id)])
+        WIDGETS.invalidate()                           # every dashboard key
+    """
+
+    # Every namespace name, so CacheStats reads totals without a shared index
+    registry = set()
+
+    def __init__(self, name, alias='default', timeout=None):
+        CacheNamespace.registry.add(name)
+        self.name = name
+        self.alias = alias
+        self.timeout = timeout
+
+    def __repr__(self):
+        return f'<CacheNamespace {self.name} ({self.alias})>'
+
+    @property
+    def store(self):
+        return caches[self.alias]
+
+    @property
+    def version_key(self):
+        return f'{self.name}:version'
+
+    @contextmanager
+    def _timed(self):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            CacheStats.record(self.name, 'ms', (time.perf_counter() - started) * 1000)
+
+    def version(self):
+        """Current namespace version (read once per request)"""
+        versions = _request_versions.get()
+        if versions is not None and self.name in versions:
+            return versions[self.name]
+
+        version = self.store.get(self.version_key)
+        if version is None:
+            # add() so concurrent first readers agree on the starting version
+            self.store.add(self.version_key, 1, None)
+            version = self.store.get(self.version_key) or 1
+        if versions is not None:
+            versions[self.name] = version
+        return version
+
+    def key(self, parts, version=None):
+        if not isinstance(parts, (list, tuple)):
+            parts = (parts,)
+        suffix = ':'.join(str(part) for part in parts)
+        return f'{self.name}:v{version or self.version()}:{suffix}'
+
+    def invalidate(self):
+        """Drop every key in the namespace by moving to a new version"""
+        with self._timed():
+            try:
+                version = self.store.incr(self.version_key)
+            except ValueError:
+                version = 2
+                self.store.set(self.version_key, version, None)
+        versions = _request_versions.get()
+        if versions is not None:
+            versions[self.name] = version
+        CacheStats.record(self.name, 'deletes')
+        return version
+
+    # ==================== READS ====================
+
+    def get(self, parts, default=None):
+        with self._timed():
+            value = self.store.get(self.key(parts))
+        CacheStats.record(self.name, 'misses' if value is None else 'hits')
+        return default if value is None else value
+
+    def get_many(self, parts_list):
+        """Returns: {parts: value} for the keys that were cached"""
+        with self._timed():
+            version = self.version()
+            keys = {self.key(parts, version): parts for parts in parts_list}
+            found = self.store.get_many(list(keys))
+        CacheStats.record(self.name, 'hits', len(found))
+        CacheStats.record(self.name, 'misses', len(keys) - len(found))
+        return {keys[key]: value for key, value in found.items()}
+
+    def get_or_set(self, parts, build, timeout=None):
+        """Cached value, or build() stored under the key (None results are not cached)"""
+        value = self.get(parts)
+        if value is None:
+            value = build()
+            if value is not None:
+                self.set(parts, value, timeout)
+        return value
+
+    # ==================== WRITES ====================
+
+    def set(self, parts, value, timeout=None):
+        with self._timed():
+            self.store.set(self.key(parts), value, self.timeout if timeout is None else timeout)
+        CacheStats.record(self.name, 'sets')
+
+    def add(self, parts, value, timeout=None):
+        """Store only if the key is missing; returns True when stored"""
+        with self._timed():
+            added = self.store.add(self.key(parts), value, self.timeout if timeout is None else timeout)
+        CacheStats.record(self.name, 'sets')
+        return added
+
+    def set_many(self, mapping, timeout=None):
+        """mapping: {parts: value}"""
+        if not mapping:
+            return
+        with self._timed():
+            version = self.version()
+            self.store.set_many(
+                {self.key(parts, version): value for parts, value in mapping.items()},
+                self.timeout if timeout is None else timeout
+            )
+        CacheStats.record(self.name, 'sets', len(mapping))
+
+    def incr(self, parts, delta=1):
+        """Adjust a cached integer in place. Raises ValueError when not cached."""
+        with self._timed():
+            value = self.store.incr(self.key(parts), delta)
+        CacheStats.record(self.name, 'sets')
+        return value
+
+    def delete(self, parts):
+        self.delete_many([parts])
+
+    def delete_many(self, parts_list):
+        parts_list = list(parts_list)
+        if not parts_list:
+            return
+        with self._timed():
+            version = self.version()
+            self.store.delete_many([self.key(parts, version) for parts in parts_list])
+        CacheStats.record(self.name, 'deletes', len(parts_list))
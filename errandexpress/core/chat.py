@@ -0,0 +1,180 @@
+"""
+Chat Push for ErrandExpress
+Server-Sent Events delivery of chat deltas per task conversation, so
+clients stop polling api_get_messages and /api/check-chat/.
+
+Events on channel chat:<task_id>:
+    message   one new Message (same shape as api_get_messages rows)
+    access    chat_unlocked / commission_paid flags changed
+
+Push is on only with a shared (Redis) broker; with memory:// a message
+sent through one worker never reaches streams held by another, so the
+chat pages keep polling. Under WSGI each open stream holds a gunicorn
+thread for up to MAX_STREAM_SECONDS, so workers x threads caps the number
+of users with a chat open at once.
+"""
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+import json
+import time
+import uuid
+import logging
+
+from core.pubsub import get_broker, is_shared, publish
+
+logger = logging.getLogger(__name__)
+
+
+class ChatPush:
+    """Publish and stream chat events"""
+
+    # Comment line keeps proxies from closing an idle stream and surfaces disconnects
+    HEARTBEAT_SECONDS = 15
+
+    # Streams end and EventSource reconnects (with Last-Event-ID), so a
+    # sync worker is never held indefinitely
+    MAX_STREAM_SECONDS = 55
+
+    # Client reconnect delay hint
+    RETRY_MS = 3000
+
+    # Messages replayed on reconnect
+    BACKFILL_LIMIT = 50
+
+    ACCESS_FIELDS = ('chat_unlocked', 'commission_deducted')
+
+    @staticmethod
+    def enabled():
+        """Whether chat pages should stream instead of poll"""
+        return is_shared()
+
+    @staticmethod
+    def channel(task_id):
+        return f'chat:{task_id}'
+
+    @staticmethod
+    def serialize_message(msg):
+        """Wire format shared by api_get_messages and the stream"""
+        return {
+            'id': str(msg.id),
+            'sender_id': str(msg.sender_id),
+            'sender_name': msg.sender.fullname,
+            'message': msg.message,
+            'created_at': msg.created_at.isoformat(),
+            'attachment_url': msg.attachment.url if msg.attachment else None,
+            'attachment_type': msg.attachment_type or 'file'
+        }
+
+    @classmethod
+    def publish_message(cls, message):
+        """Push a new message once its transaction commits"""
+        data = cls.serialize_message(message)
+        transaction.on_commit(lambda: publish(cls.channel(message.task_id), 'message', data))
+
+    @classmethod
+    def publish_access(cls, task):
+        """Push the chat access flags once the task row commits"""
+        data = {
+            'chat_unlocked': task.chat_unlocked,
+            'commission_paid': task.commission_deducted,
+        }
+        transaction.on_commit(lambda: publish(cls.channel(task.id), 'access', data))
+
+    @staticmethod
+    def format_event(event, data, event_id=None):
+        lines = []
+        if event_id:
+            lines.append(f'id: {event_id}')
+        lines.append(f'event: {event}')
+        lines.append(f'data: {json.dumps(data)}')
+        return '\n'.join(lines) + '\n\n'
+
+    @staticmethod
+    def resolve_cursor(task_id, after):
+        """
+        (created_at, id) position of an `after` cursor: a message id, or an
+        ISO timestamp (id None). None if the cursor is not valid for this
+        conversation.
+        """
+        from core.models import Message
+
+        try:
+            message_id = uuid.UUID(str(after))
+        except ValueError:
+            moment = parse_datetime(str(after))
+            if moment is None:
+                return None
+            if timezone.is_naive(moment):
+                moment = timezone.make_aware(moment)
+            return moment, None
+        return Message.objects.filter(task_id=task_id, id=message_id).values_list('created_at', 'id').first()
+
+    @classmethod
+    def messages_after(cls, task_id, after, limit=None):
+        """
+        Messages after the cursor in (created_at, id) order, oldest first,
+        read off the (task, created_at) index. The id breaks ties, so
+        messages sharing the anchor's timestamp are not skipped.
+        Returns None for an invalid cursor.
+        """
+        from core.models import Message
+
+        anchor = cls.resolve_cursor(task_id, after)
+        if anchor is None:
+            return None
+        created_at, anchor_id = anchor
+        after_anchor = Q(created_at__gt=created_at)
+        if anchor_id is not None:
+            after_anchor |= Q(created_at=created_at, id__gt=anchor_id)
+        return list(
+            Message.objects.filter(after_anchor, task_id=task_id)
+            .select_related('sender')
+            .order_by('created_at', 'id')[:limit or cls.BACKFILL_LIMIT]
+        )
+
+    @classmethod
+    def stream(cls, task, last_event_id=None, max_seconds=None, heartbeat=None):
+        """
+        SSE body generator for one task conversation.
+
+        Subscribes before the backfill query so nothing published in
+        between is lost; replayed ids are skipped on the live side.
+        """
+        subscription = get_broker().subscribe(cls.channel(task.id))
+        max_seconds = cls.MAX_STREAM_SECONDS if max_seconds is None else max_seconds
+        heartbeat = heartbeat or cls.HEARTBEAT_SECONDS
+
+        def events():
+            try:
+                yield f'retry: {cls.RETRY_MS}\n\n'
+
+                sent = set()
+                if last_event_id:
+                    for msg in cls.messages_after(task.id, last_event_id) or ():
+                        sent.add(str(msg.id))
+                        yield cls.format_event('message', cls.serialize_message(msg), msg.id)
+
+                deadline = time.monotonic() + max_seconds
+                while True:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    item = subscription.get(timeout=min(heartbeat, remaining))
+                    if item is None:
+                        yield f': ping {timezone.now().isoformat()}\n\n'
+                        continue
+
+                    event, data = item
+                    if event == 'message':
+                        if data['id'] in sent:
+                            continue
+                        yield cls.format_event(event, data, data['id'])
+                    else:
+                        yield cls.format_event(event, data)
+            finally:
+                subscription.close()
+
+        return events()
@@ -1,12 +1,12 @@
 # core/context_processors.py
-from django.db.models import Avg, Sum, Count, Q
-from django.core.cache import cache
-from decimal import Decimal
+from .badges import UserStatsCache
 
 def user_stats(request):
     """
     Context processor to provide real user statistics to all templates.
-    ✅ OPTIMIZED: Added caching to reduce database queries from 6-8 to 0 per page load.
+    ✅ OPTIMIZED: Counters live in the stats cache and are updated by signals
+    (core.badges), so a page load costs 0 queries; a miss rebuilds them with
+    a single query. Exact with a Redis stats cache, at most 60s stale otherwise.
     """
     # 1. Early exit checks
     if not request.user.is_authenticated:
@@ -18,93 +18,13 @@ def user_stats(request):
     if request.path.startswith('/admin'):
         return {}
 
-    user = request.user
-    
-    # ✅ PERFORMANCE: Check cache first
-    cache_key = f'user_stats_{user.id}'
-    cached_stats = cache.get(cache_key)
-    
-    if cached_stats is not None:
-        return {'user_stats': cached_stats}
-    
-    # Cache miss - calculate stats
-    stats = {
-        'tasks_completed': 0,
-        'user_rating': 0,
-        'total_earned': 0,
-        'active_tasks': 0,
-        'unread_notifications_count': 0,
-        'unread_messages_count': 0,
-    }
-    
     try:
-        from .models import Task, Rating, Payment, Notification, Message
-        
-        # 2. Use Cached Fields where possible
-        # User model already has avg_rating, NO NEED to query Rating table again.
-        stats['user_rating'] = float(user.avg_rating)
-        
-        # 3. Role-Based Stats (Only query if role matches)
-        # Tasks completed (different logic for poster vs doer)
-        if user.role == 'task_doer':
-            # ✅ OPTIMIZED: Use single aggregation query instead of multiple count() calls
-            task_stats = Task.objects.filter(doer=user).aggregate(
-                active=Count('id', filter=Q(status__in=['accepted', 'in_progress'])),
-                completed=Count('id', filter=Q(status='completed'))
-            )
-            stats['active_tasks'] = task_stats['active']
-            stats['tasks_completed'] = task_stats['completed']
-            
-            # Total earned
-            total_earned = Payment.objects.filter(
-                receiver=user,
-                status='confirmed'
-            ).aggregate(total=Sum('amount'))['total'] or 0
-            stats['total_earned'] = float(total_earned)
-            
-        elif user.role == 'task_poster':
-            # ✅ OPTIMIZED: Use single aggregation query
-            task_stats = Task.objects.filter(poster=user).aggregate(
-                active=Count('id', filter=Q(status__in=['open', 'accepted', 'in_progress'])),
-                completed=Count('id', filter=Q(status='completed'))
-            )
-            stats['active_tasks'] = task_stats['active']
-            stats['tasks_completed'] = task_stats['completed']
-            
-            # Total spent
-            total_spent = Payment.objects.filter(
-                payer=user,
-                status='confirmed'
-            ).aggregate(total=Sum('amount'))['total'] or 0
-            stats['total_earned'] = float(total_spent)
-            
-        # 4. Notifications & Messages (Optimized or kept essential)
-        # These are essential for the navbar badge, so we keep them.
-        stats['unread_notifications_count'] = Notification.objects.filter(
-            user=user, 
-            is_read=False
-        ).count()
-
-        # ✅ OPTIMIZED: Split complex Q query into two simpler queries (faster with indexes)
-        poster_unread = Message.objects.filter(
-            task__poster=user, 
-            is_read=False
-        ).exclude(sender=user).count()
-        
-        doer_unread = Message.objects.filter(
-            task__doer=user, 
-            is_read=False
-        ).exclude(sender=user).count()
-        
-        stats['unread_messages_count'] = poster_unread + doer_unread
-        
-        # ✅ PERFORMANCE: Cache for 60 seconds
-        cache.set(cache_key, stats, 60)
-            
+        stats = UserStatsCache.get(request.user)
     except Exception as e:
         # Fail silently/log to avoid crashing the whole site
         import logging
         logger = logging.getLogger(__name__)
         logger.error(f"Error calculating user stats: {str(e)}")
+        stats = dict.fromkeys(UserStatsCache.FIELDS, 0)
     
     return {'user_stats': stats}
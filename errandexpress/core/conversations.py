@@ -0,0 +1,175 @@
+"""
+Conversation Summaries for ErrandExpress
+Keeps one ConversationSummary row per (task, participant) with the last
+message and an unread counter, so the inbox is one indexed query and
+marking a chat read is a single-row update
+"""
+
+from django.db import transaction
+from django.db.models import Case, When, F, Q, Count, Sum, OuterRef, Subquery
+from django.utils import timezone
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class ConversationService:
+    """Maintenance and reads of ConversationSummary rows"""
+
+    PREVIEW_LENGTH = 100
+    BATCH_SIZE = 1000
+
+    @staticmethod
+    def participant_ids(task):
+        return [user_id for user_id in (task.poster_id, task.doer_id) if user_id]
+
+    @classmethod
+    def preview(cls, message):
+        text = (message.message or '').strip()
+        if not text and message.attachment:
+            text = '📎 Attachment'
+        return text[:cls.PREVIEW_LENGTH]
+
+    @classmethod
+    def record_message(cls, message):
+        """
+        Fold a new message into both participants' summaries
+        (2 queries: ensure rows, then one UPDATE for both).
+        """
+        from core.models import ConversationSummary
+        from core.badges import UserStatsCache
+
+        participants = cls.participant_ids(message.task)
+        if not participants:
+            return
+
+        with transaction.atomic():
+            ConversationSummary.objects.bulk_create(
+                [ConversationSummary(task_id=message.task_id, user_id=user_id) for user_id in participants],
+                ignore_conflicts=True
+            )
+            ConversationSummary.objects.filter(
+                task_id=message.task_id,
+                user_id__in=participants
+            ).update(
+                last_message=message,
+                last_message_preview=cls.preview(message),
+                last_message_at=message.created_at,
+                last_sender_id=message.sender_id,
+                unread_count=Case(
+                    When(user_id=message.sender_id, then=F('unread_count')),
+                    default=F('unread_count') + 1
+                ),
+                updated_at=timezone.now()
+            )
+        UserStatsCache.incr_many('unread_messages_count', {
+            user_id: 1 for user_id in participants if user_id != message.sender_id
+        })
+
+    @classmethod
+    def mark_read(cls, task_id, user):
+        """Reset the reader's unread counter (replaces bulk Message.is_read updates)"""
+        from core.models import ConversationSummary
+        from core.badges import UserStatsCache
+
+        updated = ConversationSummary.objects.filter(
+            task_id=task_id,
+            user=user
+        ).exclude(unread_count=0, last_read_at__isnull=False).update(
+            unread_count=0,
+            last_read_at=timezone.now(),
+            updated_at=timezone.now()
+        )
+        if updated:
+            UserStatsCache.invalidate(user.pk, 'unread_messages_count')
+        return updated
+
+    @classmethod
+    def clear(cls, task_id):
+        """Conversation deleted: summaries no longer point at any message"""
+        from core.models import ConversationSummary
+        from core.badges import UserStatsCache
+
+        user_ids = list(ConversationSummary.objects.filter(task_id=task_id, unread_count__gt=0).values_list('user_id', flat=True))
+        UserStatsCache.invalidate(user_ids, 'unread_messages_count')
+        ConversationSummary.objects.filter(task_id=task_id).update(
+            last_message=None,
+            last_message_preview='',
+            last_message_at=None,
+            last_sender=None,
+            unread_count=0,
+            updated_at=timezone.now()
+        )
+
+    @classmethod
+    def unread_total(cls, user):
+        from core.models import ConversationSummary
+
+        return ConversationSummary.objects.filter(user=user).aggregate(
+            total=Sum('unread_count')
+        )['total'] or 0
+
+    @classmethod
+    def rebuild(cls, tasks_queryset=None):
+        """
+        Rebuild summaries from the Message table (set-based). Existing
+        last_read_at values are kept: unread means from the other participant
+        and newer than last_read_at, or Message.is_read=False for a
+        participant who never opened the chat since summaries existed.
+
+        Returns: number of summary rows written
+        """
+        from core.models import Task, Message, ConversationSummary
+
+        if tasks_queryset is None:
+            tasks_queryset = Task.objects.all()
+
+        def read_at(field):
+            return Subquery(
+                ConversationSummary.objects.filter(task=OuterRef('pk'), user_id=OuterRef(field)).values('last_read_at')[:1]
+            )
+
+        def unread(role):
+            return ~Q(messages__sender_id=F(f'{role}_id')) & (
+                Q(**{f'{role}_read_at__isnull': True}, messages__is_read=False) |
+                Q(messages__created_at__gt=F(f'{role}_read_at'))
+            )
+
+        tasks = list(tasks_queryset.annotate(
+            poster_read_at=read_at('poster_id'),
+            doer_read_at=read_at('doer_id'),
+        ).annotate(
+            message_count=Count('messages'),
+            poster_unread=Count('messages', filter=unread('poster')),
+            doer_unread=Count('messages', filter=unread('doer')),
+            last_id=Subquery(
+                Message.objects.filter(task=OuterRef('pk')).order_by('-created_at').values('id')[:1]
+            )
+        ).filter(message_count__gt=0).values(
+            'id', 'poster_id', 'doer_id', 'poster_unread', 'doer_unread', 'poster_read_at', 'doer_read_at', 'last_id'
+        ))
+        last_messages = Message.objects.in_bulk([task['last_id'] for task in tasks])
+
+        rows = []
+        for task in tasks:
+            message = last_messages[task['last_id']]
+            for role in ('poster', 'doer'):
+                user_id = task[f'{role}_id']
+                if not user_id:
+                    continue
+                rows.append(ConversationSummary(
+                    task_id=task['id'],
+                    user_id=user_id,
+                    last_message=message,
+                    last_message_preview=cls.preview(message),
+                    last_message_at=message.created_at,
+                    last_sender_id=message.sender_id,
+                    unread_count=task[f'{role}_unread'],
+                    last_read_at=task[f'{role}_read_at'],
+                ))
+
+        with transaction.atomic():
+            ConversationSummary.objects.filter(task__in=tasks_queryset).delete()
+            ConversationSummary.objects.bulk_create(rows, batch_size=cls.BATCH_SIZE)
+        logger.info(f"Rebuilt {len(rows)} conversation summaries")
+        return len(rows)
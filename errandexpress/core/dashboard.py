@@ -0,0 +1,190 @@
+"""
+Dashboard Data for ErrandExpress
+Per-user dashboard metrics in one conditional-aggregate query per role, and
+the dashboard's task lists cached per user. Lists are dropped by signals
+when the user's tasks, applications, payments, skills or messages change;
+the open-task feed lists (recommended / high priority / quick wins) follow
+the whole marketplace, so they only live for FEED_TIMEOUT.
+"""
+
+from django.db.models import Avg, Count, DurationField, ExpressionWrapper, F, Q, Sum
+from django.utils import timezone
+import logging
+
+from core.caching import CacheNamespace
+
+logger = logging.getLogger(__name__)
+
+
+class DashboardService:
+    """
+    Usage:
+        metrics = DashboardService.metrics(user)      # 1 query
+        widgets = DashboardService.widgets(user)      # cached lists
+        DashboardService.payload(user)                # JSON variant
+    """
+
+    # Per-user lists, invalidated by signals (the timeout is a backstop)
+    CACHE_TIMEOUT = 300
+
+    # Open-task lists shared with the whole marketplace
+    FEED_TIMEOUT = 60
+
+    LIST_SIZE = 5
+
+    cache = CacheNamespace('dashboard', timeout=CACHE_TIMEOUT)
+
+    @classmethod
+    def invalidate(cls, *user_ids):
+        """Drop cached lists for these users (None ids are ignored)"""
+        cls.cache.delete_many([('widgets', user_id) for user_id in user_ids if user_id])
+
+    @staticmethod
+    def month_start(now=None):
+        return (now or timezone.now()).replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+    # ==================== METRICS ====================
+
+    @classmethod
+    def poster_metrics(cls, user, now=None):
+        """Returns: {'active_count', 'completed_count', 'total_assigned', 'monthly_spent', 'avg_completion_hours', 'success_rate'}"""
+        from core.models import Task
+
+        completed = Q(status='completed')
+        stats = Task.objects.filter(poster=user).aggregate(
+            active_count=Count('id', filter=Q(status__in=['open', 'in_progress'])),
+            completed_count=Count('id', filter=completed),
+            total_assigned=Count('id', filter=~Q(status='open')),
+            monthly_spent=Sum('price', filter=Q(created_at__gte=cls.month_start(now))),
+            avg_completion=Avg(
+                ExpressionWrapper(F('completed_at') - F('accepted_at'), output_field=DurationField()),
+                filter=completed
+            )
+        )
+        avg_completion = stats.pop('avg_completion')
+        stats['monthly_spent'] = stats['monthly_spent'] or 0
+        stats['avg_completion_hours'] = avg_completion.total_seconds() / 3600 if avg_completion else 0
+        total_assigned = stats['total_assigned']
+        stats['success_rate'] = (stats['completed_count'] / total_assigned * 100) if total_assigned > 0 else 0
+        return stats
+
+    @classmethod
+    def doer_metrics(cls, user, now=None):
+        """Returns: {'completed_count', 'in_progress_count', 'total_assigned', 'monthly_earnings', 'pending_earnings', 'success_rate', 'avg_rating'}"""
+        from core.models import Task
+
+        completed = Q(status='completed')
+        stats = Task.objects.filter(doer=user).aggregate(
+            completed_count=Count('id', filter=completed),
+            in_progress_count=Count('id', filter=Q(status='in_progress')),
+            total_assigned=Count('id'),
+            monthly_earnings=Sum('price', filter=completed & Q(completed_at__gte=cls.month_start(now))),
+            pending_earnings=Sum('price', filter=Q(status='in_progress'))
+        )
+        stats['monthly_earnings'] = stats['monthly_earnings'] or 0
+        stats['pending_earnings'] = stats['pending_earnings'] or 0
+        total_assigned = stats['total_assigned']
+        stats['success_rate'] = (stats['completed_count'] / total_assigned * 100) if total_assigned > 0 else 0.0
+        # Ratings received, kept on the user row by RatingAggregateService
+        stats['avg_rating'] = float(user.avg_rating or 0)
+        return stats
+
+    @classmethod
+    def metrics(cls, user, now=None):
+        if user.role == 'task_poster':
+            return cls.poster_metrics(user, now)
+        return cls.doer_metrics(user, now)
+
+    # ==================== WIDGET LISTS ====================
+
+    @classmethod
+    def poster_widgets(cls, user):
+        from core.models import Task
+
+        tasks = Task.objects.filter(poster=user)
+        completed = tasks.filter(status='completed').select_related('doer')[:cls.LIST_SIZE]
+        return {
+            'pending_applications': list(
+                tasks.filter(status='open').annotate(
+                    app_count=Count('applications', filter=Q(applications__status='pending'))
+                ).filter(app_count__gt=0)[:cls.LIST_SIZE]
+            ),
+            'in_progress_tasks': list(tasks.filter(status='in_progress').select_related('doer')[:cls.LIST_SIZE]),
+            'awaiting_review': list(completed),
+            'recent_tasks': list(tasks.select_related('doer').order_by('-created_at')[:cls.LIST_SIZE]),
+        }
+
+    @classmethod
+    def doer_widgets(cls, user):
+        from core.models import Task
+
+        tasks = Task.objects.filter(doer=user)
+        verified_skills = list(user.skills.filter(status='verified'))
+        return {
+            'active_applications': list(
+                Task.objects.filter(status='open', messages__sender=user).distinct()[:cls.LIST_SIZE]
+            ),
+            'current_work': list(tasks.filter(status='in_progress')[:cls.LIST_SIZE]),
+            'pending_payments': list(tasks.filter(status='completed', payment__status='pending')[:cls.LIST_SIZE]),
+            'recent_tasks': list(tasks.order_by('-created_at')[:cls.LIST_SIZE]),
+            'verified_skills': verified_skills,
+        }
+
+    @classmethod
+    def doer_feed(cls, user):
+        """Open-task lists for a doer (one ranked feed read, two small scans)"""
+        from core.models import Task
+        from core.feed import TaskFeedService
+
+        unassigned = Task.objects.filter(status='open', doer__isnull=True).exclude(poster=user)
+        return {
+            'recommended_tasks': list(TaskFeedService.get_feed_for_user(user)[:cls.LIST_SIZE]),
+            'high_priority_tasks': list(unassigned.filter(price__gte=200)[:3]),
+            'quick_wins': list(unassigned.filter(price__lte=100)[:3]),
+        }
+
+    @classmethod
+    def widgets(cls, user):
+        """Cached task lists for the user's role"""
+        widgets = cls.cache.get_or_set(
+            ('widgets', user.id),
+            lambda: cls.poster_widgets(user) if user.role == 'task_poster' else cls.doer_widgets(user)
+        )
+        if user.role != 'task_poster':
+            feed = cls.cache.get_or_set(('feed', user.id), lambda: cls.doer_feed(user), cls.FEED_TIMEOUT)
+            widgets = {**widgets, **feed}
+        return widgets
+
+    # ==================== JSON VARIANT ====================
+
+    @staticmethod
+    def serialize_task(task):
+        data = {
+            'id': str(task.id),
+            'title': task.title,
+            'status': task.status,
+            'status_display': task.get_status_display(),
+            'category': task.category,
+            'price': float(task.price),
+            'deadline': task.deadline.isoformat() if task.deadline else None,
+            'created_at': task.created_at.isoformat() if task.created_at else None,
+        }
+        if hasattr(task, 'app_count'):
+            data['app_count'] = task.app_count
+        return data
+
+    @classmethod
+    def payload(cls, user, now=None):
+        """Metrics and widget lists as JSON-ready data for api_dashboard_widgets"""
+        metrics = cls.metrics(user, now)
+        widgets = {}
+        for name, items in cls.widgets(user).items():
+            if name == 'verified_skills':
+                widgets[name] = [skill.skill_name for skill in items]
+            else:
+                widgets[name] = [cls.serialize_task(task) for task in items]
+        return {
+            'role': user.role,
+            'metrics': {name: float(value) if value is not None else None for name, value in metrics.items()},
+            'widgets': widgets,
+        }
@@ -0,0 +1,379 @@
+"""
+Task Feed Index for ErrandExpress
+Maintains TaskFeedEntry rows so the doer feed is one indexed scan
+plus a cheap per-user adjustment (skills, location, preference, time window)
+"""
+
+from django.db.models import Q, F, Value, Case, When, DecimalField, IntegerField, Avg, Min, ExpressionWrapper
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from decimal import Decimal
+from datetime import timedelta
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class TaskFeedService:
+    """
+    Incrementally maintained doer feed.
+
+    Write path (signals): Task, Rating and TaskApplication writes refresh
+    the affected TaskFeedEntry rows.
+    Read path: get_feed_for_user() filters the index by the doer's skill
+    buckets and adds only the doer-dependent score factors.
+    """
+
+    SKILL_BUCKETS = ('typing', 'powerpoint', 'graphics')
+
+    # 3-minute application window
+    APPLICATION_WINDOW = timedelta(minutes=3)
+
+    # Static weights (precomputed into static_score)
+    POSTER_RATING_WEIGHT = Decimal('2.00')
+    PRIORITY_LEVEL_WEIGHT = Decimal('0.50')
+
+    # Per-user weights
+    SKILL_MATCH_SCORE = 3
+    URGENCY_WEIGHT = Decimal('1.50')
+    LOCATION_BONUS = Decimal('2.00')
+    PREFERENCE_BONUS = Decimal('2.00')
+
+    BATCH_SIZE = 1000
+
+    # ==================== WRITE PATH ====================
+
+    @classmethod
+    def bucket_flags(cls, category, tags):
+        """Skill buckets that unlock a task: its category or an exact tag (same rules as the feed filter)"""
+        from core.tags import TagService
+
+        tags = set(TagService.normalize(tags))
+        flags = {'bucket_microtask': category == 'microtask' or 'microtask' in tags}
+        for skill in cls.SKILL_BUCKETS:
+            flags[f'bucket_{skill}'] = category == skill or skill in tags
+        return flags
+
+    @classmethod
+    def static_score(cls, poster_rating, priority_level):
+        """Score components that do not depend on the viewing doer"""
+        return (
+            Decimal(str(poster_rating)) * cls.POSTER_RATING_WEIGHT +
+            Decimal(priority_level or 0) * cls.PRIORITY_LEVEL_WEIGHT
+        ).quantize(Decimal('0.01'))
+
+    @classmethod
+    def _build_entry(cls, task, poster_rating, first_application_time):
+        from core.models import TaskFeedEntry
+
+        poster_rating = Decimal(str(poster_rating or 0)).quantize(Decimal('0.01'))
+        hidden_after = None
+        if task.doer_id and first_application_time:
+            hidden_after = first_application_time + cls.APPLICATION_WINDOW
+
+        return TaskFeedEntry(
+            task_id=task.id,
+            poster_id=task.poster_id,
+            campus_location=task.campus_location or '',
+            is_listed=task.status == 'open',
+            hidden_after=hidden_after,
+            deadline=task.deadline,
+            priority_level=task.priority_level,
+            poster_rating=poster_rating,
+            static_score=cls.static_score(poster_rating, task.priority_level),
+            **cls.bucket_flags(task.category, task.tags)
+        )
+
+    @classmethod
+    def _first_pending_application_times(cls, task_ids):
+        from core.models import TaskApplication
+
+        return dict(
+            TaskApplication.objects.filter(
+                task_id__in=task_ids,
+                status='pending',
+                first_application_time__isnull=False
+            ).values('task_id').annotate(
+                first=Min('first_application_time')
+            ).values_list('task_id', 'first')
+        )
+
+    @classmethod
+    def _poster_ratings(cls, poster_ids):
+        from core.models import User
+
+        # Denormalized by RatingAggregateService (core.ratings)
+        return dict(
+            User.objects.filter(id__in=poster_ids).values_list('id', 'avg_rating')
+        )
+
+    @classmethod
+    def refresh_task(cls, task):
+        """Rebuild the feed row for a single task (Task / TaskApplication writes)"""
+        from core.models import TaskFeedEntry
+
+        first_times = cls._first_pending_application_times([task.id]) if task.doer_id else {}
+        ratings = cls._poster_ratings([task.poster_id])
+        entry = cls._build_entry(task, ratings.get(task.poster_id), first_times.get(task.id))
+
+        TaskFeedEntry.objects.bulk_create(
+            [entry],
+            update_conflicts=True,
+            unique_fields=['task'],
+            update_fields=[f.name for f in TaskFeedEntry._meta.concrete_fields if not f.primary_key],
+        )
+
+    @classmethod
+    def refresh_visibility(cls, task_id):
+        """Recompute hidden_after only (TaskApplication writes)"""
+        from core.models import Task, TaskFeedEntry
+
+        task = Task.objects.filter(id=task_id).values('doer_id').first()
+        if task is None:
+            return
+
+        hidden_after = None
+        if task['doer_id']:
+            first = cls._first_pending_application_times([task_id]).get(task_id)
+            if first:
+                hidden_after = first + cls.APPLICATION_WINDOW
+
+        TaskFeedEntry.objects.filter(task_id=task_id).update(hidden_after=hidden_after)
+
+    @classmethod
+    def refresh_poster_rating(cls, poster_id, avg=None):
+        """Push a poster's new average rating into all of their feed rows (Rating writes)"""
+        from core.models import TaskFeedEntry
+
+        if avg is None:
+            avg = cls._poster_ratings([poster_id]).get(poster_id) or 0
+        poster_rating = Decimal(str(avg)).quantize(Decimal('0.01'))
+
+        TaskFeedEntry.objects.filter(poster_id=poster_id).update(
+            poster_rating=poster_rating,
+            static_score=ExpressionWrapper(
+                Value(poster_rating * cls.POSTER_RATING_WEIGHT) +
+                F('priority_level') * Value(cls.PRIORITY_LEVEL_WEIGHT),
+                output_field=DecimalField(max_digits=7, decimal_places=2)
+            )
+        )
+
+    @classmethod
+    def rebuild(cls, tasks_queryset=None):
+        """
+        Bulk (re)build feed rows. Used by the rebuild_task_feed command and
+        after bulk imports, which bypass model signals.
+
+        Returns: number of rows written
+        """
+        from core.models import Task, TaskFeedEntry
+
+        if tasks_queryset is None:
+            tasks_queryset = Task.objects.all()
+
+        update_fields = [f.name for f in TaskFeedEntry._meta.concrete_fields if not f.primary_key]
+        written = 0
+        batch = []
+
+        def flush(batch):
+            task_ids = [t.id for t in batch]
+            poster_ids = {t.poster_id for t in batch}
+            ratings = cls._poster_ratings(poster_ids)
+            first_times = cls._first_pending_application_times(task_ids)
+            entries = [
+                cls._build_entry(t, ratings.get(t.poster_id), first_times.get(t.id))
+                for t in batch
+            ]
+            TaskFeedEntry.objects.bulk_create(
+                entries,
+                update_conflicts=True,
+                unique_fields=['task'],
+                update_fields=update_fields,
+            )
+            return len(entries)
+
+        fields = ('id', 'poster_id', 'doer_id', 'category', 'tags', 'status',
+                  'campus_location', 'deadline', 'priority_level')
+        for task in tasks_queryset.only(*fields).iterator(chunk_size=cls.BATCH_SIZE):
+            batch.append(task)
+            if len(batch) >= cls.BATCH_SIZE:
+                written += flush(batch)
+                batch = []
+        if batch:
+            written += flush(batch)
+
+        logger.info(f"Task feed rebuilt: {written} rows")
+        return written
+
+    # ==================== READ PATH ====================
+
+    @classmethod
+    def get_verified_skills(cls, user):
+        from core.models import StudentSkill
+
+        return list(StudentSkill.objects.filter(
+            student=user,
+            status='verified'
+        ).values_list('skill_name', flat=True))
+
+    @classmethod
+    def get_feed_for_user(cls, user, user_skills=None):
+        """
+        Open tasks visible to a doer, ranked by priority_score.
+
+        Priority = Static Score (Poster Rating × 2.0 + Priority Level × 0.5) +
+                   (Skill Match × 1.0) + (Urgency × 1.5) + (Location Match × 2.0) +
+                   (Preference Match × 2.0) + (Time Window Match × 1.5)
+
+        Returns:
+            Task QuerySet with score annotations, ordered by priority_score DESC
+        """
+        from core.models import Task
+
+        if user.role not in ['task_doer', 'admin']:
+            return Task.objects.none()
+
+        if user_skills is None:
+            user_skills = cls.get_verified_skills(user)
+        skills = [s for s in user_skills if s in cls.SKILL_BUCKETS]
+
+        now = timezone.now()
+
+        # Rule 1: EVERYONE sees Microtasks; Rule 2: Verified skills unlock buckets
+        skill_query = Q()
+        for skill in skills:
+            skill_query |= Q(**{f'feed_entry__bucket_{skill}': True})
+        bucket_query = Q(feed_entry__bucket_microtask=True) | skill_query
+
+        tasks = Task.objects.filter(
+            feed_entry__is_listed=True
+        ).filter(
+            Q(feed_entry__hidden_after__isnull=True) | Q(feed_entry__hidden_after__gt=now)
+        ).filter(bucket_query).exclude(poster=user).select_related('poster')
+
+        decimal_field = DecimalField(max_digits=5, decimal_places=2)
+
+        tasks = tasks.annotate(
+            skill_match_score=(
+                Case(When(skill_query, then=Value(cls.SKILL_MATCH_SCORE)), default=Value(0), output_field=IntegerField())
+                if skills else Value(0, output_field=IntegerField())
+            ),
+            urgency_score=Case(
+                When(deadline__lte=now + timedelta(days=1), then=1),
+                default=0,
+                output_field=IntegerField()
+            ),
+            poster_rating=F('feed_entry__poster_rating'),
+            location_score=Case(
+                When(campus_location=user.campus_location, then=Value(cls.LOCATION_BONUS)),
+                default=Value(Decimal('0.00')),
+                output_field=decimal_field
+            ),
+            preference_score=Case(
+                When(preferred_doer=user, then=Value(cls.PREFERENCE_BONUS)),
+                default=Value(Decimal('0.00')),
+                output_field=decimal_field
+            ),
+            time_window_match_score=Case(
+                # Within preferred time window (+1.5)
+                When(
+                    Q(time_window_start__lte=now) & Q(time_window_end__gte=now),
+                    then=Value(Decimal('1.50'))
+                ),
+                # Same day as preferred time (+1.0)
+                When(time_window_start__date=now.date(), then=Value(Decimal('1.00'))),
+                # Flexible timing (+0.30)
+                When(flexible_timing=True, then=Value(Decimal('0.30'))),
+                default=Value(Decimal('0.00')),
+                output_field=decimal_field
+            ),
+            priority_score=ExpressionWrapper(
+                F('feed_entry__static_score') +
+                (F('skill_match_score') * Value(Decimal('1.00'), output_field=decimal_field)) +
+                (F('urgency_score') * Value(cls.URGENCY_WEIGHT, output_field=decimal_field)) +
+                F('location_score') +
+                F('preference_score') +
+                F('time_window_match_score'),
+                output_field=DecimalField(max_digits=7, decimal_places=2)
+            )
+        ).order_by('-priority_score', '-price', '-created_at')
+
+        return tasks
+
+    @classmethod
+    def get_live_matched_tasks(cls, user):
+        """
+        Reference implementation that ranks straight from the Task and Rating
+        tables without the index. Kept for the feed benchmark and for
+        verifying rebuilds; views should use get_feed_for_user().
+        """
+        from core.models import Task, Rating
+        from core.tags import TagService
+        from django.db.models import OuterRef, Subquery
+
+        if user.role not in ['task_doer', 'admin']:
+            return Task.objects.none()
+
+        user_skills = cls.get_verified_skills(user)
+        skills = [s for s in user_skills if s in cls.SKILL_BUCKETS]
+        now = timezone.now()
+
+        base_tasks = Task.objects.filter(status='open').exclude(poster=user).select_related('poster')
+        hidden = base_tasks.filter(
+            applications__status='pending',
+            applications__first_application_time__lte=now - cls.APPLICATION_WINDOW,
+            doer__isnull=False
+        ).values('id')
+        base_tasks = base_tasks.exclude(id__in=hidden)
+
+        skill_query = Q()
+        for skill in skills:
+            skill_query |= Q(category=skill) | Q(TagService.tagged(skill))
+        tasks = base_tasks.filter(Q(category='microtask') | Q(TagService.tagged('microtask')) | skill_query)
+
+        poster_rating_subquery = Rating.objects.filter(
+            rated=OuterRef('poster')
+        ).values('rated').annotate(avg_rating=Avg('score')).values('avg_rating')
+
+        decimal_field = DecimalField(max_digits=5, decimal_places=2)
+
+        return tasks.annotate(
+            skill_match_score=(
+                Case(When(skill_query, then=Value(cls.SKILL_MATCH_SCORE)), default=Value(0), output_field=IntegerField())
+                if skills else Value(0, output_field=IntegerField())
+            ),
+            urgency_score=Case(
+                When(deadline__lte=now + timedelta(days=1), then=1),
+                default=0,
+                output_field=IntegerField()
+            ),
+            poster_rating=Coalesce(
+                Subquery(poster_rating_subquery, output_field=DecimalField(max_digits=4, decimal_places=2)),
+                Value(Decimal('0.00'), output_field=DecimalField(max_digits=4, decimal_places=2)),
+                output_field=DecimalField(max_digits=4, decimal_places=2)
+            ),
+            priority_score=ExpressionWrapper(
+                (F('skill_match_score') * Value(Decimal('1.00'), output_field=decimal_field)) +
+                (F('poster_rating') * Value(cls.POSTER_RATING_WEIGHT, output_field=decimal_field)) +
+                (F('urgency_score') * Value(cls.URGENCY_WEIGHT, output_field=decimal_field)) +
+                Case(
+                    When(campus_location=user.campus_location, then=Value(cls.LOCATION_BONUS)),
+                    default=Value(Decimal('0.00')),
+                    output_field=decimal_field
+                ) +
+                Case(
+                    When(preferred_doer=user, then=Value(cls.PREFERENCE_BONUS)),
+                    default=Value(Decimal('0.00')),
+                    output_field=decimal_field
+                ) +
+                Case(
+                    When(Q(time_window_start__lte=now) & Q(time_window_end__gte=now), then=Value(Decimal('1.50'))),
+                    When(time_window_start__date=now.date(), then=Value(Decimal('1.00'))),
+                    When(flexible_timing=True, then=Value(Decimal('0.30'))),
+                    default=Value(Decimal('0.00')),
+                    output_field=decimal_field
+                ) +
+                (F('priority_level') * Value(cls.PRIORITY_LEVEL_WEIGHT, output_field=decimal_field)),
+                output_field=DecimalField(max_digits=7, decimal_places=2)
+            )
+        ).order_by('-priority_score', '-price', '-created_at')
@@ -208,6 +208,12 @@ class TaskFilterForm(forms.Form):
         })
     )
     
+    tag = forms.CharField(
+        required=False,
+        max_length=50,
+        widget=forms.HiddenInput()
+    )
+    
     sort_by = forms.ChoiceField(
         choices=SORT_CHOICES,
         required=False,
@@ -0,0 +1,257 @@
+"""
+Task Lifecycle Pipeline for ErrandExpress
+Set-based overdue/expiry processing for handle_overdue_tasks and
+auto_delete_expired_tasks. Tasks are stamped with overdue_notified_at /
+expired_at when claimed, so each one is processed exactly once; admins get
+one digest per run, and expired tasks are removed in bounded chunks.
+"""
+
+from django.db import transaction
+from django.db.models import Case, When, Value, F, Count, Q
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from datetime import timedelta
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class TaskLifecycleService:
+    """Overdue notices, admin digests and expired task cleanup"""
+
+    ACTIVE_STATUSES = ('open', 'in_progress')
+
+    # Open tasks are removed this long after their deadline
+    EXPIRY_GRACE = timedelta(hours=24)
+
+    # Tasks claimed / deleted per transaction
+    CHUNK_SIZE = 500
+
+    # Task titles listed in an admin digest before "... and N more"
+    DIGEST_LIST_LIMIT = 10
+
+    @classmethod
+    def overdue_candidates(cls, now):
+        """Past-deadline active tasks not yet processed (partial index on deadline)"""
+        from core.models import Task
+
+        return Task.objects.filter(
+            overdue_notified_at__isnull=True,
+            status__in=cls.ACTIVE_STATUSES,
+            deadline__lt=now
+        )
+
+    @classmethod
+    def expired_tasks(cls, now):
+        """Open tasks whose deadline passed more than EXPIRY_GRACE ago"""
+        from core.models import Task
+
+        return Task.objects.filter(status='open', deadline__lt=now - cls.EXPIRY_GRACE)
+
+    @staticmethod
+    def _elapsed_ms(started):
+        return round((time.monotonic() - started) * 1000, 1)
+
+    @classmethod
+    def process_overdue(cls, now=None, dry_run=False, chunk_size=None):
+        """
+        Notify posters/doers of newly overdue (in progress) or expired (open)
+        tasks and send each active admin one digest.
+
+        Returns: {'overdue', 'expired', 'notifications', 'dry_run', 'elapsed_ms'}
+        """
+        from core.models import Task
+        from core.notifications import NotificationDispatcher
+
+        started = time.monotonic()
+        now = now or timezone.now()
+        chunk_size = chunk_size or cls.CHUNK_SIZE
+        result = {'overdue': 0, 'expired': 0, 'notifications': 0, 'dry_run': dry_run}
+
+        if dry_run:
+            counts = cls.overdue_candidates(now).aggregate(
+                overdue=Count('id', filter=Q(status='in_progress')),
+                expired=Count('id', filter=Q(status='open'))
+            )
+            result.update(counts)
+            result['elapsed_ms'] = cls._elapsed_ms(started)
+            return result
+
+        digest = []
+        while True:
+            with transaction.atomic():
+                batch = list(
+                    cls.overdue_candidates(now)
+                    .select_for_update(skip_locked=True, of=('self',))
+                    .select_related('poster')
+                    .only('id', 'title', 'status', 'poster_id', 'doer_id', 'poster__fullname')
+                    .order_by('deadline')[:chunk_size]
+                )
+                if not batch:
+                    break
+
+                # Stamp first: the stamp, not a notification lookup, is the once-only guard
+                Task.objects.filter(id__in=[task.id for task in batch]).update(
+                    overdue_notified_at=now,
+                    expired_at=Case(When(status='open', then=Value(now)), default=F('expired_at'))
+                )
+
+                dispatcher = NotificationDispatcher(now=now)
+                for task in batch:
+                    # EXPIRED: Open & Overdue (no doer took it)
+                    if task.status == 'open':
+                        result['expired'] += 1
+                        dispatcher.add(
+                            task.poster_id, 'task_expired',
+                            title='⏳ Task Expired',
+                            message=f'No one applied for "{task.title}" before the deadline. Please Update or Delete it.',
+                            related_task=task.id
+                        )
+                        continue
+
+                    # OVERDUE: In Progress (has doer)
+                    result['overdue'] += 1
+                    digest.append(task)
+                    dispatcher.add(
+                        task.poster_id, 'task_overdue',
+                        title='⚠️ Task Overdue',
+                        message=f'"{task.title}" is now overdue. Please review.',
+                        related_task=task.id
+                    )
+                    if task.doer_id:
+                        dispatcher.add(
+                            task.doer_id, 'task_overdue',
+                            title='⚠️ You Missed a Deadline',
+                            message=f'The deadline for "{task.title}" has passed. Please contact the poster immediately.',
+                            related_task=task.id
+                        )
+                result['notifications'] += dispatcher.flush()
+
+            if len(batch) < chunk_size:
+                break
+
+        if digest:
+            result['notifications'] += cls.send_admin_digest(digest, now)
+
+        result['elapsed_ms'] = cls._elapsed_ms(started)
+        return result
+
+    @classmethod
+    def send_admin_digest(cls, tasks, now=None):
+        """One system_alert per active admin summarizing this run's overdue tasks"""
+        from core.models import User
+        from core.notifications import NotificationDispatcher
+
+        lines = [
+            f'• "{task.title}" (ID: {str(task.id)[:8]}) - Poster: {task.poster.fullname}'
+            for task in tasks[:cls.DIGEST_LIST_LIMIT]
+        ]
+        if len(tasks) > cls.DIGEST_LIST_LIMIT:
+            lines.append(f'... and {len(tasks) - cls.DIGEST_LIST_LIMIT} more')
+        title = f'⚠️ Admin Alert: {len(tasks)} Task{"s" if len(tasks) != 1 else ""} Overdue'
+        message = '\n'.join(lines)
+
+        dispatcher = NotificationDispatcher(now=now)
+        for admin_id in User.objects.filter(role='admin', is_active=True).values_list('id', flat=True):
+            dispatcher.add(admin_id, 'system_alert', title, message)
+        return dispatcher.flush()
+
+    @classmethod
+    def purge_expired(cls, now=None, dry_run=False, chunk_size=None, archive=False):
+        """
+        Delete (or archive as cancelled) open tasks past the expiry grace
+        period, one bounded transaction per chunk, notifying each poster.
+        Either way the derived state (tag facets, search index, score
+        cache, dashboards, badges) is refreshed once per chunk: deletes run
+        inside bulk_task_delete() so the per-row Task post_delete handlers
+        don't repeat that work for every task.
+
+        Returns: {'removed', 'archived', 'notifications', 'dry_run', 'elapsed_ms'}
+        """
+        from core.models import Task, TaskFeedEntry, TaskTag, ReminderSchedule
+        from core.notifications import NotificationDispatcher
+        from core.tags import TagService
+        from core.search import TaskSearchService
+        from core.services import PrioritizationService
+        from core.signals import bulk_task_delete
+        from core.badges import UserStatsCache
+        from core.dashboard import DashboardService
+
+        started = time.monotonic()
+        now = now or timezone.now()
+        chunk_size = chunk_size or cls.CHUNK_SIZE
+        result = {'removed': 0, 'archived': archive, 'notifications': 0, 'dry_run': dry_run}
+
+        if dry_run:
+            result['removed'] = cls.expired_tasks(now).count()
+            result['elapsed_ms'] = cls._elapsed_ms(started)
+            return result
+
+        while True:
+            with transaction.atomic():
+                batch = list(
+                    cls.expired_tasks(now)
+                    .select_for_update(skip_locked=True)
+                    .order_by('deadline')
+                    .values_list('id', 'poster_id', 'title')[:chunk_size]
+                )
+                if not batch:
+                    break
+                ids = [task_id for task_id, _, _ in batch]
+                tag_ids = list(TaskTag.objects.filter(task_id__in=ids).values_list('tag_id', flat=True).distinct())
+
+                dispatcher = NotificationDispatcher(now=now)
+                if archive:
+                    Task.objects.filter(id__in=ids).update(
+                        status='cancelled',
+                        expired_at=Coalesce(F('expired_at'), Value(now))
+                    )
+                    TaskFeedEntry.objects.filter(task_id__in=ids).update(is_listed=False)
+                    # update() skips the Task signals: drop what they would have
+                    ReminderSchedule.objects.filter(task_id__in=ids).delete()
+                    TagService.refresh_counts(tag_ids)
+                    for task_id, poster_id, title in batch:
+                        dispatcher.add(
+                            poster_id, 'system_message',
+                            title='🗄️ Task Archived',
+                            message=f'Your task "{title}" was automatically archived because it was expired for more than 24 hours.',
+                            related_task=task_id
+                        )
+                else:
+                    with bulk_task_delete():
+                        Task.objects.filter(id__in=ids).delete()
+                    # Tag links cascaded with the tasks; the rest is what the
+                    # skipped post_delete handlers would have done per row
+                    TagService.refresh_counts(tag_ids)
+                    TaskSearchService.remove(ids)
+                    PrioritizationService.invalidate_static_components(*ids)
+                    for task_id, poster_id, title in batch:
+                        dispatcher.add(
+                            poster_id, 'system_message',
+                            title='🗑️ Task Auto-Deleted',
+                            message=f'Your task "{title}" was automatically deleted because it was expired for more than 24 hours.'
+                        )
+                result['notifications'] += dispatcher.flush()
+                result['removed'] += len(batch)
+
+            poster_ids = list({poster_id for _, poster_id, _ in batch})
+            UserStatsCache.invalidate(poster_ids, *UserStatsCache.TASK_FIELDS)
+            DashboardService.invalidate(*poster_ids)
+
+            if len(batch) < chunk_size:
+                break
+
+        result['elapsed_ms'] = cls._elapsed_ms(started)
+        return result
+
+    @classmethod
+    def reset_if_rescheduled(cls, task, now=None):
+        """A deadline moved back into the future re-arms the overdue notice"""
+        from core.models import Task
+
+        if not (task.overdue_notified_at or task.expired_at):
+            return
+        if task.deadline and task.deadline > (now or timezone.now()):
+            Task.objects.filter(pk=task.pk).update(overdue_notified_at=None, expired_at=None)
+            task.overdue_notified_at = task.expired_at = None
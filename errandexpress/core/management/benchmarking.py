@@ -0,0 +1,65 @@
+"""
+Shared scaffolding for the benchmark_* and loadtest_* management commands
+Seed data is written inside rolled_back(), so a benchmark never leaves rows
+behind; timed() / sample() measure wall time and query counts the same way
+in every command, and percentile() / median() summarize the timings.
+"""
+import statistics
+import time
+from contextlib import contextmanager
+
+from django.db import connection, transaction
+
+
+@contextmanager
+def rolled_back():
+    """One transaction around seeding and measuring that is always rolled back"""
+    with transaction.atomic():
+        try:
+            yield
+        finally:
+            transaction.set_rollback(True)
+
+
+def timed(fn):
+    """
+    Call fn() once.
+
+    Returns: (result, elapsed_ms, queries)
+    """
+    # Count with an execute wrapper: the debug query log is capped at 9000 entries
+    queries = []
+
+    def count(execute, sql, params, many, context):
+        queries.append(sql)
+        return execute(sql, params, many, context)
+
+    with connection.execute_wrapper(count):
+        started = time.perf_counter()
+        result = fn()
+        elapsed = (time.perf_counter() - started) * 1000
+    return result, elapsed, len(queries)
+
+
+def sample(fn, runs):
+    """
+    Call fn() runs times.
+
+    Returns: (timings_ms, queries_per_run)
+    """
+    timings, queries = [], 0
+    for _ in range(runs):
+        _, elapsed, count = timed(fn)
+        timings.append(elapsed)
+        queries += count
+    return timings, queries / runs
+
+
+def median(timings):
+    return statistics.median(timings)
+
+
+def percentile(timings, fraction):
+    """Nearest-rank percentile, e.g. percentile(timings, 0.99) for p99"""
+    ordered = sorted(timings)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
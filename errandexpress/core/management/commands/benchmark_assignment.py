@@ -0,0 +1,90 @@
+"""
+Management command to benchmark auto-assignment
+Compares the legacy per-agent calculate_assignment_score() loop against
+the set-based AssignmentEngine. Seed data is always rolled back.
+Run with: py manage.py benchmark_assignment --sizes 1000 10000 50000
+"""
+import random
+import uuid
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from core.assignment import AssignmentEngine
+from core.models import User, StudentSkill, Task, TaskAssignment
+from core.management.benchmarking import rolled_back, timed
+from core.views import calculate_assignment_score
+
+
+class Command(BaseCommand):
+    help = 'Benchmark auto-assignment latency and query counts at several doer populations'
+
+    CATEGORIES = ['microtask', 'typing', 'powerpoint', 'graphics']
+    LOCATIONS = [choice[0] for choice in User.CAMPUS_CHOICES]
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', nargs='+', type=int, default=[1000, 10000, 50000],
+                            help='Numbers of doers to seed')
+        parser.add_argument('--batch', type=int, default=50, help='Tasks per batch assignment')
+        parser.add_argument('--legacy-limit', type=int, default=10000,
+                            help='Skip the legacy loop above this many doers (2 queries per doer)')
+
+    def handle(self, *args, **options):
+        for size in options['sizes']:
+            with rolled_back():
+                self._run(size, options)
+
+    def _run(self, size, options):
+        self.stdout.write(f'\n📊 Seeding {size} doers...')
+        rng = random.Random(size)
+
+        doers = [
+            User(id=uuid.uuid4(), username=f'bench_doer_{uuid.uuid4().hex[:12]}', role='task_doer',
+                 doer_type=rng.choice(['microtasker', 'skilled', 'both']),
+                 campus_location=rng.choice(self.LOCATIONS), avg_rating=round(rng.uniform(0, 5), 2))
+            for _ in range(size)
+        ]
+        User.objects.bulk_create(doers, batch_size=2000)
+        StudentSkill.objects.bulk_create([
+            StudentSkill(student=doer, skill_name=rng.choice(self.CATEGORIES[1:]), status='verified')
+            for doer in doers if doer.doer_type != 'microtasker'
+        ], batch_size=2000)
+
+        poster = User.objects.create(username=f'bench_poster_{uuid.uuid4().hex[:8]}', role='task_poster')
+        tasks = Task.objects.bulk_create([
+            Task(poster=poster, title=f'Bench task {i}', description='Benchmark task',
+                 category=rng.choice(self.CATEGORIES), price=100,
+                 deadline=timezone.now() + timedelta(days=1),
+                 campus_location=rng.choice(self.LOCATIONS), priority_level=5)
+            for i in range(options['batch'])
+        ])
+        TaskAssignment.objects.bulk_create([
+            TaskAssignment(task=tasks[0], agent=doer, status='in_progress')
+            for doer in rng.sample(doers, size // 10)
+        ], batch_size=2000)
+        task = tasks[0]
+
+        if size <= options['legacy_limit']:
+            def legacy():
+                best, best_score = None, -1
+                for agent in User.objects.filter(role='task_doer', is_active=True, is_banned=False):
+                    scores = calculate_assignment_score(task, agent)
+                    if scores['total'] > best_score:
+                        best, best_score = agent, scores['total']
+                return best
+            _, elapsed, queries = timed(legacy)
+            self.stdout.write(f'   legacy loop, 1 task     {elapsed:10.1f}ms  queries={queries}')
+        else:
+            self.stdout.write('   legacy loop, 1 task     skipped (--legacy-limit)')
+
+        _, elapsed, queries = timed(lambda: AssignmentEngine.top_k(task, k=5))
+        self.stdout.write(f'   engine top-5, 1 task    {elapsed:10.1f}ms  queries={queries}')
+
+        sid = transaction.savepoint()
+        assigned, elapsed, queries = timed(lambda: AssignmentEngine.assign_batch(tasks))
+        transaction.savepoint_rollback(sid)
+        self.stdout.write(
+            f'   engine batch, {len(tasks)} tasks {elapsed:10.1f}ms  queries={queries}  assigned={len(assigned)}'
+        )
@@ -0,0 +1,134 @@
+"""
+Management command to benchmark admin dashboard counters
+Compares the per-render count()/aggregate() queries admin_dashboard used
+to issue against the analytics + revenue rollup reads it issues now, and
+times a rollup refresh. Seed data is always rolled back.
+Run with: py manage.py benchmark_dashboard_stats --tasks 5000
+"""
+import random
+import uuid
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db.models import Count, Sum
+from django.utils import timezone
+
+from core.analytics import AnalyticsRollupService
+from core.management.benchmarking import rolled_back, timed, sample, median
+from core.models import User, Task, SystemCommission, Payment, Report, StudentSkill
+from core.revenue import RevenueLedger
+
+
+def live_counters():
+    """The counters admin_dashboard computed on every render before the rollups"""
+    now = timezone.now()
+    week_ago = now - timedelta(days=7)
+    month_ago = now - timedelta(days=30)
+    return [
+        User.objects.count(),
+        User.objects.filter(date_joined__gte=week_ago).count(),
+        User.objects.filter(role='task_poster').count(),
+        User.objects.filter(role='task_doer').count(),
+        Task.objects.count(),
+        Task.objects.filter(status='open').count(),
+        Task.objects.filter(status='in_progress').count(),
+        Task.objects.filter(status='completed').count(),
+        Task.objects.filter(created_at__gte=week_ago).count(),
+        Task.objects.filter(status='in_progress', updated_at__lte=week_ago).count(),
+        SystemCommission.objects.filter(status='paid').aggregate(total=Sum('amount')),
+        Payment.objects.filter(status='confirmed').aggregate(total=Sum('commission_amount')),
+        SystemCommission.objects.filter(status='paid', paid_at__gte=month_ago).aggregate(total=Sum('amount')),
+        Payment.objects.filter(status='confirmed', created_at__gte=month_ago).aggregate(total=Sum('commission_amount')),
+        StudentSkill.objects.filter(status='pending').count(),
+        StudentSkill.objects.filter(status='verified').count(),
+        Report.objects.filter(status='pending').count(),
+        list(Task.objects.values('category').annotate(count=Count('id')).order_by('-count')),
+        list(Payment.objects.filter(status='confirmed').values('task__category').annotate(total=Sum('commission_amount'))),
+        list(Task.objects.values('campus_location').annotate(count=Count('id')).order_by('-count')),
+        list(Task.objects.values('payment_method').annotate(count=Count('id')).order_by('-count')),
+        list(SystemCommission.objects.filter(status='paid', paid_at__gte=month_ago).values('amount', 'paid_at')),
+        list(Payment.objects.filter(status='confirmed', created_at__gte=month_ago).values('commission_amount', 'created_at')),
+    ]
+
+
+def rollup_counters():
+    """What admin_dashboard reads now"""
+    month_ago = timezone.localdate() - timedelta(days=30)
+    return [
+        AnalyticsRollupService.summary(),
+        RevenueLedger.window_totals(lifetime=None, month=month_ago),
+        RevenueLedger.by_category(),
+        RevenueLedger.daily_series(since=timezone.localdate() - timedelta(days=29)),
+    ]
+
+
+class Command(BaseCommand):
+    help = 'Benchmark admin dashboard counter queries: live aggregates vs analytics/revenue rollups'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tasks', type=int, default=5000, help='Tasks to seed')
+        parser.add_argument('--users', type=int, default=500, help='Users to seed')
+        parser.add_argument('--renders', type=int, default=20, help='Dashboard reads per variant')
+
+    def handle(self, *args, **options):
+        with rolled_back():
+            self._run(options['tasks'], options['users'], options['renders'])
+
+    def _measure(self, label, fn, renders):
+        timings, queries = sample(fn, renders)
+        self.stdout.write(
+            f'   {label:<18}{queries:4.0f} queries  '
+            f'p50={median(timings):.2f}ms  max={max(timings):.2f}ms'
+        )
+
+    def _seed(self, task_count, user_count):
+        now = timezone.now()
+        tag = uuid.uuid4().hex[:8]
+        users = User.objects.bulk_create([
+            User(username=f'dash_{tag}_{i}', fullname=f'Dashboard User {i}',
+                 role=random.choice(['task_poster', 'task_doer']),
+                 date_joined=now - timedelta(days=random.randint(0, 180)))
+            for i in range(user_count)
+        ])
+        posters = [user for user in users if user.role == 'task_poster'] or users
+        doers = [user for user in users if user.role == 'task_doer'] or users
+        categories = [key for key, _ in Task.CATEGORY_CHOICES]
+        campuses = [key for key, _ in User.CAMPUS_CHOICES]
+        tasks = Task.objects.bulk_create([
+            Task(poster=random.choice(posters), doer=random.choice(doers), title=f'Dashboard benchmark {i}',
+                 description='Benchmark task', category=random.choice(categories),
+                 campus_location=random.choice(campuses), payment_method=random.choice(['cod', 'online']),
+                 price=100, deadline=now + timedelta(days=1),
+                 status=random.choice(['open', 'in_progress', 'completed', 'completed']))
+            for i in range(task_count)
+        ], batch_size=1000)
+        # auto_now_add ignores seeded values; spread creation over six months
+        for task in tasks:
+            Task.objects.filter(pk=task.pk).update(created_at=now - timedelta(days=random.randint(0, 180)))
+        completed = [task for task in tasks if task.status == 'completed']
+        SystemCommission.objects.bulk_create([
+            SystemCommission(task=task, payer=task.poster, amount=Decimal('10.00'), method='online',
+                             status='paid', paid_at=now - timedelta(days=random.randint(0, 60)))
+            for task in completed
+        ], batch_size=1000)
+        RevenueLedger.record_commissions(SystemCommission.objects.filter(task__in=completed))
+        RevenueLedger.rollup()
+
+    def _run(self, task_count, user_count, renders):
+        self._seed(task_count, user_count)
+        self.stdout.write(f'\n📊 Admin dashboard counters ({task_count} tasks, {user_count} users, {renders} reads)')
+
+        self._measure('live aggregates', live_counters, renders)
+
+        result, elapsed, queries = timed(
+            lambda: AnalyticsRollupService.refresh(since=AnalyticsRollupService.earliest_day())
+        )
+        self.stdout.write(
+            f"   {'rollup backfill':<18}{queries:4d} queries  "
+            f"{elapsed:.2f}ms  ({result['days']} days, {result['rows']} rows)"
+        )
+        _, elapsed, queries = timed(AnalyticsRollupService.refresh)
+        self.stdout.write(f"   {'rollup refresh':<18}{queries:4d} queries  {elapsed:.2f}ms")
+
+        self._measure('rollup reads', rollup_counters, renders)
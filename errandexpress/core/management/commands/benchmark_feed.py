@@ -0,0 +1,99 @@
+"""
+Management command to benchmark the doer task feed
+Compares the live per-request matching query against the TaskFeedEntry index.
+Seed data is written inside a transaction that is always rolled back.
+Run with: py manage.py benchmark_feed --sizes 10000 100000
+"""
+import random
+import uuid
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core.feed import TaskFeedService
+from core.management.benchmarking import rolled_back, timed, sample, median, percentile
+from core.ratings import RatingAggregateService
+from core.tags import TagService
+from core.models import User, StudentSkill, Task, Rating
+
+
+class Command(BaseCommand):
+    help = 'Benchmark p50/p99 latency and query counts of the doer task feed'
+
+    CATEGORIES = ['microtask', 'typing', 'powerpoint', 'graphics']
+    LOCATIONS = ['main_campus', 'north_campus', 'south_campus', 'downtown']
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', nargs='+', type=int, default=[10000, 100000],
+                            help='Numbers of open tasks to seed')
+        parser.add_argument('--runs', type=int, default=50, help='Feed page loads per variant')
+        parser.add_argument('--posters', type=int, default=500, help='Number of seeded posters')
+        parser.add_argument('--page-size', type=int, default=12, help='Rows fetched per feed page')
+
+    def handle(self, *args, **options):
+        for size in options['sizes']:
+            with rolled_back():
+                self._run(size, options)
+
+    def _run(self, size, options):
+        self.stdout.write(f'\n📊 Seeding {size} open tasks...')
+        rng = random.Random(size)
+        now = timezone.now()
+
+        posters = [
+            User(id=uuid.uuid4(), username=f'bench_poster_{i}', role='task_poster',
+                 campus_location=rng.choice(self.LOCATIONS))
+            for i in range(options['posters'])
+        ]
+        User.objects.bulk_create(posters, batch_size=1000)
+        doer = User.objects.create(username=f'bench_doer_{uuid.uuid4().hex[:8]}', role='task_doer',
+                                   campus_location='main_campus')
+        StudentSkill.objects.bulk_create([
+            StudentSkill(student=doer, skill_name='typing', status='verified'),
+            StudentSkill(student=doer, skill_name='graphics', status='verified'),
+        ])
+
+        tasks = [
+            Task(
+                poster=rng.choice(posters),
+                title=f'Bench task {i}',
+                description='Benchmark task',
+                category=rng.choice(self.CATEGORIES),
+                tags=rng.choice(['', 'typing', 'graphics,design', 'microtask']),
+                price=Decimal(rng.randint(50, 2000)),
+                deadline=now + timedelta(hours=rng.randint(1, 24 * 14)),
+                campus_location=rng.choice(self.LOCATIONS),
+                priority_level=rng.randint(1, 5),
+                flexible_timing=rng.random() < 0.3,
+                status='open',
+            )
+            for i in range(size)
+        ]
+        Task.objects.bulk_create(tasks, batch_size=2000)
+
+        # Rating.task is required; reuse seeded tasks as the rated work
+        ratings = []
+        for task in rng.sample(tasks, min(len(tasks), len(posters) * 2)):
+            ratings.append(Rating(task=task, rater=doer, rated_id=task.poster_id, score=rng.randint(1, 10)))
+        Rating.objects.bulk_create(ratings, batch_size=2000, ignore_conflicts=True)
+
+        # bulk_create bypasses signals, so build aggregates and the indexes explicitly
+        RatingAggregateService.recompute(User.objects.filter(id__in=[p.id for p in posters]))
+        TagService.rebuild(Task.objects.filter(poster__in=posters))
+        _, elapsed, _ = timed(lambda: TaskFeedService.rebuild(Task.objects.filter(poster__in=posters)))
+        self.stdout.write(f'   Index build: {elapsed:.0f}ms')
+
+        page = options['page_size']
+        variants = [
+            ('live query', lambda: list(TaskFeedService.get_live_matched_tasks(doer)[:page])),
+            ('feed index', lambda: list(TaskFeedService.get_feed_for_user(doer)[:page])),
+        ]
+        for label, load in variants:
+            load()  # warm up
+            timings, queries = sample(load, options['runs'])
+            self.stdout.write(
+                f'   {label:<11} p50={median(timings):8.2f}ms  '
+                f'p99={percentile(timings, 0.99):8.2f}ms  queries/page={queries:.1f}'
+            )
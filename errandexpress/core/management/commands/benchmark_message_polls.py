@@ -0,0 +1,106 @@
+"""
+Management command to benchmark chat polling throughput
+Compares the legacy api_get_messages poll (full last-20 re-query and
+per-message extension parsing) with cursor polls and ETag/304 polls.
+Seed data is always rolled back.
+Run with: py manage.py benchmark_message_polls --messages 200 --seconds 3
+"""
+import time
+import uuid
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.http import JsonResponse
+from django.test import RequestFactory
+from django.utils import timezone
+
+from core.management.benchmarking import rolled_back
+from core.models import User, Task, Message
+from core.views import api_get_messages
+
+
+def legacy_get_messages(request, task_id):
+    """api_get_messages as it was before cursors/ETags (reference for the benchmark)"""
+    task = Task.objects.get(id=task_id)
+    if request.user not in [task.poster, task.doer]:
+        return JsonResponse({'success': False, 'error': 'Not authorized'})
+
+    messages = Message.objects.filter(task=task).select_related('sender').order_by('-created_at')[:20]
+    messages = list(reversed(messages))
+
+    messages_data = []
+    for msg in messages:
+        attachment_type = 'file'
+        if msg.attachment:
+            ext = msg.attachment.name.split('.')[-1].lower()
+            if ext in ['jpg', 'jpeg', 'png', 'gif', 'webp']:
+                attachment_type = 'image'
+        messages_data.append({
+            'id': str(msg.id),
+            'sender_id': str(msg.sender.id),
+            'sender_name': msg.sender.fullname,
+            'message': msg.message,
+            'created_at': msg.created_at.isoformat(),
+            'attachment_url': msg.attachment.url if msg.attachment else None,
+            'attachment_type': attachment_type
+        })
+    return JsonResponse({'success': True, 'messages': messages_data, 'count': len(messages_data)})
+
+
+class Command(BaseCommand):
+    help = 'Benchmark chat polls per second per worker (legacy, cursor, ETag/304)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--messages', type=int, default=200, help='Messages in the seeded conversation')
+        parser.add_argument('--seconds', type=float, default=3.0, help='Duration of each run')
+
+    def handle(self, *args, **options):
+        with rolled_back():
+            self._run(options)
+
+    def _throughput(self, view, user, task_id, seconds, **request_kwargs):
+        factory = RequestFactory()
+        polls = 0
+        status = None
+        deadline = time.perf_counter() + seconds
+        while time.perf_counter() < deadline:
+            request = factory.get(f'/api/messages/{task_id}/', **request_kwargs)
+            request.user = user
+            status = view(request, task_id).status_code
+            polls += 1
+        return polls / seconds, status
+
+    def _run(self, options):
+        poster = User.objects.create(username=f'poll_poster_{uuid.uuid4().hex[:8]}', fullname='Poll Poster', role='task_poster')
+        doer = User.objects.create(username=f'poll_doer_{uuid.uuid4().hex[:8]}', fullname='Poll Doer', role='task_doer')
+        task = Task.objects.create(
+            poster=poster, doer=doer, title='Poll benchmark', description='Benchmark task',
+            category='microtask', price=100, deadline=timezone.now() + timedelta(days=1), status='in_progress'
+        )
+        Message.objects.bulk_create([
+            Message(task=task, sender=poster if i % 2 else doer, message=f'Message {i}',
+                    attachment=f'chat_attachments/file_{i}.png' if i % 5 == 0 else None,
+                    attachment_type='image' if i % 5 == 0 else None)
+            for i in range(options['messages'])
+        ])
+
+        seconds = options['seconds']
+        self.stdout.write(f'\n📊 {options["messages"]} messages, {seconds}s per run, single worker')
+
+        rate, status = self._throughput(legacy_get_messages, poster, task.id, seconds)
+        self.stdout.write(f'   legacy full poll        {rate:8.0f} polls/s  status={status}')
+
+        rate, status = self._throughput(api_get_messages, poster, task.id, seconds)
+        self.stdout.write(f'   full poll (no cursor)   {rate:8.0f} polls/s  status={status}')
+
+        request = RequestFactory().get(f'/api/messages/{task.id}/')
+        request.user = poster
+        first = api_get_messages(request, task.id)
+        etag = first['ETag']
+        last_id = Message.objects.filter(task=task).order_by('-created_at').values_list('id', flat=True).first()
+
+        rate, status = self._throughput(api_get_messages, poster, task.id, seconds, data={'after': str(last_id)})
+        self.stdout.write(f'   cursor poll, no news    {rate:8.0f} polls/s  status={status}')
+
+        rate, status = self._throughput(api_get_messages, poster, task.id, seconds, HTTP_IF_NONE_MATCH=etag)
+        self.stdout.write(f'   ETag poll, unchanged    {rate:8.0f} polls/s  status={status}')
@@ -0,0 +1,105 @@
+"""
+Management command to benchmark browse_tasks search
+Compares the old icontains filter against the full-text index (core.search)
+on the doer feed: one count plus one ranked page per search, as
+browse_tasks renders it. Seed data is always rolled back.
+Run with: py manage.py benchmark_search --tasks 100000
+"""
+import random
+import uuid
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from django.utils import timezone
+
+from core.feed import TaskFeedService
+from core.management.benchmarking import rolled_back, timed, sample, median, percentile
+from core.models import User, Task
+from core.search import TaskSearchService
+
+
+class Command(BaseCommand):
+    help = 'Benchmark p50/p99 latency of task search: icontains vs full-text index'
+
+    WORDS = [
+        'powerpoint', 'slides', 'presentation', 'typing', 'encode', 'thesis', 'resume', 'logo',
+        'poster', 'design', 'layout', 'research', 'summary', 'survey', 'print', 'deliver',
+        'grocery', 'errand', 'lecture', 'notes', 'transcribe', 'spreadsheet', 'budget', 'report',
+        'essay', 'proofread', 'canva', 'flyer', 'banner', 'video', 'edit', 'caption',
+    ]
+
+    # Synthetic long-tail vocabulary so topic words are not in every task
+    FILLER_WORDS = 5000
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tasks', type=int, default=100000, help='Open tasks to seed')
+        parser.add_argument('--runs', type=int, default=20, help='Searches per query and variant')
+        parser.add_argument('--queries', nargs='+', default=['slides', 'pres', 'logo design', 'transcribe lecture notes'],
+                            help='Search box inputs to time (partial words allowed)')
+
+    def handle(self, *args, **options):
+        with rolled_back():
+            self._run(options)
+
+    def _phrase(self, rng, words, vocabulary):
+        # Topic words in roughly one word out of eight, the rest long-tail filler
+        return ' '.join(
+            rng.choice(self.WORDS) if rng.random() < 0.125 else rng.choice(vocabulary)
+            for _ in range(words)
+        )
+
+    def _run(self, options):
+        size = options['tasks']
+        self.stdout.write(f'\n📊 Seeding {size} open tasks...')
+        rng = random.Random(size)
+        now = timezone.now()
+        vocabulary = [f'w{uuid.UUID(int=rng.getrandbits(128)).hex[:6]}' for _ in range(self.FILLER_WORDS)]
+
+        posters = [User(id=uuid.uuid4(), username=f'search_poster_{i}', role='task_poster') for i in range(200)]
+        User.objects.bulk_create(posters)
+        doer = User.objects.create(username=f'search_doer_{uuid.uuid4().hex[:8]}', role='task_doer')
+        tasks = [
+            Task(
+                poster=rng.choice(posters),
+                title=self._phrase(rng, 6, vocabulary).capitalize(),
+                description=self._phrase(rng, 40, vocabulary),
+                category='microtask',
+                tags=','.join(rng.sample(self.WORDS, 2)),
+                price=Decimal(rng.randint(50, 2000)),
+                deadline=now + timedelta(hours=rng.randint(1, 24 * 14)),
+                priority_level=rng.randint(1, 5),
+                status='open',
+            )
+            for _ in range(size)
+        ]
+        Task.objects.bulk_create(tasks, batch_size=2000)
+
+        # bulk_create bypasses signals, so build the feed and search indexes explicitly
+        seeded = Task.objects.filter(poster__in=posters)
+        TaskFeedService.rebuild(seeded)
+        _, elapsed, _ = timed(lambda: TaskSearchService.rebuild(seeded))
+        self.stdout.write(f'   Search index build ({TaskSearchService.backend()}): {elapsed:.0f}ms')
+
+        def icontains(text):
+            tasks = TaskFeedService.get_feed_for_user(doer).filter(
+                Q(title__icontains=text) | Q(description__icontains=text) | Q(tags__icontains=text)
+            )
+            return tasks.count(), list(tasks[:12])
+
+        def full_text(text):
+            tasks = TaskSearchService.order_by_relevance(
+                TaskSearchService.search(TaskFeedService.get_feed_for_user(doer), text)
+            )
+            return tasks.count(), list(tasks[:12])
+
+        for text in options['queries']:
+            self.stdout.write(f'\n   "{text}"')
+            for label, search in (('icontains', icontains), ('full-text', full_text)):
+                hits, _ = search(text)  # warm up
+                timings, queries = sample(lambda: search(text), options['runs'])
+                self.stdout.write(
+                    f'   {label:<10} p50={median(timings):8.2f}ms  p99={percentile(timings, 0.99):8.2f}ms  '
+                    f'matches={hits:<7} queries/search={queries:.1f}'
+                )
@@ -0,0 +1,90 @@
+"""
+Management command to benchmark PayMongo webhook throughput
+Measures the ingest endpoint (signature check + insert), provider
+retries of already stored events, and worker processing rate.
+Seed data is always rolled back.
+Run with: py manage.py benchmark_webhooks --events 500
+"""
+import hashlib
+import hmac
+import json
+import uuid
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory, override_settings
+from django.utils import timezone
+
+from core.management.benchmarking import rolled_back, timed, median, percentile
+from core.models import User, Task, SystemCommission
+from core.views import paymongo_webhook
+from core.webhooks import WebhookQueue
+
+SECRET = 'whsk_benchmark'
+
+
+def system_fee_event(task_id):
+    return {
+        'data': {
+            'id': f'evt_{uuid.uuid4().hex}',
+            'attributes': {
+                'type': 'payment.paid',
+                'data': {
+                    'id': f'pay_{uuid.uuid4().hex[:24]}',
+                    'attributes': {'amount': 200, 'description': f'ErrandExpress System Fee - {task_id}'}
+                }
+            }
+        }
+    }
+
+
+class Command(BaseCommand):
+    help = 'Benchmark webhook ingest requests/s, duplicate retries and worker events/s'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--events', type=int, default=500, help='Distinct events to ingest and process')
+
+    def handle(self, *args, **options):
+        with rolled_back(), override_settings(PAYMONGO_WEBHOOK_SECRET=SECRET):
+            self._run(options['events'])
+
+    def _post(self, factory, body):
+        signature = hmac.new(SECRET.encode(), body, hashlib.sha256).hexdigest()
+        request = factory.post('/webhook/paymongo/', data=body, content_type='application/json',
+                               HTTP_X_PAYMONGO_SIGNATURE=signature)
+        status, elapsed, _ = timed(lambda: paymongo_webhook(request).status_code)
+        return elapsed, status
+
+    def _report(self, label, timings, statuses):
+        total = sum(timings) / 1000
+        self.stdout.write(
+            f'   {label:<22}{len(timings) / total:8.0f} req/s  p50={median(timings):.2f}ms  '
+            f'p95={percentile(timings, 0.95):.2f}ms  status={sorted(set(statuses))}'
+        )
+
+    def _run(self, count):
+        poster = User.objects.create(username=f'hook_poster_{uuid.uuid4().hex[:8]}', fullname='Hook Poster', role='task_poster')
+        tasks = Task.objects.bulk_create([
+            Task(poster=poster, title=f'Webhook benchmark {i}', description='Benchmark task', category='microtask',
+                 price=20, deadline=timezone.now() + timedelta(days=1), status='in_progress')
+            for i in range(count)
+        ])
+        SystemCommission.objects.bulk_create([
+            SystemCommission(task=task, payer=poster, amount=2, method='online') for task in tasks
+        ])
+        bodies = [json.dumps(system_fee_event(task.id)).encode() for task in tasks]
+
+        self.stdout.write(f'\n📊 {count} payment.paid events (system fee), single worker')
+        factory = RequestFactory()
+
+        results = [self._post(factory, body) for body in bodies]
+        self._report('ingest (new events)', *zip(*results))
+
+        results = [self._post(factory, body) for body in bodies]
+        self._report('ingest (retries)', *zip(*results))
+
+        result = WebhookQueue.process_pending()
+        rate = result['processed'] / (result['elapsed_ms'] / 1000) if result['elapsed_ms'] else 0
+        self.stdout.write(
+            f"   {'worker processing':<22}{rate:8.0f} events/s  processed={result['processed']}  failed={result['failed']}"
+        )
@@ -0,0 +1,36 @@
+"""
+Management command to report cache effectiveness per namespace
+Reads the totals CacheStatsMiddleware adds up across requests (requires
+CACHE_STATS_ENABLED and a shared CACHE_URL to see more than one process).
+Run with: py manage.py cache_report
+"""
+from django.core.management.base import BaseCommand
+from core.caching import CacheStats
+
+
+class Command(BaseCommand):
+    help = 'Show cache hits, misses and time spent per cache namespace'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true', help='Clear the totals after printing them')
+
+    def handle(self, *args, **options):
+        totals = CacheStats.totals()
+        if not totals:
+            self.stdout.write('No cache stats recorded yet (is CACHE_STATS_ENABLED set?)')
+            return
+
+        self.stdout.write(f"{'namespace':<16}{'requests':>10}{'hits':>10}{'misses':>10}{'hit rate':>10}"
+                          f"{'sets':>10}{'deletes':>10}{'ms/req':>10}")
+        ranked = sorted(totals.items(), key=lambda item: item[1]['ms'], reverse=True)
+        for namespace, entry in ranked:
+            hit_rate = f"{entry['hit_rate']:.0%}" if entry['hit_rate'] is not None else '-'
+            ms_per_request = entry['ms'] / entry['requests'] if entry['requests'] else 0
+            self.stdout.write(
+                f"{namespace:<16}{entry['requests']:>10}{entry['hits']:>10}{entry['misses']:>10}{hit_rate:>10}"
+                f"{entry['sets']:>10}{entry['deletes']:>10}{ms_per_request:>10.2f}"
+            )
+
+        if options['reset']:
+            CacheStats.reset_totals()
+            self.stdout.write(self.style.SUCCESS('✅ Cache stats reset'))
@@ -0,0 +1,92 @@
+"""
+Management command to load test the v2 auto-assign endpoint
+Seeds growing doer populations and drives api_auto_assign_task with
+repeated requests, reporting latency percentiles and queries per request.
+Seed data is always rolled back.
+Run with: py manage.py loadtest_auto_assign --sizes 100 1000 10000 --requests 50
+"""
+import json
+import random
+import uuid
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory
+from django.utils import timezone
+
+from core.api_views import api_auto_assign_task
+from core.management.benchmarking import rolled_back, timed, median, percentile
+from core.models import User, StudentSkill, Task
+
+
+class Command(BaseCommand):
+    help = 'Load test api_auto_assign_task latency and query counts at several doer populations'
+
+    CATEGORIES = ['microtask', 'typing', 'powerpoint', 'graphics']
+    LOCATIONS = [choice[0] for choice in User.CAMPUS_CHOICES]
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', nargs='+', type=int, default=[100, 1000, 10000],
+                            help='Numbers of doers to seed')
+        parser.add_argument('--requests', type=int, default=50, help='Requests per population')
+        parser.add_argument('--limit', type=int, default=5, help='Candidates per request')
+
+    def handle(self, *args, **options):
+        for size in options['sizes']:
+            with rolled_back():
+                self._run(size, options)
+
+    def _request(self, poster, payload):
+        request = RequestFactory().post(
+            '/api/tasks/auto-assign/', data=json.dumps(payload), content_type='application/json'
+        )
+        request.user = poster
+        return timed(lambda: api_auto_assign_task(request))
+
+    def _run(self, size, options):
+        self.stdout.write(f'\n📊 Seeding {size} doers...')
+        rng = random.Random(size)
+
+        doers = [
+            User(id=uuid.uuid4(), username=f'load_doer_{uuid.uuid4().hex[:12]}', role='task_doer',
+                 campus_location=rng.choice(self.LOCATIONS), avg_rating=round(rng.uniform(0, 5), 2))
+            for _ in range(size)
+        ]
+        User.objects.bulk_create(doers, batch_size=2000)
+        StudentSkill.objects.bulk_create([
+            StudentSkill(student=doer, skill_name=rng.choice(self.CATEGORIES[1:]), status='verified')
+            for doer in doers if rng.random() < 0.5
+        ], batch_size=2000)
+
+        poster = User.objects.create(username=f'load_poster_{uuid.uuid4().hex[:8]}', role='task_poster')
+        tasks = Task.objects.bulk_create([
+            Task(poster=poster, title=f'Load task {i}', description='Load test task',
+                 category=rng.choice(self.CATEGORIES), price=100,
+                 deadline=timezone.now() + timedelta(days=1),
+                 campus_location=rng.choice(self.LOCATIONS + ['']),
+                 preferred_doer=rng.choice(doers) if rng.random() < 0.3 else None,
+                 priority_level=5)
+            for i in range(options['requests'])
+        ])
+
+        latencies, query_counts = [], set()
+        for task in tasks:
+            response, elapsed, queries = self._request(poster, {
+                'task_id': str(task.id), 'limit': options['limit'], 'assign': False
+            })
+            if response.status_code != 200:
+                self.stdout.write(self.style.ERROR(f'   {response.status_code}: {response.content[:200]}'))
+                return
+            latencies.append(elapsed)
+            query_counts.add(queries)
+
+        self.stdout.write(
+            f'   rank only, {len(tasks)} requests  p50={median(latencies):8.1f}ms  '
+            f'p95={percentile(latencies, 0.95):8.1f}ms  max={max(latencies):8.1f}ms  '
+            f'queries/request={sorted(query_counts)}'
+        )
+
+        response, elapsed, queries = self._request(poster, {'task_id': str(tasks[0].id)})
+        self.stdout.write(
+            f'   rank + assign, 1 request {elapsed:10.1f}ms  queries={queries}  status={response.status_code}'
+        )
@@ -0,0 +1,60 @@
+"""
+Management command to run the overdue/expiry pipeline by hand
+Same work as the handle_overdue_tasks and auto_delete_expired_tasks
+Celery jobs, with a dry-run mode and per-phase timing.
+Run with: py manage.py process_task_lifecycle --dry-run
+"""
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core.lifecycle import TaskLifecycleService
+
+
+class Command(BaseCommand):
+    help = 'Notify newly overdue/expired tasks (admin digest) and remove tasks expired past the grace period'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only count what would be processed',
+        )
+        parser.add_argument(
+            '--archive',
+            action='store_true',
+            help='Cancel expired tasks instead of deleting them',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=TaskLifecycleService.CHUNK_SIZE,
+            help=f'Tasks per transaction (default: {TaskLifecycleService.CHUNK_SIZE})',
+        )
+        parser.add_argument(
+            '--skip-purge',
+            action='store_true',
+            help='Only send overdue/expired notices',
+        )
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        dry_run = options['dry_run']
+        prefix = '[dry run] ' if dry_run else ''
+
+        overdue = TaskLifecycleService.process_overdue(now=now, dry_run=dry_run, chunk_size=options['chunk_size'])
+        self.stdout.write(
+            f"{prefix}Overdue: {overdue['overdue']} in progress, {overdue['expired']} open "
+            f"({overdue['notifications']} notifications) in {overdue['elapsed_ms']}ms"
+        )
+
+        if not options['skip_purge']:
+            purge = TaskLifecycleService.purge_expired(
+                now=now, dry_run=dry_run, chunk_size=options['chunk_size'], archive=options['archive']
+            )
+            action = 'archived' if options['archive'] else 'deleted'
+            self.stdout.write(
+                f"{prefix}Expired: {purge['removed']} {action} "
+                f"({purge['notifications']} notifications) in {purge['elapsed_ms']}ms"
+            )
+
+        self.stdout.write(self.style.SUCCESS(f'✅ {prefix}Lifecycle pass complete'))
@@ -0,0 +1,41 @@
+"""
+Management command to report database work per endpoint
+Reads the totals QueryBudgetMiddleware adds up across requests (requires
+QUERY_BUDGET_ENABLED and a shared CACHE_URL to see more than one process;
+each worker adds its buffered counters every QueryBudget.FLUSH_EVERY requests).
+Run with: py manage.py query_report
+"""
+from django.core.management.base import BaseCommand
+from core.querybudget import QueryBudget
+
+
+class Command(BaseCommand):
+    help = 'Show queries, DB time, budget violations and N+1 flags per endpoint'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true', help='Clear the totals after printing them')
+
+    def handle(self, *args, **options):
+        totals = QueryBudget.totals()
+        if not totals:
+            self.stdout.write('No query stats recorded yet (is QUERY_BUDGET_ENABLED set?)')
+            return
+
+        self.stdout.write(f"{'endpoint':<32}{'requests':>10}{'queries/req':>13}{'budget':>8}"
+                          f"{'db ms/req':>11}{'over':>7}{'N+1':>7}")
+        ranked = sorted(totals.items(), key=lambda item: item[1]['ms'], reverse=True)
+        for endpoint, entry in ranked:
+            self.stdout.write(
+                f"{endpoint:<32}{entry['requests']:>10}{entry['avg_queries']:>13.1f}{entry['budget']:>8}"
+                f"{entry['avg_ms']:>11.2f}{entry['over_budget']:>7}{entry['n_plus_one']:>7}"
+            )
+
+        repeated = [(endpoint, entry['repeated']) for endpoint, entry in ranked if entry['repeated']]
+        if repeated:
+            self.stdout.write('\nMost repeated statement per N+1 endpoint:')
+            for endpoint, sql in repeated:
+                self.stdout.write(f'   {endpoint}: {sql}')
+
+        if options['reset']:
+            QueryBudget.reset_totals()
+            self.stdout.write(self.style.SUCCESS('✅ Query stats reset'))
@@ -0,0 +1,25 @@
+"""
+Management command to rebuild inbox conversation summaries
+Run with: py manage.py rebuild_conversations
+"""
+from django.core.management.base import BaseCommand
+from core.conversations import ConversationService
+from core.models import Task
+
+
+class Command(BaseCommand):
+    help = 'Rebuild ConversationSummary rows (last message, unread counts) from the Message table'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--task',
+            help='Only rebuild summaries for this task id',
+        )
+
+    def handle(self, *args, **options):
+        tasks = Task.objects.all()
+        if options['task']:
+            tasks = tasks.filter(id=options['task'])
+
+        written = ConversationService.rebuild(tasks)
+        self.stdout.write(self.style.SUCCESS(f'✅ Rebuilt {written} conversation summaries'))
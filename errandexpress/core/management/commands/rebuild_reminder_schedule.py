@@ -0,0 +1,25 @@
+"""
+Management command to recompute deadline reminder schedules
+Run with: py manage.py rebuild_reminder_schedule
+"""
+from django.core.management.base import BaseCommand
+from core.reminders import ReminderScheduler
+from core.models import Task
+
+
+class Command(BaseCommand):
+    help = 'Recompute ReminderSchedule rows for open and in-progress tasks (e.g. after changing reminder tiers)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--task',
+            help='Only rebuild the schedule for this task id',
+        )
+
+    def handle(self, *args, **options):
+        tasks = Task.objects.all()
+        if options['task']:
+            tasks = tasks.filter(id=options['task'])
+
+        written = ReminderScheduler.rebuild(tasks)
+        self.stdout.write(self.style.SUCCESS(f'✅ Scheduled {written} deadline reminders'))
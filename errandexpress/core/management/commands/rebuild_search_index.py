@@ -0,0 +1,25 @@
+"""
+Management command to rebuild the task full-text search index
+Run with: py manage.py rebuild_search_index
+"""
+from django.core.management.base import BaseCommand
+from core.models import Task
+from core.search import TaskSearchService
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the task search index (tsvector on PostgreSQL, FTS5 table on SQLite)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--open-only',
+            action='store_true',
+            help='Only re-index open tasks',
+        )
+
+    def handle(self, *args, **options):
+        tasks = Task.objects.filter(status='open') if options['open_only'] else None
+        written = TaskSearchService.rebuild(tasks)
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ Indexed {written} tasks ({TaskSearchService.backend()} backend)'
+        ))
@@ -0,0 +1,27 @@
+"""
+Management command to rebuild the normalized task tag index
+Run with: py manage.py rebuild_tag_index
+"""
+from django.core.management.base import BaseCommand
+from core.models import Task
+from core.tags import TagService
+
+
+class Command(BaseCommand):
+    help = 'Rebuild Tag / TaskTag rows from Task.tags and recount the browse tag facets'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--counts-only',
+            action='store_true',
+            help='Only recount Tag.open_task_count',
+        )
+
+    def handle(self, *args, **options):
+        if options['counts_only']:
+            updated = TagService.refresh_counts()
+            self.stdout.write(self.style.SUCCESS(f'✅ Recounted {updated} tags'))
+            return
+
+        written = TagService.rebuild(Task.objects.all())
+        self.stdout.write(self.style.SUCCESS(f'✅ Rebuilt {written} task tag links'))
@@ -0,0 +1,29 @@
+"""
+Management command to rebuild the precomputed doer task feed
+Run with: py manage.py rebuild_task_feed
+"""
+from django.core.management.base import BaseCommand
+from core.feed import TaskFeedService
+from core.models import Task, TaskFeedEntry
+
+
+class Command(BaseCommand):
+    help = 'Rebuild TaskFeedEntry rows from Task, Rating and TaskApplication data'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--open-only',
+            action='store_true',
+            help='Only rebuild rows for open tasks',
+        )
+
+    def handle(self, *args, **options):
+        tasks = Task.objects.all()
+        if options['open_only']:
+            tasks = tasks.filter(status='open')
+        else:
+            # Full rebuild also drops rows whose task no longer exists
+            TaskFeedEntry.objects.exclude(task__in=Task.objects.all()).delete()
+
+        written = TaskFeedService.rebuild(tasks)
+        self.stdout.write(self.style.SUCCESS(f'✅ Rebuilt {written} task feed rows'))
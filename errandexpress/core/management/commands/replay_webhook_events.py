@@ -0,0 +1,57 @@
+"""
+Management command to inspect and replay stored PayMongo webhook events
+Failed events (or any selection) are reset to pending and, with
+--process, applied right away through the normal worker path.
+Run with: py manage.py replay_webhook_events --status failed --process
+"""
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+from django.utils import timezone
+
+from core.models import InboundWebhookEvent
+from core.webhooks import WebhookQueue
+
+
+class Command(BaseCommand):
+    help = 'Replay stored PayMongo webhook events (default: failed ones)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--event-id', action='append', default=[], help='Replay this event id (repeatable)')
+        parser.add_argument('--status', default='failed', help='Replay events in this status (default: failed)')
+        parser.add_argument('--type', dest='event_type', help='Only events of this type, e.g. payment.paid')
+        parser.add_argument('--hours', type=float, help='Only events received in the last N hours')
+        parser.add_argument('--dry-run', action='store_true', help='List what would be replayed')
+        parser.add_argument('--process', action='store_true', help='Process the queue after resetting')
+
+    def handle(self, *args, **options):
+        summary = InboundWebhookEvent.objects.values('status').annotate(n=Count('id')).order_by('status')
+        self.stdout.write('Queue: ' + ', '.join(f"{row['status']}={row['n']}" for row in summary))
+
+        events = InboundWebhookEvent.objects.all()
+        if options['event_id']:
+            events = events.filter(event_id__in=options['event_id'])
+        else:
+            events = events.filter(status=options['status'])
+        if options['event_type']:
+            events = events.filter(event_type=options['event_type'])
+        if options['hours']:
+            events = events.filter(received_at__gte=timezone.now() - timedelta(hours=options['hours']))
+
+        if options['dry_run']:
+            for event in events.order_by('received_at')[:50]:
+                self.stdout.write(f"  {event.event_id}  {event.event_type}  {event.status}  attempts={event.attempts}  {event.last_error[:80]}")
+            self.stdout.write(self.style.SUCCESS(f'✅ [dry run] {events.count()} events would be replayed'))
+            return
+
+        reset = WebhookQueue.replay(events)
+        self.stdout.write(f'Reset {reset} events to pending')
+
+        if options['process']:
+            result = WebhookQueue.process_pending()
+            self.stdout.write(
+                f"Processed {result['processed']}, failed {result['failed']}, "
+                f"deferred {result['deferred']} in {result['elapsed_ms']}ms"
+            )
+        self.stdout.write(self.style.SUCCESS('✅ Replay complete'))
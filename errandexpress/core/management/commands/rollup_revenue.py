@@ -0,0 +1,29 @@
+"""
+Management command to roll up the revenue ledger
+Run with: py manage.py rollup_revenue
+"""
+from django.core.management.base import BaseCommand
+from core.models import SystemCommission, Payment
+from core.revenue import RevenueLedger
+
+
+class Command(BaseCommand):
+    help = 'Fold new RevenueEntry rows into RevenueRollup and refresh the SystemWallet totals'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--backfill',
+            action='store_true',
+            help='First append any paid commissions / confirmed payments missing from the ledger',
+        )
+
+    def handle(self, *args, **options):
+        if options['backfill']:
+            commissions = RevenueLedger.record_commissions(SystemCommission.objects.all())
+            payments = RevenueLedger.record_payments(Payment.objects.all())
+            self.stdout.write(f'Checked {commissions} commissions and {payments} payments against the ledger')
+
+        result = RevenueLedger.rollup()
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Rolled up {result['entries']} entries into {result['buckets']} buckets in {result['elapsed_ms']}ms"
+        ))
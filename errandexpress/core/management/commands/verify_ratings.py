@@ -0,0 +1,44 @@
+"""
+Management command to verify and repair denormalized user rating aggregates
+(rating_sum, total_ratings, avg_rating, best/worst rating pointers)
+Run with: py manage.py verify_ratings [--dry-run]
+"""
+from django.core.management.base import BaseCommand
+from core.ratings import RatingAggregateService
+
+
+class Command(BaseCommand):
+    help = 'Verify user rating aggregates against the Rating table and repair drift in bulk'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Report drift without repairing it',
+        )
+        parser.add_argument(
+            '--verbose-users',
+            action='store_true',
+            help='List every user with drifted aggregates',
+        )
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+
+        if dry_run:
+            self.stdout.write(self.style.WARNING('DRY RUN MODE - No changes will be made'))
+
+        drift = RatingAggregateService.recompute(dry_run=dry_run)
+
+        if options['verbose_users']:
+            for user, expected in drift:
+                self.stdout.write(
+                    f"  {user.fullname}: {expected['avg_rating']} ({expected['total_ratings']} ratings)"
+                )
+
+        if not drift:
+            self.stdout.write(self.style.SUCCESS('✅ All rating aggregates are consistent'))
+        elif dry_run:
+            self.stdout.write(self.style.WARNING(f'⚠️ {len(drift)} users have drifted rating aggregates'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'✅ Repaired rating aggregates for {len(drift)} users'))
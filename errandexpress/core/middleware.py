@@ -0,0 +1,69 @@
+"""
+Middleware for ErrandExpress
+"""
+
+from django.conf import settings
+import random
+import logging
+
+from core.caching import CacheStats
+from core.querybudget import QueryBudget
+
+logger = logging.getLogger(__name__)
+
+
+class CacheStatsMiddleware:
+    """
+    Collect cache hits/misses/latency per namespace for each request.
+    The numbers go out in a Server-Timing header (visible in browser dev
+    tools), to the debug log, and into the shared totals read by
+    `py manage.py cache_report`. Disabled unless CACHE_STATS_ENABLED.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.enabled = getattr(settings, 'CACHE_STATS_ENABLED', False)
+
+    def __call__(self, request):
+        if not self.enabled:
+            return self.get_response(request)
+
+        with CacheStats.collect() as stats:
+            response = self.get_response(request)
+
+        if stats:
+            response['Server-Timing'] = CacheStats.server_timing(stats)
+            logger.debug(f"Cache stats {request.method} {request.path}: {stats}")
+            CacheStats.add_to_totals(stats)
+        return response
+
+
+class QueryBudgetMiddleware:
+    """
+    Count queries and DB time per request, check them against the view's
+    query budget and flag repeated statements (N+1 loops). Violations are
+    logged, or raised when QUERY_BUDGET_MODE is 'raise' (tests); totals
+    per endpoint feed `py manage.py query_report`. Disabled unless
+    QUERY_BUDGET_ENABLED; QUERY_BUDGET_SAMPLE_RATE picks the share of
+    requests that are recorded.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        # Settings read per request so tests can switch budgets on and off
+        if not getattr(settings, 'QUERY_BUDGET_ENABLED', False):
+            return self.get_response(request)
+        if random.random() >= getattr(settings, 'QUERY_BUDGET_SAMPLE_RATE', 1.0):
+            return self.get_response(request)
+
+        with QueryBudget.record() as recorder:
+            response = self.get_response(request)
+
+        match = getattr(request, 'resolver_match', None)
+        endpoint = match.view_name if match else 'unresolved'
+        timing = QueryBudget.server_timing(recorder)
+        response['Server-Timing'] = f"{response['Server-Timing']}, {timing}" if response.has_header('Server-Timing') else timing
+        QueryBudget.check(endpoint, recorder)
+        return response
@@ -0,0 +1,79 @@
+# Generated by Django 4.2.7 on 2026-10-17 00:24
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+from datetime import timedelta
+from decimal import Decimal
+
+
+def backfill_task_feed(apps, schema_editor):
+    """Build feed rows for existing tasks (same rules as TaskFeedService.rebuild)"""
+    Task = apps.get_model('core', 'Task')
+    Rating = apps.get_model('core', 'Rating')
+    TaskApplication = apps.get_model('core', 'TaskApplication')
+    TaskFeedEntry = apps.get_model('core', 'TaskFeedEntry')
+
+    ratings = dict(
+        Rating.objects.values('rated_id').annotate(avg=models.Avg('score')).values_list('rated_id', 'avg')
+    )
+    first_times = dict(
+        TaskApplication.objects.filter(
+            status='pending', first_application_time__isnull=False
+        ).values('task_id').annotate(first=models.Min('first_application_time')).values_list('task_id', 'first')
+    )
+
+    entries = []
+    for task in Task.objects.all().iterator(chunk_size=1000):
+        tags = (task.tags or '').lower()
+        poster_rating = Decimal(str(ratings.get(task.poster_id) or 0)).quantize(Decimal('0.01'))
+        first = first_times.get(task.id)
+        entries.append(TaskFeedEntry(
+            task_id=task.id,
+            poster_id=task.poster_id,
+            campus_location=task.campus_location or '',
+            bucket_microtask=task.category == 'microtask' or 'microtask' in tags,
+            bucket_typing=task.category == 'typing' or 'typing' in tags,
+            bucket_powerpoint=task.category == 'powerpoint' or 'powerpoint' in tags,
+            bucket_graphics=task.category == 'graphics' or 'graphics' in tags,
+            is_listed=task.status == 'open',
+            hidden_after=first + timedelta(minutes=3) if task.doer_id and first else None,
+            deadline=task.deadline,
+            priority_level=task.priority_level,
+            poster_rating=poster_rating,
+            static_score=poster_rating * Decimal('2.00') + Decimal(task.priority_level or 0) * Decimal('0.50'),
+        ))
+    TaskFeedEntry.objects.bulk_create(entries, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0020_message_attachment_type'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaskFeedEntry',
+            fields=[
+                ('task', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='feed_entry', serialize=False, to='core.task')),
+                ('campus_location', models.CharField(blank=True, max_length=50)),
+                ('bucket_microtask', models.BooleanField(default=False)),
+                ('bucket_typing', models.BooleanField(default=False)),
+                ('bucket_powerpoint', models.BooleanField(default=False)),
+                ('bucket_graphics', models.BooleanField(default=False)),
+                ('is_listed', models.BooleanField(default=True, help_text='Task is open and shown in doer feeds')),
+                ('hidden_after', models.DateTimeField(blank=True, help_text='Doer chosen - hide once the 3-minute window closes', null=True)),
+                ('deadline', models.DateTimeField()),
+                ('priority_level', models.IntegerField(default=3)),
+                ('poster_rating', models.DecimalField(decimal_places=2, default=0.0, max_digits=4)),
+                ('static_score', models.DecimalField(decimal_places=2, default=0.0, help_text='(Poster Rating × 2.0) + (Priority Level × 0.5)', max_digits=7)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('poster', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['is_listed', 'deadline'], name='core_taskfe_is_list_b9cd14_idx'), models.Index(fields=['is_listed', 'campus_location', '-static_score'], name='core_taskfe_is_list_7f5c31_idx'), models.Index(fields=['poster'], name='core_taskfe_poster__9b67ad_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_task_feed, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 4.2.7 on 2026-10-17 00:27
+
+from django.db import migrations, models
+import django.db.models.deletion
+from decimal import Decimal, ROUND_HALF_UP
+
+
+def backfill_rating_aggregates(apps, schema_editor):
+    """Populate aggregates from the Rating table (same rules as RatingAggregateService)"""
+    User = apps.get_model('core', 'User')
+    Rating = apps.get_model('core', 'Rating')
+
+    received = Rating.objects.filter(rated=models.OuterRef('pk')).order_by()
+    totals = received.values('rated').annotate(s=models.Sum('score'), c=models.Count('id'))
+    users = User.objects.annotate(
+        expected_sum=models.Subquery(totals.values('s')),
+        expected_count=models.Subquery(totals.values('c')),
+        expected_best=models.Subquery(received.order_by('-score', '-created_at').values('id')[:1]),
+        expected_worst=models.Subquery(received.order_by('score', '-created_at').values('id')[:1]),
+    ).filter(expected_count__gt=0)
+
+    batch = []
+    for user in users.iterator(chunk_size=1000):
+        user.rating_sum = user.expected_sum
+        user.total_ratings = user.expected_count
+        user.avg_rating = (Decimal(user.expected_sum) / Decimal(user.expected_count)).quantize(
+            Decimal('0.01'), rounding=ROUND_HALF_UP
+        )
+        user.best_rating_id = user.expected_best
+        user.worst_rating_id = user.expected_worst
+        batch.append(user)
+    User.objects.bulk_update(
+        batch, ['rating_sum', 'total_ratings', 'avg_rating', 'best_rating', 'worst_rating'], batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0021_task_feed_entry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='best_rating',
+            field=models.ForeignKey(blank=True, help_text='Highest received rating (most recent on ties)', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='core.rating'),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='rating_sum',
+            field=models.IntegerField(default=0, help_text='Sum of all received rating scores'),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='worst_rating',
+            field=models.ForeignKey(blank=True, help_text='Lowest received rating (most recent on ties)', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='core.rating'),
+        ),
+        migrations.RunPython(backfill_rating_aggregates, migrations.RunPython.noop),
+    ]
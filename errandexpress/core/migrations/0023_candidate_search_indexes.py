@@ -0,0 +1,21 @@
+# Generated by Django 4.2.7 on 2026-10-17 00:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0022_user_rating_aggregates'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='studentskill',
+            index=models.Index(fields=['skill_name', 'status'], name='core_studen_skill_n_203afb_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['role', 'campus_location', '-avg_rating'], name='core_user_role_d8d76a_idx'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 4.2.7 on 2026-10-17 09:05
+
+from django.db import migrations
+
+IMAGE_EXTENSIONS = ('jpg', 'jpeg', 'png', 'gif', 'webp')
+
+
+def backfill_attachment_type(apps, schema_editor):
+    """Store attachment_type once (same rule as Message.detect_attachment_type)"""
+    Message = apps.get_model('core', 'Message')
+
+    # Text-only messages carry no type (older rows were saved with 'file')
+    Message.objects.filter(attachment='').exclude(attachment_type=None).update(attachment_type=None)
+    Message.objects.filter(attachment=None).exclude(attachment_type=None).update(attachment_type=None)
+
+    batch = []
+    for message in Message.objects.exclude(attachment='').exclude(attachment=None).only('id', 'attachment').iterator(chunk_size=1000):
+        ext = message.attachment.name.rsplit('.', 1)[-1].lower()
+        message.attachment_type = 'image' if ext in IMAGE_EXTENSIONS else 'file'
+        batch.append(message)
+    Message.objects.bulk_update(batch, ['attachment_type'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0023_candidate_search_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_attachment_type, migrations.RunPython.noop),
+    ]
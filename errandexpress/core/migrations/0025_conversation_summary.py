@@ -0,0 +1,71 @@
+# Generated by Django 4.2.7 on 2026-10-17 00:49
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+def backfill_conversation_summaries(apps, schema_editor):
+    """Build summaries from existing messages (same rules as ConversationService.rebuild)"""
+    Task = apps.get_model('core', 'Task')
+    Message = apps.get_model('core', 'Message')
+    ConversationSummary = apps.get_model('core', 'ConversationSummary')
+
+    not_from = lambda field: models.Q(messages__is_read=False) & ~models.Q(messages__sender_id=models.F(field))
+    tasks = list(Task.objects.annotate(
+        message_count=models.Count('messages'),
+        poster_unread=models.Count('messages', filter=not_from('poster_id')),
+        doer_unread=models.Count('messages', filter=not_from('doer_id')),
+        last_id=models.Subquery(
+            Message.objects.filter(task=models.OuterRef('pk')).order_by('-created_at').values('id')[:1]
+        )
+    ).filter(message_count__gt=0).values('id', 'poster_id', 'doer_id', 'poster_unread', 'doer_unread', 'last_id'))
+    last_messages = Message.objects.in_bulk([task['last_id'] for task in tasks])
+
+    rows = []
+    for task in tasks:
+        message = last_messages[task['last_id']]
+        preview = (message.message or '').strip() or ('📎 Attachment' if message.attachment else '')
+        for role in ('poster', 'doer'):
+            if task[f'{role}_id']:
+                rows.append(ConversationSummary(
+                    task_id=task['id'],
+                    user_id=task[f'{role}_id'],
+                    last_message=message,
+                    last_message_preview=preview[:100],
+                    last_message_at=message.created_at,
+                    last_sender_id=message.sender_id,
+                    unread_count=task[f'{role}_unread'],
+                ))
+    ConversationSummary.objects.bulk_create(rows, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0024_message_attachment_type_backfill'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ConversationSummary',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('last_message_preview', models.CharField(blank=True, max_length=100)),
+                ('last_message_at', models.DateTimeField(blank=True, null=True)),
+                ('unread_count', models.PositiveIntegerField(default=0)),
+                ('last_read_at', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('last_message', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='core.message')),
+                ('last_sender', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('task', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='conversation_summaries', to='core.task')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='conversation_summaries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', '-last_message_at'], name='core_conver_user_id_1ed27e_idx')],
+                'unique_together': {('task', 'user')},
+            },
+        ),
+        migrations.RunPython(backfill_conversation_summaries, migrations.RunPython.noop),
+    ]
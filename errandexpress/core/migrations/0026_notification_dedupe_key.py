@@ -0,0 +1,49 @@
+# Generated by Django 4.2.7 on 2026-10-17 00:52
+
+from django.db import migrations, models
+
+# (type, discriminator, title prefix) of the one-time notifications that
+# used to be deduplicated with exists() checks; keys match
+# NotificationDispatcher.dedupe_key(..., window=None)
+ONCE_PER_TASK = [
+    ('task_expired', '', ''),
+    ('task_overdue', '', ''),
+    ('system_alert', 'overdue', '⚠️ Admin Alert: Task Overdue'),
+    ('deadline_reminder', '24h', '⏰ Task Due Tomorrow'),
+]
+
+
+def backfill_dedupe_keys(apps, schema_editor):
+    """Key the earliest existing row of each once-per-task notification so jobs do not resend it"""
+    Notification = apps.get_model('core', 'Notification')
+
+    batch = []
+    seen = set()
+    for type, discriminator, title in ONCE_PER_TASK:
+        rows = Notification.objects.filter(
+            type=type, related_task__isnull=False, title__startswith=title
+        ).order_by('created_at').only('id', 'user_id', 'related_task_id')
+        for notification in rows.iterator(chunk_size=1000):
+            key = f'{type}:{discriminator}:{notification.user_id}:{notification.related_task_id}:once'
+            if key in seen:
+                continue
+            seen.add(key)
+            notification.dedupe_key = key
+            batch.append(notification)
+    Notification.objects.bulk_update(batch, ['dedupe_key'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0025_conversation_summary'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notification',
+            name='dedupe_key',
+            field=models.CharField(blank=True, max_length=200, null=True, unique=True),
+        ),
+        migrations.RunPython(backfill_dedupe_keys, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,71 @@
+# Generated by Django 4.2.7 on 2026-10-17 00:56
+
+from django.db import migrations, models
+import django.db.models.deletion
+from django.utils import timezone
+from datetime import timedelta
+
+# Mirrors ReminderScheduler.TIERS at the time of this migration
+TIERS = [
+    ('24h', timedelta(hours=24), timedelta(hours=2), None),
+    ('2h', timedelta(hours=2), timedelta(minutes=20), timedelta(minutes=20)),
+    ('20m', timedelta(minutes=20), timedelta(0), timedelta(minutes=2)),
+]
+
+
+def fire_times(deadline, now):
+    for tier, start, end, every in TIERS:
+        window_start, window_end = deadline - start, deadline - end
+        if window_end <= now:
+            continue
+        if every is None:
+            yield tier, max(window_start, now)
+            continue
+        grid = []
+        fire_at = window_start
+        while fire_at < window_end:
+            if fire_at >= now:
+                grid.append(fire_at)
+            fire_at += every
+        if window_start < now and (not grid or grid[0] - now >= every / 2):
+            grid.insert(0, now)
+        for fire_at in grid:
+            yield tier, fire_at
+
+
+def schedule_active_tasks(apps, schema_editor):
+    """Enqueue reminders for tasks that are still open with a future deadline"""
+    Task = apps.get_model('core', 'Task')
+    ReminderSchedule = apps.get_model('core', 'ReminderSchedule')
+
+    now = timezone.now()
+    active = Task.objects.filter(status__in=['open', 'in_progress'], deadline__gt=now)
+    ReminderSchedule.objects.bulk_create([
+        ReminderSchedule(task_id=task_id, tier=tier, fire_at=fire_at, deadline=deadline)
+        for task_id, deadline in active.values_list('id', 'deadline').iterator()
+        for tier, fire_at in fire_times(deadline, now)
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0026_notification_dedupe_key'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReminderSchedule',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tier', models.CharField(choices=[('24h', '24 hours before (once)'), ('2h', 'Last 2 hours (every 20 minutes)'), ('20m', 'Last 20 minutes (every 2 minutes)')], max_length=3)),
+                ('fire_at', models.DateTimeField()),
+                ('deadline', models.DateTimeField(help_text='Task deadline this row was computed for')),
+                ('task', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reminder_schedule', to='core.task')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['fire_at'], name='core_remind_fire_at_44edec_idx')],
+            },
+        ),
+        migrations.RunPython(schedule_active_tasks, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 4.2.7 on 2026-10-17 00:59
+
+from django.db import migrations, models
+from django.db.models import Exists, OuterRef, F
+
+
+def stamp_notified_tasks(apps, schema_editor):
+    """Tasks that already got an overdue/expired notice are not processed again"""
+    Task = apps.get_model('core', 'Task')
+    Notification = apps.get_model('core', 'Notification')
+
+    def noticed(type):
+        return Exists(Notification.objects.filter(related_task=OuterRef('pk'), type=type))
+
+    Task.objects.filter(noticed('task_overdue')).update(overdue_notified_at=F('deadline'))
+    Task.objects.filter(noticed('task_expired')).update(overdue_notified_at=F('deadline'), expired_at=F('deadline'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0027_reminder_schedule'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='task',
+            name='expired_at',
+            field=models.DateTimeField(blank=True, help_text='Deadline passed while still open', null=True),
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='overdue_notified_at',
+            field=models.DateTimeField(blank=True, help_text='Overdue/expired notice sent', null=True),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(condition=models.Q(('overdue_notified_at__isnull', True), ('status__in', ['open', 'in_progress'])), fields=['deadline'], name='task_overdue_pending_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['status', 'deadline'], name='core_task_status_c090db_idx'),
+        ),
+        migrations.RunPython(stamp_notified_tasks, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 4.2.7 on 2026-10-17 01:07
+
+from django.db import migrations, models
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0028_task_lifecycle_stamps'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InboundWebhookEvent',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('event_id', models.CharField(help_text='PayMongo event id (or body hash)', max_length=255, unique=True)),
+                ('event_type', models.CharField(blank=True, max_length=100)),
+                ('ordering_key', models.CharField(blank=True, help_text='Task id (or payment resource id); events per key apply in order', max_length=255)),
+                ('payload', models.JSONField()),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('processing', 'Processing'), ('processed', 'Processed'), ('ignored', 'Ignored'), ('failed', 'Failed')], default='pending', max_length=15)),
+                ('outcome', models.CharField(blank=True, max_length=50)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('last_error', models.TextField(blank=True)),
+                ('received_at', models.DateTimeField(auto_now_add=True)),
+                ('claimed_at', models.DateTimeField(blank=True, null=True)),
+                ('processed_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'ordering': ['received_at'],
+                'indexes': [models.Index(fields=['status', 'received_at'], name='core_inboun_status_c3e1b1_idx'), models.Index(fields=['ordering_key', 'received_at'], name='core_inboun_orderin_6c74f6_idx')],
+            },
+        ),
+    ]
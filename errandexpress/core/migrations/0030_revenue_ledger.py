@@ -0,0 +1,106 @@
+# Generated by Django 4.2.7 on 2026-10-17 01:12
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def backfill_ledger(apps, schema_editor):
+    """Ledger entries and daily rollups for revenue recorded before the ledger"""
+    from django.utils import timezone
+
+    SystemCommission = apps.get_model('core', 'SystemCommission')
+    Payment = apps.get_model('core', 'Payment')
+    RevenueEntry = apps.get_model('core', 'RevenueEntry')
+    RevenueRollup = apps.get_model('core', 'RevenueRollup')
+    SystemWallet = apps.get_model('core', 'SystemWallet')
+
+    now = timezone.now()
+    entries = []
+    for row in SystemCommission.objects.filter(status='paid', amount__gt=0).values(
+            'id', 'amount', 'paid_at', 'created_at', 'task_id', 'task__category'):
+        entries.append(RevenueEntry(
+            source_type='commission', source_id=str(row['id']), amount=row['amount'],
+            task_id=row['task_id'], category=row['task__category'] or '',
+            booked_at=row['paid_at'] or row['created_at'], rolled_up_at=now
+        ))
+    for row in Payment.objects.filter(status__in=('confirmed', 'paid'), commission_amount__gt=0).values(
+            'id', 'commission_amount', 'confirmed_at', 'paid_at', 'created_at', 'task_id', 'task__category'):
+        entries.append(RevenueEntry(
+            source_type='payment', source_id=str(row['id']), amount=row['commission_amount'],
+            task_id=row['task_id'], category=row['task__category'] or '',
+            booked_at=row['confirmed_at'] or row['paid_at'] or row['created_at'], rolled_up_at=now
+        ))
+    RevenueEntry.objects.bulk_create(entries, batch_size=1000)
+
+    buckets = {}
+    for entry in entries:
+        key = (timezone.localtime(entry.booked_at).date(), entry.source_type, entry.category)
+        total, count = buckets.get(key, (0, 0))
+        buckets[key] = (total + entry.amount, count + 1)
+    RevenueRollup.objects.bulk_create([
+        RevenueRollup(day=day, source_type=source_type, category=category, total=total, entries=count)
+        for (day, source_type, category), (total, count) in buckets.items()
+    ], batch_size=1000)
+
+    SystemWallet.objects.update_or_create(
+        id='00000000-0000-0000-0000-000000000000',
+        defaults={'total_revenue': sum(entry.amount for entry in entries), 'total_transactions': len(entries)}
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0029_inbound_webhook_event'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RevenueEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source_type', models.CharField(choices=[('commission', 'System Commission'), ('payment', 'Task Payment Commission'), ('manual', 'Manual Adjustment')], max_length=20)),
+                ('source_id', models.CharField(max_length=64)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('category', models.CharField(blank=True, max_length=20)),
+                ('description', models.CharField(blank=True, max_length=255)),
+                ('booked_at', models.DateTimeField(help_text='When the revenue was earned')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('rolled_up_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='RevenueRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('source_type', models.CharField(choices=[('commission', 'System Commission'), ('payment', 'Task Payment Commission'), ('manual', 'Manual Adjustment')], max_length=20)),
+                ('category', models.CharField(blank=True, max_length=20)),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('entries', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='revenuerollup',
+            constraint=models.UniqueConstraint(fields=('day', 'source_type', 'category'), name='revenue_rollup_unique_bucket'),
+        ),
+        migrations.AddField(
+            model_name='revenueentry',
+            name='task',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='core.task'),
+        ),
+        migrations.AddIndex(
+            model_name='revenueentry',
+            index=models.Index(condition=models.Q(('rolled_up_at__isnull', True)), fields=['booked_at'], name='revenue_entry_pending_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='revenueentry',
+            index=models.Index(fields=['-booked_at'], name='core_revenu_booked__306520_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='revenueentry',
+            constraint=models.UniqueConstraint(fields=('source_type', 'source_id'), name='revenue_entry_unique_source'),
+        ),
+        migrations.RunPython(backfill_ledger, migrations.RunPython.noop),
+    ]
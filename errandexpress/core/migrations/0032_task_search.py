@@ -0,0 +1,64 @@
+# Generated by Django 4.2.7 on 2026-10-17 01:30
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    """GIN index + tsvector backfill on PostgreSQL, FTS5 table + backfill on SQLite"""
+    connection = schema_editor.connection
+    if connection.vendor == 'postgresql':
+        schema_editor.execute(
+            'CREATE INDEX IF NOT EXISTS core_task_search_vector_gin ON core_task USING gin (search_vector)'
+        )
+        schema_editor.execute(
+            "UPDATE core_task SET search_vector = "
+            "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+            "setweight(to_tsvector('english', coalesce(tags, '')), 'B') || "
+            "setweight(to_tsvector('english', coalesce(description, '')), 'C')"
+        )
+    elif connection.vendor == 'sqlite':
+        try:
+            schema_editor.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS core_task_search USING fts5("
+                "task_id UNINDEXED, title, tags, description, "
+                "tokenize = 'porter unicode61', prefix = '2 3')"
+            )
+        except Exception:
+            # SQLite builds without FTS5 fall back to icontains search
+            return
+
+        Task = apps.get_model('core', 'Task')
+        rows = [
+            (int(task_id.hex[:15], 16), task_id.hex, title or '', tags or '', description or '')
+            for task_id, title, tags, description in Task.objects.values_list('id', 'title', 'tags', 'description')
+        ]
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                'INSERT INTO core_task_search (rowid, task_id, title, tags, description) VALUES (%s, %s, %s, %s, %s)',
+                rows
+            )
+
+
+def drop_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX IF EXISTS core_task_search_vector_gin')
+    elif connection.vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE IF EXISTS core_task_search')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0031_analytics_rollup'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='task',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
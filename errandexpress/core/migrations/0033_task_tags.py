@@ -0,0 +1,79 @@
+# Generated by Django 4.2.7 on 2026-10-17 01:36
+
+from django.db import migrations, models
+import django.db.models.deletion
+import re
+
+
+def backfill_task_tags(apps, schema_editor):
+    """Tag / TaskTag rows and open-task counts from the comma-separated Task.tags"""
+    Task = apps.get_model('core', 'Task')
+    Tag = apps.get_model('core', 'Tag')
+    TaskTag = apps.get_model('core', 'TaskTag')
+
+    task_names = {}
+    open_counts = {}
+    for task_id, raw, status in Task.objects.values_list('id', 'tags', 'status'):
+        names = []
+        for part in (raw or '').split(','):
+            name = re.sub(r'\s+', ' ', part).strip().lower()[:50]
+            if name and name not in names:
+                names.append(name)
+        task_names[task_id] = names
+        if status == 'open':
+            for name in names:
+                open_counts[name] = open_counts.get(name, 0) + 1
+
+    all_names = {name for names in task_names.values() for name in names}
+    Tag.objects.bulk_create(
+        [Tag(name=name, open_task_count=open_counts.get(name, 0)) for name in sorted(all_names)],
+        batch_size=1000
+    )
+    ids = dict(Tag.objects.values_list('name', 'id'))
+    TaskTag.objects.bulk_create(
+        [TaskTag(task_id=task_id, tag_id=ids[name]) for task_id, names in task_names.items() for name in names],
+        batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0032_task_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('open_task_count', models.PositiveIntegerField(default=0, help_text='Open tasks with this tag (browse facet)')),
+            ],
+            options={
+                'ordering': ['name'],
+            },
+        ),
+        migrations.CreateModel(
+            name='TaskTag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tag', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='task_tags', to='core.tag')),
+                ('task', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='task_tags', to='core.task')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='tag',
+            index=models.Index(fields=['-open_task_count', 'name'], name='core_tag_open_ta_233f94_idx'),
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='normalized_tags',
+            field=models.ManyToManyField(blank=True, related_name='tasks', through='core.TaskTag', to='core.tag'),
+        ),
+        migrations.AddConstraint(
+            model_name='tasktag',
+            constraint=models.UniqueConstraint(fields=('tag', 'task'), name='task_tag_unique'),
+        ),
+        migrations.RunPython(backfill_task_tags, migrations.RunPython.noop),
+    ]
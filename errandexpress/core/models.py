@@ -1,6 +1,7 @@
 from django.db import models
 from django.contrib.auth.models import AbstractUser
 from django.core.validators import MinValueValidator, MaxValueValidator
+from django.contrib.postgres.search import SearchVectorField
 from django.utils import timezone
 import uuid
 
@@ -35,6 +36,10 @@ class User(AbstractUser):
     doer_type = models.CharField(max_length=20, choices=DOER_TYPE_CHOICES, null=True, blank=True)
     avg_rating = models.DecimalField(max_digits=4, decimal_places=2, default=0.00)
     total_ratings = models.IntegerField(default=0)
+    # Rating aggregates maintained by RatingAggregateService (core.ratings)
+    rating_sum = models.IntegerField(default=0, help_text="Sum of all received rating scores")
+    best_rating = models.ForeignKey('Rating', on_delete=models.SET_NULL, null=True, blank=True, related_name='+', help_text="Highest received rating (most recent on ties)")
+    worst_rating = models.ForeignKey('Rating', on_delete=models.SET_NULL, null=True, blank=True, related_name='+', help_text="Lowest received rating (most recent on ties)")
     is_verified = models.BooleanField(default=False)
     phone_number = models.CharField(max_length=15, blank=True)
     profile_picture = models.ImageField(upload_to='profiles/', null=True, blank=True)
@@ -45,14 +50,20 @@ class User(AbstractUser):
     is_banned = models.BooleanField(default=False)
     ban_reason = models.TextField(blank=True)
     
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            # Candidate tier scans for auto-assign (core.assignment.CandidateSearch)
+            models.Index(fields=['role', 'campus_location', '-avg_rating']),
+        ]
+    
     def __str__(self):
         return f"{self.fullname} ({self.role})"
     
     def update_rating(self, new_rating):
         """Update user's average rating"""
-        total_score = self.avg_rating * self.total_ratings + new_rating
+        self.rating_sum += new_rating
         self.total_ratings += 1
-        self.avg_rating = total_score / self.total_ratings
+        self.avg_rating = round(self.rating_sum / self.total_ratings, 2)
         self.save()
 
 
@@ -83,6 +94,9 @@ class StudentSkill(models.Model):
     
     class Meta:
         unique_together = ['student', 'skill_name']
+        indexes = [
+            models.Index(fields=['skill_name', 'status']),
+        ]
     
     def __str__(self):
         return f"{self.student.fullname} - {self.skill_name} ({self.status})"
@@ -161,6 +175,8 @@ class Task(models.Model):
     description = models.TextField()
     category = models.CharField(max_length=20, choices=CATEGORY_CHOICES)
     tags = models.CharField(max_length=255, help_text="Comma-separated tags")
+    # Normalized copy of `tags` for indexed matching (core.tags.TagService)
+    normalized_tags = models.ManyToManyField('Tag', through='TaskTag', related_name='tasks', blank=True)
     price = models.DecimalField(max_digits=10, decimal_places=2, validators=[MinValueValidator(0)])
     payment_method = models.CharField(max_length=10, choices=PAYMENT_METHOD_CHOICES)
     deadline = models.DateTimeField()
@@ -220,11 +236,24 @@ class Task(models.Model):
     accepted_at = models.DateTimeField(null=True, blank=True)
     completed_at = models.DateTimeField(null=True, blank=True)
     
+    # Lifecycle pipeline stamps (core.lifecycle) - each task is processed once
+    overdue_notified_at = models.DateTimeField(null=True, blank=True, help_text="Overdue/expired notice sent")
+    expired_at = models.DateTimeField(null=True, blank=True, help_text="Deadline passed while still open")
+    
+    # Full-text search (core.search): tsvector + GIN index on PostgreSQL,
+    # unused on SQLite, which searches the core_task_search FTS5 table.
+    # Both indexes are created in migration 0032 (GIN cannot be declared
+    # in Meta.indexes while SQLite is supported).
+    search_vector = SearchVectorField(null=True, editable=False)
+    
     def __str__(self):
         return f"{self.title} - {self.poster.fullname}"
     
     def get_tags_list(self):
-        """Return tags as a list"""
+        """Return tags as a list (from prefetched normalized_tags when available)"""
+        prefetched = getattr(self, '_prefetched_objects_cache', {}).get('normalized_tags')
+        if prefetched is not None:
+            return [tag.name for tag in prefetched]
         return [tag.strip() for tag in self.tags.split(',') if tag.strip()]
 
     @property
@@ -253,9 +282,45 @@ class Task(models.Model):
             models.Index(fields=['priority_level', '-created_at']),
             models.Index(fields=['time_window_start', 'time_window_end']),
             models.Index(fields=['preferred_doer', 'status']),
+            # Lifecycle pipeline: only unprocessed tasks are indexed
+            models.Index(
+                fields=['deadline'],
+                name='task_overdue_pending_idx',
+                condition=models.Q(overdue_notified_at__isnull=True, status__in=['open', 'in_progress'])
+            ),
+            models.Index(fields=['status', 'deadline']),
         ]
 
 
+class Tag(models.Model):
+    """Normalized task tag (lowercase, trimmed), maintained by TagService"""
+    name = models.CharField(max_length=50, unique=True)
+    open_task_count = models.PositiveIntegerField(default=0, help_text="Open tasks with this tag (browse facet)")
+    
+    class Meta:
+        ordering = ['name']
+        indexes = [
+            models.Index(fields=['-open_task_count', 'name']),
+        ]
+    
+    def __str__(self):
+        return self.name
+
+
+class TaskTag(models.Model):
+    """Task <-> Tag link; the (tag, task) index serves tag filters and counts"""
+    task = models.ForeignKey(Task, on_delete=models.CASCADE, related_name='task_tags')
+    tag = models.ForeignKey(Tag, on_delete=models.CASCADE, related_name='task_tags')
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['tag', 'task'], name='task_tag_unique'),
+        ]
+    
+    def __str__(self):
+        return f"{self.task_id} #{self.tag_id}"
+
+
 class Message(models.Model):
     """Chat messages between poster and doer"""
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
@@ -268,6 +333,8 @@ class Message(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     is_read = models.BooleanField(default=False)
     
+    IMAGE_EXTENSIONS = ('jpg', 'jpeg', 'png', 'gif', 'webp')
+    
     class Meta:
         ordering = ['created_at']
         indexes = [
@@ -279,6 +346,17 @@ class Message(models.Model):
     
     def __str__(self):
         return f"{self.sender.fullname}: {self.message[:50]}..."
+    
+    @classmethod
+    def detect_attachment_type(cls, filename):
+        """'image' or 'file' from the attachment's extension"""
+        ext = filename.rsplit('.', 1)[-1].lower()
+        return 'image' if ext in cls.IMAGE_EXTENSIONS else 'file'
+    
+    def save(self, *args, **kwargs):
+        # Attachment type is stored at write time so readers never re-derive it
+        self.attachment_type = self.detect_attachment_type(self.attachment.name) if self.attachment else None
+        super().save(*args, **kwargs)
 
 
 class SystemCommission(models.Model):
@@ -535,6 +613,8 @@ class Notification(models.Model):
     message = models.TextField()
     is_read = models.BooleanField(default=False)
     related_task = models.ForeignKey(Task, on_delete=models.SET_NULL, null=True, blank=True)
+    # Set by NotificationDispatcher (core.notifications) for deduplicated sends
+    dedupe_key = models.CharField(max_length=200, null=True, blank=True, unique=True)
     created_at = models.DateTimeField(auto_now_add=True)
     
     class Meta:
@@ -669,7 +749,7 @@ class TaskAssignment(models.Model):
 
 
 class SystemWallet(models.Model):
-    """Track system revenue from ₱2 system fees"""
+    """System revenue totals, refreshed from RevenueRollup by RevenueLedger.rollup()"""
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     total_revenue = models.DecimalField(max_digits=15, decimal_places=2, default=0.00)
     total_transactions = models.IntegerField(default=0)
@@ -694,20 +774,231 @@ class SystemWallet(models.Model):
         return wallet
     
     def add_revenue(self, amount, description=""):
-        """Add revenue to wallet"""
-        # Convert amount to Decimal to avoid type mismatch
-        from decimal import Decimal
-        amount = Decimal(str(amount))
-        
-        # Ensure total_revenue is Decimal
-        if isinstance(self.total_revenue, float):
-            self.total_revenue = Decimal(str(self.total_revenue))
-        
-        self.total_revenue += amount
-        self.total_transactions += 1
-        self.save()
+        """
+        Record a manual credit in the revenue ledger.
+        Paid commissions and payments are recorded by signals; the wallet
+        totals are refreshed by RevenueLedger.rollup().
+        """
+        from core.revenue import RevenueLedger
+        RevenueLedger.record_manual(amount, description)
         
         import logging
         logger = logging.getLogger(__name__)
         logger.info(f"💰 Revenue added: ₱{amount} - {description}")
-        logger.info(f"Total wallet: ₱{self.total_revenue} ({self.total_transactions} transactions)")
+
+
+class TaskFeedEntry(models.Model):
+    """
+    Materialized doer feed row (one per task), maintained by TaskFeedService.
+    Holds the skill buckets that unlock the task and the score components
+    that do not depend on the viewing doer, so the feed is one indexed scan.
+    """
+    task = models.OneToOneField(Task, on_delete=models.CASCADE, primary_key=True, related_name='feed_entry')
+    poster = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    campus_location = models.CharField(max_length=50, blank=True)
+    
+    # Skill buckets (microtask = visible to everyone)
+    bucket_microtask = models.BooleanField(default=False)
+    bucket_typing = models.BooleanField(default=False)
+    bucket_powerpoint = models.BooleanField(default=False)
+    bucket_graphics = models.BooleanField(default=False)
+    
+    # Visibility
+    is_listed = models.BooleanField(default=True, help_text="Task is open and shown in doer feeds")
+    hidden_after = models.DateTimeField(null=True, blank=True, help_text="Doer chosen - hide once the 3-minute window closes")
+    deadline = models.DateTimeField()
+    
+    # Static score components
+    priority_level = models.IntegerField(default=3)
+    poster_rating = models.DecimalField(max_digits=4, decimal_places=2, default=0.00)
+    static_score = models.DecimalField(max_digits=7, decimal_places=2, default=0.00, help_text="(Poster Rating × 2.0) + (Priority Level × 0.5)")
+    
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['is_listed', 'deadline']),
+            models.Index(fields=['is_listed', 'campus_location', '-static_score']),
+            models.Index(fields=['poster']),
+        ]
+    
+    def __str__(self):
+        return f"Feed: {self.task_id} ({'listed' if self.is_listed else 'unlisted'})"
+
+
+class ConversationSummary(models.Model):
+    """
+    Inbox row per (task, participant), maintained by ConversationService on
+    message insert and read. messages_list renders from these rows instead
+    of prefetching every message and counting unread ones.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    task = models.ForeignKey(Task, on_delete=models.CASCADE, related_name='conversation_summaries')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='conversation_summaries')
+    
+    # Last message
+    last_message = models.ForeignKey(Message, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    last_message_preview = models.CharField(max_length=100, blank=True)
+    last_message_at = models.DateTimeField(null=True, blank=True)
+    last_sender = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    
+    # Read state
+    unread_count = models.PositiveIntegerField(default=0)
+    last_read_at = models.DateTimeField(null=True, blank=True)
+    
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        unique_together = ['task', 'user']
+        indexes = [
+            models.Index(fields=['user', '-last_message_at']),
+        ]
+    
+    def __str__(self):
+        return f"Conversation: {self.task_id} / {self.user_id} ({self.unread_count} unread)"
+
+
+class ReminderSchedule(models.Model):
+    """
+    One pending deadline reminder, precomputed by ReminderScheduler when a
+    task's deadline or status changes. send_deadline_reminders claims due
+    rows by fire_at and deletes them once sent.
+    """
+    TIER_CHOICES = [
+        ('24h', '24 hours before (once)'),
+        ('2h', 'Last 2 hours (every 20 minutes)'),
+        ('20m', 'Last 20 minutes (every 2 minutes)'),
+    ]
+    
+    task = models.ForeignKey(Task, on_delete=models.CASCADE, related_name='reminder_schedule')
+    tier = models.CharField(max_length=3, choices=TIER_CHOICES)
+    fire_at = models.DateTimeField()
+    deadline = models.DateTimeField(help_text="Task deadline this row was computed for")
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['fire_at']),
+        ]
+    
+    def __str__(self):
+        return f"Reminder {self.tier} for {self.task_id} at {self.fire_at}"
+
+
+class InboundWebhookEvent(models.Model):
+    """
+    Raw PayMongo webhook event, stored by paymongo_webhook before it answers
+    and applied later by core.webhooks.WebhookQueue. event_id is unique, so
+    provider retries of the same event are stored once.
+    """
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('processing', 'Processing'),
+        ('processed', 'Processed'),
+        ('ignored', 'Ignored'),
+        ('failed', 'Failed'),
+    ]
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    event_id = models.CharField(max_length=255, unique=True, help_text="PayMongo event id (or body hash)")
+    event_type = models.CharField(max_length=100, blank=True)
+    ordering_key = models.CharField(max_length=255, blank=True, help_text="Task id (or payment resource id); events per key apply in order")
+    payload = models.JSONField()
+    
+    status = models.CharField(max_length=15, choices=STATUS_CHOICES, default='pending')
+    outcome = models.CharField(max_length=50, blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    
+    received_at = models.DateTimeField(auto_now_add=True)
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        ordering = ['received_at']
+        indexes = [
+            models.Index(fields=['status', 'received_at']),
+            models.Index(fields=['ordering_key', 'received_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.event_type} {self.event_id} ({self.status})"
+
+
+class RevenueEntry(models.Model):
+    """
+    Append-only revenue ledger: one row per credit, unique on its source
+    (a paid SystemCommission or a confirmed Payment), so concurrent credits
+    never contend and a source is never counted twice. RevenueLedger rolls
+    rows into RevenueRollup and stamps rolled_up_at.
+    """
+    SOURCE_CHOICES = [
+        ('commission', 'System Commission'),
+        ('payment', 'Task Payment Commission'),
+        ('manual', 'Manual Adjustment'),
+    ]
+    
+    source_type = models.CharField(max_length=20, choices=SOURCE_CHOICES)
+    source_id = models.CharField(max_length=64)
+    amount = models.DecimalField(max_digits=12, decimal_places=2)
+    task = models.ForeignKey(Task, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    category = models.CharField(max_length=20, blank=True)
+    description = models.CharField(max_length=255, blank=True)
+    booked_at = models.DateTimeField(help_text="When the revenue was earned")
+    created_at = models.DateTimeField(auto_now_add=True)
+    rolled_up_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['source_type', 'source_id'], name='revenue_entry_unique_source'),
+        ]
+        indexes = [
+            # Tail of entries not yet in RevenueRollup
+            models.Index(fields=['booked_at'], name='revenue_entry_pending_idx', condition=models.Q(rolled_up_at__isnull=True)),
+            models.Index(fields=['-booked_at']),
+        ]
+    
+    def __str__(self):
+        return f"₱{self.amount} {self.source_type}:{self.source_id}"
+
+
+class RevenueRollup(models.Model):
+    """Pre-aggregated revenue per local day, source and task category"""
+    day = models.DateField()
+    source_type = models.CharField(max_length=20, choices=RevenueEntry.SOURCE_CHOICES)
+    category = models.CharField(max_length=20, blank=True)
+    total = models.DecimalField(max_digits=15, decimal_places=2, default=0)
+    entries = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'source_type', 'category'], name='revenue_rollup_unique_bucket'),
+        ]
+    
+    def __str__(self):
+        return f"{self.day} {self.source_type}/{self.category or '-'}: ₱{self.total} ({self.entries})"
+
+
+class AnalyticsRollup(models.Model):
+    """
+    Pre-aggregated dashboard counters maintained by AnalyticsRollupService.
+    Flow metrics (tasks_created, tasks_completed, users_joined) are per
+    local day; snapshot metrics (users, tasks, skills, reports) hold the
+    state at the last refresh of that day. Revenue lives in RevenueRollup.
+    """
+    day = models.DateField()
+    metric = models.CharField(max_length=30)
+    dimension = models.CharField(max_length=80, default='all', help_text="'all' or '<field>:<value>'")
+    value = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'metric', 'dimension'], name='analytics_rollup_unique_cell'),
+        ]
+        indexes = [
+            models.Index(fields=['metric', '-day']),
+        ]
+    
+    def __str__(self):
+        return f"{self.day} {self.metric}[{self.dimension}] = {self.value}"
@@ -0,0 +1,130 @@
+"""
+Notification Dispatch for ErrandExpress
+Buffers notifications for a request or job and writes them with one
+bulk insert. Deduplication uses a unique dedupe_key per
+(user, type, related_task, window) instead of an exists() check before
+every insert; the recipients' cached unread badges (core.badges) are
+incremented by the number of rows that actually landed.
+"""
+
+from django.db import transaction
+from django.utils import timezone
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class NotificationDispatcher:
+    """
+    Write-coalescing notification buffer.
+
+    Usage:
+        with NotificationDispatcher() as dispatcher:
+            for task in tasks:
+                dispatcher.add(task.poster, 'task_overdue', title, message,
+                               related_task=task, dedupe=True)
+
+    dedupe=True with window=None means "once per (user, type, task)";
+    with a timedelta window, at most once per window-sized time bucket.
+    """
+
+    BATCH_SIZE = 1000
+
+    def __init__(self, now=None):
+        self.now = now or timezone.now()
+        self._buffer = []
+        self._keys = set()
+        self.inserted_keys = set()
+
+    @staticmethod
+    def dedupe_key(user_id, type, related_task_id=None, window=None, now=None, discriminator=''):
+        if window is None:
+            bucket = 'once'
+        else:
+            bucket = str(int((now or timezone.now()).timestamp() // window.total_seconds()))
+        return f'{type}:{discriminator}:{user_id}:{related_task_id or "-"}:{bucket}'
+
+    def add(self, user, type, title, message, related_task=None, dedupe=False, window=None, discriminator=''):
+        """
+        Queue a notification; user/related_task may be instances or ids.
+
+        Returns: the dedupe key (or None), so callers can check inserted_keys after flush
+        """
+        from core.models import Notification
+
+        user_id = getattr(user, 'pk', user)
+        task_id = getattr(related_task, 'pk', related_task)
+
+        key = None
+        if dedupe:
+            key = self.dedupe_key(user_id, type, task_id, window, self.now, discriminator)
+            if key in self._keys:
+                return key
+            self._keys.add(key)
+
+        self._buffer.append(Notification(
+            user_id=user_id,
+            type=type,
+            title=title,
+            message=message,
+            related_task_id=task_id,
+            dedupe_key=key
+        ))
+        return key
+
+    def __len__(self):
+        return len(self._buffer)
+
+    def flush(self):
+        """
+        Insert everything buffered (duplicates by dedupe_key are skipped by
+        the database) and invalidate the recipients' badge caches.
+
+        Returns: number of notifications actually inserted
+        """
+        from core.models import Notification
+
+        if not self._buffer:
+            return 0
+
+        buffer, self._buffer = self._buffer, []
+        self._keys = set()
+
+        with transaction.atomic():
+            Notification.objects.bulk_create(buffer, batch_size=self.BATCH_SIZE, ignore_conflicts=True)
+
+        # ignore_conflicts does not report which rows landed. Ids are
+        # generated client-side, so a keyed row is ours only if its id is
+        # in the buffer; a concurrent flush of the same key never counts it
+        keyed = [notification.id for notification in buffer if notification.dedupe_key is not None]
+        inserted = len(buffer) - len(keyed)
+        self.inserted_keys = set()
+        for start in range(0, len(keyed), self.BATCH_SIZE):
+            self.inserted_keys.update(Notification.objects.filter(
+                id__in=keyed[start:start + self.BATCH_SIZE]
+            ).values_list('dedupe_key', flat=True))
+        inserted += len(self.inserted_keys)
+
+        if inserted:
+            from core.badges import UserStatsCache
+            landed = {}
+            for notification in buffer:
+                if notification.dedupe_key is None or notification.dedupe_key in self.inserted_keys:
+                    landed[notification.user_id] = landed.get(notification.user_id, 0) + 1
+            UserStatsCache.incr_many('unread_notifications_count', landed)
+        return inserted
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.flush()
+        return False
+
+
+def notify(user, type, title, message, related_task=None, **dedupe):
+    """Send one notification through the dispatcher (dedupe=True, window=..., discriminator=...)"""
+    dispatcher = NotificationDispatcher()
+    dispatcher.add(user, type, title, message, related_task=related_task, **dedupe)
+    return dispatcher.flush()
@@ -0,0 +1,275 @@
+"""
+Keyset Pagination for ErrandExpress
+Seek-method paging for the long, newest-first lists (browse feed,
+notifications, admin lists, payment history). Instead of OFFSET, each page
+continues from the ordering values of the row it stopped at:
+
+    WHERE (priority_score, price, created_at, id) < (last row's values)
+    ORDER BY priority_score DESC, price DESC, created_at DESC, id DESC
+    LIMIT per_page + 1
+
+so a deep page costs the same as the first one, and rows inserted while
+someone is paging do not shift items onto the next page twice. Cursors are
+signed, opaque tokens; a stale, tampered or foreign cursor falls back to
+the first page.
+"""
+
+from django.core import signing
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from django.http import QueryDict
+from datetime import date, datetime
+from decimal import Decimal
+import uuid
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class KeysetPage:
+    """
+    One page of rows plus cursors to its neighbours. Iterates like a list,
+    so templates keep their {% for %} loops.
+    """
+
+    def __init__(self, paginator, object_list, has_next, has_previous, params=None):
+        self.paginator = paginator
+        self.object_list = object_list
+        self.has_next = has_next
+        self.has_previous = has_previous
+        self.params = params
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def __repr__(self):
+        return f'<KeysetPage {len(self)} rows next={self.has_next} previous={self.has_previous}>'
+
+    def has_other_pages(self):
+        return self.has_next or self.has_previous
+
+    # ==================== CURSORS ====================
+
+    @property
+    def next_cursor(self):
+        if self.has_next and self.object_list:
+            return self.paginator.encode_cursor(self.object_list[-1], forward=True)
+        return None
+
+    @property
+    def previous_cursor(self):
+        if self.has_previous and self.object_list:
+            return self.paginator.encode_cursor(self.object_list[0], forward=False)
+        return None
+
+    def _query(self, cursor):
+        """Current query string with the cursor swapped (filters and sort kept)"""
+        if isinstance(self.params, QueryDict):
+            params = self.params.copy()
+        else:
+            params = QueryDict(mutable=True)
+            params.update(self.params or {})
+        params.pop('page', None)
+        params.pop(self.paginator.cursor_param, None)
+        if cursor:
+            params[self.paginator.cursor_param] = cursor
+        return params.urlencode()
+
+    @property
+    def next_query(self):
+        """For templates: <a href="?{{ page.next_query }}">"""
+        return self._query(self.next_cursor)
+
+    @property
+    def previous_query(self):
+        return self._query(self.previous_cursor)
+
+    @property
+    def first_query(self):
+        return self._query(None)
+
+    # ==================== TOTALS ====================
+
+    @property
+    def total(self):
+        """Matching rows (capped when the paginator counts approximately), or None"""
+        return self.paginator.total[0]
+
+    @property
+    def total_is_capped(self):
+        return self.paginator.total[1]
+
+    @property
+    def total_display(self):
+        """'87', or '1000+' past the approximate count's cap"""
+        total, capped = self.paginator.total
+        if total is None:
+            return ''
+        return f'{total}+' if capped else str(total)
+
+    # ==================== JSON ====================
+
+    def as_json(self, serialize=None):
+        """
+        Dict for JsonResponse; `serialize` turns each row into JSON-safe data.
+
+        Returns: {'results', 'next_cursor', 'previous_cursor', 'has_next',
+                  'has_previous', 'total', 'total_is_capped'}
+        """
+        total, capped = self.paginator.total
+        return {
+            'results': [serialize(row) if serialize else row for row in self.object_list],
+            'next_cursor': self.next_cursor,
+            'previous_cursor': self.previous_cursor,
+            'has_next': self.has_next,
+            'has_previous': self.has_previous,
+            'total': total,
+            'total_is_capped': capped,
+        }
+
+
+class KeysetPaginator:
+    """
+    Usage:
+        paginator = KeysetPaginator(tasks, 12, count='approximate')
+        page = paginator.get_page(request.GET)     # reads ?cursor=
+        page.next_query, page.previous_query       # template links
+        JsonResponse(page.as_json(serialize))      # API responses
+
+    Ordering defaults to the queryset's own order_by and must name plain
+    fields or annotations that are never NULL; the primary key is appended
+    as the tie-breaker when missing.
+    """
+
+    SALT = 'core.pagination.cursor'
+
+    # count='approximate' stops counting here and reports "COUNT_CAP+"
+    COUNT_CAP = 1000
+
+    def __init__(self, queryset, per_page, ordering=None, count=None, cursor_param='cursor'):
+        if count not in (None, 'exact', 'approximate'):
+            raise ValueError("count must be None, 'exact' or 'approximate'")
+
+        ordering = list(ordering or queryset.query.order_by or queryset.model._meta.ordering)
+        if not ordering:
+            raise ValueError('Keyset pagination needs an ordered queryset')
+
+        pk_name = queryset.model._meta.pk.attname
+        keys = []
+        for item in ordering:
+            if not isinstance(item, str) or '__' in item or item.lstrip('-') == '?':
+                raise ValueError(f'Keyset ordering must name fields or annotations, got {item!r}')
+            name = item.lstrip('-')
+            keys.append((pk_name if name == 'pk' else name, item.startswith('-')))
+        if pk_name not in [name for name, _ in keys]:
+            keys.append((pk_name, keys[-1][1]))
+
+        self.keys = keys
+        self.ordering = [f"{'-' if descending else ''}{name}" for name, descending in keys]
+        self.queryset = queryset.order_by(*self.ordering)
+        self.per_page = per_page
+        self.count = count
+        self.cursor_param = cursor_param
+        self._total = None
+
+    # ==================== CURSOR ENCODING ====================
+
+    @staticmethod
+    def _dump(value):
+        if isinstance(value, (datetime, date)):
+            return value.isoformat()
+        if isinstance(value, (Decimal, uuid.UUID)):
+            return str(value)
+        return value
+
+    def _field(self, name):
+        annotation = self.queryset.query.annotations.get(name)
+        if annotation is not None:
+            return annotation.output_field
+        return self.queryset.model._meta.get_field(name)
+
+    def encode_cursor(self, row, forward=True):
+        """Opaque token for the position just after (or before) `row`"""
+        values = [row[name] if isinstance(row, dict) else getattr(row, name) for name, _ in self.keys]
+        return signing.dumps(
+            {'o': self.ordering, 'd': 'n' if forward else 'p', 'v': [self._dump(value) for value in values]},
+            salt=self.SALT, compress=True
+        )
+
+    def decode_cursor(self, cursor):
+        """(forward, values), or None for a blank or unusable cursor"""
+        if not cursor:
+            return None
+        try:
+            payload = signing.loads(cursor, salt=self.SALT)
+            if payload['o'] != self.ordering or len(payload['v']) != len(self.keys):
+                return None  # Cursor from another sort order
+            values = [self._field(name).to_python(raw) for (name, _), raw in zip(self.keys, payload['v'])]
+            return payload['d'] == 'n', values
+        except (signing.BadSignature, ValidationError, KeyError, TypeError, ValueError):
+            logger.debug('Ignoring invalid pagination cursor')
+            return None
+
+    # ==================== QUERYING ====================
+
+    def _seek(self, values, forward):
+        """
+        Rows strictly after `values` in walking direction, as the expanded
+        row comparison (a < x) OR (a = x AND b < y) OR ... so mixed ASC/DESC
+        orderings work, plus a bound on the leading key for index range scans.
+        """
+        condition = Q()
+        for index, (name, descending) in enumerate(self.keys):
+            lookup = 'lt' if descending == forward else 'gt'
+            term = Q(**{f'{name}__{lookup}': values[index]})
+            for (prefix_name, _), value in zip(self.keys[:index], values):
+                term &= Q(**{prefix_name: value})
+            condition |= term
+
+        name, descending = self.keys[0]
+        return Q(**{f"{name}__{'lte' if descending == forward else 'gte'}": values[0]}) & condition
+
+    def get_page(self, params=None):
+        """
+        Page for request query params (a QueryDict or dict carrying the
+        cursor); the first page when there is no usable cursor.
+        """
+        cursor = params.get(self.cursor_param) if params else None
+        position = self.decode_cursor(cursor)
+
+        queryset = self.queryset
+        forward = True
+        if position:
+            forward, values = position
+            queryset = queryset.filter(self._seek(values, forward))
+            if not forward:
+                queryset = queryset.reverse()
+
+        rows = list(queryset[:self.per_page + 1])
+        more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+
+        if forward:
+            return KeysetPage(self, rows, has_next=more, has_previous=position is not None, params=params)
+        rows.reverse()
+        return KeysetPage(self, rows, has_next=True, has_previous=more, params=params)
+
+    @property
+    def total(self):
+        """(count, capped), computed once; (None, False) when counting is off"""
+        if self._total is None:
+            if self.count == 'exact':
+                self._total = (self.queryset.count(), False)
+            elif self.count == 'approximate':
+                # COUNT over a LIMITed subquery: never scans past the cap
+                counted = self.queryset.order_by().values('pk')[:self.COUNT_CAP + 1].count()
+                self._total = (min(counted, self.COUNT_CAP), counted > self.COUNT_CAP)
+            else:
+                self._total = (None, False)
+        return self._total
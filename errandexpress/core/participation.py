@@ -0,0 +1,78 @@
+"""
+Task Participation State for ErrandExpress
+What a user still owes on the tasks they posted or did (a rating, a payment)
+used to be looked up per task in Python loops: a Rating.exists() and a
+Payment.get() per completed task. TaskParticipationService computes that
+state as annotations on the task query itself, so monitoring, payments and
+the pending-rating checks cost a fixed number of queries however long a
+user's task history is.
+"""
+
+from django.db.models import Case, Count, Exists, F, OuterRef, Q, When
+
+
+class TaskParticipationService:
+    """
+    Usage:
+        tasks = TaskParticipationService.for_user(user)             # posted or done
+        tasks = TaskParticipationService.annotate(my_queryset, user)
+        task.user_has_rated, task.payment_status, task.doer_paid
+        TaskParticipationService.status_counts(tasks)                # one aggregate
+        TaskParticipationService.unrated(user)                       # rating obligations
+    """
+
+    # Payment states that still need action from the poster
+    OPEN_PAYMENT_STATUSES = ('pending_payment', 'pending_confirmation')
+
+    @classmethod
+    def annotate(cls, queryset, user):
+        """
+        Per-task state from `user`'s point of view:
+
+            counterpart_id   the other participant (doer for the poster, poster for the doer)
+            user_has_rated   user already rated the counterpart on this task
+            payment_status   the task's Payment status, None without a payment
+            doer_paid        a confirmed payment from user to the doer exists
+        """
+        from core.models import Payment, Rating
+
+        return queryset.annotate(
+            counterpart_id=Case(When(poster_id=user.pk, then=F('doer_id')), default=F('poster_id')),
+            user_has_rated=Exists(
+                Rating.objects.filter(task=OuterRef('pk'), rater_id=user.pk, rated_id=OuterRef('counterpart_id'))
+            ),
+            payment_status=F('payment__status'),
+            doer_paid=Exists(
+                Payment.objects.filter(
+                    task=OuterRef('pk'), payer_id=user.pk, receiver_id=OuterRef('doer_id'), status='confirmed'
+                )
+            ),
+        )
+
+    @classmethod
+    def for_user(cls, user):
+        """Every task the user posted or is doing, annotated"""
+        from core.models import Task
+
+        return cls.annotate(Task.objects.filter(Q(poster=user) | Q(doer=user)), user)
+
+    @classmethod
+    def unrated(cls, user, queryset=None):
+        """Completed tasks where the user has not rated the counterpart yet"""
+        tasks = cls.for_user(user) if queryset is None else cls.annotate(queryset, user)
+        return tasks.filter(status='completed', user_has_rated=False)
+
+    @staticmethod
+    def status_counts(queryset):
+        """
+        Task counts by status in one conditional aggregate.
+
+        Returns: {'total', 'open', 'in_progress', 'completed', 'accepted'}
+        """
+        return queryset.order_by().aggregate(
+            total=Count('id'),
+            open=Count('id', filter=Q(status='open')),
+            in_progress=Count('id', filter=Q(status='in_progress')),
+            completed=Count('id', filter=Q(status='completed')),
+            accepted=Count('id', filter=Q(status='accepted')),
+        )
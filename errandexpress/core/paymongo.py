@@ -5,9 +5,16 @@ LIVE PRODUCTION KEYS INTEGRATED
 """
 
 import requests
+from requests.adapters import HTTPAdapter
 import base64
 import json
 import os
+import random
+import re
+import threading
+import time
+import uuid
+from collections import defaultdict, deque
 from django.conf import settings
 from decimal import Decimal
 import logging
@@ -15,275 +22,373 @@ import logging
 logger = logging.getLogger(__name__)
 
 
+class CircuitOpenError(Exception):
+    """PayMongo is failing; requests are refused until the breaker resets"""
+
+
+class CircuitBreaker:
+    """
+    Fails fast after `failure_threshold` consecutive provider failures
+    (timeouts, connection errors, 5xx). After `reset_timeout` seconds one
+    trial request is let through; success closes the circuit again.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._state()
+
+    def _state(self):
+        if self.opened_at is None:
+            return 'closed'
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return 'half_open'
+        return 'open'
+
+    def allow(self):
+        """Raise CircuitOpenError unless a request may be sent now"""
+        with self._lock:
+            state = self._state()
+            if state == 'closed':
+                return
+            if state == 'half_open' and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return
+        raise CircuitOpenError('PayMongo circuit is open')
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_in_flight = False
+            if self.opened_at is not None or self.failures >= self.failure_threshold:
+                if self.opened_at is None:
+                    logger.error(f"PayMongo circuit opened after {self.failures} consecutive failures")
+                self.opened_at = time.monotonic()
+
+
+class LatencyMetrics:
+    """Per-endpoint request counters and latency percentiles (recent samples)"""
+
+    SAMPLES = 500
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = defaultdict(lambda: {
+            'requests': 0, 'errors': 0, 'retries': 0, 'rejected': 0,
+            'total_ms': 0.0, 'max_ms': 0.0, 'samples': deque(maxlen=self.SAMPLES)
+        })
+
+    def record(self, endpoint, elapsed_ms=None, error=False, retry=False, rejected=False):
+        with self._lock:
+            stats = self._stats[endpoint]
+            if rejected:
+                stats['rejected'] += 1
+                return
+            stats['requests'] += 1
+            stats['errors'] += int(error)
+            stats['retries'] += int(retry)
+            stats['total_ms'] += elapsed_ms
+            stats['max_ms'] = max(stats['max_ms'], elapsed_ms)
+            stats['samples'].append(elapsed_ms)
+
+    def snapshot(self):
+        """{endpoint: {requests, errors, retries, rejected, avg_ms, p50_ms, p95_ms, max_ms}}"""
+        with self._lock:
+            result = {}
+            for endpoint, stats in self._stats.items():
+                samples = sorted(stats['samples'])
+                percentile = lambda q: round(samples[min(len(samples) - 1, int(q * len(samples)))], 1) if samples else None
+                result[endpoint] = {
+                    'requests': stats['requests'],
+                    'errors': stats['errors'],
+                    'retries': stats['retries'],
+                    'rejected': stats['rejected'],
+                    'avg_ms': round(stats['total_ms'] / stats['requests'], 1) if stats['requests'] else None,
+                    'p50_ms': percentile(0.50),
+                    'p95_ms': percentile(0.95),
+                    'max_ms': round(stats['max_ms'], 1),
+                }
+            return result
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+
+
+class PayMongoTransport:
+    """
+    Single HTTP layer for PayMongo: pooled keep-alive session, connect/read
+    timeouts, jittered retries for idempotent calls (GETs, and POSTs that
+    carry an Idempotency-Key), a circuit breaker and latency metrics.
+    """
+
+    CONNECT_TIMEOUT = 3.05
+    READ_TIMEOUT = 10
+    MAX_RETRIES = 2
+    BACKOFF_SECONDS = 0.3
+    RETRY_STATUSES = {429, 500, 502, 503, 504}
+    POOL_SIZE = 20
+
+    # /payment_intents/pi_abc123/attach -> /payment_intents/:id/attach
+    _ID_SEGMENT = re.compile(r'/(?:pi|pm|src|link|hook|pay|evt|cs)_[A-Za-z0-9]+')
+
+    def __init__(self, base_url=None, secret_key=None, pool_size=None, breaker=None, metrics=None):
+        self.base_url = (base_url or getattr(settings, 'PAYMONGO_API_BASE', 'https://api.paymongo.com/v1')).rstrip('/')
+        secret_key = secret_key if secret_key is not None else settings.PAYMONGO_SECRET_KEY
+        self.breaker = breaker or CircuitBreaker()
+        self.metrics = metrics or LatencyMetrics()
+
+        encoded_auth = base64.b64encode(f"{secret_key}:".encode()).decode()
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size or self.POOL_SIZE)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers.update({
+            "Authorization": f"Basic {encoded_auth}",
+            "Content-Type": "application/json",
+            "Accept": "application/json",
+        })
+
+    @classmethod
+    def endpoint_name(cls, method, path):
+        return f"{method} {cls._ID_SEGMENT.sub('/:id', path)}"
+
+    def _backoff(self, attempt, response=None):
+        retry_after = response.headers.get('Retry-After') if response is not None else None
+        if retry_after and retry_after.isdigit():
+            return min(float(retry_after), 10.0)
+        return self.BACKOFF_SECONDS * (2 ** attempt) * (1 + random.random())
+
+    def request(self, method, path, payload=None, idempotency_key=None, timeout=None, throttle=None):
+        """
+        Send one PayMongo API call; returns the final requests.Response.
+
+        Raises CircuitOpenError when failing fast, or the last
+        requests.RequestException once retries are exhausted.
+        """
+        method = method.upper()
+        endpoint = self.endpoint_name(method, path)
+        headers = {'Idempotency-Key': idempotency_key} if idempotency_key else None
+        retryable = method in ('GET', 'HEAD', 'DELETE') or idempotency_key is not None
+        attempts = self.MAX_RETRIES + 1 if retryable else 1
+
+        for attempt in range(attempts):
+            if throttle:
+                throttle()
+            try:
+                self.breaker.allow()
+            except CircuitOpenError:
+                self.metrics.record(endpoint, rejected=True)
+                raise
+
+            started = time.monotonic()
+            response, error = None, None
+            try:
+                response = self.session.request(
+                    method, f'{self.base_url}{path}',
+                    json=payload, headers=headers,
+                    timeout=timeout or (self.CONNECT_TIMEOUT, self.READ_TIMEOUT)
+                )
+            except requests.RequestException as e:
+                error = e
+            except BaseException:
+                # Anything else still ends a half-open trial, or the circuit never closes
+                self.breaker.record_failure()
+                raise
+            elapsed_ms = (time.monotonic() - started) * 1000
+
+            failed = error is not None or response.status_code >= 500
+            self.metrics.record(endpoint, elapsed_ms, error=failed, retry=attempt > 0)
+            if failed:
+                self.breaker.record_failure()
+            else:
+                self.breaker.record_success()
+
+            if error is not None:
+                should_retry = isinstance(error, (requests.ConnectionError, requests.Timeout))
+            else:
+                should_retry = response.status_code in self.RETRY_STATUSES
+            if not should_retry or attempt == attempts - 1:
+                if error is not None:
+                    raise error
+                return response
+
+            wait = self._backoff(attempt, response)
+            logger.warning(f"PayMongo {endpoint} failed ({error or response.status_code}), retrying in {wait:.2f}s")
+            time.sleep(wait)
+
+
+_transport = None
+_transport_lock = threading.Lock()
+
+
+def get_transport():
+    """Process-wide PayMongo transport (shared connection pool, breaker and metrics)"""
+    global _transport
+    if _transport is None:
+        with _transport_lock:
+            if _transport is None:
+                _transport = PayMongoTransport()
+    return _transport
+
+
+def new_idempotency_key():
+    return uuid.uuid4().hex
+
+
 class PayMongoClient:
     """PayMongo API client for handling payments"""
     
-    def __init__(self):
+    def __init__(self, transport=None):
+        self.transport = transport or get_transport()
         self.secret_key = settings.PAYMONGO_SECRET_KEY
         self.public_key = settings.PAYMONGO_PUBLIC_KEY
-        self.base_url = "https://api.paymongo.com/v1"
+        self.base_url = self.transport.base_url
+    
+    def _call(self, method, path, payload=None, idempotency_key=None, action='request'):
+        """JSON body of a 200 response, else None (errors are logged, as before)"""
+        try:
+            response = self.transport.request(method, path, payload, idempotency_key=idempotency_key)
+        except CircuitOpenError:
+            logger.error(f"PayMongo {action} skipped: circuit open")
+            return None
+        except requests.RequestException as e:
+            logger.error(f"PayMongo {action} error: {str(e)}")
+            return None
         
-        # Create authorization header
-        auth_string = f"{self.secret_key}:"
-        encoded_auth = base64.b64encode(auth_string.encode()).decode()
-        self.headers = {
-            "Authorization": f"Basic {encoded_auth}",
-            "Content-Type": "application/json"
-        }
+        if response.status_code == 200:
+            return response.json()
+        logger.error(f"PayMongo {action} failed: Status={response.status_code}, Response={response.text}")
+        return None
     
-    def create_payment_intent(self, amount, currency="PHP", description="ErrandExpress Payment"):
+    def create_payment_intent(self, amount, currency="PHP", description="ErrandExpress Payment", idempotency_key=None):
         """
         Create a payment intent for the given amount
         Amount should be in centavos (₱1 = 100 centavos)
         """
-        try:
-            # Convert amount to centavos (handle Decimal types)
-            amount_centavos = int(float(amount) * 100)
-            
-            payload = {
-                "data": {
-                    "attributes": {
-                        "amount": amount_centavos,
-                        "currency": currency,
-                        "description": description,
-                        "statement_descriptor": "ErrandExpress",
-                        "payment_method_allowed": [
-                            "card",
-                            "paymaya",
-                            "gcash"
-                        ]
-                    }
+        # Convert amount to centavos (handle Decimal types)
+        amount_centavos = int(float(amount) * 100)
+        
+        payload = {
+            "data": {
+                "attributes": {
+                    "amount": amount_centavos,
+                    "currency": currency,
+                    "description": description,
+                    "statement_descriptor": "ErrandExpress",
+                    "payment_method_allowed": [
+                        "card",
+                        "paymaya",
+                        "gcash"
+                    ]
                 }
             }
-            
-            response = requests.post(
-                f"{self.base_url}/payment_intents",
-                json=payload,
-                headers=self.headers
-            )
-            
-            if response.status_code == 200:
-                return response.json()
-            else:
-                logger.error(f"PayMongo payment intent creation failed: {response.text}")
-                return None
-                
-        except Exception as e:
-            logger.error(f"PayMongo payment intent error: {str(e)}")
-            return None
+        }
+        
+        return self._call('POST', '/payment_intents', payload,
+                          idempotency_key=idempotency_key or new_idempotency_key(),
+                          action='payment intent creation')
     
-    def attach_payment_method(self, payment_intent_id, payment_method_id):
+    def attach_payment_method(self, payment_intent_id, payment_method_id, idempotency_key=None):
         """Attach a payment method to a payment intent"""
-        try:
-            payload = {
-                "data": {
-                    "attributes": {
-                        "payment_method": payment_method_id
-                    }
-                }
-            }
-            
-            response = requests.post(
-                f"{self.base_url}/payment_intents/{payment_intent_id}/attach",
-                json=payload,
-                headers=self.headers
-            )
-            
-            if response.status_code == 200:
-                return response.json()
-            else:
-                logger.error(f"PayMongo payment method attachment failed: {response.text}")
-                return None
-                
-        except Exception as e:
-            logger.error(f"PayMongo payment method attachment error: {str(e)}")
-            return None
-    
-    def create_source(self, amount, source_type="gcash", currency="PHP", success_url=None, failed_url=None, description="ErrandExpress Payment"):
-        """Create a payment source (for GCash, PayMaya, etc.)"""
-        try:
-            # Convert amount to centavos (handle Decimal types)
-            amount_centavos = int(float(amount) * 100)
-            
-            # Validate amount
-            if amount_centavos <= 0:
-                logger.error(f"Invalid amount: {amount_centavos} centavos")
-                return None
-            
-            # Use provided URLs or fall back to default
-            if not success_url:
-                success_url = f"https://{settings.ALLOWED_HOSTS[0]}/payment/success/"
-            if not failed_url:
-                failed_url = f"https://{settings.ALLOWED_HOSTS[0]}/payment/failed/"
-            
-            # Ensure URLs are valid
-            if not success_url.startswith('http'):
-                logger.error(f"Invalid success URL: {success_url}")
-                return None
-            if not failed_url.startswith('http'):
-                logger.error(f"Invalid failed URL: {failed_url}")
-                return None
-                
-            payload = {
-                "data": {
-                    "attributes": {
-                        "amount": amount_centavos,
-                        "currency": currency,
-                        "type": source_type,
-                        "description": description,
-                        "redirect": {
-                            "success": success_url,
-                            "failed": failed_url
-                        }
-                    }
+        payload = {
+            "data": {
+                "attributes": {
+                    "payment_method": payment_method_id
                 }
             }
-            
-            logger.info(f"Creating PayMongo source: type={source_type}, amount={amount_centavos} centavos, description={description}")
-            
-            response = requests.post(
-                f"{self.base_url}/sources",
-                json=payload,
-                headers=self.headers,
-                timeout=10
-            )
-            
-            if response.status_code == 200:
-                logger.info(f"PayMongo source created successfully")
-                return response.json()
-            else:
-                logger.error(f"PayMongo source creation failed: Status={response.status_code}, Response={response.text}")
-                return None
-                
-        except Exception as e:
-            logger.error(f"PayMongo source creation error: {str(e)}")
-            return None
+        }
+        
+        return self._call('POST', f'/payment_intents/{payment_intent_id}/attach', payload,
+                          idempotency_key=idempotency_key or new_idempotency_key(),
+                          action='payment method attachment')
     
-    def create_link(self, amount, description="ErrandExpress Payment"):
+    def create_link(self, amount, description="ErrandExpress Payment", idempotency_key=None):
         """Create a payment link (Checkout Session)"""
-        try:
-            # Convert amount to centavos
-            amount_centavos = int(float(amount) * 100)
-            
-            payload = {
-                "data": {
-                    "attributes": {
-                        "amount": amount_centavos,
-                        "description": description,
-                        "remarks": "card_payment"
-                    }
+        # Convert amount to centavos
+        amount_centavos = int(float(amount) * 100)
+        
+        payload = {
+            "data": {
+                "attributes": {
+                    "amount": amount_centavos,
+                    "description": description,
+                    "remarks": "card_payment"
                 }
             }
-            
-            response = requests.post(
-                f"{self.base_url}/links",
-                json=payload,
-                headers=self.headers,
-                timeout=10
-            )
-            
-            if response.status_code == 200:
-                return response.json()
-            else:
-                logger.error(f"PayMongo link creation failed: {response.text}")
-                return None
-                
-        except Exception as e:
-            logger.error(f"PayMongo link creation error: {str(e)}")
-            return None
+        }
+        
+        return self._call('POST', '/links', payload,
+                          idempotency_key=idempotency_key or new_idempotency_key(),
+                          action='link creation')
 
     def retrieve_payment_intent(self, payment_intent_id):
         """Retrieve payment intent details"""
-        try:
-            response = requests.get(
-                f"{self.base_url}/payment_intents/{payment_intent_id}",
-                headers=self.headers
-            )
-            
-            if response.status_code == 200:
-                return response.json()
-            else:
-                logger.error(f"PayMongo payment intent retrieval failed: {response.text}")
-                return None
-                
-        except Exception as e:
-            logger.error(f"PayMongo payment intent retrieval error: {str(e)}")
-            return None
+        return self._call('GET', f'/payment_intents/{payment_intent_id}', action='payment intent retrieval')
     
-    def create_source(self, amount, source_type="gcash", currency="PHP", success_url=None, failed_url=None, description="ErrandExpress Payment"):
+    def create_source(self, amount, source_type="gcash", currency="PHP", success_url=None, failed_url=None, description="ErrandExpress Payment", idempotency_key=None):
         """Create a payment source (for GCash, Card, etc.)"""
-        try:
-            # Convert amount to centavos (handle Decimal types)
-            amount_centavos = int(float(amount) * 100)
-            
-            # Validate amount
-            if amount_centavos <= 0:
-                logger.error(f"Invalid amount: {amount_centavos} centavos")
-                return None
-            
-            # Build payload
-            payload = {
-                "data": {
-                    "attributes": {
-                        "amount": amount_centavos,
-                        "currency": currency,
-                        "type": source_type,
-                        "description": description,
-                        "redirect": {
-                            "success": success_url,
-                            "failed": failed_url
-                        }
+        # Convert amount to centavos (handle Decimal types)
+        amount_centavos = int(float(amount) * 100)
+        
+        # Validate amount
+        if amount_centavos <= 0:
+            logger.error(f"Invalid amount: {amount_centavos} centavos")
+            return None
+        
+        # Build payload
+        payload = {
+            "data": {
+                "attributes": {
+                    "amount": amount_centavos,
+                    "currency": currency,
+                    "type": source_type,
+                    "description": description,
+                    "redirect": {
+                        "success": success_url,
+                        "failed": failed_url
                     }
                 }
             }
-            
-            logger.info(f"Creating PayMongo source: type={source_type}, amount={amount_centavos} centavos")
-            
-            response = requests.post(
-                f"{self.base_url}/sources",
-                json=payload,
-                headers=self.headers,
-                timeout=10
-            )
-            
-            if response.status_code == 200:
-                logger.info(f"PayMongo source created successfully")
-                return response.json()
-            else:
-                logger.error(f"PayMongo source creation failed: Status={response.status_code}, Response={response.text}")
-                return None
-                
-        except Exception as e:
-            logger.error(f"PayMongo source creation error: {str(e)}")
-            return None
+        }
+        
+        logger.info(f"Creating PayMongo source: type={source_type}, amount={amount_centavos} centavos")
+        
+        result = self._call('POST', '/sources', payload,
+                            idempotency_key=idempotency_key or new_idempotency_key(),
+                            action='source creation')
+        if result:
+            logger.info(f"PayMongo source created successfully")
+        return result
     
     def create_webhook(self, url, events):
         """Create a webhook for payment events"""
-        try:
-            payload = {
-                "data": {
-                    "attributes": {
-                        "url": url,
-                        "events": events
-                    }
+        payload = {
+            "data": {
+                "attributes": {
+                    "url": url,
+                    "events": events
                 }
             }
-            
-            response = requests.post(
-                f"{self.base_url}/webhooks",
-                json=payload,
-                headers=self.headers
-            )
-            
-            if response.status_code == 200:
-                return response.json()
-            else:
-                logger.error(f"PayMongo webhook creation failed: {response.text}")
-                return None
-                
-        except Exception as e:
-            logger.error(f"PayMongo webhook creation error: {str(e)}")
-            return None
+        }
+        
+        return self._call('POST', '/webhooks', payload,
+                          idempotency_key=new_idempotency_key(),
+                          action='webhook creation')
 
 
 class ErrandExpressPayments:
@@ -0,0 +1,144 @@
+"""
+Pub/Sub for ErrandExpress
+Minimal publish/subscribe used for server push (chat deltas, access changes).
+
+Backends are picked by settings.PUBSUB_URL:
+    memory://                 in-process fan-out (default, tests, single worker)
+    redis://host:6379/0       Redis PUBLISH/SUBSCRIBE (multi-process deployments)
+
+Only Redis reaches subscribers in other processes; is_shared() tells
+callers whether push can replace polling.
+"""
+
+from django.conf import settings
+from collections import defaultdict
+import json
+import logging
+import queue
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class InMemoryBroker:
+    """
+    Thread-safe in-process broker: every subscriber gets its own queue.
+    Only reaches subscribers in the same process.
+    """
+
+    # Slow subscribers drop events instead of growing without bound
+    MAX_PENDING = 1000
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = defaultdict(set)
+
+    def publish(self, channel, event, data):
+        """Returns: number of subscribers reached"""
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel, ()))
+        for subscription in subscribers:
+            try:
+                subscription.queue.put_nowait((event, data))
+            except queue.Full:
+                logger.warning(f"Dropping {event} event for slow subscriber on {channel}")
+        return len(subscribers)
+
+    def subscribe(self, channel):
+        subscription = _InMemorySubscription(self, channel)
+        with self._lock:
+            self._subscribers[channel].add(subscription)
+        return subscription
+
+    def _unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.channel)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.channel]
+
+    def subscriber_count(self, channel):
+        with self._lock:
+            return len(self._subscribers.get(channel, ()))
+
+
+class _InMemorySubscription:
+    def __init__(self, broker, channel):
+        self.broker = broker
+        self.channel = channel
+        self.queue = queue.Queue(maxsize=InMemoryBroker.MAX_PENDING)
+
+    def get(self, timeout=None):
+        """Next (event, data) or None after `timeout` seconds"""
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        self.broker._unsubscribe(self)
+
+
+class RedisBroker:
+    """Redis PUBLISH/SUBSCRIBE; payloads are JSON {"event", "data"}"""
+
+    def __init__(self, url):
+        import redis
+
+        self.client = redis.Redis.from_url(url)
+
+    def publish(self, channel, event, data):
+        return self.client.publish(channel, json.dumps({'event': event, 'data': data}))
+
+    def subscribe(self, channel):
+        pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(channel)
+        return _RedisSubscription(pubsub)
+
+
+class _RedisSubscription:
+    def __init__(self, pubsub):
+        self.pubsub = pubsub
+
+    def get(self, timeout=None):
+        message = self.pubsub.get_message(timeout=timeout)
+        if message is None:
+            return None
+        payload = json.loads(message['data'])
+        return payload['event'], payload['data']
+
+    def close(self):
+        self.pubsub.close()
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def is_shared():
+    """True when published events reach every worker (a Redis broker)"""
+    return getattr(settings, 'PUBSUB_URL', 'memory://').startswith('redis')
+
+
+def get_broker():
+    """Process-wide broker for settings.PUBSUB_URL"""
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                url = getattr(settings, 'PUBSUB_URL', 'memory://')
+                if url.startswith('redis'):
+                    _broker = RedisBroker(url)
+                else:
+                    _broker = InMemoryBroker()
+    return _broker
+
+
+def publish(channel, event, data):
+    """Publish without ever failing the caller (push is best-effort; clients can resync)"""
+    try:
+        return get_broker().publish(channel, event, data)
+    except Exception as e:
+        logger.warning(f"Failed to publish {event} on {channel}: {str(e)}")
+        return 0
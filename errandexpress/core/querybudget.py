@@ -0,0 +1,262 @@
+"""
+Query Budgets for ErrandExpress
+Counts the SQL each request runs, and how long it spends in the database,
+so N+1 loops show up before they reach production:
+
+- every endpoint (URL name) has a query budget: QUERY_BUDGETS in settings,
+  falling back to QUERY_BUDGET_DEFAULT
+- statements are fingerprinted (literals and IN lists collapsed) and one
+  shape repeated QUERY_BUDGET_REPEAT_THRESHOLD times is flagged as N+1;
+  fingerprinting only runs once a request has made that many queries
+- QUERY_BUDGET_MODE 'warn' logs violations, 'raise' makes them errors
+  (tests); on by default only with DEBUG, and QUERY_BUDGET_SAMPLE_RATE
+  checks a fraction of requests where it is switched on in production
+
+Per-endpoint totals are buffered per process and added to the default
+cache every FLUSH_EVERY requests, then read by `py manage.py query_report`.
+"""
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connections
+from django.urls import get_resolver
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+import re
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class QueryBudgetExceeded(Exception):
+    """A request ran more queries than its budget, or an N+1 pattern"""
+
+
+class QueryRecorder:
+    """
+    execute_wrapper that counts queries, DB time and statement shapes
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.statements = Counter()
+        self.samples = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += time.perf_counter() - start
+            self.count += 1
+            self.statements[sql] += 1
+
+    @property
+    def ms(self):
+        return self.seconds * 1000
+
+    @property
+    def fingerprints(self):
+        """Counter of statement shapes, fingerprinting each distinct statement once"""
+        shapes = Counter()
+        for sql, times in self.statements.items():
+            shape = QueryBudget.fingerprint(sql)
+            shapes[shape] += times
+            self.samples.setdefault(shape, sql)
+        return shapes
+
+    def repeats(self, threshold):
+        """[(fingerprint, times)] run at least `threshold` times, most repeated first"""
+        if self.count < threshold:
+            return []  # No shape can repeat that often; skip fingerprinting
+        return [(shape, times) for shape, times in self.fingerprints.most_common() if times >= threshold]
+
+
+class QueryBudget:
+    """
+    Usage:
+        with QueryBudget.record() as recorder:
+            ...                                        # any ORM work
+        QueryBudget.check('task_monitoring', recorder) # violations, warns or raises
+        QueryBudget.totals()                           # across all requests
+    """
+
+    FIELDS = ('requests', 'queries', 'ms', 'over_budget', 'n_plus_one')
+
+    # Cumulative counters live in the default cache so every worker adds to them
+    ALIAS = 'default'
+    TOTALS_PREFIX = 'querybudget'
+    TOTALS_TIMEOUT = 7 * 24 * 60 * 60
+
+    # Requests folded into the process-local buffer between cache writes
+    FLUSH_EVERY = 20
+    FLUSH_SECONDS = 30
+
+    _pending = Counter()
+    _pending_repeated = {}
+    _pending_requests = 0
+    _flushed_at = time.monotonic()
+    _lock = threading.Lock()
+
+    @staticmethod
+    def fingerprint(sql):
+        """Statement shape: quoted and numeric literals and IN lists collapsed"""
+        sql = re.sub(r"'(?:[^']|'')*'", '?', sql)
+        sql = re.sub(r'\b\d+(?:\.\d+)?\b', '?', sql)
+        sql = re.sub(r'\bIN \((?:\s*(?:%s|\?)\s*,?)+\)', 'IN (...)', sql)
+        return re.sub(r'\s+', ' ', sql).strip()
+
+    @staticmethod
+    @contextmanager
+    def record(using=None):
+        """Record every query run on the given (default: all) connections"""
+        recorder = QueryRecorder()
+        with ExitStack() as stack:
+            for alias in using or connections:
+                stack.enter_context(connections[alias].execute_wrapper(recorder))
+            yield recorder
+
+    @staticmethod
+    def budget_for(endpoint):
+        return getattr(settings, 'QUERY_BUDGETS', {}).get(
+            endpoint, getattr(settings, 'QUERY_BUDGET_DEFAULT', 30)
+        )
+
+    @classmethod
+    def violations(cls, endpoint, recorder):
+        """Human-readable problems with one request's queries"""
+        problems = []
+        budget = cls.budget_for(endpoint)
+        if recorder.count > budget:
+            problems.append(f'{recorder.count} queries (budget {budget})')
+        threshold = getattr(settings, 'QUERY_BUDGET_REPEAT_THRESHOLD', 10)
+        for shape, times in recorder.repeats(threshold):
+            problems.append(f'N+1: {times}x {recorder.samples[shape][:200]}')
+        return problems
+
+    @classmethod
+    def check(cls, endpoint, recorder):
+        """
+        Warn about (or, in 'raise' mode, fail on) budget violations and
+        fold the request into the shared totals.
+
+        Returns: list of violations
+        """
+        problems = cls.violations(endpoint, recorder)
+        cls.add_to_totals(endpoint, recorder, problems)
+        if problems:
+            message = f"Query budget exceeded for {endpoint}: " + '; '.join(problems)
+            if getattr(settings, 'QUERY_BUDGET_MODE', 'warn') == 'raise':
+                raise QueryBudgetExceeded(message)
+            logger.warning(message)
+        return problems
+
+    @classmethod
+    def add_to_totals(cls, endpoint, recorder, problems=()):
+        """Fold one request into this process's buffer; flushed to the cache in batches"""
+        entry = {
+            'requests': 1,
+            'queries': recorder.count,
+            'ms': round(recorder.seconds * 1000000),  # microseconds, so incr works
+            'over_budget': int(any(not problem.startswith('N+1') for problem in problems)),
+            'n_plus_one': int(any(problem.startswith('N+1') for problem in problems)),
+        }
+        with cls._lock:
+            for field, amount in entry.items():
+                if amount:
+                    cls._pending[(endpoint, field)] += amount
+            if entry['n_plus_one']:
+                top = recorder.repeats(1)[0][0]
+                cls._pending_repeated[endpoint] = recorder.samples[top][:500]
+            cls._pending_requests += 1
+            due = (cls._pending_requests >= cls.FLUSH_EVERY
+                   or time.monotonic() - cls._flushed_at >= cls.FLUSH_SECONDS)
+        if due:
+            cls.flush()
+
+    @classmethod
+    def flush(cls):
+        """
+        Add the buffered counters to the stats cache with add/incr. Totals
+        are exact only when that cache is Redis, where both are atomic and
+        shared by every worker. The file backend's incr is a read-modify-write,
+        so concurrent flushes can drop increments, and locmem only ever
+        sees its own process.
+        """
+        with cls._lock:
+            pending, repeated = cls._pending, cls._pending_repeated
+            cls._pending, cls._pending_repeated = Counter(), {}
+            cls._pending_requests = 0
+            cls._flushed_at = time.monotonic()
+        if not pending and not repeated:
+            return
+
+        store = caches[cls.ALIAS]
+        try:
+            for (endpoint, field), amount in pending.items():
+                key = f'{cls.TOTALS_PREFIX}:{endpoint}:{field}'
+                if not store.add(key, amount, cls.TOTALS_TIMEOUT):
+                    store.incr(key, amount)
+            if repeated:
+                store.set_many(
+                    {f'{cls.TOTALS_PREFIX}:{endpoint}:repeated': sql for endpoint, sql in repeated.items()},
+                    cls.TOTALS_TIMEOUT
+                )
+        except Exception as e:
+            logger.warning(f"Could not record query stats: {e}")
+
+    @staticmethod
+    def endpoints():
+        """Every URL name (namespaced too) a request can be recorded under, instead of a shared index"""
+        def names(resolver, prefix=''):
+            found = {f'{prefix}{name}' for name in resolver.reverse_dict if isinstance(name, str)}
+            for namespace, (_, sub) in resolver.namespace_dict.items():
+                found |= names(sub, f'{prefix}{namespace}:')
+            return found
+
+        return sorted(names(get_resolver()) | {'unresolved'})
+
+    @classmethod
+    def _keys(cls):
+        return [f'{cls.TOTALS_PREFIX}:{endpoint}:{field}' for endpoint in cls.endpoints() for field in cls.FIELDS + ('repeated',)]
+
+    @classmethod
+    def totals(cls):
+        """
+        Cumulative counters per endpoint that has served requests (this
+        process's buffer is flushed first).
+
+        Returns: {endpoint: {'requests', 'queries', 'ms', 'over_budget', 'n_plus_one',
+                             'avg_queries', 'avg_ms', 'budget', 'repeated'}}
+        """
+        cls.flush()
+        raw = caches[cls.ALIAS].get_many(cls._keys())
+
+        totals = {}
+        for endpoint in cls.endpoints():
+            if not raw.get(f'{cls.TOTALS_PREFIX}:{endpoint}:requests'):
+                continue
+            entry = {field: raw.get(f'{cls.TOTALS_PREFIX}:{endpoint}:{field}', 0) for field in cls.FIELDS}
+            entry['ms'] = entry['ms'] / 1000  # stored in microseconds
+            requests = entry['requests'] or 1
+            entry['avg_queries'] = entry['queries'] / requests
+            entry['avg_ms'] = entry['ms'] / requests
+            entry['budget'] = cls.budget_for(endpoint)
+            entry['repeated'] = raw.get(f'{cls.TOTALS_PREFIX}:{endpoint}:repeated')
+            totals[endpoint] = entry
+        return totals
+
+    @classmethod
+    def reset_totals(cls):
+        with cls._lock:
+            cls._pending, cls._pending_repeated = Counter(), {}
+            cls._pending_requests = 0
+        caches[cls.ALIAS].delete_many(cls._keys())
+
+    @staticmethod
+    def server_timing(recorder):
+        """Server-Timing metric for the request's database work"""
+        return f'db;dur={recorder.ms:.2f};desc="{recorder.count} queries"'
@@ -0,0 +1,137 @@
+"""
+Rating Aggregates for ErrandExpress
+Keeps sum/count/avg and best/worst review pointers on the User row so
+ranking queries read a column instead of aggregating the Rating table
+"""
+
+from django.db import transaction
+from django.db.models import Sum, Count, OuterRef, Subquery
+from decimal import Decimal, ROUND_HALF_UP
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class RatingAggregateService:
+    """
+    Transactional maintenance of User rating aggregates.
+
+    record_rating() is incremental and runs in the caller's transaction
+    with the rated user's row locked; recompute() is the bulk set-based
+    path used on edits/deletes and by the verify_ratings command.
+    """
+
+    AGGREGATE_FIELDS = ['rating_sum', 'total_ratings', 'avg_rating', 'best_rating', 'worst_rating']
+    BATCH_SIZE = 1000
+
+    @staticmethod
+    def average(rating_sum, total_ratings):
+        """Average as stored in User.avg_rating (2 decimal places)"""
+        if not total_ratings:
+            return Decimal('0.00')
+        return (Decimal(rating_sum) / Decimal(total_ratings)).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+
+    @classmethod
+    def record_rating(cls, rating):
+        """
+        Fold a newly inserted Rating into the rated user's aggregates.
+
+        Returns: the updated User
+        """
+        from core.models import User
+
+        with transaction.atomic():
+            user = User.objects.select_for_update(of=('self',)).select_related(
+                'best_rating', 'worst_rating'
+            ).get(id=rating.rated_id)
+
+            user.rating_sum += rating.score
+            user.total_ratings += 1
+            user.avg_rating = cls.average(user.rating_sum, user.total_ratings)
+
+            # Ties go to the newer review (matches the -created_at display order)
+            if user.best_rating is None or rating.score >= user.best_rating.score:
+                user.best_rating = rating
+            if user.worst_rating is None or rating.score <= user.worst_rating.score:
+                user.worst_rating = rating
+
+            user.save(update_fields=cls.AGGREGATE_FIELDS)
+
+        return user
+
+    @classmethod
+    def expected_aggregates(cls, users_queryset):
+        """
+        Annotate users with aggregates computed from the Rating table
+        (one statement per batch, no per-user loop).
+        """
+        from core.models import Rating
+
+        received = Rating.objects.filter(rated=OuterRef('pk')).order_by()
+        totals = received.values('rated').annotate(
+            s=Sum('score'), c=Count('id')
+        )
+        return users_queryset.annotate(
+            expected_sum=Subquery(totals.values('s')),
+            expected_count=Subquery(totals.values('c')),
+            expected_best=Subquery(received.order_by('-score', '-created_at').values('id')[:1]),
+            expected_worst=Subquery(received.order_by('score', '-created_at').values('id')[:1]),
+        )
+
+    @classmethod
+    def find_drift(cls, users_queryset=None):
+        """
+        Yield (user, corrected_values) for users whose stored aggregates
+        disagree with the Rating table
+        """
+        from core.models import User
+
+        if users_queryset is None:
+            users_queryset = User.objects.all()
+
+        users = cls.expected_aggregates(users_queryset.only(
+            'id', 'fullname', 'rating_sum', 'total_ratings', 'avg_rating', 'best_rating', 'worst_rating'
+        ))
+        for user in users.iterator(chunk_size=cls.BATCH_SIZE):
+            rating_sum = user.expected_sum or 0
+            total = user.expected_count or 0
+            expected = {
+                'rating_sum': rating_sum,
+                'total_ratings': total,
+                'avg_rating': cls.average(rating_sum, total),
+                'best_rating_id': user.expected_best,
+                'worst_rating_id': user.expected_worst,
+            }
+            if any(getattr(user, field) != value for field, value in expected.items()):
+                yield user, expected
+
+    @classmethod
+    def recompute(cls, users_queryset=None, dry_run=False):
+        """
+        Verify and repair aggregates in bulk.
+
+        Returns: list of (user, corrected_values) that were (or would be) fixed
+        """
+        from core.models import User
+
+        drift = list(cls.find_drift(users_queryset))
+        if drift and not dry_run:
+            fixed = []
+            for user, expected in drift:
+                for field, value in expected.items():
+                    setattr(user, field, value)
+                fixed.append(user)
+            with transaction.atomic():
+                User.objects.bulk_update(fixed, cls.AGGREGATE_FIELDS, batch_size=cls.BATCH_SIZE)
+            logger.info(f"Repaired rating aggregates for {len(fixed)} users")
+        return drift
+
+    @classmethod
+    def recompute_user(cls, user_id):
+        """Recompute one user's aggregates (rating edited or deleted)"""
+        from core.models import User
+
+        with transaction.atomic():
+            list(User.objects.select_for_update(of=('self',)).filter(id=user_id).values_list('id'))
+            cls.recompute(User.objects.filter(id=user_id))
+        return User.objects.filter(id=user_id).values_list('avg_rating', flat=True).first()
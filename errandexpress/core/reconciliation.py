@@ -0,0 +1,142 @@
+"""
+Payment Reconciliation for ErrandExpress
+Checks pending PayMongo payments concurrently over the shared PayMongo
+transport (keep-alive pool, timeouts, retry with backoff, circuit
+breaker) from a bounded thread pool behind a token-bucket rate limit.
+Confirmed payments are written with a single UPDATE and appended to the
+revenue ledger in one bulk insert.
+"""
+
+from django.utils import timezone
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+import threading
+import time
+import logging
+
+import requests
+
+from core.paymongo import CircuitOpenError, get_transport
+from core.revenue import RevenueLedger
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """Thread-safe token bucket: `rate` tokens per second, bursts up to `capacity`"""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity or rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a token is available"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class PaymentReconciler:
+    """
+    Usage:
+        result = PaymentReconciler().run()
+
+    HTTP work happens on the pool threads; all database reads and the
+    final bulk update stay on the calling thread.
+    """
+
+    MAX_WORKERS = 8
+
+    # PayMongo requests per second across all workers (retries included)
+    RATE_PER_SECOND = 10
+
+    # Payments younger than this are left to the webhook
+    MIN_AGE = timedelta(hours=1)
+
+    def __init__(self, transport=None, workers=None, rate=None):
+        self.transport = transport or get_transport()
+        self.workers = workers or self.MAX_WORKERS
+        self.bucket = TokenBucket(rate or self.RATE_PER_SECOND)
+
+    def fetch_status(self, payment_intent_id):
+        """PayMongo status of one payment intent, or None if it could not be read"""
+        try:
+            response = self.transport.request(
+                'GET', f'/payment_intents/{payment_intent_id}',
+                throttle=self.bucket.acquire
+            )
+        except CircuitOpenError:
+            return None
+        except requests.RequestException as e:
+            logger.warning(f"PayMongo request for {payment_intent_id} failed: {str(e)}")
+            return None
+
+        if response.status_code != 200:
+            logger.error(f"PayMongo payment intent retrieval failed ({response.status_code}): {response.text[:200]}")
+            return None
+        try:
+            return response.json()['data']['attributes']['status']
+        except (ValueError, KeyError) as e:
+            logger.error(f"Unexpected PayMongo response for {payment_intent_id}: {str(e)}")
+            return None
+
+    def pending_payments(self, now=None):
+        from core.models import Payment
+
+        return Payment.objects.filter(
+            status='pending',
+            created_at__lt=(now or timezone.now()) - self.MIN_AGE,
+        ).exclude(paymongo_payment_id='')
+
+    def run(self, payments_queryset=None, now=None):
+        """
+        Reconcile pending payments.
+
+        Returns: {'checked', 'confirmed', 'unreachable', 'elapsed_ms'}
+        """
+        from core.models import Payment
+        from core.badges import UserStatsCache
+        from core.dashboard import DashboardService
+
+        started = time.monotonic()
+        now = now or timezone.now()
+        if payments_queryset is None:
+            payments_queryset = self.pending_payments(now)
+        pending = list(payments_queryset.values_list('id', 'paymongo_payment_id', 'payer_id', 'receiver_id'))
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            statuses = list(pool.map(self.fetch_status, [row[1] for row in pending]))
+
+        succeeded_rows = [row for row, status in zip(pending, statuses) if status == 'succeeded']
+        succeeded = [row[0] for row in succeeded_rows]
+        confirmed = 0
+        if succeeded:
+            confirmed = Payment.objects.filter(id__in=succeeded, status='pending').update(
+                status='confirmed',
+                confirmed_at=now
+            )
+            # update() bypasses post_save, so the ledger entries are written here
+            RevenueLedger.record_payments(Payment.objects.filter(id__in=succeeded, status='confirmed'))
+            # ...and the payers' and receivers' cached totals are dropped here
+            user_ids = {user_id for row in succeeded_rows for user_id in row[2:]}
+            UserStatsCache.invalidate(list(user_ids), 'total_earned')
+            DashboardService.invalidate(*user_ids)
+
+        result = {
+            'checked': len(pending),
+            'confirmed': confirmed,
+            'unreachable': statuses.count(None),
+            'elapsed_ms': round((time.monotonic() - started) * 1000, 1),
+        }
+        logger.info(f"Payment reconciliation: {result}")
+        return result
@@ -0,0 +1,179 @@
+"""
+Deadline Reminder Schedule for ErrandExpress
+Reminder fire times are precomputed when a task is created or its deadline
+changes. Each send_deadline_reminders tick claims only the rows that are
+due (SELECT ... FOR UPDATE SKIP LOCKED), so its cost follows reminders due
+rather than tasks alive.
+"""
+
+from django.db import transaction
+from django.utils import timezone
+from datetime import timedelta
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class ReminderScheduler:
+    """
+    Tiers (relative to the deadline):
+    - 24h: once, between 24h and 2h before
+    - 2h:  every 20 minutes, between 2h and 20 minutes before
+    - 20m: every 2 minutes, in the last 20 minutes
+    """
+
+    ACTIVE_STATUSES = ('open', 'in_progress')
+    NOTIFICATION_TYPE = 'deadline_reminder'
+
+    # Task fields that change a schedule
+    SCHEDULE_FIELDS = ('deadline', 'status')
+
+    # (tier, window start before deadline, window end before deadline, repeat interval)
+    TIERS = [
+        ('24h', timedelta(hours=24), timedelta(hours=2), None),
+        ('2h', timedelta(hours=2), timedelta(minutes=20), timedelta(minutes=20)),
+        ('20m', timedelta(minutes=20), timedelta(0), timedelta(minutes=2)),
+    ]
+
+    # Rows claimed per transaction
+    CLAIM_BATCH = 500
+
+    @classmethod
+    def fire_times(cls, deadline, now=None):
+        """
+        Future reminder times for a deadline.
+
+        Returns: list of (tier, fire_at)
+        """
+        now = now or timezone.now()
+        times = []
+        for tier, start, end, every in cls.TIERS:
+            window_start, window_end = deadline - start, deadline - end
+            if window_end <= now:
+                continue
+            if every is None:
+                times.append((tier, max(window_start, now)))
+                continue
+
+            grid = []
+            fire_at = window_start
+            while fire_at < window_end:
+                if fire_at >= now:
+                    grid.append(fire_at)
+                fire_at += every
+            # Already inside the window: fire now unless the next slot is close
+            if window_start < now and (not grid or grid[0] - now >= every / 2):
+                grid.insert(0, now)
+            times.extend((tier, fire_at) for fire_at in grid)
+        return times
+
+    @classmethod
+    def sync(cls, task, now=None):
+        """Bring a task's schedule in line with its deadline and status (1 query when unchanged)"""
+        from core.models import ReminderSchedule
+
+        now = now or timezone.now()
+        active = task.status in cls.ACTIVE_STATUSES and task.deadline and task.deadline > now
+        scheduled_for = ReminderSchedule.objects.filter(task_id=task.pk).values_list('deadline', flat=True).first()
+
+        if active and scheduled_for == task.deadline:
+            return
+        if scheduled_for is not None:
+            ReminderSchedule.objects.filter(task_id=task.pk).delete()
+        if active:
+            ReminderSchedule.objects.bulk_create([
+                ReminderSchedule(task_id=task.pk, tier=tier, fire_at=fire_at, deadline=task.deadline)
+                for tier, fire_at in cls.fire_times(task.deadline, now)
+            ])
+
+    @classmethod
+    def rebuild(cls, tasks_queryset=None, now=None):
+        """Recompute schedules for many tasks. Returns: rows written"""
+        from core.models import Task, ReminderSchedule
+
+        now = now or timezone.now()
+        if tasks_queryset is None:
+            tasks_queryset = Task.objects.all()
+        active = tasks_queryset.filter(status__in=cls.ACTIVE_STATUSES, deadline__gt=now)
+
+        rows = [
+            ReminderSchedule(task_id=task_id, tier=tier, fire_at=fire_at, deadline=deadline)
+            for task_id, deadline in active.values_list('id', 'deadline').iterator()
+            for tier, fire_at in cls.fire_times(deadline, now)
+        ]
+        with transaction.atomic():
+            ReminderSchedule.objects.filter(task__in=tasks_queryset).delete()
+            ReminderSchedule.objects.bulk_create(rows, batch_size=1000)
+        return len(rows)
+
+    @classmethod
+    def render(cls, tier, task, now):
+        """(title, message, dedupe kwargs) for a reminder fired at `now`"""
+        minutes_remaining = int((task.deadline - now).total_seconds() / 60)
+        local_deadline = timezone.localtime(task.deadline).strftime('%I:%M %p')
+        if tier == '20m':
+            return (
+                f"🚨 CRITICAL: Due in {minutes_remaining} mins!",
+                f"Task '{task.title}' is due very soon! Deadline: {local_deadline}",
+                {'discriminator': '20m', 'window': timedelta(minutes=2)},
+            )
+        if tier == '2h':
+            return (
+                f"⏳ Urgent: Due in {minutes_remaining} mins",
+                f"Head's up! Task '{task.title}' is due in under 2 hours.",
+                {'discriminator': '2h', 'window': timedelta(minutes=20)},
+            )
+        # Once per deadline: a moved deadline earns a fresh reminder
+        return (
+            "⏰ Task Due Tomorrow",
+            f"Reminder: '{task.title}' is due in 24 hours ({local_deadline})",
+            {'discriminator': f'24h@{int(task.deadline.timestamp())}', 'window': None},
+        )
+
+    @classmethod
+    def fire_due(cls, now=None):
+        """
+        Claim due schedule rows and send their reminders.
+        Concurrent workers skip rows another worker holds.
+
+        Returns: number of notifications inserted
+        """
+        from core.models import ReminderSchedule
+        from core.notifications import NotificationDispatcher
+
+        now = now or timezone.now()
+        sent = 0
+        while True:
+            with transaction.atomic():
+                due = list(
+                    ReminderSchedule.objects.select_for_update(skip_locked=True, of=('self',))
+                    .filter(fire_at__lte=now)
+                    .select_related('task')
+                    .only('id', 'tier', 'fire_at', 'task__id', 'task__title', 'task__deadline',
+                          'task__status', 'task__poster_id', 'task__doer_id')
+                    .order_by('fire_at')[:cls.CLAIM_BATCH]
+                )
+                if not due:
+                    break
+
+                # A backlog (worker downtime) collapses to the latest due row per task
+                latest = {}
+                for row in due:
+                    latest[row.task_id] = row
+
+                dispatcher = NotificationDispatcher(now=now)
+                for row in latest.values():
+                    task = row.task
+                    if task.status not in cls.ACTIVE_STATUSES or task.deadline <= now:
+                        continue
+                    title, message, dedupe = cls.render(row.tier, task, now)
+                    for recipient_id in filter(None, (task.poster_id, task.doer_id)):
+                        dispatcher.add(recipient_id, cls.NOTIFICATION_TYPE, title, message,
+                                       related_task=task.id, dedupe=True, **dedupe)
+
+                ReminderSchedule.objects.filter(id__in=[row.id for row in due]).delete()
+                sent += dispatcher.flush()
+
+            if len(due) < cls.CLAIM_BATCH:
+                break
+        return sent
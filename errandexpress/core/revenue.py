@@ -0,0 +1,261 @@
+"""
+Revenue Ledger for ErrandExpress
+Every credit (paid SystemCommission, confirmed Payment commission, manual
+adjustment) is appended to RevenueEntry, unique on its source, instead of
+incrementing the single SystemWallet row. RevenueLedger.rollup() folds new
+entries into per-day RevenueRollup buckets and refreshes the SystemWallet
+totals; dashboard reads are rollup sums plus the not-yet-rolled-up tail.
+"""
+
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+from django.utils import timezone
+from datetime import datetime, time as dt_time
+from decimal import Decimal
+import time
+import uuid
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class RevenueLedger:
+    """
+    Usage:
+        RevenueLedger.record_payments(Payment.objects.filter(id__in=ids))
+        RevenueLedger.rollup()
+        RevenueLedger.totals(since=month_start)
+    """
+
+    PAYMENT_STATUSES = ('confirmed', 'paid')
+
+    # Entries claimed per rollup transaction
+    ROLLUP_BATCH = 1000
+
+    @staticmethod
+    def local_day(moment):
+        return timezone.localtime(moment).date()
+
+    @staticmethod
+    def day_start(day):
+        """Aware datetime of local midnight for a date"""
+        return timezone.make_aware(datetime.combine(day, dt_time.min))
+
+    @classmethod
+    def _insert(cls, entries):
+        """Append entries; a source already in the ledger is skipped by the database"""
+        from core.models import RevenueEntry
+
+        entries = [entry for entry in entries if entry.amount and entry.amount > 0]
+        if entries:
+            RevenueEntry.objects.bulk_create(entries, batch_size=cls.ROLLUP_BATCH, ignore_conflicts=True)
+        return len(entries)
+
+    @classmethod
+    def record_commissions(cls, commissions_queryset):
+        """Ledger entries for paid SystemCommissions"""
+        from core.models import RevenueEntry
+
+        rows = commissions_queryset.filter(status='paid').values(
+            'id', 'amount', 'paid_at', 'created_at', 'task_id', 'task__category', 'task__title'
+        )
+        return cls._insert(
+            RevenueEntry(
+                source_type='commission',
+                source_id=str(row['id']),
+                amount=row['amount'],
+                task_id=row['task_id'],
+                category=row['task__category'] or '',
+                description=f"Commission from task: {row['task__title']}"[:255],
+                booked_at=row['paid_at'] or row['created_at'],
+            )
+            for row in rows
+        )
+
+    @classmethod
+    def record_payments(cls, payments_queryset):
+        """Ledger entries for the commission part of confirmed/paid Payments"""
+        from core.models import RevenueEntry
+
+        rows = payments_queryset.filter(status__in=cls.PAYMENT_STATUSES).values(
+            'id', 'commission_amount', 'confirmed_at', 'paid_at', 'created_at',
+            'task_id', 'task__category', 'task__title'
+        )
+        return cls._insert(
+            RevenueEntry(
+                source_type='payment',
+                source_id=str(row['id']),
+                amount=row['commission_amount'],
+                task_id=row['task_id'],
+                category=row['task__category'] or '',
+                description=f"Commission from task payment: {row['task__title']}"[:255],
+                booked_at=row['confirmed_at'] or row['paid_at'] or row['created_at'],
+            )
+            for row in rows
+        )
+
+    @classmethod
+    def record_manual(cls, amount, description='', booked_at=None):
+        """Ad-hoc credit with no source record (SystemWallet.add_revenue)"""
+        from core.models import RevenueEntry
+
+        return cls._insert([RevenueEntry(
+            source_type='manual',
+            source_id=str(uuid.uuid4()),
+            amount=Decimal(str(amount)),
+            description=description[:255],
+            booked_at=booked_at or timezone.now(),
+        )])
+
+    @classmethod
+    def rollup(cls, now=None):
+        """
+        Fold entries not yet rolled up into RevenueRollup and refresh the
+        SystemWallet totals. Concurrent runs skip entries another run holds.
+
+        Returns: {'entries', 'buckets', 'elapsed_ms'}
+        """
+        from core.models import RevenueEntry, RevenueRollup
+
+        started = time.monotonic()
+        now = now or timezone.now()
+        result = {'entries': 0, 'buckets': 0}
+        while True:
+            with transaction.atomic():
+                batch = list(
+                    RevenueEntry.objects.select_for_update(skip_locked=True)
+                    .filter(rolled_up_at__isnull=True)
+                    .order_by('id')
+                    .values_list('id', 'booked_at', 'source_type', 'category', 'amount')[:cls.ROLLUP_BATCH]
+                )
+                if not batch:
+                    break
+
+                buckets = {}
+                for _, booked_at, source_type, category, amount in batch:
+                    key = (cls.local_day(booked_at), source_type, category)
+                    total, count = buckets.get(key, (Decimal('0'), 0))
+                    buckets[key] = (total + amount, count + 1)
+
+                RevenueRollup.objects.bulk_create([
+                    RevenueRollup(day=day, source_type=source_type, category=category)
+                    for day, source_type, category in buckets
+                ], ignore_conflicts=True)
+                for (day, source_type, category), (total, count) in buckets.items():
+                    RevenueRollup.objects.filter(day=day, source_type=source_type, category=category).update(
+                        total=F('total') + total,
+                        entries=F('entries') + count,
+                        updated_at=now
+                    )
+
+                RevenueEntry.objects.filter(id__in=[row[0] for row in batch]).update(rolled_up_at=now)
+                result['entries'] += len(batch)
+                result['buckets'] += len(buckets)
+
+            if len(batch) < cls.ROLLUP_BATCH:
+                break
+
+        cls.refresh_wallet()
+        result['elapsed_ms'] = round((time.monotonic() - started) * 1000, 1)
+        return result
+
+    @classmethod
+    def refresh_wallet(cls):
+        """Write the rolled-up totals to the SystemWallet row (admin / legacy readers)"""
+        from core.models import RevenueRollup, SystemWallet
+
+        totals = RevenueRollup.objects.aggregate(total=Sum('total'), entries=Sum('entries'))
+        wallet = SystemWallet.get_or_create_wallet()
+        SystemWallet.objects.filter(pk=wallet.pk).update(
+            total_revenue=totals['total'] or 0,
+            total_transactions=totals['entries'] or 0,
+            updated_at=timezone.now()
+        )
+
+    @classmethod
+    def _tail(cls, since=None):
+        """Entries not yet rolled up (bounded by the rollup interval)"""
+        from core.models import RevenueEntry
+
+        tail = RevenueEntry.objects.filter(rolled_up_at__isnull=True)
+        if since is not None:
+            tail = tail.filter(booked_at__gte=cls.day_start(since))
+        return tail
+
+    @classmethod
+    def totals(cls, since=None):
+        """
+        Exact revenue since a local date (or all time).
+
+        Returns: {'total': Decimal, 'entries': int}
+        """
+        return cls.window_totals(period=since)['period']
+
+    @classmethod
+    def window_totals(cls, **windows):
+        """
+        Several totals in one rollup query and one tail query, e.g.
+        window_totals(lifetime=None, month=month_start).
+
+        Returns: {name: {'total': Decimal, 'entries': int}}
+        """
+        from core.models import RevenueRollup
+
+        rollup_aggregates, tail_aggregates = {}, {}
+        for name, since in windows.items():
+            rolled = Q(day__gte=since) if since is not None else Q()
+            tail = Q(booked_at__gte=cls.day_start(since)) if since is not None else Q()
+            rollup_aggregates[f'{name}_total'] = Sum('total', filter=rolled)
+            rollup_aggregates[f'{name}_entries'] = Sum('entries', filter=rolled)
+            tail_aggregates[f'{name}_total'] = Sum('amount', filter=tail)
+            tail_aggregates[f'{name}_entries'] = Count('id', filter=tail)
+
+        rolled = RevenueRollup.objects.aggregate(**rollup_aggregates)
+        tail = cls._tail().aggregate(**tail_aggregates)
+        return {
+            name: {
+                'total': (rolled[f'{name}_total'] or Decimal('0')) + (tail[f'{name}_total'] or Decimal('0')),
+                'entries': (rolled[f'{name}_entries'] or 0) + (tail[f'{name}_entries'] or 0),
+            }
+            for name in windows
+        }
+
+    @classmethod
+    def daily_series(cls, since):
+        """Revenue per local day from `since` on. Returns: {date: Decimal}"""
+        from core.models import RevenueRollup
+
+        series = {}
+        for day, total in (
+            RevenueRollup.objects.filter(day__gte=since)
+            .values('day').annotate(day_total=Sum('total'))
+            .values_list('day', 'day_total')
+        ):
+            series[day] = total
+        for booked_at, amount in cls._tail(since).values_list('booked_at', 'amount'):
+            day = cls.local_day(booked_at)
+            series[day] = series.get(day, Decimal('0')) + amount
+        return series
+
+    @classmethod
+    def by_category(cls):
+        """
+        Task-linked revenue per category, highest first.
+
+        Returns: list of {'category', 'total'}
+        """
+        from core.models import RevenueRollup
+
+        totals = {}
+        for category, total in (
+            RevenueRollup.objects.exclude(category='')
+            .values('category').annotate(category_total=Sum('total'))
+            .values_list('category', 'category_total')
+        ):
+            totals[category] = total
+        for category, amount in cls._tail().exclude(category='').values_list('category', 'amount'):
+            totals[category] = totals.get(category, Decimal('0')) + amount
+        return [
+            {'category': category, 'total': total}
+            for category, total in sorted(totals.items(), key=lambda item: item[1], reverse=True)
+        ]
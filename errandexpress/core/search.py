@@ -0,0 +1,217 @@
+"""
+Task Search for ErrandExpress
+Full-text search over task title, tags and description, replacing the
+leading-wildcard icontains scans browse_tasks used to run:
+
+    PostgreSQL   Task.search_vector (tsvector; title A, tags B, description C)
+                 behind a GIN index, ranked with ts_rank
+    SQLite       FTS5 table core_task_search (porter stemming, prefix
+                 indexes), ranked with bm25
+    otherwise    icontains per term, unranked
+
+Every term is a prefix match, so partial words typed into the search box
+still hit. The index is refreshed by a Task post_save signal when the text
+changes; rebuild() re-indexes in bulk after imports, which skip signals.
+"""
+
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.db import connections
+from django.db.models import ExpressionWrapper, F, FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+from decimal import Decimal
+import re
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class TaskSearchService:
+    """
+    Usage:
+        tasks = TaskSearchService.search(tasks, 'pow slides')   # filter + search_relevance
+        tasks = TaskSearchService.order_by_relevance(tasks)     # blend with priority_score
+        TaskSearchService.rebuild()                             # after bulk imports
+    """
+
+    FTS_TABLE = 'core_task_search'
+    CONFIG = 'english'
+
+    # Indexed columns, in FTS5 column order, with their weights
+    TEXT_FIELDS = ('title', 'tags', 'description')
+    WEIGHTS = {'title': 'A', 'tags': 'B', 'description': 'C'}
+    BM25_WEIGHTS = (10.0, 5.0, 1.0)
+
+    # priority_score points added by a perfect text match (relevance is 0..1)
+    RELEVANCE_WEIGHT = Decimal('4.00')
+
+    MAX_TERMS = 8
+    BATCH_SIZE = 1000
+
+    # {database alias: FTS table present}
+    _fts_available = {}
+
+    @classmethod
+    def terms(cls, text):
+        """Lowercased word tokens of the user's query (punctuation dropped)"""
+        return re.findall(r'\w+', (text or '').lower())[:cls.MAX_TERMS]
+
+    @classmethod
+    def backend(cls, using='default'):
+        """'postgres', 'fts5' or 'like'"""
+        connection = connections[using]
+        if connection.vendor == 'postgresql':
+            return 'postgres'
+        if connection.vendor == 'sqlite':
+            if using not in cls._fts_available:
+                cls._fts_available[using] = cls.FTS_TABLE in connection.introspection.table_names()
+            if cls._fts_available[using]:
+                return 'fts5'
+        return 'like'
+
+    @staticmethod
+    def fts_rowid(task_id):
+        """FTS5 rowid for a task: 60 bits of its UUID, so re-indexing deletes by rowid"""
+        return int(task_id.hex[:15], 16)
+
+    @classmethod
+    def vector(cls):
+        return (
+            SearchVector('title', weight=cls.WEIGHTS['title'], config=cls.CONFIG) +
+            SearchVector('tags', weight=cls.WEIGHTS['tags'], config=cls.CONFIG) +
+            SearchVector('description', weight=cls.WEIGHTS['description'], config=cls.CONFIG)
+        )
+
+    # ==================== WRITE PATH ====================
+
+    @classmethod
+    def index_tasks(cls, tasks, using='default'):
+        """(Re)index tasks (Task instances, or any objects with id/title/tags/description)"""
+        from core.models import Task
+
+        tasks = list(tasks)
+        if not tasks:
+            return 0
+
+        backend = cls.backend(using)
+        if backend == 'postgres':
+            Task.objects.using(using).filter(id__in=[task.id for task in tasks]).update(search_vector=cls.vector())
+        elif backend == 'fts5':
+            with connections[using].cursor() as cursor:
+                cursor.executemany(
+                    f'DELETE FROM {cls.FTS_TABLE} WHERE rowid = %s',
+                    [(cls.fts_rowid(task.id),) for task in tasks]
+                )
+                cursor.executemany(
+                    f'INSERT INTO {cls.FTS_TABLE} (rowid, task_id, title, tags, description) VALUES (%s, %s, %s, %s, %s)',
+                    [
+                        (cls.fts_rowid(task.id), task.id.hex, task.title or '', task.tags or '', task.description or '')
+                        for task in tasks
+                    ]
+                )
+        return len(tasks)
+
+    @classmethod
+    def remove(cls, task_ids, using='default'):
+        """Drop deleted tasks from the FTS5 table (the tsvector column goes with the row)"""
+        if task_ids and cls.backend(using) == 'fts5':
+            with connections[using].cursor() as cursor:
+                cursor.executemany(
+                    f'DELETE FROM {cls.FTS_TABLE} WHERE rowid = %s',
+                    [(cls.fts_rowid(task_id),) for task_id in task_ids]
+                )
+
+    @classmethod
+    def rebuild(cls, tasks_queryset=None, using='default'):
+        """
+        Bulk (re)index. Used by the rebuild_search_index command and after
+        bulk imports, which bypass model signals.
+
+        Returns: number of tasks indexed
+        """
+        from core.models import Task
+
+        full = tasks_queryset is None
+        if full:
+            tasks_queryset = Task.objects.using(using).all()
+
+        backend = cls.backend(using)
+        if backend == 'postgres':
+            written = tasks_queryset.update(search_vector=cls.vector())
+        else:
+            if full and backend == 'fts5':
+                # Also drops rows of tasks deleted without signals
+                with connections[using].cursor() as cursor:
+                    cursor.execute(f'DELETE FROM {cls.FTS_TABLE}')
+            written = 0
+            batch = []
+            for task in tasks_queryset.only('id', *cls.TEXT_FIELDS).iterator(chunk_size=cls.BATCH_SIZE):
+                batch.append(task)
+                if len(batch) >= cls.BATCH_SIZE:
+                    written += cls.index_tasks(batch, using)
+                    batch = []
+            written += cls.index_tasks(batch, using)
+            if full and backend == 'fts5':
+                with connections[using].cursor() as cursor:
+                    cursor.execute(f"INSERT INTO {cls.FTS_TABLE} ({cls.FTS_TABLE}) VALUES ('optimize')")
+
+        logger.info(f"Task search index rebuilt: {written} tasks")
+        return written
+
+    # ==================== READ PATH ====================
+
+    @classmethod
+    def search(cls, queryset, text):
+        """
+        Tasks matching every term of `text` (each as a prefix), annotated
+        with search_relevance in [0, 1). Blank queries return the queryset
+        unfiltered.
+        """
+        from core.models import Task
+
+        terms = cls.terms(text)
+        if not terms:
+            return queryset.annotate(search_relevance=Value(0.0, output_field=FloatField()))
+
+        backend = cls.backend(queryset.db)
+        if backend == 'postgres':
+            query = SearchQuery(
+                ' & '.join(f"'{term}':*" for term in terms), config=cls.CONFIG, search_type='raw'
+            )
+            # normalization 32 maps rank to rank / (rank + 1)
+            return queryset.filter(search_vector=query).annotate(
+                search_relevance=SearchRank(F('search_vector'), query, normalization=32)
+            )
+
+        if backend == 'fts5':
+            table = cls.FTS_TABLE
+            bm25 = f"bm25({table}, {', '.join(str(weight) for weight in cls.BM25_WEIGHTS)})"
+            return queryset.extra(
+                tables=[table],
+                where=[f'{table} MATCH %s', f'{table}.task_id = {Task._meta.db_table}.id'],
+                params=[' '.join(f'"{term}"*' for term in terms)],
+            ).annotate(
+                # bm25 is negative, lower is better; map -bm25 to x / (x + 1)
+                search_relevance=RawSQL(f'(-{bm25}) / (1.0 - {bm25})', [], output_field=FloatField())
+            )
+
+        for term in terms:
+            queryset = queryset.filter(
+                Q(title__icontains=term) | Q(tags__icontains=term) | Q(description__icontains=term)
+            )
+        return queryset.annotate(search_relevance=Value(0.0, output_field=FloatField()))
+
+    @classmethod
+    def order_by_relevance(cls, queryset):
+        """
+        Order searched tasks by priority_score plus text relevance (feed
+        querysets), or by relevance alone when there is no priority_score.
+        """
+        if 'priority_score' not in queryset.query.annotations:
+            return queryset.order_by('-search_relevance', '-created_at')
+
+        return queryset.annotate(
+            search_score=ExpressionWrapper(
+                F('priority_score') + F('search_relevance') * Value(float(cls.RELEVANCE_WEIGHT)),
+                output_field=FloatField()
+            )
+        ).order_by('-search_score', '-price', '-created_at')
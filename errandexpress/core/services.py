@@ -8,6 +8,9 @@ from django.db.models.functions import Coalesce
 from django.utils import timezone
 from decimal import Decimal
 from datetime import timedelta
+import numpy as np
+
+from core.caching import CacheNamespace
 
 
 class PrioritizationService:
@@ -20,6 +23,10 @@ class PrioritizationService:
     5. Price agreement
     6. User ratings
     7. Deadline urgency
+    
+    Every factor is defined once by the tables below and evaluated either
+    as SQL annotations (get_prioritized_tasks) or as a NumPy batch over a
+    page of tasks (get_score_breakdowns), so both paths agree.
     """
     
     # Scoring weights
@@ -31,19 +38,63 @@ class PrioritizationService:
     RATING_WEIGHT = Decimal('2.0')
     DEADLINE_WEIGHT = Decimal('1.0')
     
+    # Urgency factor by priority level
+    URGENCY_LEVELS = {
+        5: Decimal('1.50'),
+        4: Decimal('1.20'),
+        3: Decimal('0.90'),
+        2: Decimal('0.60'),
+        1: Decimal('0.30'),
+    }
+    URGENCY_DEFAULT = Decimal('0.90')  # Default to normal priority
+    
+    # Location factor
+    LOCATION_MATCH = Decimal('2.00')
+    LOCATION_UNSPECIFIED = Decimal('0.50')  # No location specified
+    
+    # Preference factor
+    PREFERENCE_MATCH = Decimal('2.00')
+    
+    # Time window factor
+    TIME_WINDOW_ACTIVE = Decimal('1.50')       # Within preferred time window
+    TIME_WINDOW_SAME_DAY = Decimal('1.00')     # Same day as time window start
+    TIME_WINDOW_FLEXIBLE = Decimal('0.50')     # Flexible timing
+    TIME_WINDOW_UNSPECIFIED = Decimal('0.30')  # No time window specified
+    
+    # Price factor: (minimum price, divisor); divisor None means full score
+    PRICE_TIERS = [
+        (Decimal('1000'), None),
+        (Decimal('500'), Decimal('1000.0')),
+        (Decimal('100'), Decimal('2000.0')),
+        (Decimal('0'), Decimal('5000.0')),
+    ]
+    
+    # Deadline factor: (due within days, factor)
+    DEADLINE_TIERS = [
+        (1, Decimal('1.00')),
+        (3, Decimal('0.70')),
+        (7, Decimal('0.40')),
+    ]
+    DEADLINE_DEFAULT = Decimal('0.20')
+    
+    # Poster rating used before the poster has any ratings
+    DEFAULT_POSTER_RATING = Decimal('3.00')
+    RATING_SCALE = Decimal('5.00')
+    
+    # Cached per-task static components (urgency, price)
+    STATIC_CACHE_TIMEOUT = 60 * 60
+    static_cache = CacheNamespace('task_scores', timeout=STATIC_CACHE_TIMEOUT)
+    
     @staticmethod
     def calculate_urgency_score(priority_level):
         """
         Calculate urgency score based on priority level (1-5)
         Returns: 0.0 to 1.5
         """
+        cls = PrioritizationService
         return Case(
-            When(priority_level=5, then=Value(Decimal('1.50'))),
-            When(priority_level=4, then=Value(Decimal('1.20'))),
-            When(priority_level=3, then=Value(Decimal('0.90'))),
-            When(priority_level=2, then=Value(Decimal('0.60'))),
-            When(priority_level=1, then=Value(Decimal('0.30'))),
-            default=Value(Decimal('0.90')),  # Default to normal priority
+            *[When(priority_level=level, then=Value(factor)) for level, factor in cls.URGENCY_LEVELS.items()],
+            default=Value(cls.URGENCY_DEFAULT),
             output_field=DecimalField(max_digits=5, decimal_places=2)
         )
     
@@ -53,9 +104,10 @@ class PrioritizationService:
         Calculate location match score
         Returns: 0.0 or 2.0
         """
+        cls = PrioritizationService
         return Case(
-            When(campus_location=user_campus, then=Value(Decimal('2.00'))),
-            When(campus_location='', then=Value(Decimal('0.50'))),  # No location specified
+            When(campus_location=user_campus, then=Value(cls.LOCATION_MATCH)),
+            When(campus_location='', then=Value(cls.LOCATION_UNSPECIFIED)),
             default=Value(Decimal('0.00')),
             output_field=DecimalField(max_digits=5, decimal_places=2)
         )
@@ -67,40 +119,41 @@ class PrioritizationService:
         Returns: 0.0 or 2.0
         """
         return Case(
-            When(preferred_doer_id=user_id, then=Value(Decimal('2.00'))),
+            When(preferred_doer_id=user_id, then=Value(PrioritizationService.PREFERENCE_MATCH)),
             default=Value(Decimal('0.00')),
             output_field=DecimalField(max_digits=5, decimal_places=2)
         )
     
     @staticmethod
-    def calculate_time_window_score():
+    def calculate_time_window_score(now=None):
         """
         Calculate time window match score
         Returns: 0.0 to 1.5
         """
-        now = timezone.now()
+        cls = PrioritizationService
+        now = now or timezone.now()
         
         return Case(
             # Within preferred time window - highest score
             When(
                 time_window_start__lte=now,
                 time_window_end__gte=now,
-                then=Value(Decimal('1.50'))
+                then=Value(cls.TIME_WINDOW_ACTIVE)
             ),
             # Same day as time window start - medium score
             When(
-                time_window_start__date=now.date(),
-                then=Value(Decimal('1.00'))
+                time_window_start__date=timezone.localdate(now),
+                then=Value(cls.TIME_WINDOW_SAME_DAY)
             ),
             # Flexible timing - low score
             When(
                 flexible_timing=True,
-                then=Value(Decimal('0.50'))
+                then=Value(cls.TIME_WINDOW_FLEXIBLE)
             ),
             # No time window specified - neutral
             When(
                 time_window_start__isnull=True,
-                then=Value(Decimal('0.30'))
+                then=Value(cls.TIME_WINDOW_UNSPECIFIED)
             ),
             default=Value(Decimal('0.00')),
             output_field=DecimalField(max_digits=5, decimal_places=2)
@@ -113,63 +166,50 @@ class PrioritizationService:
         Higher prices get higher scores
         Returns: 0.0 to 1.0
         """
-        # Normalize price: score = min(price / 1000, 1.0)
         # Tasks priced at ₱1000+ get max score
+        cases = []
+        for minimum, divisor in PrioritizationService.PRICE_TIERS[:-1]:
+            # Multiply by the reciprocal: SQLite truncates NUMERIC / NUMERIC to an integer
+            then = Value(Decimal('1.00')) if divisor is None else F('price') * Value(1 / divisor)
+            cases.append(When(price__gte=minimum, then=then))
         return ExpressionWrapper(
             Case(
-                When(price__gte=1000, then=Value(Decimal('1.00'))),
-                When(price__gte=500, then=F('price') / Value(Decimal('1000.0'))),
-                When(price__gte=100, then=F('price') / Value(Decimal('2000.0'))),
-                default=F('price') / Value(Decimal('5000.0')),
+                *cases,
+                default=F('price') * Value(1 / PrioritizationService.PRICE_TIERS[-1][1]),
                 output_field=DecimalField(max_digits=5, decimal_places=2)
             ),
             output_field=DecimalField(max_digits=5, decimal_places=2)
         )
     
     @staticmethod
-    def calculate_deadline_urgency_score():
+    def calculate_deadline_urgency_score(now=None):
         """
         Calculate deadline urgency score
         Returns: 0.2 to 1.0
         """
-        now = timezone.now()
-        one_day = now + timedelta(days=1)
-        three_days = now + timedelta(days=3)
-        one_week = now + timedelta(days=7)
+        cls = PrioritizationService
+        now = now or timezone.now()
         
         return Case(
-            # Due within 24 hours - URGENT
-            When(deadline__lte=one_day, then=Value(Decimal('1.00'))),
-            # Due within 3 days - High priority
-            When(deadline__lte=three_days, then=Value(Decimal('0.70'))),
-            # Due within 1 week - Medium priority
-            When(deadline__lte=one_week, then=Value(Decimal('0.40'))),
-            # Due later - Low priority
-            default=Value(Decimal('0.20')),
+            # Due within 24 hours / 3 days / 1 week, else low priority
+            *[When(deadline__lte=now + timedelta(days=days), then=Value(factor)) for days, factor in cls.DEADLINE_TIERS],
+            default=Value(cls.DEADLINE_DEFAULT),
             output_field=DecimalField(max_digits=5, decimal_places=2)
         )
     
     @classmethod
-    def get_prioritized_tasks(cls, tasks_queryset, user):
+    def get_prioritized_tasks(cls, tasks_queryset, user, now=None):
         """
         Apply prioritization scoring to a task queryset
         
         Args:
             tasks_queryset: Django QuerySet of Task objects
             user: User object for personalized scoring
-            
+        
         Returns:
             QuerySet with priority_score annotation, ordered by score DESC
         """
-        from core.models import Rating
-        from django.db.models import OuterRef, Subquery
-        
-        # Calculate poster rating from Rating table
-        poster_rating_subquery = Rating.objects.filter(
-            rated=OuterRef('poster')
-        ).values('rated').annotate(
-            avg_rating=Avg('score')
-        ).values('avg_rating')
+        now = now or timezone.now()
         
         # Apply all scoring factors
         prioritized_tasks = tasks_queryset.annotate(
@@ -177,18 +217,19 @@ class PrioritizationService:
             urgency_factor=cls.calculate_urgency_score(F('priority_level')),
             location_factor=cls.calculate_location_score(user.campus_location),
             preference_factor=cls.calculate_preference_score(user.id),
-            time_window_factor=cls.calculate_time_window_score(),
+            time_window_factor=cls.calculate_time_window_score(now),
             price_factor=cls.calculate_price_score(),
-            deadline_factor=cls.calculate_deadline_urgency_score(),
+            deadline_factor=cls.calculate_deadline_urgency_score(now),
             
             # Poster rating factor
-            poster_rating_value=Coalesce(
-                Subquery(poster_rating_subquery, output_field=DecimalField(max_digits=4, decimal_places=2)),
-                Value(Decimal('3.00'), output_field=DecimalField(max_digits=4, decimal_places=2)),
+            # Denormalized on the user row by RatingAggregateService (core.ratings)
+            poster_rating_value=Case(
+                When(poster__total_ratings=0, then=Value(cls.DEFAULT_POSTER_RATING)),
+                default=F('poster__avg_rating'),
                 output_field=DecimalField(max_digits=4, decimal_places=2)
             ),
             rating_factor=ExpressionWrapper(
-                (F('poster_rating_value') / Value(Decimal('5.00'))) * cls.RATING_WEIGHT,
+                F('poster_rating_value') * Value(cls.RATING_WEIGHT / cls.RATING_SCALE),
                 output_field=DecimalField(max_digits=5, decimal_places=2)
             ),
             
@@ -207,73 +248,196 @@ class PrioritizationService:
         
         return prioritized_tasks
     
+    # ==================== NUMPY BATCH PATH ====================
+    
     @classmethod
-    def get_score_breakdown(cls, task, user):
+    def invalidate_static_components(cls, *task_ids):
+        """Drop cached static components (called on task edits and deletes)"""
+        cls.static_cache.delete_many(task_ids)
+    
+    @classmethod
+    def get_static_components(cls, tasks):
         """
-        Get detailed score breakdown for a specific task
-        Useful for debugging and transparency
+        Per-task factors that depend only on the task row (urgency, price).
+        Served from the cache with one get_many; misses are computed as a
+        batch and written back together.
         
-        Returns:
-            dict with individual factor scores and total
+        Returns: {task_id: (urgency_factor, price_factor)}
         """
-        from core.models import Rating
-        
-        # Calculate each factor manually for this task
-        urgency = (task.priority_level / 5.0) * float(cls.URGENCY_WEIGHT)
+        components = cls.static_cache.get_many([task.id for task in tasks])
+        missing = [task for task in tasks if task.id not in components]
+        if missing:
+            levels = np.array([task.priority_level for task in missing])
+            urgency = np.full(len(missing), float(cls.URGENCY_DEFAULT))
+            for level, factor in cls.URGENCY_LEVELS.items():
+                urgency[levels == level] = float(factor)
+            
+            prices = np.array([float(task.price) for task in missing])
+            price = np.select(
+                [prices >= float(minimum) for minimum, _ in cls.PRICE_TIERS],
+                [np.ones(len(missing)) if divisor is None else prices / float(divisor)
+                 for _, divisor in cls.PRICE_TIERS],
+                default=0.0
+            )
+            
+            fresh = {task.id: (float(u), float(p)) for task, u, p in zip(missing, urgency, price)}
+            components.update(fresh)
+            cls.static_cache.set_many(fresh)
+        return components
+    
+    @classmethod
+    def get_task_factors(cls, tasks, now):
+        """
+        Weighted factors that depend only on the task and the clock
+        (urgency, time window, price, poster rating, deadline)
         
-        location = float(cls.LOCATION_WEIGHT) if task.campus_location == user.campus_location else 0.0
+        Returns: {factor_name: float64 array in the order of `tasks`}
+        """
+        today = timezone.localdate(now)
+        now_ts = now.timestamp()
         
-        preference = float(cls.PREFERENCE_WEIGHT) if task.preferred_doer_id == user.id else 0.0
+        static = cls.get_static_components(tasks)
+        urgency = np.array([static[task.id][0] for task in tasks])
+        price = np.array([static[task.id][1] for task in tasks])
         
         # Time window
-        now = timezone.now()
-        if task.time_window_start and task.time_window_end:
-            if task.time_window_start <= now <= task.time_window_end:
-                time_window = 1.5
-            elif task.time_window_start.date() == now.date():
-                time_window = 1.0
-            else:
-                time_window = 0.0
-        elif task.flexible_timing:
-            time_window = 0.5
-        else:
-            time_window = 0.3
-        time_window *= float(cls.TIME_WINDOW_WEIGHT)
-        
-        # Price
-        price = min(float(task.price) / 1000.0, 1.0) * float(cls.PRICE_WEIGHT)
-        
-        # Rating
-        poster_ratings = Rating.objects.filter(rated=task.poster)
-        avg_rating = poster_ratings.aggregate(Avg('score'))['score__avg'] or 3.0
-        rating = (avg_rating / 5.0) * float(cls.RATING_WEIGHT)
+        start = np.array([task.time_window_start.timestamp() if task.time_window_start else np.nan for task in tasks])
+        end = np.array([task.time_window_end.timestamp() if task.time_window_end else np.nan for task in tasks])
+        same_day = np.array([
+            bool(task.time_window_start) and timezone.localdate(task.time_window_start) == today
+            for task in tasks
+        ])
+        flexible = np.array([bool(task.flexible_timing) for task in tasks])
+        with np.errstate(invalid='ignore'):
+            active = (start <= now_ts) & (end >= now_ts)
+        time_window = np.select(
+            [active, same_day, flexible, np.isnan(start)],
+            [float(cls.TIME_WINDOW_ACTIVE), float(cls.TIME_WINDOW_SAME_DAY),
+             float(cls.TIME_WINDOW_FLEXIBLE), float(cls.TIME_WINDOW_UNSPECIFIED)],
+            default=0.0
+        )
         
         # Deadline
-        days_until = (task.deadline - now).days
-        if days_until <= 1:
-            deadline = 1.0
-        elif days_until <= 3:
-            deadline = 0.7
-        elif days_until <= 7:
-            deadline = 0.4
-        else:
-            deadline = 0.2
-        deadline *= float(cls.DEADLINE_WEIGHT)
+        deadline_ts = np.array([task.deadline.timestamp() for task in tasks])
+        deadline = np.select(
+            [deadline_ts <= now_ts + days * 86400 for days, _ in cls.DEADLINE_TIERS],
+            [float(factor) for _, factor in cls.DEADLINE_TIERS],
+            default=float(cls.DEADLINE_DEFAULT)
+        )
         
-        total = urgency + location + preference + time_window + price + rating + deadline
+        # Poster rating (denormalized on the user row)
+        poster_rating = np.array([
+            float(task.poster.avg_rating) if task.poster.total_ratings else float(cls.DEFAULT_POSTER_RATING)
+            for task in tasks
+        ])
         
         return {
-            'urgency_score': round(urgency, 2),
-            'location_score': round(location, 2),
-            'preference_score': round(preference, 2),
-            'time_window_score': round(time_window, 2),
-            'price_score': round(price, 2),
-            'rating_score': round(rating, 2),
-            'deadline_score': round(deadline, 2),
-            'total_score': round(total, 2),
-            'max_possible_score': round(float(
-                cls.URGENCY_WEIGHT + cls.LOCATION_WEIGHT + cls.PREFERENCE_WEIGHT +
-                cls.TIME_WINDOW_WEIGHT + cls.PRICE_WEIGHT + cls.RATING_WEIGHT +
-                cls.DEADLINE_WEIGHT
-            ), 2)
+            'urgency_score': urgency * float(cls.URGENCY_WEIGHT),
+            'time_window_score': time_window * float(cls.TIME_WINDOW_WEIGHT),
+            'price_score': price * float(cls.PRICE_WEIGHT),
+            'rating_score': poster_rating / float(cls.RATING_SCALE) * float(cls.RATING_WEIGHT),
+            'deadline_score': deadline * float(cls.DEADLINE_WEIGHT),
         }
+    
+    @classmethod
+    def get_doer_factors(cls, task_campus, doer_campus, preferred, size):
+        """
+        Weighted factors that depend on the doer (location, preference)
+        
+        Args:
+            task_campus: object array of task campus_location ('' if unset)
+            doer_campus: doer campus_location (scalar or array)
+            preferred: bool array, task.preferred_doer is the doer
+        """
+        location = np.select(
+            [task_campus == doer_campus, task_campus == ''],
+            [float(cls.LOCATION_MATCH), float(cls.LOCATION_UNSPECIFIED)],
+            default=0.0
+        )
+        preference = np.asarray(preferred, dtype=bool) * float(cls.PREFERENCE_MATCH)
+        return {
+            'location_score': np.broadcast_to(location * float(cls.LOCATION_WEIGHT), size),
+            'preference_score': np.broadcast_to(preference * float(cls.PREFERENCE_WEIGHT), size),
+        }
+    
+    @classmethod
+    def _assemble_breakdowns(cls, weighted, size):
+        """Turn factor arrays into rounded breakdown dicts"""
+        weighted = {name: np.broadcast_to(values, size) for name, values in weighted.items()}
+        weighted['total_score'] = sum(weighted.values())
+        rounded = {name: np.round(values, 2) for name, values in weighted.items()}
+        max_possible = cls.max_possible_score()
+        
+        return [
+            dict({name: float(values[i]) for name, values in rounded.items()}, max_possible_score=max_possible)
+            for i in range(size)
+        ]
+    
+    @classmethod
+    def get_score_breakdowns(cls, tasks, user, now=None):
+        """
+        Score breakdowns for a page of tasks in one vectorized pass
+        (no per-row queries; tasks should have poster selected)
+        
+        Returns:
+            list of breakdown dicts in the order of `tasks`
+        """
+        tasks = list(tasks)
+        if not tasks:
+            return []
+        
+        now = now or timezone.now()
+        weighted = cls.get_task_factors(tasks, now)
+        weighted.update(cls.get_doer_factors(
+            np.array([task.campus_location or '' for task in tasks], dtype=object),
+            user.campus_location,
+            [task.preferred_doer_id == user.id for task in tasks],
+            len(tasks)
+        ))
+        return cls._assemble_breakdowns(weighted, len(tasks))
+    
+    @classmethod
+    def get_candidate_breakdowns(cls, task, doers, now=None):
+        """
+        Score breakdowns of one task for many doers. The task factors are
+        computed once; only location and preference vary per doer.
+        
+        Args:
+            doers: sequence of objects/dicts with id and campus_location
+        
+        Returns:
+            list of breakdown dicts in the order of `doers`
+        """
+        doers = list(doers)
+        if not doers:
+            return []
+        
+        now = now or timezone.now()
+        get = (lambda doer, name: doer[name]) if isinstance(doers[0], dict) else getattr
+        weighted = cls.get_task_factors([task], now)
+        weighted.update(cls.get_doer_factors(
+            np.array([task.campus_location or ''], dtype=object),
+            np.array([get(doer, 'campus_location') or '' for doer in doers], dtype=object),
+            [get(doer, 'id') == task.preferred_doer_id for doer in doers],
+            len(doers)
+        ))
+        return cls._assemble_breakdowns(weighted, len(doers))
+    
+    @classmethod
+    def max_possible_score(cls):
+        return round(float(
+            cls.URGENCY_WEIGHT + cls.LOCATION_WEIGHT + cls.PREFERENCE_WEIGHT +
+            cls.TIME_WINDOW_WEIGHT + cls.PRICE_WEIGHT + cls.RATING_WEIGHT +
+            cls.DEADLINE_WEIGHT
+        ), 2)
+    
+    @classmethod
+    def get_score_breakdown(cls, task, user):
+        """
+        Get detailed score breakdown for a specific task
+        Useful for debugging and transparency
+        
+        Returns:
+            dict with individual factor scores and total
+        """
+        return cls.get_score_breakdowns([task], user)[0]
@@ -0,0 +1,272 @@
+"""
+Model signal handlers for ErrandExpress
+Keep derived state in sync with model writes:
+
+- TaskFeedEntry rows and cached score components (Task, TaskApplication)
+- User rating aggregates (Rating)
+- search index and tag facets (Task)
+- chat deltas and inbox summaries (Message, Task)
+- deadline reminder schedules and lifecycle stamps (Task)
+- revenue ledger entries for paid commissions and confirmed payments
+- cached dashboard lists of the users a write touches
+- navbar badge counters (core.badges)
+
+Bulk writes (update(), bulk_update) skip these handlers and refresh the
+same state themselves. Bulk Task deletes run inside bulk_task_delete(),
+which turns the per-row Task post_delete handlers into no-ops.
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+import logging
+
+from .models import Task, Rating, TaskApplication, Message, SystemCommission, Payment, StudentSkill, Notification
+from .badges import UserStatsCache
+from .chat import ChatPush
+from .conversations import ConversationService
+from .dashboard import DashboardService
+from .feed import TaskFeedService
+from .lifecycle import TaskLifecycleService
+from .ratings import RatingAggregateService
+from .reminders import ReminderScheduler
+from .search import TaskSearchService
+from .tags import TagService
+from .revenue import RevenueLedger
+from .services import PrioritizationService
+
+logger = logging.getLogger(__name__)
+
+_bulk_task_delete = ContextVar('bulk_task_delete', default=False)
+
+
+@contextmanager
+def bulk_task_delete():
+    """
+    Skip the per-row Task post_delete handlers (search index, tag facets,
+    score cache, dashboards, badges) for deletes inside the block. The
+    caller refreshes the same state once for the whole batch.
+    """
+    token = _bulk_task_delete.set(True)
+    try:
+        yield
+    finally:
+        _bulk_task_delete.reset(token)
+
+
+def _skip_task_delete(signal):
+    return signal is post_delete and _bulk_task_delete.get()
+
+
+@receiver(post_save, sender=Task, dispatch_uid='feed_task_saved')
+def refresh_feed_on_task_save(sender, instance, raw=False, **kwargs):
+    """Status, buckets, deadline or doer may have changed"""
+    if raw:
+        return
+    TaskFeedService.refresh_task(instance)
+    PrioritizationService.invalidate_static_components(instance.id)
+
+
+@receiver(post_save, sender=Task, dispatch_uid='chat_task_saved')
+def push_chat_access_on_task_save(sender, instance, raw=False, update_fields=None, **kwargs):
+    """Chat unlock / commission payment reaches open chat streams"""
+    if raw:
+        return
+    if update_fields is not None and not set(update_fields) & set(ChatPush.ACCESS_FIELDS):
+        return
+    ChatPush.publish_access(instance)
+
+
+@receiver(post_save, sender=Task, dispatch_uid='reminders_task_saved')
+def schedule_reminders_on_task_save(sender, instance, raw=False, update_fields=None, **kwargs):
+    """New task, moved deadline or closed task: re-enqueue (or drop) its reminders"""
+    if raw:
+        return
+    if update_fields is not None and not set(update_fields) & set(ReminderScheduler.SCHEDULE_FIELDS):
+        return
+    ReminderScheduler.sync(instance)
+
+
+@receiver(post_save, sender=Task, dispatch_uid='lifecycle_task_saved')
+def rearm_lifecycle_on_task_save(sender, instance, raw=False, update_fields=None, **kwargs):
+    """An extended deadline makes the task eligible for overdue notices again"""
+    if raw:
+        return
+    if update_fields is not None and 'deadline' not in update_fields:
+        return
+    TaskLifecycleService.reset_if_rescheduled(instance)
+
+
+@receiver(post_save, sender=Task, dispatch_uid='search_task_saved')
+def index_task_on_save(sender, instance, raw=False, update_fields=None, **kwargs):
+    """Title, tags or description may have changed"""
+    if raw:
+        return
+    if update_fields is not None and not set(update_fields) & set(TaskSearchService.TEXT_FIELDS):
+        return
+    TaskSearchService.index_tasks([instance])
+
+
+@receiver(post_delete, sender=Task, dispatch_uid='search_task_deleted')
+def unindex_task_on_delete(sender, instance, signal=None, **kwargs):
+    if _skip_task_delete(signal):
+        return
+    TaskSearchService.remove([instance.id])
+
+
+@receiver(post_save, sender=Task, dispatch_uid='tags_task_saved')
+def sync_tags_on_task_save(sender, instance, raw=False, update_fields=None, **kwargs):
+    """Tag links follow Task.tags; facet counts follow status"""
+    if raw:
+        return
+    if update_fields is not None and not set(update_fields) & set(TagService.SYNC_FIELDS):
+        return
+    TagService.sync_task(instance)
+
+
+@receiver(post_delete, sender=Task, dispatch_uid='tags_task_deleted')
+def refresh_tag_facets_on_task_delete(sender, instance, signal=None, **kwargs):
+    """Links cascade with the task; recount the tags it carried"""
+    if _skip_task_delete(signal):
+        return
+    TagService.refresh_counts_for_names(TagService.normalize(instance.tags))
+
+
+@receiver(post_save, sender=Message, dispatch_uid='chat_message_saved')
+def push_chat_message_on_save(sender, instance, created=False, raw=False, **kwargs):
+    """New messages (api_send_message, chat form posts) update inbox summaries and go to subscribers"""
+    if raw or not created:
+        return
+    ConversationService.record_message(instance)
+    ChatPush.publish_message(instance)
+
+
+@receiver(post_delete, sender=Task, dispatch_uid='score_task_deleted')
+def invalidate_scores_on_task_delete(sender, instance, signal=None, **kwargs):
+    if _skip_task_delete(signal):
+        return
+    PrioritizationService.invalidate_static_components(instance.id)
+
+
+@receiver(post_save, sender=Rating, dispatch_uid='rating_saved')
+def update_aggregates_on_rating_save(sender, instance, created=False, raw=False, **kwargs):
+    """
+    Runs inside the inserting transaction: new ratings are folded in
+    incrementally, edited scores trigger a recompute for the rated user.
+    Poster rating then feeds the static score of every task they posted.
+    """
+    if raw:
+        return
+    if created:
+        avg = RatingAggregateService.record_rating(instance).avg_rating
+    else:
+        avg = RatingAggregateService.recompute_user(instance.rated_id)
+    TaskFeedService.refresh_poster_rating(instance.rated_id, avg)
+
+
+@receiver(post_delete, sender=Rating, dispatch_uid='rating_deleted')
+def update_aggregates_on_rating_delete(sender, instance, **kwargs):
+    """Deleted ratings may have been the best/worst pointer"""
+    avg = RatingAggregateService.recompute_user(instance.rated_id)
+    if avg is not None:
+        TaskFeedService.refresh_poster_rating(instance.rated_id, avg)
+
+
+@receiver(post_save, sender=TaskApplication, dispatch_uid='feed_application_saved')
+@receiver(post_delete, sender=TaskApplication, dispatch_uid='feed_application_deleted')
+def refresh_feed_on_application_change(sender, instance, raw=False, **kwargs):
+    """3-minute application window drives feed visibility"""
+    if raw:
+        return
+    TaskFeedService.refresh_visibility(instance.task_id)
+
+
+@receiver(post_save, sender=SystemCommission, dispatch_uid='revenue_commission_saved')
+def record_revenue_on_commission_save(sender, instance, raw=False, **kwargs):
+    """Unique on the commission id, so re-saves of a paid commission are no-ops"""
+    if raw or instance.status != 'paid':
+        return
+    RevenueLedger.record_commissions(SystemCommission.objects.filter(pk=instance.pk))
+
+
+@receiver(post_save, sender=Payment, dispatch_uid='revenue_payment_saved')
+def record_revenue_on_payment_save(sender, instance, raw=False, **kwargs):
+    if raw or instance.status not in RevenueLedger.PAYMENT_STATUSES:
+        return
+    RevenueLedger.record_payments(Payment.objects.filter(pk=instance.pk))
+
+
+@receiver(post_save, sender=Task, dispatch_uid='dashboard_task_saved')
+@receiver(post_delete, sender=Task, dispatch_uid='dashboard_task_deleted')
+def invalidate_dashboard_on_task_change(sender, instance, raw=False, signal=None, **kwargs):
+    if raw or _skip_task_delete(signal):
+        return
+    DashboardService.invalidate(instance.poster_id, instance.doer_id)
+
+
+@receiver(post_save, sender=TaskApplication, dispatch_uid='dashboard_application_saved')
+@receiver(post_delete, sender=TaskApplication, dispatch_uid='dashboard_application_deleted')
+def invalidate_dashboard_on_application_change(sender, instance, raw=False, **kwargs):
+    """Poster's "applications to review" list"""
+    if raw:
+        return
+    DashboardService.invalidate(Task.objects.filter(pk=instance.task_id).values_list('poster_id', flat=True).first())
+
+
+@receiver(post_save, sender=Payment, dispatch_uid='dashboard_payment_saved')
+def invalidate_dashboard_on_payment_save(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    DashboardService.invalidate(instance.payer_id, instance.receiver_id)
+
+
+@receiver(post_save, sender=StudentSkill, dispatch_uid='dashboard_skill_saved')
+@receiver(post_delete, sender=StudentSkill, dispatch_uid='dashboard_skill_deleted')
+def invalidate_dashboard_on_skill_change(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    DashboardService.invalidate(instance.student_id)
+
+
+@receiver(post_save, sender=Message, dispatch_uid='dashboard_message_saved')
+def invalidate_dashboard_on_message_save(sender, instance, created=False, raw=False, **kwargs):
+    """A doer's first message on an open task adds it to their applications"""
+    if raw or not created:
+        return
+    DashboardService.invalidate(instance.sender_id)
+
+
+@receiver(post_save, sender=Notification, dispatch_uid='badges_notification_saved')
+def update_badges_on_notification_save(sender, instance, created=False, raw=False, **kwargs):
+    """Single creates; NotificationDispatcher bulk inserts count themselves"""
+    if raw:
+        return
+    if created:
+        if not instance.is_read:
+            UserStatsCache.incr(instance.user_id, 'unread_notifications_count')
+    else:
+        UserStatsCache.invalidate(instance.user_id, 'unread_notifications_count')
+
+
+@receiver(post_save, sender=Task, dispatch_uid='badges_task_saved')
+@receiver(post_delete, sender=Task, dispatch_uid='badges_task_deleted')
+def update_badges_on_task_change(sender, instance, raw=False, signal=None, **kwargs):
+    if raw or _skip_task_delete(signal):
+        return
+    UserStatsCache.invalidate([instance.poster_id, instance.doer_id], *UserStatsCache.TASK_FIELDS)
+
+
+@receiver(post_save, sender=Payment, dispatch_uid='badges_payment_saved')
+def update_badges_on_payment_save(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    UserStatsCache.invalidate([instance.payer_id, instance.receiver_id], 'total_earned')
+
+
+@receiver(post_save, sender=Rating, dispatch_uid='badges_rating_saved')
+@receiver(post_delete, sender=Rating, dispatch_uid='badges_rating_deleted')
+def update_badges_on_rating_change(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    UserStatsCache.invalidate(instance.rated_id, 'user_rating')
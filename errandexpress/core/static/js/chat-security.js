@@ -99,21 +99,24 @@ class ChatSecurity {
     }
     
     setupPaymentStatusListener() {
-        // Poll for payment status updates every 10 seconds
+        // Payment / unlock changes are pushed on the task's chat stream
+        if (window.EventSource) {
+            this.setupStreamListener();
+            return;
+        }
+        
+        // Fallback: poll for payment status updates every 10 seconds
         setInterval(async () => {
             await this.checkChatAccess();
         }, 10000);
-        
-        // Listen for PayMongo webhook events (if using WebSockets)
-        if (window.WebSocket) {
-            this.setupWebSocketListener();
-        }
     }
     
-    setupWebSocketListener() {
-        // This would connect to a WebSocket for real-time updates
-        // For now, we'll use polling, but this is where you'd add WebSocket logic
-        console.log('WebSocket listener setup (placeholder)');
+    setupStreamListener() {
+        const stream = new EventSource(`/api/messages/${this.taskId}/stream/`);
+        stream.addEventListener('access', async () => {
+            // Flags changed - re-check once for the full access decision
+            await this.checkChatAccess();
+        });
     }
     
     setupMessageInterception() {
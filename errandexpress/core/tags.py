@@ -0,0 +1,190 @@
+"""
+Task Tag Index for ErrandExpress
+Task.tags stays the comma-separated text posters type; TagService mirrors it
+into Tag / TaskTag rows so tag matching is an indexed equality join instead
+of an icontains scan (which also matched 'retyping' for 'typing'), and keeps
+Tag.open_task_count current for the browse page facet.
+"""
+
+from django.db.models import Count, Exists, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+import re
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class TagService:
+    """
+    Usage:
+        TagService.normalize('Typing, URGENT ,typing')     # ['typing', 'urgent']
+        tasks.filter(TagService.tagged('typing'))           # indexed filter
+        TagService.facets()                                 # precomputed counts
+        TagService.counts(tasks)                            # counts within a result set
+    """
+
+    MAX_LENGTH = 50
+    BATCH_SIZE = 1000
+
+    # Statuses counted in Tag.open_task_count
+    FACET_STATUSES = ('open',)
+
+    # Task fields whose changes affect links or facet counts
+    SYNC_FIELDS = ('tags', 'status')
+
+    @classmethod
+    def normalize(cls, raw):
+        """Unique lowercase tag names in the order typed"""
+        names = []
+        for part in (raw or '').split(','):
+            name = re.sub(r'\s+', ' ', part).strip().lower()[:cls.MAX_LENGTH]
+            if name and name not in names:
+                names.append(name)
+        return names
+
+    # ==================== WRITE PATH ====================
+
+    @classmethod
+    def tag_ids(cls, names):
+        """{name: id}, creating missing tags"""
+        from core.models import Tag
+
+        if not names:
+            return {}
+        ids = dict(Tag.objects.filter(name__in=names).values_list('name', 'id'))
+        missing = [name for name in names if name not in ids]
+        if missing:
+            Tag.objects.bulk_create([Tag(name=name) for name in missing], ignore_conflicts=True)
+            ids.update(Tag.objects.filter(name__in=missing).values_list('name', 'id'))
+        return ids
+
+    @classmethod
+    def sync_task(cls, task):
+        """Mirror task.tags into TaskTag rows and refresh the affected facet counts"""
+        from core.models import TaskTag
+
+        wanted = set(cls.tag_ids(cls.normalize(task.tags)).values())
+        current = set(TaskTag.objects.filter(task_id=task.pk).values_list('tag_id', flat=True))
+
+        if current - wanted:
+            TaskTag.objects.filter(task_id=task.pk, tag_id__in=current - wanted).delete()
+        if wanted - current:
+            TaskTag.objects.bulk_create(
+                [TaskTag(task_id=task.pk, tag_id=tag_id) for tag_id in wanted - current],
+                ignore_conflicts=True
+            )
+        cls.refresh_counts(current | wanted)
+
+    @classmethod
+    def refresh_counts(cls, tag_ids=None):
+        """Recompute open_task_count for some tags (or all) in one UPDATE"""
+        from core.models import Tag, TaskTag
+
+        if tag_ids is not None and not tag_ids:
+            return 0
+        tags = Tag.objects.all() if tag_ids is None else Tag.objects.filter(id__in=tag_ids)
+        return tags.update(open_task_count=Coalesce(
+            Subquery(
+                TaskTag.objects.filter(tag=OuterRef('pk'), task__status__in=cls.FACET_STATUSES)
+                .values('tag').annotate(n=Count('task')).values('n')[:1],
+                output_field=IntegerField()
+            ),
+            Value(0)
+        ))
+
+    @classmethod
+    def refresh_counts_for_names(cls, names):
+        """Facet refresh when only tag names are known (deleted tasks)"""
+        from core.models import Tag
+
+        if names:
+            cls.refresh_counts(list(Tag.objects.filter(name__in=names).values_list('id', flat=True)))
+
+    @classmethod
+    def rebuild(cls, tasks_queryset=None):
+        """
+        Bulk (re)build TaskTag rows. Used by the rebuild_tag_index command
+        and after bulk imports, which bypass model signals.
+
+        Returns: number of links written
+        """
+        from core.models import Task, TaskTag
+
+        if tasks_queryset is None:
+            tasks_queryset = Task.objects.all()
+
+        written = 0
+        batch = []
+
+        def flush(batch):
+            names = {name for _, raw in batch for name in cls.normalize(raw)}
+            ids = cls.tag_ids(list(names))
+            TaskTag.objects.filter(task_id__in=[task_id for task_id, _ in batch]).delete()
+            links = [
+                TaskTag(task_id=task_id, tag_id=ids[name])
+                for task_id, raw in batch
+                for name in cls.normalize(raw)
+            ]
+            TaskTag.objects.bulk_create(links, batch_size=cls.BATCH_SIZE, ignore_conflicts=True)
+            return len(links)
+
+        for row in tasks_queryset.values_list('id', 'tags').iterator(chunk_size=cls.BATCH_SIZE):
+            batch.append(row)
+            if len(batch) >= cls.BATCH_SIZE:
+                written += flush(batch)
+                batch = []
+        if batch:
+            written += flush(batch)
+
+        cls.refresh_counts()
+        logger.info(f"Tag index rebuilt: {written} links")
+        return written
+
+    # ==================== READ PATH ====================
+
+    @classmethod
+    def tagged(cls, *names):
+        """
+        Condition for tasks carrying any of these tags (an EXISTS over the
+        (tag, task) index); combines with Q, e.g. Q(category=s) | tagged(s)
+        """
+        from core.models import TaskTag
+
+        names = [name for raw in names for name in cls.normalize(raw)]
+        return Exists(TaskTag.objects.filter(task=OuterRef('pk'), tag__name__in=names))
+
+    @classmethod
+    def filter_tagged(cls, queryset, *names):
+        return queryset.filter(cls.tagged(*names))
+
+    @classmethod
+    def counts(cls, tasks_queryset, limit=None):
+        """
+        Live tag counts within a task result set, largest first.
+
+        Returns: list of {'name', 'count'}
+        """
+        from core.models import TaskTag
+
+        rows = (
+            TaskTag.objects.filter(task__in=tasks_queryset.order_by().values('pk'))
+            .values('tag__name').annotate(count=Count('task')).order_by('-count', 'tag__name')
+        )
+        if limit:
+            rows = rows[:limit]
+        return [{'name': row['tag__name'], 'count': row['count']} for row in rows]
+
+    @classmethod
+    def facets(cls, limit=20):
+        """
+        Precomputed open-task counts per tag, largest first (one indexed read).
+
+        Returns: list of {'name', 'count'}
+        """
+        from core.models import Tag
+
+        return [
+            {'name': name, 'count': count}
+            for name, count in Tag.objects.filter(open_task_count__gt=0)
+            .order_by('-open_task_count', 'name').values_list('name', 'open_task_count')[:limit]
+        ]
@@ -1,8 +1,46 @@
-from django.test import TestCase, Client
+from django.test import TestCase, Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.db import connection
+from django.db.models import Count
 from django.contrib.auth import get_user_model
+from django.core.cache import cache, caches
+from django.core.management import call_command
 from django.utils import timezone
 from datetime import timedelta
-from .models import Task, Message, Rating, Notification
+from .models import Task, Message, Rating, Notification, StudentSkill, TaskApplication, TaskAssignment, TaskFeedEntry, Tag, TaskTag, ConversationSummary, ReminderSchedule, InboundWebhookEvent, SystemCommission, SystemWallet, Payment, RevenueEntry, AnalyticsRollup
+from .feed import TaskFeedService
+from .ratings import RatingAggregateService
+from .services import PrioritizationService
+from .assignment import AssignmentEngine, CandidateSearch, solve_assignment
+from .chat import ChatPush
+from .conversations import ConversationService
+from .reminders import ReminderScheduler
+from .lifecycle import TaskLifecycleService
+from .reconciliation import PaymentReconciler, TokenBucket
+from .webhooks import WebhookQueue
+from .revenue import RevenueLedger
+from .analytics import AnalyticsRollupService
+from .dashboard import DashboardService
+from .search import TaskSearchService
+from .tags import TagService
+from .pagination import KeysetPaginator
+from .participation import TaskParticipationService
+from .badges import UserStatsCache
+from .caching import CacheNamespace, CacheStats, is_shared_backend
+from .querybudget import QueryBudget, QueryBudgetExceeded
+from .paymongo import PayMongoClient, PayMongoTransport, CircuitBreaker, CircuitOpenError
+from .pubsub import get_broker
+from .tasks import process_task_assignments, handle_overdue_tasks, auto_delete_expired_tasks
+from .notifications import NotificationDispatcher
+from .views import get_matched_tasks_for_user, get_pending_rating_obligations, calculate_assignment_score, auto_assign_task
+from .utils import check_pending_ratings
+from decimal import Decimal
+from io import StringIO
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import socket
+import threading
+import time
+import numpy as np
 import json
 
 User = get_user_model()
@@ -158,6 +196,570 @@ class MessageTests(TestCase):
         data = json.loads(response.content)
         self.assertFalse(data.get('success'))
         self.assertTrue(data.get('payment_required'))
+    
+    def test_attachment_type_stored_on_write(self):
+        """Test that attachment_type is derived once when the message is saved"""
+        image = Message.objects.create(task=self.task, sender=self.poster, message='Pic', attachment='chat_attachments/a.PNG')
+        doc = Message.objects.create(task=self.task, sender=self.poster, message='Doc', attachment='chat_attachments/a.pdf')
+        text = Message.objects.create(task=self.task, sender=self.poster, message='Text')
+        
+        self.assertEqual(image.attachment_type, 'image')
+        self.assertEqual(doc.attachment_type, 'file')
+        self.assertIsNone(text.attachment_type)
+    
+    def test_get_messages_cursor_and_etag(self):
+        """Test after= cursor returns only newer messages and unchanged polls get 304"""
+        first = Message.objects.create(task=self.task, sender=self.poster, message='First')
+        second = Message.objects.create(task=self.task, sender=self.doer, message='Second')
+        self.client.login(username='poster', password='testpass123')
+        url = f'/api/messages/{self.task.id}/'
+        
+        response = self.client.get(url, {'after': str(first.id)})
+        data = response.json()
+        self.assertEqual([msg['id'] for msg in data['messages']], [str(second.id)])
+        self.assertEqual(data['cursor'], str(second.id))
+        
+        etag = response['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        
+        Message.objects.create(task=self.task, sender=self.doer, message='Third')
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+class ChatPushTests(TestCase):
+    """Test server push of chat deltas"""
+    
+    def setUp(self):
+        """Create poster, doer and an in-progress task"""
+        self.poster = User.objects.create_user(
+            username='pushposter',
+            email='pushposter@test.com',
+            password='testpass123',
+            fullname='Push Poster',
+            role='task_poster'
+        )
+        self.doer = User.objects.create_user(
+            username='pushdoer',
+            email='pushdoer@test.com',
+            password='testpass123',
+            fullname='Push Doer',
+            role='task_doer'
+        )
+        self.task = Task.objects.create(
+            poster=self.poster,
+            doer=self.doer,
+            title='Push Task',
+            description='Test',
+            category='typing',
+            price=100,
+            deadline=timezone.now() + timedelta(days=1),
+            status='in_progress'
+        )
+        self.client = Client()
+    
+    def test_send_message_publishes_delta(self):
+        """Test that api_send_message reaches subscribers after commit"""
+        subscription = get_broker().subscribe(ChatPush.channel(self.task.id))
+        self.client.login(username='pushposter', password='testpass123')
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post('/api/send-message/',
+                json.dumps({'task_id': str(self.task.id), 'message': 'Hello'}),
+                content_type='application/json'
+            )
+        
+        event, data = subscription.get(timeout=1)
+        subscription.close()
+        self.assertEqual(event, 'message')
+        self.assertEqual(data['message'], 'Hello')
+        self.assertEqual(data['sender_id'], str(self.poster.id))
+    
+    def test_stream_replays_missed_and_pushes_live(self):
+        """Test Last-Event-ID backfill followed by live events"""
+        seen = Message.objects.create(task=self.task, sender=self.poster, message='Seen')
+        missed = Message.objects.create(task=self.task, sender=self.doer, message='Missed')
+        
+        events = ChatPush.stream(self.task, last_event_id=str(seen.id), max_seconds=1, heartbeat=0.1)
+        self.assertTrue(next(events).startswith('retry:'))
+        self.assertIn(f'id: {missed.id}', next(events))
+        
+        self.task.chat_unlocked = True
+        with self.captureOnCommitCallbacks(execute=True):
+            self.task.save(update_fields=['chat_unlocked'])
+        self.assertIn('event: access', next(events))
+        events.close()
+        self.assertEqual(get_broker().subscriber_count(ChatPush.channel(self.task.id)), 0)
+    
+    def test_cursor_keeps_messages_sharing_a_timestamp(self):
+        """Test that the (created_at, id) seek returns same-instant messages after the anchor"""
+        moment = timezone.now()
+        batch = [Message.objects.create(task=self.task, sender=self.poster, message=f'Burst {i}') for i in range(3)]
+        Message.objects.filter(id__in=[m.id for m in batch]).update(created_at=moment)
+        ordered = sorted(m.id for m in batch)
+        
+        after_first = ChatPush.messages_after(self.task.id, str(ordered[0]))
+        self.assertEqual([m.id for m in after_first], ordered[1:])
+        self.assertEqual(ChatPush.messages_after(self.task.id, str(ordered[-1])), [])
+        self.assertIsNone(ChatPush.messages_after(self.task.id, 'not-a-cursor'))
+    
+    def test_stream_requires_participant(self):
+        """Test that outsiders cannot open the stream"""
+        User.objects.create_user(
+            username='pushoutsider',
+            email='pushoutsider@test.com',
+            password='testpass123',
+            fullname='Push Outsider',
+            role='task_doer'
+        )
+        self.client.login(username='pushoutsider', password='testpass123')
+        
+        response = self.client.get(f'/api/messages/{self.task.id}/stream/')
+        self.assertEqual(response.status_code, 403)
+    
+    def test_stream_needs_shared_broker(self):
+        """Test that pages keep polling unless the broker reaches every worker"""
+        self.client.login(username='pushposter', password='testpass123')
+        
+        self.assertFalse(ChatPush.enabled())
+        response = self.client.get(f'/api/messages/{self.task.id}/stream/')
+        self.assertEqual(response.status_code, 204)
+        
+        with override_settings(PUBSUB_URL='redis://localhost:6379/0'):
+            self.assertTrue(ChatPush.enabled())
+
+
+class ConversationSummaryTests(TestCase):
+    """Test inbox summaries maintained on message insert and read"""
+    
+    def setUp(self):
+        """Create poster, doer and an in-progress task"""
+        self.poster = User.objects.create_user(
+            username='inboxposter',
+            email='inboxposter@test.com',
+            password='testpass123',
+            fullname='Inbox Poster',
+            role='task_poster'
+        )
+        self.doer = User.objects.create_user(
+            username='inboxdoer',
+            email='inboxdoer@test.com',
+            password='testpass123',
+            fullname='Inbox Doer',
+            role='task_doer'
+        )
+        self.task = Task.objects.create(
+            poster=self.poster,
+            doer=self.doer,
+            title='Inbox Task',
+            description='Test',
+            category='typing',
+            price=100,
+            deadline=timezone.now() + timedelta(days=1),
+            status='in_progress'
+        )
+        self.client = Client()
+    
+    @override_settings(STORAGES={
+        'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+        'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+    })
+    def test_summary_follows_inserts_and_reads(self):
+        """Test last message / unread counters and mark-read on opening the chat"""
+        Message.objects.create(task=self.task, sender=self.poster, message='Hi')
+        last = Message.objects.create(task=self.task, sender=self.poster, message='Are you there?')
+        
+        doer_row = ConversationSummary.objects.get(task=self.task, user=self.doer)
+        poster_row = ConversationSummary.objects.get(task=self.task, user=self.poster)
+        self.assertEqual(doer_row.last_message_id, last.id)
+        self.assertEqual(doer_row.last_message_preview, 'Are you there?')
+        self.assertEqual(doer_row.unread_count, 2)
+        self.assertEqual(poster_row.unread_count, 0)
+        self.assertEqual(ConversationService.unread_total(self.doer), 2)
+        
+        self.client.login(username='inboxdoer', password='testpass123')
+        response = self.client.get(f'/messages/{self.task.id}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['conversations'][0]['last_message']['message'], 'Are you there?')
+        doer_row.refresh_from_db()
+        self.assertEqual(doer_row.unread_count, 0)
+        self.assertIsNotNone(doer_row.last_read_at)
+    
+    def test_rebuild_matches_incremental(self):
+        """Test that rebuild_conversations reproduces the maintained rows"""
+        Message.objects.create(task=self.task, sender=self.poster, message='One')
+        Message.objects.create(task=self.task, sender=self.doer, message='Two')
+        fields = ('task_id', 'user_id', 'last_message_id', 'last_message_preview', 'last_sender_id', 'unread_count')
+        incremental = set(ConversationSummary.objects.values_list(*fields))
+        
+        call_command('rebuild_conversations', stdout=StringIO())
+        self.assertEqual(set(ConversationSummary.objects.values_list(*fields)), incremental)
+    
+    def test_rebuild_keeps_read_state(self):
+        """Test that a rebuild after mark_read counts only messages newer than last_read_at"""
+        Message.objects.create(task=self.task, sender=self.poster, message='One')
+        Message.objects.create(task=self.task, sender=self.poster, message='Two')
+        ConversationService.mark_read(self.task.id, self.doer)
+        read_at = ConversationSummary.objects.get(task=self.task, user=self.doer).last_read_at
+        
+        ConversationService.rebuild()
+        doer_row = ConversationSummary.objects.get(task=self.task, user=self.doer)
+        self.assertEqual(doer_row.unread_count, 0)
+        self.assertEqual(doer_row.last_read_at, read_at)
+        
+        Message.objects.create(task=self.task, sender=self.poster, message='Three')
+        ConversationService.rebuild()
+        self.assertEqual(ConversationSummary.objects.get(task=self.task, user=self.doer).unread_count, 1)
+        self.assertEqual(ConversationSummary.objects.get(task=self.task, user=self.poster).unread_count, 0)
+
+
+class ReminderScheduleTests(TestCase):
+    """Test precomputed deadline reminder schedules"""
+    
+    def setUp(self):
+        """Create poster, doer and an in-progress task due in 3 hours"""
+        self.poster = User.objects.create_user(
+            username='remindposter',
+            email='remindposter@test.com',
+            password='testpass123',
+            fullname='Remind Poster',
+            role='task_poster'
+        )
+        self.doer = User.objects.create_user(
+            username='reminddoer',
+            email='reminddoer@test.com',
+            password='testpass123',
+            fullname='Remind Doer',
+            role='task_doer'
+        )
+        self.task = Task.objects.create(
+            poster=self.poster,
+            doer=self.doer,
+            title='Reminder Task',
+            description='Test',
+            category='typing',
+            price=100,
+            deadline=timezone.now() + timedelta(hours=3),
+            status='in_progress'
+        )
+    
+    def test_schedule_follows_deadline_and_status(self):
+        """Test that saves re-enqueue reminders for a moved deadline and drop them on completion"""
+        tiers = dict(ReminderSchedule.objects.filter(task=self.task).values_list('tier').annotate(n=Count('id')))
+        self.assertEqual(tiers, {'24h': 1, '2h': 5, '20m': 10})
+        
+        self.task.deadline = timezone.now() + timedelta(minutes=30)
+        self.task.save()
+        deadlines = set(ReminderSchedule.objects.filter(task=self.task).values_list('deadline', flat=True))
+        self.assertEqual(deadlines, {self.task.deadline})
+        self.assertFalse(ReminderSchedule.objects.filter(task=self.task, tier='24h').exists())
+        
+        self.task.status = 'completed'
+        self.task.save(update_fields=['status'])
+        self.assertFalse(ReminderSchedule.objects.filter(task=self.task).exists())
+    
+    def test_moved_deadline_gets_new_day_ahead_reminder(self):
+        """Test that the once-only 24h reminder is once per deadline"""
+        now = timezone.now()
+        self.assertEqual(ReminderScheduler.fire_due(now), 2)
+        
+        self.task.deadline += timedelta(hours=1)
+        self.task.save()
+        self.assertEqual(ReminderScheduler.fire_due(timezone.now()), 2)
+        self.assertEqual(Notification.objects.filter(related_task=self.task, title='⏰ Task Due Tomorrow').count(), 4)
+    
+    def test_tick_claims_only_due_rows(self):
+        """Test that a tick sends due reminders once and its cost ignores tasks not yet due"""
+        now = timezone.now()
+        self.assertEqual(ReminderScheduler.fire_due(now), 2)
+        self.assertEqual(ReminderScheduler.fire_due(now), 0)
+        self.assertEqual(ReminderSchedule.objects.filter(task=self.task).count(), 15)
+        
+        # Two 2h-tier slots overdue at once collapse into one reminder each
+        later = self.task.deadline - timedelta(minutes=90)
+        with CaptureQueriesContext(connection) as few_tasks:
+            self.assertEqual(ReminderScheduler.fire_due(later), 2)
+        titles = set(Notification.objects.filter(related_task=self.task).values_list('title', flat=True))
+        self.assertIn('⏳ Urgent: Due in 90 mins', titles)
+        
+        for i in range(10):
+            Task.objects.create(
+                poster=self.poster, title=f'Later {i}', description='Test', category='typing',
+                price=100, deadline=now + timedelta(days=3), status='open'
+            )
+        with CaptureQueriesContext(connection) as many_tasks:
+            ReminderScheduler.fire_due(later + timedelta(minutes=20))
+        self.assertEqual(len(many_tasks), len(few_tasks))
+
+
+class NotificationDispatchTests(TestCase):
+    """Test buffered, deduplicated notification dispatch"""
+    
+    def setUp(self):
+        """Create poster, doer, admin and an overdue in-progress task"""
+        self.poster = User.objects.create_user(
+            username='notifposter',
+            email='notifposter@test.com',
+            password='testpass123',
+            fullname='Notif Poster',
+            role='task_poster'
+        )
+        self.doer = User.objects.create_user(
+            username='notifdoer',
+            email='notifdoer@test.com',
+            password='testpass123',
+            fullname='Notif Doer',
+            role='task_doer'
+        )
+        self.admin = User.objects.create_user(
+            username='notifadmin',
+            email='notifadmin@test.com',
+            password='testpass123',
+            fullname='Notif Admin',
+            role='admin'
+        )
+        self.task = Task.objects.create(
+            poster=self.poster,
+            doer=self.doer,
+            title='Late Task',
+            description='Test',
+            category='typing',
+            price=100,
+            deadline=timezone.now() - timedelta(hours=1),
+            status='in_progress'
+        )
+    
+    def test_overdue_job_notifies_once_and_updates_badges(self):
+        """Test that reruns are dropped by the dedupe key and cached badge counts stay exact"""
+        caches['stats'].clear()
+        self.assertEqual(UserStatsCache.get(self.poster)['unread_notifications_count'], 0)
+        
+        self.assertEqual(handle_overdue_tasks()['overdue_tasks'], 1)
+        self.assertEqual(UserStatsCache.get(self.poster)['unread_notifications_count'], 1)
+        self.assertEqual(handle_overdue_tasks()['overdue_tasks'], 0)
+        
+        counts = dict(Notification.objects.filter(related_task=self.task).values_list('user').annotate(n=Count('id')))
+        self.assertEqual(counts, {self.poster.id: 1, self.doer.id: 1})
+        self.assertEqual(Notification.objects.filter(user=self.admin, type='system_alert').count(), 1)
+    
+    def test_flush_counts_only_its_own_rows(self):
+        """Test that a row a concurrent flush landed for the same key is not counted twice"""
+        caches['stats'].clear()
+        dispatcher = NotificationDispatcher()
+        key = dispatcher.add(self.poster, 'system_message', 'Hi', 'Hello', related_task=self.task, dedupe=True)
+        # Another worker's flush of the same key, committed while this one runs
+        Notification.objects.create(
+            user=self.poster, type='system_message', title='Hi', message='Hello',
+            related_task=self.task, dedupe_key=key
+        )
+        Notification.objects.filter(dedupe_key=key).update(created_at=timezone.now() + timedelta(minutes=1))
+        before = UserStatsCache.get(self.poster)['unread_notifications_count']
+        
+        self.assertEqual(dispatcher.flush(), 0)
+        self.assertEqual(dispatcher.inserted_keys, set())
+        self.assertEqual(UserStatsCache.get(self.poster)['unread_notifications_count'], before)
+    
+    def test_dispatcher_dedupes_within_window(self):
+        """Test window buckets: same bucket deduped, next bucket sent"""
+        now = timezone.now()
+        window = timedelta(minutes=20)
+        for moment in (now, now, now + window):
+            dispatcher = NotificationDispatcher(now=moment)
+            dispatcher.add(self.doer, 'deadline_reminder', 'Soon', 'Due soon',
+                           related_task=self.task, dedupe=True, window=window)
+            dispatcher.add(self.doer, 'deadline_reminder', 'Soon', 'Due soon',
+                           related_task=self.task, dedupe=True, window=window)
+            self.assertEqual(len(dispatcher), 1)
+            dispatcher.flush()
+        
+        self.assertEqual(Notification.objects.filter(user=self.doer, type='deadline_reminder').count(), 2)
+
+
+class UserStatsCacheTests(TestCase):
+    """Test event-maintained navbar badge counters"""
+    
+    def setUp(self):
+        caches['stats'].clear()
+        self.poster = User.objects.create_user(
+            username='statsposter',
+            email='statsposter@test.com',
+            password='testpass123',
+            fullname='Stats Poster',
+            role='task_poster'
+        )
+        self.doer = User.objects.create_user(
+            username='statsdoer',
+            email='statsdoer@test.com',
+            password='testpass123',
+            fullname='Stats Doer',
+            role='task_doer'
+        )
+        self.task = Task.objects.create(
+            poster=self.poster,
+            doer=self.doer,
+            title='Stats Task',
+            description='Test',
+            category='typing',
+            price=100,
+            deadline=timezone.now() + timedelta(days=1),
+            status='in_progress'
+        )
+    
+    def test_miss_is_one_query_and_hit_is_none(self):
+        """Test the rebuild query count and task status invalidation"""
+        with self.assertNumQueries(1):
+            stats = UserStatsCache.get(self.doer)
+        self.assertEqual((stats['active_tasks'], stats['tasks_completed']), (1, 0))
+        with self.assertNumQueries(0):
+            UserStatsCache.get(self.doer)
+        
+        self.task.status = 'completed'
+        self.task.save()
+        stats = UserStatsCache.get(self.doer)
+        self.assertEqual((stats['active_tasks'], stats['tasks_completed']), (0, 1))
+    
+    def test_unread_badges_follow_events(self):
+        """Test message/notification increments and mark-read resets"""
+        UserStatsCache.get(self.poster)
+        Message.objects.create(task=self.task, sender=self.doer, message='Hi')
+        Message.objects.create(task=self.task, sender=self.doer, message='Still there?')
+        Notification.objects.create(user=self.poster, type='system_alert', title='Hi', message='Hello')
+        
+        with self.assertNumQueries(0):
+            stats = UserStatsCache.get(self.poster)
+        self.assertEqual(stats['unread_messages_count'], 2)
+        self.assertEqual(stats['unread_notifications_count'], 1)
+        
+        ConversationService.mark_read(self.task.id, self.poster)
+        self.client.force_login(self.poster)
+        self.client.post('/api/notifications/mark-as-read/')
+        stats = UserStatsCache.get(self.poster)
+        self.assertEqual((stats['unread_messages_count'], stats['unread_notifications_count']), (0, 0))
+        self.assertEqual(Notification.objects.filter(user=self.poster, is_read=False).count(), 0)
+    
+    def test_event_during_rebuild_is_not_lost(self):
+        """Test that a rebuild racing an event does not cache the older count"""
+        from unittest import mock
+        build = UserStatsCache.build
+        
+        def build_then_event(user):
+            stats = build(user)
+            Notification.objects.create(user=self.poster, type='system_alert', title='Hi', message='Racing')
+            return stats
+        
+        with mock.patch.object(UserStatsCache, 'build', side_effect=build_then_event):
+            self.assertEqual(UserStatsCache.get(self.poster)['unread_notifications_count'], 0)
+        self.assertEqual(UserStatsCache.get(self.poster)['unread_notifications_count'], 1)
+    
+    def test_short_timeout_without_shared_backend(self):
+        """Test counters expire quickly when the stats cache is per-process"""
+        self.assertFalse(is_shared_backend('stats'))
+        self.assertEqual(UserStatsCache.TIMEOUT, UserStatsCache.LOCAL_TIMEOUT)
+        self.assertEqual(UserStatsCache.cache.timeout, 60)
+
+
+class TaskLifecycleTests(TestCase):
+    """Test the set-based overdue/expiry pipeline"""
+    
+    def setUp(self):
+        """Create poster, doer and admin"""
+        self.poster = User.objects.create_user(
+            username='lifeposter',
+            email='lifeposter@test.com',
+            password='testpass123',
+            fullname='Life Poster',
+            role='task_poster'
+        )
+        self.doer = User.objects.create_user(
+            username='lifedoer',
+            email='lifedoer@test.com',
+            password='testpass123',
+            fullname='Life Doer',
+            role='task_doer'
+        )
+        self.admin = User.objects.create_user(
+            username='lifeadmin',
+            email='lifeadmin@test.com',
+            password='testpass123',
+            fullname='Life Admin',
+            role='admin'
+        )
+    
+    def create_task(self, title, status, deadline, doer=None):
+        return Task.objects.create(
+            poster=self.poster, doer=doer, title=title, description='Test',
+            category='typing', price=100, deadline=deadline, status=status
+        )
+    
+    def test_overdue_pass_stamps_tasks_and_sends_one_digest(self):
+        """Test dry run, exactly-once stamping and one admin digest per run"""
+        now = timezone.now()
+        late = [self.create_task(f'Late {i}', 'in_progress', now - timedelta(hours=1), self.doer) for i in range(3)]
+        expired = self.create_task('Nobody Applied', 'open', now - timedelta(hours=1))
+        
+        preview = TaskLifecycleService.process_overdue(dry_run=True)
+        self.assertEqual((preview['overdue'], preview['expired']), (3, 1))
+        self.assertFalse(Notification.objects.exists())
+        
+        result = TaskLifecycleService.process_overdue(chunk_size=2)
+        self.assertEqual((result['overdue'], result['expired']), (3, 1))
+        self.assertEqual(Notification.objects.filter(user=self.admin).count(), 1)
+        self.assertIn('3 Tasks Overdue', Notification.objects.get(user=self.admin).title)
+        self.assertFalse(Task.objects.filter(id__in=[t.id for t in late], overdue_notified_at__isnull=True).exists())
+        expired.refresh_from_db()
+        self.assertIsNotNone(expired.expired_at)
+        
+        self.assertEqual(handle_overdue_tasks()['overdue_tasks'], 0)
+        
+        # Extending the deadline re-arms the notice
+        expired.deadline = now + timedelta(days=1)
+        expired.save()
+        expired.refresh_from_db()
+        self.assertIsNone(expired.overdue_notified_at)
+    
+    def test_purge_removes_expired_tasks_in_chunks(self):
+        """Test chunked deletion, archive mode and dry run"""
+        now = timezone.now()
+        stale = [self.create_task(f'Stale {i}', 'open', now - timedelta(days=2)) for i in range(3)]
+        fresh = self.create_task('Recently Expired', 'open', now - timedelta(hours=2))
+        
+        self.assertEqual(auto_delete_expired_tasks(dry_run=True)['deleted_tasks'], 3)
+        self.assertEqual(Task.objects.count(), 4)
+        ReminderSchedule.objects.create(task=stale[0], tier='20m', fire_at=now, deadline=stale[0].deadline)
+        self.assertEqual(UserStatsCache.get(self.poster)['active_tasks'], 4)
+        
+        archived = TaskLifecycleService.purge_expired(chunk_size=2, archive=True)
+        self.assertEqual(archived['removed'], 3)
+        self.assertEqual(Task.objects.filter(status='cancelled', expired_at__isnull=False).count(), 3)
+        self.assertFalse(ReminderSchedule.objects.filter(task=stale[0]).exists())
+        self.assertEqual(UserStatsCache.get(self.poster)['active_tasks'], 1)
+        
+        Task.objects.filter(id__in=[t.id for t in stale]).update(status='open')
+        result = TaskLifecycleService.purge_expired(chunk_size=2)
+        self.assertEqual(result['removed'], 3)
+        self.assertEqual(list(Task.objects.values_list('id', flat=True)), [fresh.id])
+        self.assertEqual(Notification.objects.filter(user=self.poster, title='🗑️ Task Auto-Deleted').count(), 3)
+    
+    def test_purge_refreshes_derived_state_once_per_chunk(self):
+        """Deleted chunks skip the per-row post_delete work and refresh it in bulk"""
+        now = timezone.now()
+        stale = [self.create_task(f'Stale errand {i}', 'open', now - timedelta(days=2)) for i in range(4)]
+        for task in stale:
+            task.tags = 'groceries, errands'
+            task.save()
+        self.assertEqual(TagService.facets()[0]['count'], 4)
+        self.assertEqual(UserStatsCache.get(self.poster)['active_tasks'], 4)
+        
+        with CaptureQueriesContext(connection) as ctx:
+            result = TaskLifecycleService.purge_expired(chunk_size=2)
+        self.assertEqual(result['removed'], 4)
+        tag_refreshes = [q for q in ctx.captured_queries if q['sql'].startswith('UPDATE "core_tag"')]
+        self.assertEqual(len(tag_refreshes), 2)
+        
+        self.assertFalse(Tag.objects.filter(open_task_count__gt=0).exists())
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT COUNT(*) FROM {TaskSearchService.FTS_TABLE}')
+            self.assertEqual(cursor.fetchone()[0], 0)
+        self.assertEqual(UserStatsCache.get(self.poster)['active_tasks'], 0)
 
 
 class RatingTests(TestCase):
@@ -218,6 +820,47 @@ class RatingTests(TestCase):
         ratings = Rating.objects.filter(rated=self.rated)
         avg = sum(r.score for r in ratings) / ratings.count()
         self.assertEqual(avg, 8)
+    
+    def test_rating_aggregates_maintained(self):
+        """Test that sum/count/avg and best/worst pointers follow rating writes"""
+        other_task = Task.objects.create(
+            poster=self.rater,
+            doer=self.rated,
+            title='Second Task',
+            description='Test',
+            category='typing',
+            price=100,
+            deadline=timezone.now() + timedelta(days=1),
+            status='completed'
+        )
+        low = Rating.objects.create(task=self.task, rater=self.rater, rated=self.rated, score=4)
+        high = Rating.objects.create(task=other_task, rater=self.rater, rated=self.rated, score=9)
+        
+        self.rated.refresh_from_db()
+        self.assertEqual(self.rated.rating_sum, 13)
+        self.assertEqual(self.rated.total_ratings, 2)
+        self.assertEqual(self.rated.avg_rating, Decimal('6.50'))
+        self.assertEqual(self.rated.best_rating, high)
+        self.assertEqual(self.rated.worst_rating, low)
+        
+        high.delete()
+        self.rated.refresh_from_db()
+        self.assertEqual(self.rated.total_ratings, 1)
+        self.assertEqual(self.rated.avg_rating, Decimal('4.00'))
+        self.assertEqual(self.rated.best_rating, low)
+    
+    def test_verify_ratings_repairs_drift(self):
+        """Test that verify_ratings repairs stale aggregates in bulk"""
+        rating = Rating.objects.create(task=self.task, rater=self.rater, rated=self.rated, score=7)
+        User.objects.filter(id=self.rated.id).update(rating_sum=0, total_ratings=0, avg_rating=0, best_rating=None)
+        
+        self.assertEqual(len(RatingAggregateService.recompute(dry_run=True)), 1)
+        call_command('verify_ratings', stdout=StringIO())
+        
+        self.rated.refresh_from_db()
+        self.assertEqual(self.rated.avg_rating, Decimal('7.00'))
+        self.assertEqual(self.rated.best_rating, rating)
+        self.assertEqual(RatingAggregateService.recompute(dry_run=True), [])
 
 
 class PaymentTests(TestCase):
@@ -303,41 +946,663 @@ class PaymentTests(TestCase):
             )
 
 
-class MonitoringTests(TestCase):
-    """Test task monitoring and feedback system"""
+class _PayMongoStandIn(BaseHTTPRequestHandler):
+    """Local stand-in for GET /payment_intents/<id> (keep-alive, records callers)"""
+    protocol_version = 'HTTP/1.1'
+    requests_seen = []
+    posts_seen = []
+    failed_once = set()
+    
+    def do_GET(self):
+        intent_id = self.path.rstrip('/').split('/')[-1]
+        self.requests_seen.append((intent_id, self.client_address[1]))
+        if intent_id.startswith('pi_flaky') and intent_id not in self.failed_once:
+            self.failed_once.add(intent_id)
+            return self.reply(503, {'errors': [{'detail': 'try again'}]})
+        status = 'succeeded' if intent_id.startswith(('pi_paid', 'pi_flaky')) else 'awaiting_payment_method'
+        self.reply(200, {'data': {'id': intent_id, 'attributes': {'status': status}}})
+    
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        self.posts_seen.append((self.path, self.headers.get('Idempotency-Key')))
+        if self.path.endswith('/sources') and self.path not in self.failed_once:
+            self.failed_once.add(self.path)
+            return self.reply(503, {'errors': [{'detail': 'try again'}]})
+        attributes = json.loads(body)['data']['attributes']
+        self.reply(200, {'data': {'id': 'src_standin', 'attributes': attributes}})
+    
+    def reply(self, code, body):
+        payload = json.dumps(body).encode()
+        self.send_response(code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+    
+    def log_message(self, *args):
+        pass
+
+
+class PayMongoStandInTestCase(TestCase):
+    """Runs _PayMongoStandIn on a free local port for the test class"""
+    
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), _PayMongoStandIn)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.base_url = f'http://127.0.0.1:{cls.server.server_address[1]}/v1'
+    
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
     
     def setUp(self):
-        """Create test users and task"""
-        self.poster = User.objects.create_user(
-            username='poster',
-            email='poster@test.com',
-            password='testpass123',
-            fullname='Test Poster',
-            role='task_poster'
-        )
-        self.doer = User.objects.create_user(
-            username='doer',
-            email='doer@test.com',
-            password='testpass123',
-            fullname='Test Doer',
-            role='task_doer'
-        )
-        self.task = Task.objects.create(
-            poster=self.poster,
-            doer=self.doer,
-            title='Test Task',
-            description='Test',
-            category='typing',
-            price=100,
-            deadline=timezone.now() + timedelta(days=1),
-            status='completed'
+        _PayMongoStandIn.requests_seen = []
+        _PayMongoStandIn.posts_seen = []
+        _PayMongoStandIn.failed_once = set()
+    
+    def transport(self, **kwargs):
+        transport = PayMongoTransport(base_url=self.base_url, secret_key='sk_test', **kwargs)
+        transport.BACKOFF_SECONDS = 0.01
+        return transport
+
+
+class PayMongoTransportTests(PayMongoStandInTestCase):
+    """Test the pooled PayMongo transport"""
+    
+    def test_creates_retry_with_one_idempotency_key(self):
+        """Test that a 503 on a create is retried with the same key and metered per endpoint"""
+        transport = self.transport()
+        source = PayMongoClient(transport=transport).create_source(
+            50, success_url='https://example.com/ok', failed_url='https://example.com/failed'
         )
-        self.client = Client()
+        
+        self.assertEqual(source['data']['attributes']['amount'], 5000)
+        keys = [key for _, key in _PayMongoStandIn.posts_seen]
+        self.assertEqual(len(keys), 2)
+        self.assertEqual(len(set(keys)), 1)
+        self.assertIsNotNone(keys[0])
+        stats = transport.metrics.snapshot()['POST /sources']
+        self.assertEqual((stats['requests'], stats['errors'], stats['retries']), (2, 1, 1))
     
-    def test_task_monitoring_access(self):
-        """Test task monitoring dashboard access"""
-        self.client.login(username='poster', password='testpass123')
-        response = self.client.get('/monitoring/')
+    def test_circuit_breaker_fails_fast_and_recovers(self):
+        """Test that repeated connection failures open the circuit until a trial succeeds"""
+        with socket.socket() as sock:
+            sock.bind(('127.0.0.1', 0))
+            dead_port = sock.getsockname()[1]
+        transport = self.transport(breaker=CircuitBreaker(failure_threshold=2, reset_timeout=60))
+        transport.base_url = f'http://127.0.0.1:{dead_port}/v1'
+        
+        with self.assertRaises(CircuitOpenError):
+            transport.request('GET', '/payment_intents/pi_dead')
+        self.assertEqual(transport.breaker.state, 'open')
+        self.assertIsNone(PayMongoClient(transport=transport).retrieve_payment_intent('pi_dead'))
+        stats = transport.metrics.snapshot()['GET /payment_intents/:id']
+        self.assertEqual((stats['errors'], stats['rejected']), (2, 2))
+        
+        transport.base_url = self.base_url
+        transport.breaker.reset_timeout = 0
+        self.assertEqual(transport.request('GET', '/payment_intents/pi_paid_1').status_code, 200)
+        self.assertEqual(transport.breaker.state, 'closed')
+    
+    def test_half_open_trial_always_records_an_outcome(self):
+        """Test that a non-connection RequestException on the trial call does not wedge the circuit"""
+        from requests.exceptions import ChunkedEncodingError
+        
+        transport = self.transport(breaker=CircuitBreaker(failure_threshold=1, reset_timeout=0))
+        transport.breaker.record_failure()
+        session = transport.session
+        
+        def broken(*args, **kwargs):
+            raise ChunkedEncodingError('Connection broken')
+        transport.session = type('Broken', (), {'request': staticmethod(broken)})()
+        with self.assertRaises(ChunkedEncodingError):
+            transport.request('GET', '/payment_intents/pi_paid_1')
+        
+        transport.session = session
+        self.assertEqual(transport.request('GET', '/payment_intents/pi_paid_1').status_code, 200)
+        self.assertEqual(transport.breaker.state, 'closed')
+
+
+class PaymentReconciliationTests(PayMongoStandInTestCase):
+    """Test concurrent reconciliation against a local PayMongo stand-in"""
+    
+    def setUp(self):
+        """Create pending payments that are old enough to reconcile"""
+        from .models import Payment
+        super().setUp()
+        
+        poster = User.objects.create_user(
+            username='reconposter', email='reconposter@test.com', password='testpass123',
+            fullname='Recon Poster', role='task_poster'
+        )
+        doer = User.objects.create_user(
+            username='recondoer', email='recondoer@test.com', password='testpass123',
+            fullname='Recon Doer', role='task_doer'
+        )
+        intent_ids = [f'pi_paid_{i}' for i in range(8)] + ['pi_flaky_1', 'pi_open_1', 'pi_open_2']
+        for intent_id in intent_ids:
+            task = Task.objects.create(
+                poster=poster, doer=doer, title=intent_id, description='Test', category='typing',
+                price=100, deadline=timezone.now() + timedelta(days=1), status='completed'
+            )
+            Payment.objects.create(
+                task=task, payer=poster, receiver=doer, amount=110,
+                method='paymongo', paymongo_payment_id=intent_id
+            )
+        Payment.objects.update(created_at=timezone.now() - timedelta(hours=2))
+    
+    def test_reconciles_concurrently_over_pooled_connections(self):
+        """Test bulk confirmation, retry of a 503 and keep-alive connection reuse"""
+        from .models import Payment
+        
+        doer = User.objects.get(username='recondoer')
+        self.assertEqual(UserStatsCache.get(doer)['total_earned'], 0)
+        
+        reconciler = PaymentReconciler(transport=self.transport(pool_size=4), workers=4, rate=1000)
+        with CaptureQueriesContext(connection) as queries:
+            result = reconciler.run()
+        
+        self.assertEqual((result['checked'], result['confirmed'], result['unreachable']), (11, 9, 0))
+        # Pending read, bulk confirm, and the ledger read + bulk insert
+        self.assertEqual(len(queries), 4)
+        self.assertEqual(Payment.objects.filter(status='confirmed').count(), 9)
+        self.assertEqual(RevenueEntry.objects.filter(source_type='payment').count(), 9)
+        self.assertEqual(UserStatsCache.get(doer)['total_earned'], 990)
+        self.assertEqual(len(_PayMongoStandIn.requests_seen), 12)
+        self.assertLessEqual(len({port for _, port in _PayMongoStandIn.requests_seen}), 4)
+        
+        # Nothing left to confirm on the next run
+        self.assertEqual(PaymentReconciler(transport=self.transport(), rate=1000).run()['checked'], 2)
+    
+    def test_token_bucket_limits_rate(self):
+        """Test that requests beyond the burst wait for refill"""
+        bucket = TokenBucket(rate=50, capacity=1)
+        started = time.monotonic()
+        for _ in range(6):
+            bucket.acquire()
+        self.assertGreaterEqual(time.monotonic() - started, 0.09)
+
+
+class WebhookIngestTests(TestCase):
+    """Test ingest-then-process PayMongo webhooks"""
+    
+    def setUp(self):
+        """Create a task with a pending system fee"""
+        self.client = Client()
+        self.poster = User.objects.create_user(
+            username='hookposter',
+            email='hookposter@test.com',
+            password='testpass123',
+            fullname='Hook Poster',
+            role='task_poster'
+        )
+        self.task = Task.objects.create(
+            poster=self.poster, title='Hook Task', description='Test', category='typing',
+            price=20, deadline=timezone.now() + timedelta(days=1), status='in_progress'
+        )
+    
+    def event(self, event_id):
+        return json.dumps({'data': {'id': event_id, 'attributes': {'type': 'payment.paid', 'data': {
+            'id': f'pay_{event_id}',
+            'attributes': {'amount': 200, 'description': f'ErrandExpress System Fee - {self.task.id}'}
+        }}}})
+    
+    @override_settings(PAYMONGO_WEBHOOK_SECRET=None)
+    def test_webhook_stores_event_once_and_worker_applies_it(self):
+        """Test that retries are deduplicated, work is deferred, and replays are idempotent"""
+        SystemCommission.objects.create(task=self.task, payer=self.poster, amount=2, method='online')
+        
+        for duplicate in (False, True):
+            response = self.client.post('/webhook/paymongo/', data=self.event('evt_1'), content_type='application/json')
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.json()['duplicate'], duplicate)
+        self.assertEqual(InboundWebhookEvent.objects.count(), 1)
+        self.assertEqual(SystemCommission.objects.get(task=self.task).status, 'pending')
+        
+        self.assertEqual(WebhookQueue.process_pending()['processed'], 1)
+        self.task.refresh_from_db()
+        self.assertTrue(self.task.chat_unlocked)
+        self.assertEqual(InboundWebhookEvent.objects.get().outcome, 'system_fee')
+        
+        WebhookQueue.replay(InboundWebhookEvent.objects.all())
+        WebhookQueue.process_pending()
+        self.assertEqual(InboundWebhookEvent.objects.get().outcome, 'already_applied')
+        RevenueLedger.rollup()
+        self.assertEqual(SystemWallet.get_or_create_wallet().total_revenue, Decimal('2.00'))
+    
+    def test_failed_event_holds_back_later_events_for_its_task(self):
+        """Test per-task ordering: later events wait until the failed one succeeds"""
+        first, _ = WebhookQueue.ingest(self.event('evt_a').encode())
+        second, _ = WebhookQueue.ingest(self.event('evt_b').encode())
+        InboundWebhookEvent.objects.filter(id=second.id).update(received_at=first.received_at + timedelta(seconds=1))
+        
+        # No SystemCommission yet: the first event fails
+        result = WebhookQueue.process_pending()
+        self.assertEqual((result['processed'], result['failed']), (0, 1))
+        self.assertEqual(InboundWebhookEvent.objects.get(id=second.id).status, 'pending')
+        
+        SystemCommission.objects.create(task=self.task, payer=self.poster, amount=2, method='online')
+        self.assertEqual(WebhookQueue.process_pending()['processed'], 2)
+        outcomes = list(InboundWebhookEvent.objects.order_by('received_at').values_list('outcome', flat=True))
+        self.assertEqual(outcomes, ['system_fee', 'already_applied'])
+    
+    @override_settings(PAYMONGO_WEBHOOK_SECRET=None, CELERY_WORKERS=False)
+    def test_webhook_request_never_processes_without_worker(self):
+        """Test that the request only stores the event; the cron job applies it"""
+        SystemCommission.objects.create(task=self.task, payer=self.poster, amount=2, method='online')
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post('/webhook/paymongo/', data=self.event('evt_inline'), content_type='application/json')
+        self.assertEqual(InboundWebhookEvent.objects.get().status, 'pending')
+    
+    @override_settings(CRON_SECRET='cron-secret')
+    def test_cron_endpoint_runs_beat_job(self):
+        """Test the cron fallback for hosts without a beat process"""
+        WebhookQueue.ingest(self.event('evt_cron').encode())
+        SystemCommission.objects.create(task=self.task, payer=self.poster, amount=2, method='online')
+        
+        url = '/api/cron/process-webhook-events/'
+        self.assertEqual(self.client.get(url).status_code, 403)
+        self.assertEqual(self.client.get('/api/cron/no-such-job/', HTTP_AUTHORIZATION='Bearer cron-secret').status_code, 404)
+        response = self.client.get(url, HTTP_AUTHORIZATION='Bearer cron-secret')
+        self.assertEqual(response.json()['result']['processed'], 1)
+
+
+class RevenueLedgerTests(TestCase):
+    """Test the append-only revenue ledger and its rollups"""
+    
+    def setUp(self):
+        """Create a completed task with a doer"""
+        self.client = Client()
+        self.poster = User.objects.create_user(
+            username='ledgerposter',
+            email='ledgerposter@test.com',
+            password='testpass123',
+            fullname='Ledger Poster',
+            role='task_poster'
+        )
+        self.doer = User.objects.create_user(
+            username='ledgerdoer',
+            email='ledgerdoer@test.com',
+            password='testpass123',
+            fullname='Ledger Doer',
+            role='task_doer'
+        )
+        self.task = Task.objects.create(
+            poster=self.poster, doer=self.doer, title='Ledger Task', description='Test', category='typing',
+            price=100, deadline=timezone.now() + timedelta(days=1), status='completed'
+        )
+    
+    def test_paid_sources_are_recorded_once_and_rolled_up(self):
+        """Test that re-saves do not double count and reads match before and after rollup"""
+        commission = SystemCommission.objects.create(task=self.task, payer=self.poster, amount=10, method='online')
+        self.assertEqual(RevenueEntry.objects.count(), 0)
+        commission.status = 'paid'
+        commission.paid_at = timezone.now()
+        commission.save()
+        commission.save()
+        Payment.objects.create(
+            task=self.task, payer=self.poster, receiver=self.doer, amount=110,
+            method='paymongo', status='confirmed', confirmed_at=timezone.now()
+        )
+        self.assertEqual(RevenueEntry.objects.count(), 2)
+        
+        before = RevenueLedger.totals()
+        self.assertEqual(before, {'total': Decimal('20.00'), 'entries': 2})
+        self.assertEqual(RevenueLedger.rollup()['entries'], 2)
+        self.assertEqual(RevenueLedger.rollup()['entries'], 0)
+        self.assertEqual(RevenueLedger.totals(), before)
+        self.assertEqual(RevenueLedger.by_category(), [{'category': 'typing', 'total': Decimal('20.00')}])
+        
+        wallet = SystemWallet.get_or_create_wallet()
+        self.assertEqual((wallet.total_revenue, wallet.total_transactions), (Decimal('20.00'), 2))
+        
+        # Manual credits land in the tail until the next rollup
+        wallet.add_revenue(5, 'Adjustment')
+        self.assertEqual(RevenueLedger.totals()['total'], Decimal('25.00'))
+        today = timezone.localdate()
+        self.assertEqual(RevenueLedger.daily_series(since=today)[today], Decimal('25.00'))
+    
+    @override_settings(STORAGES={
+        'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+        'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+    })
+    def test_wallet_page_reads_the_ledger(self):
+        """Test that system_wallet reports ledger totals"""
+        User.objects.create_user(
+            username='ledgeradmin', email='ledgeradmin@test.com', password='testpass123',
+            fullname='Ledger Admin', role='admin'
+        )
+        SystemCommission.objects.create(
+            task=self.task, payer=self.poster, amount=10, method='online', status='paid', paid_at=timezone.now()
+        )
+        RevenueLedger.rollup()
+        self.client.login(username='ledgeradmin', password='testpass123')
+        
+        response = self.client.get('/system-wallet/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['total_revenue'], Decimal('10.00'))
+        self.assertEqual(response.context['monthly_commissions'], 1)
+
+
+class AnalyticsRollupTests(TestCase):
+    """Test pre-aggregated dashboard counters"""
+    
+    def setUp(self):
+        """Create a poster with tasks in different states"""
+        self.poster = User.objects.create_user(
+            username='statsposter',
+            email='statsposter@test.com',
+            password='testpass123',
+            fullname='Stats Poster',
+            role='task_poster'
+        )
+        for status, category in (('open', 'typing'), ('completed', 'typing'), ('in_progress', 'microtask')):
+            Task.objects.create(
+                poster=self.poster, title=f'Stats {status}', description='Test', category=category,
+                price=50, deadline=timezone.now() + timedelta(days=1), status=status,
+                completed_at=timezone.now() if status == 'completed' else None
+            )
+    
+    def test_summary_reads_snapshot_and_weekly_flows(self):
+        """Test that the dashboard counters come from two rollup queries"""
+        AnalyticsRollupService.refresh()
+        with self.assertNumQueries(2):
+            stats = AnalyticsRollupService.summary()
+        
+        self.assertEqual(stats['tasks']['all'], 3)
+        self.assertEqual(stats['tasks']['status:open'], 1)
+        self.assertEqual(stats['users']['role:task_poster'], 1)
+        self.assertEqual(stats['week'], {'tasks_created': 3, 'tasks_completed': 1, 'users_joined': 1})
+        self.assertEqual(
+            AnalyticsRollupService.breakdown(stats['tasks'], 'category'),
+            [{'category': 'typing', 'count': 2}, {'category': 'microtask', 'count': 1}]
+        )
+        
+        # Counters move on the next refresh, not on every write
+        Task.objects.filter(status='open').update(status='cancelled')
+        self.assertEqual(AnalyticsRollupService.summary()['tasks']['status:open'], 1)
+        AnalyticsRollupService.refresh()
+        self.assertNotIn('status:open', AnalyticsRollupService.summary()['tasks'])
+    
+    def test_refresh_catches_up_missed_days(self):
+        """Test that a refresh recomputes every day since the last run"""
+        now = timezone.now()
+        AnalyticsRollupService.refresh(now=now - timedelta(days=3))
+        Task.objects.filter(status='open').update(created_at=now - timedelta(days=2))
+        
+        result = AnalyticsRollupService.refresh(now=now)
+        self.assertEqual(result['days'], 4)
+        two_days_ago = timezone.localtime(now - timedelta(days=2)).date()
+        self.assertEqual(
+            AnalyticsRollup.objects.get(day=two_days_ago, metric='tasks_created', dimension='all').value, 1
+        )
+        self.assertEqual(AnalyticsRollupService.summary(now)['week']['tasks_created'], 3)
+
+
+class DashboardServiceTests(TestCase):
+    """Test dashboard metrics aggregation and cached widget lists"""
+    
+    def setUp(self):
+        """Create a poster and a doer with tasks in different states"""
+        cache.clear()
+        self.client = Client()
+        self.poster = User.objects.create_user(
+            username='dashposter',
+            email='dashposter@test.com',
+            password='testpass123',
+            fullname='Dash Poster',
+            role='task_poster'
+        )
+        self.doer = User.objects.create_user(
+            username='dashdoer',
+            email='dashdoer@test.com',
+            password='testpass123',
+            fullname='Dash Doer',
+            role='task_doer'
+        )
+        for status, price in (('open', 50), ('in_progress', 120), ('completed', 80)):
+            Task.objects.create(
+                poster=self.poster, doer=None if status == 'open' else self.doer,
+                title=f'Dash {status}', description='Test', category='microtask', price=price,
+                deadline=timezone.now() + timedelta(days=1), status=status,
+                accepted_at=timezone.now() - timedelta(hours=3) if status == 'completed' else None,
+                completed_at=timezone.now() if status == 'completed' else None
+            )
+    
+    def test_metrics_use_one_query_per_role(self):
+        """Test that each role's metrics come from a single conditional aggregate"""
+        with self.assertNumQueries(1):
+            poster = DashboardService.metrics(self.poster)
+        self.assertEqual((poster['active_count'], poster['completed_count'], poster['total_assigned']), (2, 1, 2))
+        self.assertEqual(poster['success_rate'], 50)
+        self.assertAlmostEqual(poster['avg_completion_hours'], 3, places=1)
+        
+        with self.assertNumQueries(1):
+            doer = DashboardService.metrics(self.doer)
+        self.assertEqual((doer['completed_count'], doer['in_progress_count']), (1, 1))
+        self.assertEqual((doer['monthly_earnings'], doer['pending_earnings']), (80, 120))
+    
+    def test_widget_lists_are_cached_until_a_related_write(self):
+        """Test cache hits, signal invalidation and the JSON variant"""
+        self.assertEqual(len(DashboardService.widgets(self.poster)['recent_tasks']), 3)
+        with self.assertNumQueries(0):
+            DashboardService.widgets(self.poster)
+        
+        Task.objects.create(
+            poster=self.poster, title='Dash new', description='Test', category='microtask', price=30,
+            deadline=timezone.now() + timedelta(days=1)
+        )
+        self.assertEqual(DashboardService.widgets(self.poster)['recent_tasks'][0].title, 'Dash new')
+        
+        self.client.login(username='dashdoer', password='testpass123')
+        data = self.client.get('/api/dashboard/widgets/').json()
+        self.assertEqual(data['metrics']['completed_count'], 1)
+        self.assertEqual([task['title'] for task in data['widgets']['current_work']], ['Dash in_progress'])
+
+
+
+class CacheLayerTests(TestCase):
+    """Test namespaced/versioned cache keys and per-request cache stats"""
+    
+    def setUp(self):
+        cache.clear()
+        caches['stats'].clear()
+    
+    def test_namespace_version_bump_drops_only_its_keys(self):
+        """Test key isolation between namespaces and versioned invalidation"""
+        first, second = CacheNamespace('ns_a', timeout=60), CacheNamespace('ns_b', timeout=60)
+        first.set(('item', 1), 'a1')
+        second.set(('item', 1), 'b1')
+        self.assertEqual(first.get_many([('item', 1), ('item', 2)]), {('item', 1): 'a1'})
+        
+        first.invalidate()
+        self.assertIsNone(first.get(('item', 1)))
+        self.assertEqual(second.get(('item', 1)), 'b1')
+        self.assertEqual(first.get_or_set(('item', 1), lambda: 'a2'), 'a2')
+        self.assertEqual(first.get(('item', 1)), 'a2')
+    
+    @override_settings(CACHE_STATS_ENABLED=True)
+    def test_middleware_reports_hits_and_misses_per_namespace(self):
+        """Test the Server-Timing header and the shared totals behind cache_report"""
+        user = User.objects.create_user(
+            username='cachestats',
+            email='cachestats@test.com',
+            password='testpass123',
+            fullname='Cache Stats',
+            role='task_poster'
+        )
+        client = Client()
+        client.force_login(user)
+        
+        first = client.get('/api/dashboard/widgets/')
+        second = client.get('/api/dashboard/widgets/')
+        self.assertIn('cache-dashboard', first['Server-Timing'])
+        self.assertIn('0 hit / 1 miss', first['Server-Timing'])
+        self.assertIn('1 hit / 0 miss', second['Server-Timing'])
+        
+        totals = CacheStats.totals()['dashboard']
+        self.assertEqual((totals['requests'], totals['hits'], totals['misses']), (2, 1, 1))
+        self.assertEqual(totals['hit_rate'], 0.5)
+        
+        out = StringIO()
+        call_command('cache_report', '--reset', stdout=out)
+        self.assertIn('dashboard', out.getvalue())
+        self.assertEqual(CacheStats.totals(), {})
+
+
+class QueryBudgetTests(TestCase):
+    """Test per-view query budgets and N+1 detection"""
+    
+    def setUp(self):
+        cache.clear()
+        caches['stats'].clear()
+        self.poster = User.objects.create_user(
+            username='budgetposter',
+            email='budgetposter@test.com',
+            password='testpass123',
+            fullname='Budget Poster',
+            role='task_poster'
+        )
+        self.doer = User.objects.create_user(
+            username='budgetdoer',
+            email='budgetdoer@test.com',
+            password='testpass123',
+            fullname='Budget Doer',
+            role='task_doer'
+        )
+        self.admin = User.objects.create_user(
+            username='budgetadmin',
+            email='budgetadmin@test.com',
+            password='testpass123',
+            fullname='Budget Admin',
+            role='admin'
+        )
+        StudentSkill.objects.create(student=self.doer, skill_name='typing', status='verified')
+        StudentSkill.objects.create(student=self.doer, skill_name='powerpoint', status='pending')
+        
+        def task(**fields):
+            return Task.objects.create(
+                poster=self.poster, title='Budget task', description='Test', category='microtask',
+                price=100, deadline=timezone.now() + timedelta(days=2), **fields
+            )
+        self.open_tasks = [task() for _ in range(3)]
+        self.active = task(doer=self.doer, status='in_progress')
+        self.completed = [task(doer=self.doer, status='completed') for _ in range(3)]
+        for done in self.completed:
+            Payment.objects.create(
+                task=done, payer=self.poster, receiver=self.doer, amount=100, method='cod',
+                status='confirmed', paymongo_payment_id=f'pay_{done.id.hex}'
+            )
+            Rating.objects.create(task=done, rater=self.poster, rated=self.doer, score=8)
+            Rating.objects.create(task=done, rater=self.doer, rated=self.poster, score=8)
+        TaskApplication.objects.create(task=self.open_tasks[0], doer=self.doer, cover_letter='Pick me')
+        for i in range(3):
+            Message.objects.create(task=self.active, sender=self.poster, message=f'Update {i}')
+            Notification.objects.create(user=self.doer, type='system_message', title='Hi', message='Hello')
+    
+    @override_settings(QUERY_BUDGET_ENABLED=True, QUERY_BUDGET_MODE='raise', STORAGES={
+        'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+        'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+    })
+    def test_top_views_stay_within_budgets(self):
+        """Test the 20 most used pages on cold caches; a violation raises QueryBudgetExceeded"""
+        pages = {
+            self.poster: [
+                '/', '/dashboard/', '/my-tasks/', f'/tasks/{self.open_tasks[0].id}/',
+                f'/tasks/{self.open_tasks[0].id}/applications/', '/payments/', '/monitoring/',
+                '/messages/', f'/chat/{self.active.id}/', f'/api/messages/{self.active.id}/',
+            ],
+            self.doer: [
+                '/tasks/browse/', '/notifications/', '/api/notifications/recent/', '/api/notifications/count/',
+                '/skills/', '/api/dashboard/widgets/', '/api/tasks/updates/', f'/tasks/{self.open_tasks[1].id}/apply/',
+            ],
+            self.admin: ['/admin-dashboard/skills/', '/system-wallet/'],
+        }
+        endpoints = set()
+        for user, urls in pages.items():
+            self.client.force_login(user)
+            for url in urls:
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200, url)
+                self.assertIn('db;dur=', response['Server-Timing'])
+                endpoints.add(response.resolver_match.view_name)
+        self.assertEqual(len(endpoints), 20)
+        self.assertEqual(set(QueryBudget.totals()), endpoints)
+    
+    @override_settings(QUERY_BUDGET_ENABLED=True, QUERY_BUDGET_MODE='warn', QUERY_BUDGET_REPEAT_THRESHOLD=3,
+                       QUERY_BUDGETS={'notifications': 1})
+    def test_repeated_statements_are_flagged_and_reported(self):
+        """Test fingerprinting, N+1 flags, warn/raise modes and the query_report summary"""
+        self.assertEqual(
+            QueryBudget.fingerprint("SELECT 1 FROM t WHERE id IN (%s, %s) AND name = 'x' LIMIT 21"),
+            QueryBudget.fingerprint("SELECT 1 FROM t WHERE id IN (%s) AND name = 'yz' LIMIT 1")
+        )
+        with QueryBudget.record() as recorder:
+            for done in self.completed:
+                Rating.objects.filter(task=done, rater=self.poster).exists()
+        self.assertEqual(recorder.count, 3)
+        self.assertEqual(recorder.repeats(4), [])
+        self.assertEqual(recorder.samples, {})  # Below the threshold nothing was fingerprinted
+        [problem] = QueryBudget.violations('task_monitoring', recorder)
+        self.assertIn('N+1: 3x', problem)
+        with override_settings(QUERY_BUDGET_MODE='raise'), self.assertRaises(QueryBudgetExceeded):
+            QueryBudget.check('task_monitoring', recorder)
+        
+        self.client.force_login(self.doer)
+        with self.assertLogs('core.querybudget', level='WARNING') as logs:
+            self.assertEqual(self.client.get('/notifications/').status_code, 200)
+        self.assertIn('budget 1', logs.output[0])
+        
+        totals = QueryBudget.totals()
+        self.assertEqual(totals['notifications']['over_budget'], 1)
+        self.assertEqual(totals['task_monitoring']['n_plus_one'], 1)
+        out = StringIO()
+        call_command('query_report', '--reset', stdout=out)
+        self.assertIn('task_monitoring', out.getvalue())
+        self.assertIn('core_rating', out.getvalue())
+        self.assertEqual(QueryBudget.totals(), {})
+
+
+class MonitoringTests(TestCase):
+    """Test task monitoring and feedback system"""
+    
+    def setUp(self):
+        """Create test users and task"""
+        self.poster = User.objects.create_user(
+            username='poster',
+            email='poster@test.com',
+            password='testpass123',
+            fullname='Test Poster',
+            role='task_poster'
+        )
+        self.doer = User.objects.create_user(
+            username='doer',
+            email='doer@test.com',
+            password='testpass123',
+            fullname='Test Doer',
+            role='task_doer'
+        )
+        self.task = Task.objects.create(
+            poster=self.poster,
+            doer=self.doer,
+            title='Test Task',
+            description='Test',
+            category='typing',
+            price=100,
+            deadline=timezone.now() + timedelta(days=1),
+            status='completed'
+        )
+        self.client = Client()
+    
+    def test_task_monitoring_access(self):
+        """Test task monitoring dashboard access"""
+        self.client.login(username='poster', password='testpass123')
+        response = self.client.get('/monitoring/')
         self.assertEqual(response.status_code, 200)
         self.assertIn('tasks', response.context)
         self.assertIn('stats', response.context)
@@ -398,6 +1663,690 @@ class MonitoringTests(TestCase):
         self.assertEqual(data['feedback'][0]['score'], 8)
 
 
+class TaskParticipationTests(TestCase):
+    """Test batched rating/payment state for monitoring, payments and rating obligations"""
+    
+    def setUp(self):
+        cache.clear()
+        caches['stats'].clear()
+        self.poster = User.objects.create_user(
+            username='partposter',
+            email='partposter@test.com',
+            password='testpass123',
+            fullname='Part Poster',
+            role='task_poster'
+        )
+        self.doer = User.objects.create_user(
+            username='partdoer',
+            email='partdoer@test.com',
+            password='testpass123',
+            fullname='Part Doer',
+            role='task_doer'
+        )
+        self.rated = self.completed_task()
+        Rating.objects.create(task=self.rated, rater=self.poster, rated=self.doer, score=9)
+        self.unpaid = self.completed_task(payment_method='online', chat_unlocked=True)
+        self.awaiting = self.completed_task()
+        self.pay(self.awaiting, 'pending_confirmation')
+        self.paid = self.completed_task()
+        self.pay(self.paid, 'confirmed')
+    
+    def completed_task(self, **fields):
+        return Task.objects.create(
+            poster=self.poster, doer=self.doer, title='Done task', description='Test', category='typing',
+            price=100, deadline=timezone.now() + timedelta(days=1), status='completed', **fields
+        )
+    
+    def pay(self, task, status):
+        Payment.objects.create(
+            task=task, payer=self.poster, receiver=self.doer, amount=100, method='cod',
+            status=status, paymongo_payment_id=f'pay_{task.id.hex}'
+        )
+    
+    def test_rating_and_payment_state_in_one_query(self):
+        """Test the annotated state and the pending-rating checks built on it"""
+        with self.assertNumQueries(1):
+            tasks = {task.id: task for task in TaskParticipationService.for_user(self.poster)}
+        self.assertTrue(tasks[self.rated.id].user_has_rated)
+        self.assertFalse(tasks[self.unpaid.id].user_has_rated)
+        self.assertEqual(tasks[self.unpaid.id].counterpart_id, self.doer.id)
+        self.assertIsNone(tasks[self.unpaid.id].payment_status)
+        self.assertEqual(tasks[self.awaiting.id].payment_status, 'pending_confirmation')
+        self.assertTrue(tasks[self.paid.id].doer_paid)
+        
+        self.assertEqual(set(check_pending_ratings(self.poster)), {self.unpaid, self.awaiting, self.paid})
+        # The doer rated nobody yet; a rating of their own clears only that task
+        Rating.objects.create(task=self.paid, rater=self.doer, rated=self.poster, score=8)
+        self.assertEqual(set(check_pending_ratings(self.doer)), {self.rated, self.unpaid, self.awaiting})
+        
+        obligations = get_pending_rating_obligations(self.poster)
+        self.assertEqual(
+            {(item['task'], item['payment_method'], item['needs_doer_payment']) for item in obligations['pending_tasks']},
+            {(self.unpaid, 'online', True), (self.awaiting, 'cod', False), (self.paid, 'cod', False)}
+        )
+        self.assertEqual(TaskParticipationService.status_counts(Task.objects.filter(poster=self.poster))['completed'], 4)
+    
+    @override_settings(STORAGES={
+        'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+        'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+    })
+    def test_monitoring_and_payments_cost_does_not_grow_with_history(self):
+        """Test that more completed tasks add no queries to monitoring or payments"""
+        def query_counts():
+            counts = []
+            for user in (self.poster, self.doer):
+                self.client.force_login(user)
+                for url in ('/monitoring/', '/payments/'):
+                    cache.clear()
+                    caches['stats'].clear()
+                    with CaptureQueriesContext(connection) as ctx:
+                        self.assertEqual(self.client.get(url).status_code, 200)
+                    counts.append(len(ctx.captured_queries))
+            return counts
+        
+        self.client.force_login(self.poster)
+        response = self.client.get('/payments/')
+        self.assertEqual(
+            {(item['task'], item['payment'] and item['payment'].status) for item in response.context['pending_payments']},
+            {(self.unpaid, None), (self.awaiting, 'pending_confirmation')}
+        )
+        response = self.client.get('/monitoring/')
+        self.assertEqual(response.context['stats']['completed'], 4)
+        self.assertEqual({task.id for task in response.context['tasks'] if task.user_has_rated}, {self.rated.id})
+        
+        before = query_counts()
+        for _ in range(12):
+            self.pay(self.completed_task(), 'pending_payment')
+        self.assertEqual(query_counts(), before)
+
+
+class TaskSearchTests(TestCase):
+    """Test the full-text task search index and ranked browse results"""
+    
+    def setUp(self):
+        self.poster = User.objects.create_user(
+            username='searchposter',
+            email='searchposter@test.com',
+            password='testpass123',
+            fullname='Search Poster',
+            role='task_poster'
+        )
+        self.doer = User.objects.create_user(
+            username='searchdoer',
+            email='searchdoer@test.com',
+            password='testpass123',
+            fullname='Search Doer',
+            role='task_doer'
+        )
+        
+        def task(title, description, tags=''):
+            return Task.objects.create(
+                poster=self.poster, title=title, description=description, tags=tags,
+                category='microtask', price=100, deadline=timezone.now() + timedelta(days=2)
+            )
+        self.title_hit = task('Thesis defense slides', 'Make a deck for my defense')
+        self.body_hit = task('Help with thesis', 'Prepare the data tables, then the slides')
+        self.other = task('Grocery run', 'Buy snacks for the org meeting')
+    
+    def test_prefix_search_ranks_and_follows_edits(self):
+        """Test partial-word matching, title-weighted ranking and index maintenance on save/delete"""
+        self.assertEqual(TaskSearchService.backend(), 'fts5')
+        
+        results = list(TaskSearchService.order_by_relevance(TaskSearchService.search(Task.objects.all(), 'slid')))
+        self.assertEqual(results, [self.title_hit, self.body_hit])
+        self.assertGreater(results[0].search_relevance, results[1].search_relevance)
+        self.assertEqual(set(TaskSearchService.search(Task.objects.all(), 'thesis slid!')), {self.title_hit, self.body_hit})
+        
+        self.other.title = 'Grocery run and slides printing'
+        self.other.save()
+        self.title_hit.delete()
+        self.assertEqual(
+            set(TaskSearchService.search(Task.objects.all(), 'slides')),
+            {self.body_hit, self.other}
+        )
+        self.assertEqual(TaskSearchService.rebuild(), 2)
+    
+    @override_settings(STORAGES={
+        'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+        'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+    })
+    def test_browse_tasks_blends_relevance_into_smart_order(self):
+        """Test that browse_tasks filters with the index and ranks title matches first"""
+        self.client.force_login(self.doer)
+        response = self.client.get('/tasks/browse/', {'search': 'slides'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['total_tasks'], '2')
+        self.assertEqual(list(response.context['tasks']), [self.title_hit, self.body_hit])
+        
+        response = self.client.get('/tasks/browse/', {'search': 'slides', 'sort_by': '-created_at'})
+        self.assertEqual(list(response.context['tasks']), [self.body_hit, self.title_hit])
+
+
+class TagIndexTests(TestCase):
+    """Test the normalized tag index, tag-gated feed buckets and browse facets"""
+    
+    def setUp(self):
+        self.poster = User.objects.create_user(
+            username='tagposter',
+            email='tagposter@test.com',
+            password='testpass123',
+            fullname='Tag Poster',
+            role='task_poster'
+        )
+        self.doer = User.objects.create_user(
+            username='tagdoer',
+            email='tagdoer@test.com',
+            password='testpass123',
+            fullname='Tag Doer',
+            role='task_doer'
+        )
+        StudentSkill.objects.create(student=self.doer, skill_name='typing', status='verified')
+        
+        def task(title, tags):
+            return Task.objects.create(
+                poster=self.poster, title=title, description='Test', category='graphics', tags=tags,
+                price=100, deadline=timezone.now() + timedelta(days=2)
+            )
+        self.typing = task('Typed notes', 'Typing, URGENT')
+        self.retyping = task('Retype layout', 'retyping,  urgent , urgent')
+    
+    def test_tags_are_normalized_and_gate_skills_exactly(self):
+        """Test that 'retyping' no longer unlocks the typing bucket and edits resync links"""
+        self.assertEqual(TagService.normalize(' Typing,URGENT ,, typing'), ['typing', 'urgent'])
+        self.assertEqual(
+            set(TaskTag.objects.filter(task=self.retyping).values_list('tag__name', flat=True)),
+            {'retyping', 'urgent'}
+        )
+        
+        self.assertEqual(list(get_matched_tasks_for_user(self.doer)), [self.typing])
+        self.assertEqual(list(TaskFeedService.get_live_matched_tasks(self.doer)), [self.typing])
+        self.assertEqual(set(TagService.filter_tagged(Task.objects.all(), 'URGENT')), {self.typing, self.retyping})
+        
+        self.retyping.tags = 'typing'
+        self.retyping.save()
+        self.assertEqual(set(get_matched_tasks_for_user(self.doer)), {self.typing, self.retyping})
+        self.assertEqual(TagService.counts(Task.objects.all()), [{'name': 'typing', 'count': 2}, {'name': 'urgent', 'count': 1}])
+    
+    @override_settings(STORAGES={
+        'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+        'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+    })
+    def test_browse_facets_follow_status_and_filter_by_tag(self):
+        """Test precomputed open-task counts and the browse tag filter"""
+        self.assertEqual(TagService.facets()[0], {'name': 'urgent', 'count': 2})
+        
+        self.retyping.status = 'in_progress'
+        self.retyping.save(update_fields=['status'])
+        self.assertEqual(Tag.objects.get(name='urgent').open_task_count, 1)
+        self.assertEqual(Tag.objects.get(name='retyping').open_task_count, 0)
+        
+        self.retyping.delete()
+        self.assertEqual(TagService.rebuild(), 2)
+        
+        self.client.force_login(self.doer)
+        response = self.client.get('/tasks/browse/', {'tag': 'urgent'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(list(response.context['tasks']), [self.typing])
+        self.assertEqual(response.context['tag_facets'], [{'name': 'typing', 'count': 1}, {'name': 'urgent', 'count': 1}])
+        with self.assertNumQueries(0):
+            self.assertEqual(response.context['tasks'][0].get_tags_list(), ['typing', 'urgent'])
+
+
+class KeysetPaginationTests(TestCase):
+    """Test cursor paging over the browse feed, notifications and their JSON API"""
+    
+    def setUp(self):
+        self.poster = User.objects.create_user(
+            username='pageposter',
+            email='pageposter@test.com',
+            password='testpass123',
+            fullname='Page Poster',
+            role='task_poster'
+        )
+        self.doer = User.objects.create_user(
+            username='pagedoer',
+            email='pagedoer@test.com',
+            password='testpass123',
+            fullname='Page Doer',
+            role='task_doer'
+        )
+        for i in range(11):
+            Task.objects.create(
+                poster=self.poster, title=f'Lecture notes {i}', description='Transcribe lecture notes',
+                category='microtask', price=100 + (i % 3) * 50, priority_level=1 + i % 2,
+                deadline=timezone.now() + timedelta(days=2)
+            )
+        # Ties on every ordering column but id
+        Task.objects.update(created_at=timezone.now() - timedelta(hours=1))
+    
+    def walk(self, paginator, forward=True):
+        page = paginator.get_page()
+        rows = list(page)
+        while page.has_next:
+            page = paginator.get_page({'cursor': page.next_cursor})
+            rows += list(page)
+        if forward:
+            return rows
+        rows = list(page)
+        while page.has_previous:
+            page = paginator.get_page({'cursor': page.previous_cursor})
+            rows = list(page) + rows
+        return rows
+    
+    def test_feed_pages_cover_ordering_ties_both_ways(self):
+        """Test that paging forward and back visits every row once in queryset order"""
+        feed = get_matched_tasks_for_user(self.doer)
+        searched = TaskSearchService.order_by_relevance(TaskSearchService.search(feed, 'lecture'))
+        for queryset, per_page, tie_breaker in ((feed, 4, '-id'), (searched, 3, '-id'), (feed.order_by('price'), 5, 'id')):
+            paginator = KeysetPaginator(queryset, per_page)
+            self.assertEqual(paginator.ordering[-1], tie_breaker)
+            self.assertEqual(self.walk(paginator), list(paginator.queryset))
+            self.assertEqual(self.walk(paginator, forward=False), list(paginator.queryset))
+        
+        paginator = KeysetPaginator(feed, 4, count='approximate')
+        paginator.COUNT_CAP = 10
+        page = paginator.get_page({'cursor': 'not-a-cursor', 'search': 'notes'})
+        self.assertEqual(list(page), list(paginator.queryset[:4]))
+        self.assertEqual(page.total_display, '10+')
+        self.assertIn('search=notes', page.next_query)
+        # A cursor from another sort order restarts at the first page
+        by_price = KeysetPaginator(feed.order_by('price'), 4)
+        self.assertEqual(list(by_price.get_page({'cursor': page.next_cursor})), list(by_price.queryset[:4]))
+    
+    @override_settings(STORAGES={
+        'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+        'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+    })
+    def test_notification_pages_and_json_cursor(self):
+        """Test that new notifications do not shift older pages and the API pages by cursor"""
+        for i in range(25):
+            Notification.objects.create(user=self.doer, type='system_message', title=f'Note {i}', message='Hi')
+        self.client.force_login(self.doer)
+        
+        response = self.client.get('/notifications/')
+        first = response.context['notifications']
+        self.assertEqual(len(first), 20)
+        self.assertTrue(first.has_next)
+        Notification.objects.create(user=self.doer, type='system_message', title='Newest', message='Hi')
+        
+        response = self.client.get('/notifications/?' + first.next_query)
+        self.assertEqual([n.title for n in response.context['notifications']], [f'Note {i}' for i in range(4, -1, -1)])
+        
+        data = self.client.get('/api/notifications/recent/').json()
+        self.assertEqual(len(data['notifications']), 10)
+        self.assertEqual(data['notifications'][0]['title'], 'Newest')
+        older = self.client.get('/api/notifications/recent/', {'cursor': data['next_cursor']}).json()
+        self.assertEqual(older['notifications'][0]['title'], 'Note 15')
+        self.assertTrue(older['has_next'])
+
+
+class TaskFeedTests(TestCase):
+    """Test the precomputed doer task feed"""
+    
+    def setUp(self):
+        """Create poster, doer and tasks"""
+        self.poster = User.objects.create_user(
+            username='feedposter',
+            email='feedposter@test.com',
+            password='testpass123',
+            fullname='Feed Poster',
+            role='task_poster'
+        )
+        self.doer = User.objects.create_user(
+            username='feeddoer',
+            email='feeddoer@test.com',
+            password='testpass123',
+            fullname='Feed Doer',
+            role='task_doer'
+        )
+        self.microtask = Task.objects.create(
+            poster=self.poster,
+            title='Microtask',
+            description='Test',
+            category='microtask',
+            price=100,
+            deadline=timezone.now() + timedelta(days=3)
+        )
+        self.typing_task = Task.objects.create(
+            poster=self.poster,
+            title='Typing Task',
+            description='Test',
+            category='typing',
+            price=200,
+            deadline=timezone.now() + timedelta(days=3)
+        )
+    
+    def test_feed_entries_follow_task_writes(self):
+        """Test that saving a task keeps its feed entry in sync"""
+        entry = TaskFeedEntry.objects.get(task=self.typing_task)
+        self.assertTrue(entry.is_listed)
+        self.assertTrue(entry.bucket_typing)
+        self.assertFalse(entry.bucket_microtask)
+        
+        self.typing_task.status = 'in_progress'
+        self.typing_task.save()
+        entry.refresh_from_db()
+        self.assertFalse(entry.is_listed)
+    
+    def test_feed_respects_verified_skills(self):
+        """Test that microtasks are universal and skills unlock categories"""
+        feed = list(get_matched_tasks_for_user(self.doer))
+        self.assertEqual(feed, [self.microtask])
+        
+        StudentSkill.objects.create(student=self.doer, skill_name='typing', status='verified')
+        feed = list(get_matched_tasks_for_user(self.doer))
+        self.assertEqual(feed[0], self.typing_task)  # Skill match ranks first
+        self.assertEqual(len(feed), 2)
+    
+    def test_feed_matches_live_ranking(self):
+        """Test that the index ranks tasks the same as the live query"""
+        StudentSkill.objects.create(student=self.doer, skill_name='typing', status='verified')
+        Rating.objects.create(task=self.microtask, rater=self.doer, rated=self.poster, score=7)
+        
+        entry = TaskFeedEntry.objects.get(task=self.microtask)
+        self.assertEqual(entry.poster_rating, Decimal('7.00'))
+        
+        feed = TaskFeedService.get_feed_for_user(self.doer)
+        live = TaskFeedService.get_live_matched_tasks(self.doer)
+        self.assertEqual(
+            [(t.id, t.priority_score) for t in feed],
+            [(t.id, t.priority_score) for t in live]
+        )
+    
+    def test_feed_hides_task_after_application_window(self):
+        """Test that a task with a chosen doer drops out after 3 minutes"""
+        TaskApplication.objects.create(
+            task=self.microtask,
+            doer=self.doer,
+            cover_letter='Test',
+            first_application_time=timezone.now() - timedelta(minutes=5)
+        )
+        self.microtask.doer = self.doer
+        self.microtask.save()
+        
+        other_doer = User.objects.create_user(
+            username='otherdoer',
+            email='otherdoer@test.com',
+            password='testpass123',
+            fullname='Other Doer',
+            role='task_doer'
+        )
+        self.assertNotIn(self.microtask, list(get_matched_tasks_for_user(other_doer)))
+
+
+class AssignmentEngineTests(TestCase):
+    """Test the set-based auto-assignment engine"""
+    
+    def setUp(self):
+        """Create poster, doers and a typing task"""
+        self.poster = User.objects.create_user(
+            username='assignposter',
+            email='assignposter@test.com',
+            password='testpass123',
+            fullname='Assign Poster',
+            role='task_poster'
+        )
+        self.doers = []
+        for i, rating in enumerate(['2.00', '4.50', '3.00']):
+            doer = User.objects.create_user(
+                username=f'assigndoer{i}',
+                email=f'assigndoer{i}@test.com',
+                password='testpass123',
+                fullname=f'Assign Doer {i}',
+                role='task_doer',
+                doer_type='both',
+                campus_location='engineering'
+            )
+            User.objects.filter(id=doer.id).update(avg_rating=Decimal(rating))
+            StudentSkill.objects.create(student=doer, skill_name='typing', status='verified')
+            self.doers.append(doer)
+        self.task = Task.objects.create(
+            poster=self.poster,
+            title='Typing Task',
+            description='Test',
+            category='typing',
+            price=100,
+            deadline=timezone.now() + timedelta(days=1),
+            campus_location='engineering'
+        )
+    
+    def test_engine_matches_scalar_scores(self):
+        """Test that vectorized scores equal calculate_assignment_score"""
+        with self.assertNumQueries(3):
+            ranked = AssignmentEngine.top_k(self.task, k=3)
+        
+        self.assertEqual(ranked[0][0], self.doers[1].id)
+        for doer_id, scores in ranked:
+            agent = User.objects.get(id=doer_id)
+            self.assertEqual(scores, calculate_assignment_score(self.task, agent))
+    
+    def test_auto_assign_records_winner_scores(self):
+        """Test that the assignment stores the winner's scores"""
+        winner = User.objects.get(id=self.doers[1].id)
+        expected = calculate_assignment_score(self.task, winner)
+        assignment = auto_assign_task(self.task)
+        
+        self.assertEqual(assignment.agent_id, winner.id)
+        assignment.refresh_from_db()
+        self.assertEqual(float(assignment.total_match_score), expected['total'])
+        self.assertTrue(Notification.objects.filter(user=self.doers[1], type='task_assigned').exists())
+    
+    def test_batch_spreads_load(self):
+        """Test that each batch assignment counts toward the winner's workload"""
+        second = Task.objects.create(
+            poster=self.poster,
+            title='Second Typing Task',
+            description='Test',
+            category='typing',
+            price=100,
+            deadline=timezone.now() + timedelta(days=1),
+            campus_location='engineering'
+        )
+        assigned = AssignmentEngine.assign_batch([self.task, second])
+        
+        self.assertEqual(assigned[self.task.id].agent_id, self.doers[1].id)
+        self.assertEqual(assigned[second.id].agent_id, self.doers[2].id)
+    
+    def test_window_matching_spreads_winners(self):
+        """Test that one strong applicant cannot win every closed-window task in a tick"""
+        second = Task.objects.create(
+            poster=self.poster,
+            title='Second Typing Task',
+            description='Test',
+            category='typing',
+            price=100,
+            deadline=timezone.now() + timedelta(days=1)
+        )
+        opened = timezone.now() - timedelta(minutes=5)
+        for task in (self.task, second):
+            task.auto_assign_enabled = True
+            task.save()
+            for doer in self.doers[1:]:
+                TaskApplication.objects.create(task=task, doer=doer, cover_letter='Test', first_application_time=opened)
+        self.assertEqual(UserStatsCache.get(self.doers[1])['active_tasks'], 0)
+        
+        result = process_task_assignments()
+        
+        self.assertEqual(result['processed'], 2)
+        winners = set(Task.objects.filter(id__in=[self.task.id, second.id]).values_list('doer_id', flat=True))
+        self.assertEqual(winners, {self.doers[1].id, self.doers[2].id})
+        self.assertEqual(TaskAssignment.objects.filter(assignment_method='application').count(), 2)
+        self.assertFalse(TaskFeedEntry.objects.get(task=second).is_listed)
+        self.assertEqual(UserStatsCache.get(self.doers[1])['active_tasks'], 1)
+    
+    def test_solve_assignment_is_optimal(self):
+        """Test the assignment solver against a greedy-unfriendly matrix"""
+        cost = np.array([[1.0, 2.0], [1.0, 10.0], [5.0, 5.0]])
+        rows, cols = solve_assignment(cost)
+        
+        self.assertEqual(cost[rows, cols].sum(), 3.0)
+        self.assertEqual(len(set(cols)), 2)
+
+
+class PrioritizationKernelTests(TestCase):
+    """Test that SQL and batch scoring share one kernel"""
+    
+    def setUp(self):
+        """Create a poster, a doer and tasks covering every factor tier"""
+        cache.clear()
+        self.poster = User.objects.create_user(
+            username='kernelposter',
+            email='kernelposter@test.com',
+            password='testpass123',
+            fullname='Kernel Poster',
+            role='task_poster',
+            campus_location='engineering'
+        )
+        self.doer = User.objects.create_user(
+            username='kerneldoer',
+            email='kerneldoer@test.com',
+            password='testpass123',
+            fullname='Kernel Doer',
+            role='task_doer',
+            campus_location='engineering'
+        )
+        now = timezone.now()
+        specs = [
+            (5, 1500, timedelta(hours=5), 'engineering', None, True),
+            (4, 750, timedelta(days=2), '', self.doer, False),
+            (1, 150, timedelta(days=5), 'business', None, False),
+            (3, 40, timedelta(days=30), 'engineering', None, False),
+        ]
+        for i, (level, price, due, campus, preferred, flexible) in enumerate(specs):
+            Task.objects.create(
+                poster=self.poster,
+                title=f'Kernel Task {i}',
+                description='Test',
+                category='microtask',
+                price=price,
+                deadline=now + due,
+                campus_location=campus,
+                priority_level=level,
+                preferred_doer=preferred,
+                flexible_timing=flexible,
+                time_window_start=now - timedelta(hours=1) if i == 0 else None,
+                time_window_end=now + timedelta(hours=1) if i == 0 else None
+            )
+    
+    def test_batch_breakdowns_match_sql_scores(self):
+        """Test that NumPy breakdown totals equal the SQL priority_score"""
+        now = timezone.now()
+        tasks = list(PrioritizationService.get_prioritized_tasks(
+            Task.objects.select_related('poster'), self.doer, now=now
+        ))
+        
+        with self.assertNumQueries(0):
+            breakdowns = PrioritizationService.get_score_breakdowns(tasks, self.doer, now=now)
+        
+        for task, breakdown in zip(tasks, breakdowns):
+            self.assertAlmostEqual(breakdown['total_score'], float(task.priority_score), delta=0.02)
+            self.assertAlmostEqual(
+                breakdown['urgency_score'],
+                float(task.urgency_factor * PrioritizationService.URGENCY_WEIGHT),
+                places=2
+            )
+    
+    def test_static_components_invalidated_on_edit(self):
+        """Test that cached urgency/price components are dropped when a task changes"""
+        task = Task.objects.select_related('poster').get(priority_level=1)
+        before = PrioritizationService.get_score_breakdown(task, self.doer)
+        self.assertIsNotNone(PrioritizationService.static_cache.get(task.id))
+        
+        task.priority_level = 5
+        task.save()
+        self.assertIsNone(PrioritizationService.static_cache.get(task.id))
+        
+        after = PrioritizationService.get_score_breakdown(task, self.doer)
+        self.assertGreater(after['urgency_score'], before['urgency_score'])
+
+
+class CandidateSearchTests(TestCase):
+    """Test the pruned candidate search behind the v2 auto-assign endpoint"""
+    
+    def setUp(self):
+        """Create poster, a typing task and doers on two campuses"""
+        self.poster = User.objects.create_user(
+            username='searchposter',
+            email='searchposter@test.com',
+            password='testpass123',
+            fullname='Search Poster',
+            role='task_poster'
+        )
+        self.preferred = self._doer('pref', 'business', '1.00')
+        self.campus = self._doer('campus', 'engineering', '3.00')
+        self.other = self._doer('other', 'business', '5.00')
+        self.unskilled = self._doer('unskilled', 'engineering', '5.00', skill=False)
+        self.task = Task.objects.create(
+            poster=self.poster,
+            title='Typing Task',
+            description='Test',
+            category='typing',
+            price=100,
+            deadline=timezone.now() + timedelta(days=1),
+            campus_location='engineering',
+            preferred_doer=self.preferred
+        )
+        self.client = Client()
+        self.client.force_login(self.poster)
+    
+    def _doer(self, name, campus, rating, skill=True):
+        doer = User.objects.create_user(
+            username=f'search{name}',
+            email=f'search{name}@test.com',
+            password='testpass123',
+            fullname=f'Search {name}',
+            role='task_doer',
+            campus_location=campus
+        )
+        User.objects.filter(id=doer.id).update(avg_rating=Decimal(rating))
+        if skill:
+            StudentSkill.objects.create(student=doer, skill_name='typing', status='verified')
+        return doer
+    
+    def _post(self, **payload):
+        return self.client.post(
+            '/api/tasks/auto-assign/',
+            data=json.dumps(dict(task_id=str(self.task.id), **payload)),
+            content_type='application/json'
+        )
+    
+    def test_ranks_by_tier_and_matches_breakdown(self):
+        """Test tier order, skill pruning and agreement with get_score_breakdown"""
+        result = CandidateSearch.search(self.task, limit=10)
+        ids = [candidate['id'] for candidate in result['candidates']]
+        
+        self.assertEqual(ids, [str(self.preferred.id), str(self.campus.id), str(self.other.id)])
+        self.assertFalse(result['has_more'])
+        for candidate in result['candidates']:
+            doer = User.objects.get(id=candidate['id'])
+            expected = PrioritizationService.get_score_breakdown(self.task, doer)
+            self.assertEqual(candidate['score']['total_score'], expected['total_score'])
+    
+    def test_query_count_independent_of_population(self):
+        """Test that more doers do not add queries"""
+        with CaptureQueriesContext(connection) as small:
+            self.assertEqual(self._post(assign=False, limit=1).status_code, 200)
+        
+        for i in range(30):
+            self._doer(f'extra{i}', 'engineering', '2.00')
+        with CaptureQueriesContext(connection) as large:
+            response = self._post(assign=False, limit=1)
+        
+        self.assertEqual(len(small.captured_queries), len(large.captured_queries))
+        self.assertTrue(response.json()['has_more'])
+    
+    def test_assigns_top_candidate_and_notifies(self):
+        """Test that the endpoint assigns the first candidate"""
+        response = self._post()
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['assigned_doer']['id'], str(self.preferred.id))
+        self.task.refresh_from_db()
+        self.assertEqual(self.task.doer_id, self.preferred.id)
+        self.assertEqual(self.task.status, 'in_progress')
+        self.assertTrue(Notification.objects.filter(user=self.preferred, type='task_assigned').exists())
+
+
 class HealthCheckTests(TestCase):
     """Test health check endpoint"""
     
@@ -22,9 +22,11 @@ from django.db.models import (
 )
 from django.db.models.functions import Coalesce
 from decimal import Decimal
-from django.http import JsonResponse
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
 from django.utils import timezone
 from django.core.paginator import Paginator
+from django.utils.cache import get_conditional_response
+from django.utils.http import quote_etag
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods, require_POST
 from .supabase_client import supabase
@@ -36,13 +38,19 @@ from .utils import (
     log_admin_action,
     check_pending_ratings
 )
+from .chat import ChatPush
+from .conversations import ConversationService
+from .notifications import notify
+from .pagination import KeysetPaginator
+from .participation import TaskParticipationService
+from .paymongo import CircuitOpenError
+from .search import TaskSearchService
+from .tags import TagService
 import logging
 import json
 import base64
 import requests
 import traceback
-import hmac
-import hashlib
 
 logger = logging.getLogger(__name__)
 
@@ -61,55 +69,43 @@ def get_pending_rating_obligations(user):
         'is_blocked': bool
     }
     """
-    from .models import Task, Rating, Payment
-    from django.db.models import Prefetch
+    from .models import Task
     
     pending_tasks = []
     
-    # optimized: fetch tasks with related ratings and payments in one go
-    # We want tasks where the POSTER (current user) has NOT rated the DOER.
-    
-    completed_tasks = Task.objects.filter(
-        poster=user,
-        status='completed',
-        doer__isnull=False
-    ).select_related('doer').prefetch_related(
-        Prefetch('ratings', queryset=Rating.objects.filter(rater=user), to_attr='user_ratings'),
-        Prefetch('payment', queryset=Payment.objects.filter(payer=user, status='confirmed'), to_attr='user_payments')
-    )
+    # ✅ OPTIMIZED: Rating and payment state annotated in the same query
+    # (core.participation) - tasks the poster has not rated the doer on yet
+    completed_tasks = TaskParticipationService.unrated(
+        user, Task.objects.filter(poster=user, status='completed', doer__isnull=False)
+    ).select_related('doer')
     
     for task in completed_tasks:
-        # Check if poster already rated the doer (using prefetched data)
-        # In memory check, no DB hit
-        already_rated = any(r.rated_id == task.doer_id for r in task.user_ratings)
+        # Check payment requirements
+        chat_unlocked = task.chat_unlocked
         
-        if not already_rated:
-            # Check payment requirements
-            chat_unlocked = task.chat_unlocked
+        # For online payment: also check if task doer was paid
+        if task.payment_method == 'online':
+            doer_paid = task.doer_paid
             
-            # For online payment: also check if task doer was paid (using prefetched data)
-            if task.payment_method == 'online':
-                doer_paid = any(p.receiver_id == task.doer_id for p in task.user_payments)
-                
-                # If chat not unlocked OR doer not paid, it's a pending obligation
-                if not chat_unlocked or not doer_paid:
-                    pending_tasks.append({
-                        'task': task,
-                        'reason': 'payment_required',
-                        'needs_system_fee': not chat_unlocked,
-                        'needs_doer_payment': not doer_paid,
-                        'payment_method': 'online'
-                    })
-            else:
-                # For COD: only check if chat is unlocked
-                if not chat_unlocked:
-                    pending_tasks.append({
-                        'task': task,
-                        'reason': 'payment_required',
-                        'needs_system_fee': True,
-                        'needs_doer_payment': False,
-                        'payment_method': 'cod'
-                    })
+            # If chat not unlocked OR doer not paid, it's a pending obligation
+            if not chat_unlocked or not doer_paid:
+                pending_tasks.append({
+                    'task': task,
+                    'reason': 'payment_required',
+                    'needs_system_fee': not chat_unlocked,
+                    'needs_doer_payment': not doer_paid,
+                    'payment_method': 'online'
+                })
+        else:
+            # For COD: only check if chat is unlocked
+            if not chat_unlocked:
+                pending_tasks.append({
+                    'task': task,
+                    'reason': 'payment_required',
+                    'needs_system_fee': True,
+                    'needs_doer_payment': False,
+                    'payment_method': 'cod'
+                })
     
     has_obligations = len(pending_tasks) > 0
     is_blocked = has_obligations  # User is blocked if they have pending obligations
@@ -209,40 +205,14 @@ def reconcile_payments():
     """
     Reconcile pending payments with PayMongo
     Checks for payments that should be confirmed but aren't
+    
+    ✅ OPTIMIZED: PaymentReconciler (core.reconciliation) checks payments
+    concurrently over one pooled session and confirms them in one UPDATE.
     """
-    from .models import Payment, SystemCommission
+    from .reconciliation import PaymentReconciler
     
     try:
-        # Find payments pending for more than 1 hour
-        one_hour_ago = timezone.now() - timedelta(hours=1)
-        pending_payments = Payment.objects.filter(
-            status='pending',
-            created_at__lt=one_hour_ago,
-            paymongo_payment_id__isnull=False
-        )
-        
-        reconciled_count = 0
-        for payment in pending_payments:
-            try:
-                # Verify payment with PayMongo
-                from .paymongo import PayMongoClient
-                client = PayMongoClient()
-                payment_intent = client.retrieve_payment_intent(payment.paymongo_payment_id)
-                
-                if payment_intent:
-                    status = payment_intent['data']['attributes']['status']
-                    if status == 'succeeded':
-                        payment.status = 'confirmed'
-                        payment.confirmed_at = timezone.now()
-                        payment.save()
-                        reconciled_count += 1
-                        logger.info(f"Payment {payment.id} reconciled: {status}")
-                        
-            except Exception as e:
-                logger.error(f"Error reconciling payment {payment.id}: {str(e)}")
-        
-        logger.info(f"Payment reconciliation complete: {reconciled_count} payments updated")
-        return reconciled_count
+        return PaymentReconciler().run()['confirmed']
         
     except Exception as e:
         logger.error(f"Payment reconciliation error: {str(e)}")
@@ -253,73 +223,15 @@ def auto_assign_task(task, criteria=None):
     """
     Automatically assign a task to the best matching agent
     Criteria: skills, availability, rating, workload
+    
+    ✅ OPTIMIZED: Set-based AssignmentEngine (core.assignment) loads all
+    candidates in 3 queries and scores them with NumPy instead of running
+    calculate_assignment_score() (2 queries) per agent.
     """
-    from .models import TaskAssignment, StudentSkill
+    from .assignment import AssignmentEngine
     
     try:
-        # Get available agents (task doers)
-        available_agents = User.objects.filter(
-            role='task_doer',
-            is_active=True,
-            is_banned=False
-        )
-        
-        # Filter by skill match if needed
-        if task.category in ['typing', 'powerpoint', 'graphics']:
-            skilled_agents = StudentSkill.objects.filter(
-                status='verified',
-                skill_name=task.category
-            ).values_list('student_id', flat=True)
-            available_agents = available_agents.filter(id__in=skilled_agents)
-        else:
-            # Microtask: allow microtaskers and 'both' type
-            available_agents = available_agents.filter(
-                doer_type__in=['microtasker', 'both']
-            )
-        
-        if not available_agents.exists():
-            logger.warning(f"No available agents for task {task.id}")
-            return None
-        
-        # Score all available agents
-        best_agent = None
-        best_score = -1
-        
-        for agent in available_agents:
-            scores = calculate_assignment_score(task, agent)
-            if scores['total'] > best_score:
-                best_score = scores['total']
-                best_agent = agent
-        
-        if best_agent:
-            # Create assignment
-            assignment = TaskAssignment.objects.create(
-                task=task,
-                agent=best_agent,
-                assigned_by=task.poster,
-                status='assigned',
-                assignment_method='automatic',
-                skill_match_score=scores['skill_match'],
-                availability_score=scores['availability'],
-                rating_score=scores['rating'],
-                workload_score=scores['workload'],
-                total_match_score=scores['total'],
-                assignment_notes=f"Auto-assigned based on skill match, rating, and availability"
-            )
-            
-            # Send notification to agent
-            Notification.objects.create(
-                user=best_agent,
-                type='task_assigned',
-                title='🎯 Task Assigned to You',
-                message=f'You have been assigned to "{task.title}" by {task.poster.fullname}',
-                related_task=task
-            )
-            
-            logger.info(f"Task {task.id} auto-assigned to {best_agent.fullname} with score {best_score}")
-            return assignment
-        
-        return None
+        return AssignmentEngine.assign_batch([task]).get(task.id)
         
     except Exception as e:
         logger.error(f"Error auto-assigning task {task.id}: {str(e)}")
@@ -338,168 +250,15 @@ def get_matched_tasks_for_user(user):
       * Task poster chose a doer, OR
       * Only 1 applicant (task taken)
     - If multiple applicants after 3 min: Keep showing task
-    """
-    if user.role not in ['task_doer', 'admin']:
-        return Task.objects.none()
-    
-    # Get user's validated skills
-    user_skills = list(StudentSkill.objects.filter(
-        student=user, 
-        status='verified'
-    ).values_list('skill_name', flat=True))
-    
-    # Base query for open tasks (exclude user's own posted tasks)
-    base_tasks = Task.objects.filter(status='open').exclude(poster=user).select_related('poster')
-    
-    # Debug logging
-    import logging
-    logger = logging.getLogger(__name__)
-    logger.info(f"🔍 Matching tasks for {user.username} (doer_type: {user.doer_type})")
-    logger.info(f"   Validated skills: {user_skills}")
-    logger.info(f"   Total open tasks (excluding own): {base_tasks.count()}")
-    
-    # 🧹 FILTER OUT TASKS THAT SHOULD BE HIDDEN (3-minute window logic)
-    # ✅ OPTIMIZED: Use database queries instead of Python loop
-    now = timezone.now()
-    three_minutes_ago = now - timezone.timedelta(minutes=3)
-    
-    # Find tasks to exclude using database queries (no N+1!)
-    from django.db.models import Min, Count
-    
-    # Tasks with applications that have passed 3-minute window AND doer is already selected
-    tasks_with_old_apps = base_tasks.filter(
-        applications__status='pending',
-        applications__first_application_time__lte=three_minutes_ago
-    ).filter(
-        Q(doer__isnull=False)  # Doer already chosen
-    ).distinct().values_list('id', flat=True)
-    
-    # Only exclude tasks where a Doer is explicitly chosen
-    tasks_to_exclude = list(tasks_with_old_apps)
-    
-    # Exclude hidden tasks
-    if tasks_to_exclude:
-        logger.info(f"   Excluding {len(tasks_to_exclude)} tasks (Doer assigned)")
-        base_tasks = base_tasks.exclude(id__in=tasks_to_exclude)
-    
-    # 🎯 UNIVERSAL FILTERING LOGIC
-    # Rule 1: EVERYONE sees Microtasks (Universal Access)
-    universal_query = Q(category='microtask') | Q(tags__icontains='microtask')
-    
-    # Rule 2: Verified Skills UNLOCK specific categories
-    skill_query = Q()
-    if user_skills:
-        logger.info(f"   Unlocking tasks for skills: {user_skills}")
-        for skill in user_skills:
-            if skill == 'typing':
-                skill_query |= Q(category='typing') | Q(tags__icontains='typing')
-            elif skill == 'powerpoint':
-                skill_query |= Q(category='powerpoint') | Q(tags__icontains='powerpoint')
-            elif skill == 'graphics':
-                skill_query |= Q(category='graphics') | Q(tags__icontains='graphics')
-    
-    # Combine: (Microtasks) OR (Skill Matches)
-    final_query = universal_query | skill_query
-    
-    tasks = base_tasks.filter(final_query).distinct()
-    
-    logger.info(f"   Final matching tasks found: {tasks.count()}")
-
-
-    
-    # 🧠 ENHANCED SMART RANKING ALGORITHM (OBJECTIVE NO.1 - 100% Alignment)
-    # Priority = (Skill Match × 1.0) + (Poster Rating × 2.0) + (Urgency × 1.5) + 
-    #            (Location Match × 2.0) + (Preference Match × 2.0) + 
-    #            (Time Window Match × 1.5) + (Priority Level × 0.5)
-    
-    # Calculate real-time poster ratings from Rating table
-    poster_rating_subquery = Rating.objects.filter(
-        rated=OuterRef('poster')
-    ).values('rated').annotate(
-        avg_rating=Avg('score')
-    ).values('avg_rating')
-    
-    # Get current time for time window calculations
-    now = timezone.now()
-    
-    tasks = tasks.annotate(
-        skill_match_score=Case(
-            # Check if task matches user's skills
-            *[When(Q(category='typing') | Q(tags__icontains='typing'), then=3) 
-              for skill in user_skills if skill == 'typing'] +
-            [When(Q(category='powerpoint') | Q(tags__icontains='powerpoint'), then=3) 
-             for skill in user_skills if skill == 'powerpoint'] +
-            [When(Q(category='graphics') | Q(tags__icontains='graphics'), then=3) 
-             for skill in user_skills if skill == 'graphics'],
-            default=0,
-            output_field=IntegerField()
-        ),
-        urgency_score=Case(
-            When(deadline__lte=timezone.now() + timezone.timedelta(days=1), then=1),
-            default=0,
-            output_field=IntegerField()
-        ),
-        # FIXED: Use real-time poster rating from Rating table instead of stale avg_rating field
-        poster_rating=Coalesce(
-            Subquery(poster_rating_subquery, output_field=DecimalField(max_digits=4, decimal_places=2)),
-            Value(Decimal('0.00'), output_field=DecimalField(max_digits=4, decimal_places=2)),
-            output_field=DecimalField(max_digits=4, decimal_places=2)
-        ),
-        # NEW: Customer Preference Matching Score
-        preference_score=Case(
-            # Preferred doer match (+2.0)
-            When(preferred_doer=user, then=Value(Decimal('2.00'))),
-            # Default: no preference bonus
-            default=Value(Decimal('0.00')),
-            output_field=DecimalField(max_digits=5, decimal_places=2)
-        ),
-        # NEW: Time Window Matching Score
-        time_window_match_score=Case(
-            # Within preferred time window (+1.5)
-            When(
-                Q(time_window_start__lte=now) & Q(time_window_end__gte=now),
-                then=Value(Decimal('1.50'))
-            ),
-            # Same day as preferred time (+1.0)
-            When(
-                Q(time_window_start__date=now.date()),
-                then=Value(Decimal('1.00'))
-            ),
-            # Flexible timing (+0.30)
-            When(flexible_timing=True, then=Value(Decimal('0.30'))),
-            default=Value(Decimal('0.00')),
-            output_field=DecimalField(max_digits=5, decimal_places=2)
-        ),
-        # Calculate total priority score with consistent Decimal arithmetic
-        # ENHANCED FORMULA: 7 factors for 100% OBJECTIVE NO.1 alignment
-        priority_score=ExpressionWrapper(
-            (F('skill_match_score') * Value(Decimal('1.00'), output_field=DecimalField(max_digits=5, decimal_places=2))) +
-            (F('poster_rating') * Value(Decimal('2.00'), output_field=DecimalField(max_digits=5, decimal_places=2))) +
-            (F('urgency_score') * Value(Decimal('1.50'), output_field=DecimalField(max_digits=5, decimal_places=2))) +
-            # Location Match Bonus (+2.00)
-            (Case(
-                When(campus_location=user.campus_location, then=Value(Decimal('2.00'))),
-                default=Value(Decimal('0.00')),
-                output_field=DecimalField(max_digits=5, decimal_places=2)
-            )) +
-            # NEW: Preference Match (+2.00)
-            (F('preference_score') * Value(Decimal('1.00'), output_field=DecimalField(max_digits=5, decimal_places=2))) +
-            # NEW: Time Window Match (+1.50)
-            (F('time_window_match_score') * Value(Decimal('1.00'), output_field=DecimalField(max_digits=5, decimal_places=2))) +
-            # NEW: Priority Level (+0.50 per level)
-            (F('priority_level') * Value(Decimal('0.50'), output_field=DecimalField(max_digits=5, decimal_places=2))),
-            output_field=DecimalField(max_digits=7, decimal_places=2)
-        )
-    ).order_by('-priority_score', '-price', '-created_at')
-    
-    # Debug logging - show what was matched
-    matched_count = tasks.count()
-    logger.info(f"   ✅ Matched {matched_count} tasks")
-    if matched_count > 0:
-        categories = list(tasks.values_list('category', flat=True).distinct())
-        logger.info(f"   Categories: {categories}")
     
-    return tasks
+    ✅ OPTIMIZED: Reads the precomputed TaskFeedEntry index (core.feed)
+    instead of rebuilding buckets, visibility and poster ratings per request.
+    Priority = (Skill Match × 1.0) + (Poster Rating × 2.0) + (Urgency × 1.5) + 
+               (Location Match × 2.0) + (Preference Match × 2.0) + 
+               (Time Window Match × 1.5) + (Priority Level × 0.5)
+    """
+    from .feed import TaskFeedService
+    return TaskFeedService.get_feed_for_user(user)
 
 
 def handle_task_creation_with_payment(poster, title, description, category, tags, price, payment_method, deadline, location=None, requirements=None):
@@ -968,6 +727,51 @@ def health_check(request):
         }, status=503)
 
 
+
+@login_required
+def api_dashboard_widgets(request):
+    """Dashboard metrics and task lists as JSON, for loading widgets after the page shell"""
+    from .dashboard import DashboardService
+    
+    return JsonResponse(DashboardService.payload(request.user))
+
+
+@login_required
+def api_paymongo_metrics(request):
+    """PayMongo circuit state and per-endpoint latency for this process (admins only)"""
+    from .paymongo import get_transport
+    
+    if request.user.role != 'admin':
+        return JsonResponse({'error': 'Admin privileges required'}, status=403)
+    
+    transport = get_transport()
+    return JsonResponse({
+        'circuit': transport.breaker.state,
+        'endpoints': transport.metrics.snapshot()
+    })
+
+@csrf_exempt
+@require_http_methods(["GET", "POST"])
+def run_periodic_job(request, job):
+    """
+    Run one Celery beat job (errandexpress/celery.py) in this process, for
+    hosts without a beat process: vercel.json schedules them as cron jobs.
+    Requires Authorization: Bearer <CRON_SECRET>; disabled when unset.
+    """
+    from django.utils.module_loading import import_string
+    from errandexpress.celery import app
+    import hmac
+    
+    secret = settings.CRON_SECRET
+    entry = app.conf.beat_schedule.get(job)
+    if not secret or entry is None:
+        return JsonResponse({'error': 'Not found'}, status=404)
+    if not hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {secret}'):
+        return JsonResponse({'error': 'Not authorized'}, status=403)
+    
+    result = import_string(entry['task'])()
+    return JsonResponse({'job': job, 'result': result if isinstance(result, dict) else None})
+
 def home(request):
     """Redesigned homepage with better navigation and organization"""
     context = {
@@ -1222,9 +1026,6 @@ def dashboard(request):
     
     # Get user data
     user = request.user
-    from datetime import datetime, timedelta
-    from django.db.models import Q, Avg, Sum, Count
-    from django.utils import timezone
     
     # ✅ NEW: Check for pending rating obligations (SYSTEM BLOCK)
     rating_obligations = get_pending_rating_obligations(user)
@@ -1237,72 +1038,30 @@ def dashboard(request):
             'count': rating_obligations['count']
         })
     
-    # Current month calculations
-    current_month = timezone.now().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    # ✅ OPTIMIZED: one conditional-aggregate query per role + cached lists (core.dashboard)
+    from .dashboard import DashboardService
+    metrics = DashboardService.metrics(user)
+    widgets = DashboardService.widgets(user)
     
     if user.role == 'task_poster':
-        # ✅ OPTIMIZED: Use aggregation for all counts (single query)
         # TASK POSTER METRICS
-        all_tasks = Task.objects.filter(poster=user)
-        
-        # ✅ OPTIMIZED: Calculate all counts in one aggregation query
-        stats = all_tasks.aggregate(
-            active_count=Count('id', filter=Q(status__in=['open', 'in_progress'])),
-            completed_count=Count('id', filter=Q(status='completed')),
-            total_assigned=Count('id', filter=~Q(status='open')),
-            monthly_spent=Sum('price', filter=Q(created_at__gte=current_month))
-        )
-        
-        active_tasks = all_tasks.filter(status__in=['open', 'in_progress'])
-        completed_tasks = all_tasks.filter(status='completed')
-        
-        total_spent = stats['monthly_spent'] or 0
-        
-        # ✅ OPTIMIZED: Calculate average completion time using database aggregation
-        from django.db.models import F, ExpressionWrapper, DurationField
-        completed_with_times = completed_tasks.exclude(completed_at__isnull=True, accepted_at__isnull=True)
-        avg_completion_hours = 0
-        if completed_with_times.exists():
-            avg_duration = completed_with_times.aggregate(
-                avg_time=Avg(ExpressionWrapper(F('completed_at') - F('accepted_at'), output_field=DurationField()))
-            )['avg_time']
-            if avg_duration:
-                avg_completion_hours = avg_duration.total_seconds() / 3600
-        
-        # ✅ OPTIMIZED: Calculate success rate from aggregation
-        total_assigned = stats['total_assigned']
-        success_rate = (stats['completed_count'] / total_assigned * 100) if total_assigned > 0 else 0
-        
-        # ✅ OPTIMIZED: Get tasks with applications (not messages)
-        pending_applications = all_tasks.filter(status='open').annotate(
-            app_count=Count('applications', filter=Q(applications__status='pending'))
-        ).filter(app_count__gt=0)[:5]
-        
-        # ✅ OPTIMIZED: Get tasks in different states with select_related
-        in_progress_tasks = active_tasks.filter(status='in_progress').select_related('doer')[:5]
-        awaiting_review = completed_tasks.select_related('doer')[:5]
-        payment_pending = completed_tasks.select_related('doer')[:5]
-        
-        # ✅ OPTIMIZED: Recent tasks with select_related
-        recent_tasks = all_tasks.select_related('doer').order_by('-created_at')[:5]
-        
         context = {
             'user': user,
             'is_poster': True,
             # Key Metrics
-            'active_tasks_count': active_tasks.count(),
-            'total_spent': total_spent,
-            'avg_completion_time': round(avg_completion_hours, 1),
-            'success_rate': round(success_rate, 1),
+            'active_tasks_count': metrics['active_count'],
+            'total_spent': metrics['monthly_spent'],
+            'avg_completion_time': round(metrics['avg_completion_hours'], 1),
+            'success_rate': round(metrics['success_rate'], 1),
             
             # Task Management
-            'pending_applications': pending_applications[:5],
-            'in_progress_tasks': in_progress_tasks[:5],
-            'awaiting_review': awaiting_review[:5],
-            'payment_pending': payment_pending[:5],
+            'pending_applications': widgets['pending_applications'],
+            'in_progress_tasks': widgets['in_progress_tasks'],
+            'awaiting_review': widgets['awaiting_review'],
+            'payment_pending': widgets['awaiting_review'],
             
             # Activity
-            'recent_tasks': recent_tasks,
+            'recent_tasks': widgets['recent_tasks'],
             
             # Smart Insights (mock data for now)
             'best_posting_time': '2:00 PM - 4:00 PM',
@@ -1312,70 +1071,37 @@ def dashboard(request):
         
     else:
         # TASK DOER METRICS
-        completed_tasks = Task.objects.filter(doer=user, status='completed')
-        in_progress_tasks = Task.objects.filter(doer=user, status='in_progress')
-        all_doer_tasks = Task.objects.filter(doer=user)
-        
-        # Calculate total earnings this month
-        monthly_completed = completed_tasks.filter(completed_at__gte=current_month)
-        total_earnings = monthly_completed.aggregate(total=Sum('price'))['total'] or 0
-        pending_earnings = in_progress_tasks.aggregate(total=Sum('price'))['total'] or 0
-        
-        # Calculate success rate with proper decimal handling
-        total_assigned = all_doer_tasks.count()
-        success_rate = float((completed_tasks.count() / Decimal(total_assigned)) * 100) if total_assigned > 0 else 0.0
-        
-        # Calculate average rating
-        ratings = Rating.objects.filter(task__doer=user)
-        avg_rating = ratings.aggregate(avg=Avg('score'))['avg'] or 0
-        
-        # Get available tasks (smart matching)
-        available_tasks = get_matched_tasks_for_user(user)[:10]
-        
-        # Get tasks where user has shown interest (sent messages)
-        active_applications = Task.objects.filter(
-            status='open',
-            messages__sender=user
-        ).distinct()[:5]
-        
-        # Skill validation status
-        validated_skills = user.skills.filter(status='verified')
+        total_earnings = metrics['monthly_earnings']
+        avg_rating = metrics['avg_rating']
+        validated_skills = widgets['verified_skills']
         
         context = {
             'user': user,
             'is_doer': True,
             # Key Metrics
-            'tasks_completed': completed_tasks.count(),
+            'tasks_completed': metrics['completed_count'],
             'total_earnings': total_earnings,
-            'pending_earnings': pending_earnings,
-            'success_rate': round(success_rate, 1),
+            'pending_earnings': metrics['pending_earnings'],
+            'success_rate': round(metrics['success_rate'], 1),
             'avg_rating': round(avg_rating, 1),
             'user_rating': round(avg_rating, 1),  # Alias for template
             
             # Task Feed
-            'recommended_tasks': available_tasks[:5],
-            'high_priority_tasks': Task.objects.filter(
-                status='open',
-                doer__isnull=True,
-                price__gte=200
-            ).exclude(poster=user)[:3],
-            'nearby_tasks': available_tasks[:3],
-            'quick_wins': Task.objects.filter(
-                status='open',
-                doer__isnull=True,
-                price__lte=100
-            ).exclude(poster=user)[:3],
+            'recommended_tasks': widgets['recommended_tasks'],
+            'high_priority_tasks': widgets['high_priority_tasks'],
+            'nearby_tasks': widgets['recommended_tasks'][:3],
+            'quick_wins': widgets['quick_wins'],
             
             # Performance Tracking
-            'active_applications': active_applications,
-            'current_work': in_progress_tasks[:5],
-            'pending_payments': completed_tasks.filter(payment__status='pending')[:5],
-            'recent_tasks': all_doer_tasks.order_by('-created_at')[:5],  # Unified list for dashboard
+            'active_applications': widgets['active_applications'],
+            'current_work': widgets['current_work'],
+            'pending_payments': widgets['pending_payments'],
+            'recent_tasks': widgets['recent_tasks'],  # Unified list for dashboard
             
             # Skills
             'validated_skills': validated_skills,
             'verified_skills': validated_skills,  # Alias for template
-            'skill_count': validated_skills.count(),
+            'skill_count': len(validated_skills),
             
             # Earnings Insights
             'weekly_goal': 1000,
@@ -1550,22 +1276,24 @@ def browse_tasks(request):
     # 🎯 SMART TASK MATCHING ALGORITHM
     # filter out tasks that are expired
     tasks = get_matched_tasks_for_user(request.user).select_related('poster')
-    tasks = tasks.filter(deadline__gt=timezone.now())
+    tasks = tasks.filter(feed_entry__deadline__gt=timezone.now())
     
     # Apply filters
     if filter_form.is_valid():
+        # ✅ OPTIMIZED: Full-text index (core.search) instead of icontains scans
         search = filter_form.cleaned_data.get('search')
         if search:
-            tasks = tasks.filter(
-                Q(title__icontains=search) |
-                Q(description__icontains=search) |
-                Q(tags__icontains=search)
-            )
+            tasks = TaskSearchService.search(tasks, search)
         
         category = filter_form.cleaned_data.get('category')
         if category:
             tasks = tasks.filter(category=category)
         
+        # ✅ OPTIMIZED: Indexed tag join (core.tags) instead of a substring match
+        tag = filter_form.cleaned_data.get('tag')
+        if tag:
+            tasks = TagService.filter_tagged(tasks, tag)
+        
         min_price = filter_form.cleaned_data.get('min_price')
         if min_price:
             tasks = tasks.filter(price__gte=min_price)
@@ -1577,19 +1305,19 @@ def browse_tasks(request):
         sort_by = filter_form.cleaned_data.get('sort_by')
         if sort_by and sort_by != 'smart':
             tasks = tasks.order_by(sort_by)
+        elif search:
+            # Smart ordering with text relevance blended into priority_score
+            tasks = TaskSearchService.order_by_relevance(tasks)
     
     # Ensure we always have ordering for pagination
     # If sort_by is 'smart' (or None/default from form), the annotation ordering from get_matched_tasks_for_user applies
     if not tasks.query.order_by:
         tasks = tasks.order_by('-priority_score', '-price', '-created_at')
     
-    # ✅ OPTIMIZED: Cache count before pagination
-    total_tasks = tasks.count()
-    
-    # Pagination
-    paginator = Paginator(tasks, 12)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    # ✅ OPTIMIZED: Keyset pagination on the ordering columns (no OFFSET scans)
+    # and a capped count instead of counting the whole feed
+    paginator = KeysetPaginator(tasks.prefetch_related('normalized_tags'), 12, count='approximate')
+    page_obj = paginator.get_page(request.GET)
     
     # Get skill counts for filter display
     skill_task_counts = {}
@@ -1604,11 +1332,12 @@ def browse_tasks(request):
     context = {
         'tasks': page_obj,
         'filter_form': filter_form,
-        'total_tasks': total_tasks,
+        'total_tasks': page_obj.total_display,
         'user_skills': list(user_skills),  # User's validated skills
         'user_doer_type': request.user.doer_type,  # User's doer type
         'skill_task_counts': skill_task_counts,  # Count of tasks per skill
         'has_validated_skills': len(user_skills) > 0,
+        'tag_facets': TagService.facets(),  # Precomputed open-task counts per tag
     }
     
     return render(request, 'browse_tasks_modern.html', context)
@@ -2497,7 +2226,7 @@ def payment_success(request):
     if payment_type in ['system_fee', 'commission_payment']:
         # Update system commission status
         try:
-            from .models import SystemCommission, SystemWallet
+            from .models import SystemCommission
             logger.info(f"Processing commission payment for task {task_id}")
             
             # Check if commission exists
@@ -2523,16 +2252,7 @@ def payment_success(request):
                 commission.save()
                 logger.info(f"✅ Commission status updated to 'paid'")
             
-            # 💰 ADD REVENUE TO SYSTEM WALLET
-            # Ensure we use the correct commission amount
-            revenue_amount = task.commission_amount if task.commission_amount > 0 else 2.00
-            
-            wallet = SystemWallet.get_or_create_wallet()
-            wallet.add_revenue(
-                amount=revenue_amount,
-                description=f"Commission from task: {task.title}"
-            )
-            logger.info(f"💰 Revenue added to wallet: ₱{revenue_amount}")
+            # 💰 Revenue ledger entry is appended by the commission post_save signal
             
             # 🔔 UNLOCK CHAT IMMEDIATELY & MARK DEDUCTED
             task.chat_unlocked = True
@@ -2743,74 +2463,32 @@ def task_monitoring(request):
     
     if user.role == 'task_poster':
         # Faculty view: Monitor posted tasks
-        tasks = Task.objects.filter(poster=user).select_related('doer').order_by('-created_at')
-        
-        # Add rating status for each task
-        for task in tasks:
-            if task.status == 'completed' and task.doer:
-                # Check if poster has rated the doer
-                task.user_has_rated = Rating.objects.filter(
-                    task=task,
-                    rater=user,
-                    rated=task.doer
-                ).exists()
-            else:
-                task.user_has_rated = False
-        
-        # Calculate statistics
-        total_tasks = tasks.count()
-        completed_tasks = tasks.filter(status='completed').count()
-        in_progress = tasks.filter(status='in_progress').count()
-        pending = tasks.filter(status='open').count()
-        
-        context = {
-            'tasks': tasks,
-            'stats': {
-                'total': total_tasks,
-                'completed': completed_tasks,
-                'in_progress': in_progress,
-                'pending': pending,
-                'completion_rate': (completed_tasks / total_tasks * 100) if total_tasks > 0 else 0
-            },
-            'role': 'poster'
-        }
-        
+        tasks = Task.objects.filter(poster=user)
+        role = 'poster'
     elif user.role == 'task_doer':
         # Student view: Monitor assigned tasks
-        tasks = Task.objects.filter(doer=user).select_related('poster').order_by('-created_at')
-        
-        # Add rating status for each task
-        for task in tasks:
-            if task.status == 'completed' and task.poster:
-                # Check if doer has rated the poster
-                task.user_has_rated = Rating.objects.filter(
-                    task=task,
-                    rater=user,
-                    rated=task.poster
-                ).exists()
-            else:
-                task.user_has_rated = False
-        
-        # Calculate statistics
-        total_tasks = tasks.count()
-        completed_tasks = tasks.filter(status='completed').count()
-        in_progress = tasks.filter(status='in_progress').count()
-        pending = tasks.filter(status='open').count()
-        
-        context = {
-            'tasks': tasks,
-            'stats': {
-                'total': total_tasks,
-                'completed': completed_tasks,
-                'in_progress': in_progress,
-                'pending': pending,
-                'completion_rate': (completed_tasks / total_tasks * 100) if total_tasks > 0 else 0
-            },
-            'role': 'doer'
-        }
+        tasks = Task.objects.filter(doer=user)
+        role = 'doer'
     else:
         return redirect('dashboard')
     
+    # ✅ OPTIMIZED: Rating status annotated per task (core.participation) and
+    # status counts in one conditional aggregate, instead of a query per task
+    counts = TaskParticipationService.status_counts(tasks)
+    tasks = TaskParticipationService.annotate(tasks, user).select_related('poster', 'doer').order_by('-created_at')
+    
+    context = {
+        'tasks': tasks,
+        'stats': {
+            'total': counts['total'],
+            'completed': counts['completed'],
+            'in_progress': counts['in_progress'],
+            'pending': counts['open'],
+            'completion_rate': (counts['completed'] / counts['total'] * 100) if counts['total'] > 0 else 0
+        },
+        'role': role
+    }
+    
     return render(request, 'monitoring/task_monitoring.html', context)
 
 
@@ -2908,21 +2586,18 @@ def rate_user(request, task_id, user_id):
             rating.task = task
             rating.rater = request.user
             rating.rated = rated_user
-            rating.save()
             
-            # IMPROVED: Recalculate average rating from all ratings (more accurate)
-            all_ratings = Rating.objects.filter(rated=rated_user)
-            if all_ratings.exists():
-                avg_rating = all_ratings.aggregate(Avg('score'))['score__avg']
-                rated_user.avg_rating = round(avg_rating, 2)
-                rated_user.total_ratings = all_ratings.count()
-                rated_user.save()
-                logger.info(f"Updated {rated_user.fullname}'s rating: {rated_user.avg_rating} ({rated_user.total_ratings} ratings)")
+            # ✅ OPTIMIZED: Rating insert and the rated user's sum/count/avg and
+            # best/worst pointers commit together (RatingAggregateService via post_save)
+            with transaction.atomic():
+                rating.save()
+            rated_user.refresh_from_db(fields=['rating_sum', 'total_ratings', 'avg_rating', 'best_rating', 'worst_rating'])
+            logger.info(f"Updated {rated_user.fullname}'s rating: {rated_user.avg_rating} ({rated_user.total_ratings} ratings)")
             
             # Create notification
-            Notification.objects.create(
-                user=rated_user,
-                type='rating_received',
+            notify(
+                rated_user,
+                'rating_received',
                 title='New Rating Received',
                 message=f'{request.user.fullname} rated you {rating.score}/10 for "{task.title}"',
                 related_task=task
@@ -3012,17 +2687,15 @@ def apply_for_task(request, task_id):
     
     # Get user stats for display
     completed_tasks = Task.objects.filter(doer=request.user, status='completed').count()
-    user_ratings = Rating.objects.filter(rated=request.user)
-    avg_rating = user_ratings.aggregate(Avg('score'))['score__avg'] or 0
     
     context = {
         'form': form,
         'task': task,
         'user_stats': {
-            'rating': round(avg_rating, 1),
+            'rating': round(request.user.avg_rating, 1),
             'completed_tasks': completed_tasks,
             'is_newbie': completed_tasks < 3,
-            'total_ratings': user_ratings.count(),
+            'total_ratings': request.user.total_ratings,
         }
     }
     
@@ -3047,13 +2720,15 @@ def view_applications(request, task_id):
     from django.db.models import Count, Prefetch
     
     # Prefetch ratings and skills for each doer
-    # ✅ NOTE: Don't use slice [:3] in Prefetch queryset - it prevents further filtering
+    # ✅ OPTIMIZED: Only the 3 most recent ratings per doer (sliced Prefetch, Django 4.2+);
+    # best/worst come from the denormalized pointers instead of the full history
     applications = TaskApplication.objects.filter(
         task=task
-    ).select_related('doer').prefetch_related(
+    ).select_related('doer', 'doer__best_rating', 'doer__worst_rating').prefetch_related(
         Prefetch(
             'doer__received_ratings',
-            queryset=Rating.objects.order_by('-created_at')
+            queryset=Rating.objects.order_by('-created_at')[:3],
+            to_attr='recent_received_ratings'
         ),
         Prefetch(
             'doer__skills',
@@ -3061,19 +2736,9 @@ def view_applications(request, task_id):
         )
     ).order_by('-created_at')
     
-    # Calculate real-time ratings and add to each application
-    doer_rating_subquery = Rating.objects.filter(
-        rated=OuterRef('doer')
-    ).values('rated').annotate(
-        avg_rating=Avg('score')
-    ).values('avg_rating')
-    
+    # ✅ OPTIMIZED: Ratings are denormalized on the user row (core.ratings)
     applications = applications.annotate(
-        doer_current_rating=Coalesce(
-            Subquery(doer_rating_subquery, output_field=DecimalField(max_digits=3, decimal_places=2)),
-            Value(0.0, output_field=DecimalField(max_digits=3, decimal_places=2)),
-            output_field=DecimalField(max_digits=3, decimal_places=2)
-        ),
+        doer_current_rating=F('doer__avg_rating'),
         doer_completed_count=Count(
             'doer__assigned_tasks',
             filter=Q(doer__assigned_tasks__status='completed')
@@ -3097,17 +2762,11 @@ def view_applications(request, task_id):
         
         # ✅ OPTIMIZED: Use prefetched ratings
         # User Requirement: Show Highest and Lowest rating with feedback
-        all_ratings = list(app.doer.received_ratings.all())  # Already prefetched ordered by -created_at
-        
-        app.recent_ratings = all_ratings[:3]
+        app.recent_ratings = app.doer.recent_received_ratings  # Already prefetched ordered by -created_at
         
-        # Calculate Best and Worst manually from the prefetched list to avoid N+1
-        if all_ratings:
-            app.highest_rating = max(all_ratings, key=lambda r: r.score)
-            app.lowest_rating = min(all_ratings, key=lambda r: r.score)
-        else:
-            app.highest_rating = None
-            app.lowest_rating = None
+        # Best and Worst pointers are maintained with the rating aggregates
+        app.highest_rating = app.doer.best_rating
+        app.lowest_rating = app.doer.worst_rating
         
         # ✅ OPTIMIZED: Use prefetched skills
         app.validated_skills = [skill.skill_name for skill in app.doer.skills.all()]
@@ -3301,10 +2960,8 @@ def notifications(request):
     
     unread_count = user_notifications.filter(is_read=False).count()
     
-    # Pagination
-    paginator = Paginator(user_notifications, 20)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    # ✅ OPTIMIZED: Keyset pagination on (created_at, id)
+    page_obj = KeysetPaginator(user_notifications, 20).get_page(request.GET)
     
     context = {
         'notifications': page_obj,
@@ -3326,23 +2983,26 @@ def api_notifications_recent(request):
     """Get recent notifications for dropdown (AJAX)"""
     from django.utils.timesince import timesince
     
-    notifications = Notification.objects.filter(user=request.user).order_by('-created_at')[:10]
+    # ✅ OPTIMIZED: Keyset pages of 10; ?cursor=<next_cursor> loads older ones
+    page = KeysetPaginator(
+        Notification.objects.filter(user=request.user).order_by('-created_at'), 10
+    ).get_page(request.GET)
     unread_count = Notification.objects.filter(user=request.user, is_read=False).count()
     
-    notifications_data = []
-    for notif in notifications:
-        notifications_data.append({
-            'id': str(notif.id),
-            'type': notif.type,
-            'title': notif.title,
-            'message': notif.message,
-            'is_read': notif.is_read,
-            'time_ago': timesince(notif.created_at) + ' ago',
-            'created_at': notif.created_at.isoformat()
-        })
+    data = page.as_json(lambda notif: {
+        'id': str(notif.id),
+        'type': notif.type,
+        'title': notif.title,
+        'message': notif.message,
+        'is_read': notif.is_read,
+        'time_ago': timesince(notif.created_at) + ' ago',
+        'created_at': notif.created_at.isoformat()
+    })
     
     return JsonResponse({
-        'notifications': notifications_data,
+        'notifications': data['results'],
+        'next_cursor': data['next_cursor'],
+        'has_next': data['has_next'],
         'unread_count': unread_count
     })
 
@@ -3358,8 +3018,11 @@ def api_notifications_count(request):
 @require_POST
 def api_notifications_mark_as_read(request):
     """Mark all unread notifications as read (AJAX)"""
+    from .badges import UserStatsCache
+    
     try:
         Notification.objects.filter(user=request.user, is_read=False).update(is_read=True)
+        UserStatsCache.set(request.user.id, 'unread_notifications_count', 0)
         return JsonResponse({'success': True, 'message': 'All notifications marked as read'})
     except Exception as e:
         return JsonResponse({'success': False, 'error': str(e)}, status=500)
@@ -3375,9 +3038,7 @@ def api_tasks_updates(request):
         
         # Get new open tasks for this user
         if request.user.role == 'task_doer':
-            from core.algorithms import get_matched_tasks_for_user
-            new_tasks = get_matched_tasks_for_user(request.user)
-            new_tasks_count = new_tasks.count() if new_tasks else 0
+            new_tasks_count = get_matched_tasks_for_user(request.user).count()
         else:
             new_tasks_count = 0
         
@@ -3403,142 +3064,72 @@ def admin_dashboard(request):
         messages.error(request, "Access denied. Admin privileges required.")
         return redirect('dashboard')
     
-    from django.db.models import Count, Sum, Avg
-    from datetime import datetime, timedelta
-    from .models import SystemCommission, Payment, Report, StudentSkill
-    
+    from datetime import timedelta
     
     # Get date ranges
     today = timezone.now().date()
-    week_ago = today - timedelta(days=7)
     month_ago = today - timedelta(days=30)
     
+    # ✅ OPTIMIZED: counters come from the analytics rollup (2 queries)
+    from .analytics import AnalyticsRollupService
+    stats = AnalyticsRollupService.summary()
+    user_stats, task_stats = stats['users'], stats['tasks']
+    
     # User statistics
-    total_users = User.objects.count()
-    new_users_week = User.objects.filter(date_joined__gte=week_ago).count()
-    task_posters = User.objects.filter(role='task_poster').count()
-    task_doers = User.objects.filter(role='task_doer').count()
+    total_users = user_stats.get('all', 0)
+    new_users_week = stats['week'].get('users_joined', 0)
+    task_posters = user_stats.get('role:task_poster', 0)
+    task_doers = user_stats.get('role:task_doer', 0)
     
     # Task statistics
-    total_tasks = Task.objects.count()
-    open_tasks = Task.objects.filter(status='open').count()
-    in_progress_tasks = Task.objects.filter(status='in_progress').count()
-    completed_tasks = Task.objects.filter(status='completed').count()
-    tasks_this_week = Task.objects.filter(created_at__gte=week_ago).count()
+    total_tasks = task_stats.get('all', 0)
+    open_tasks = task_stats.get('status:open', 0)
+    in_progress_tasks = task_stats.get('status:in_progress', 0)
+    completed_tasks = task_stats.get('status:completed', 0)
+    tasks_this_week = stats['week'].get('tasks_created', 0)
     
     # Calculate Completion Rate
     completion_rate = round((completed_tasks / total_tasks * 100), 1) if total_tasks > 0 else 0
     
     # Identify Stalled Tasks (In Progress > 7 days)
-    stalled_tasks_count = Task.objects.filter(
-        status='in_progress',
-        updated_at__lte=week_ago
-    ).count()
-    
-    # Financial statistics
-    # ... (existing revenue logic) ...
-    # 1. Legacy SystemCommission Revenue
-    legacy_revenue = SystemCommission.objects.filter(status='paid').aggregate(
-        total=Sum('amount'))['total'] or 0
-    
-    # 2. New Task Payment Commission Revenue
-    payment_revenue = Payment.objects.filter(status='confirmed').aggregate(
-        total=Sum('commission_amount'))['total'] or 0
-        
-    total_revenue = legacy_revenue + payment_revenue
-
-    # Monthly Revenue
-    legacy_month = SystemCommission.objects.filter(
-        status='paid', 
-        paid_at__gte=month_ago
-    ).aggregate(total=Sum('amount'))['total'] or 0
+    stalled_tasks_count = task_stats.get('stalled', 0)
     
-    payment_month = Payment.objects.filter(
-        status='confirmed',
-        created_at__gte=month_ago  # Approximation using created_at for payments
-    ).aggregate(total=Sum('commission_amount'))['total'] or 0
-    
-    revenue_this_month = legacy_month + payment_month
+    # Financial statistics (pre-aggregated revenue ledger)
+    from .revenue import RevenueLedger
+    revenue = RevenueLedger.window_totals(lifetime=None, month=month_ago)
+    total_revenue = revenue['lifetime']['total']
+    revenue_this_month = revenue['month']['total']
     
     # Skill validation statistics
-    pending_skills = StudentSkill.objects.filter(status='pending').count()
-    verified_skills = StudentSkill.objects.filter(status='verified').count()
+    pending_skills = stats['skills'].get('status:pending', 0)
+    verified_skills = stats['skills'].get('status:verified', 0)
     
     # Recent activity
     recent_tasks = Task.objects.select_related('poster', 'doer').order_by('-created_at')[:10]
     recent_users = User.objects.order_by('-date_joined')[:10]
-    pending_reports = Report.objects.filter(status='pending').count()
+    pending_reports = stats['reports'].get('status:pending', 0)
     
     # Category breakdown (Project Count)
-    category_stats = Task.objects.values('category').annotate(
-        count=Count('id')
-    ).order_by('-count')
+    category_stats = AnalyticsRollupService.breakdown(task_stats, 'category')
     
     # 💰 Revenue by Category (Commission Source)
-    revenue_by_category = Payment.objects.filter(status='confirmed').values('task__category').annotate(
-        total_revenue=Sum('commission_amount')
-    ).order_by('-total_revenue')
+    revenue_by_category = RevenueLedger.by_category()
     
     # 📍 Campus Breakdown (Heatmap)
-    campus_stats = Task.objects.values('campus_location').annotate(
-        count=Count('id')
-    ).order_by('-count')
+    campus_stats = AnalyticsRollupService.breakdown(task_stats, 'campus_location')
     
     # 💵 Payment Method Split
-    payment_method_stats = Task.objects.values('payment_method').annotate(
-        count=Count('id')
-    ).order_by('-count')
+    payment_method_stats = AnalyticsRollupService.breakdown(task_stats, 'payment_method')
     
-    # 📈 Chart Data: Revenue Last 30 Days (Optimized)
+    # 📈 Chart Data: Revenue Last 30 Days (daily rollups + unrolled tail)
+    local_today = timezone.localdate()
+    daily_revenue = RevenueLedger.daily_series(since=local_today - timedelta(days=29))
     revenue_chart_labels = []
     revenue_chart_data = []
-    
-    # 1. Fetch all relevant data in bulk (2 database queries instead of 60)
-    month_legacy_commissions = SystemCommission.objects.filter(
-        status='paid',
-        paid_at__gte=month_ago
-    ).values('amount', 'paid_at')
-    
-    month_payments = Payment.objects.filter(
-        status='confirmed',
-        created_at__gte=month_ago
-    ).values('commission_amount', 'created_at')
-    
-    # 2. Process in Python
-    # Create a dictionary to hold daily totals: {'YYYY-MM-DD': 0.0}
-    daily_revenue_map = {}
-    
-    # Initialize all dates in range with 0
-    for i in range(30):
-        d = today - timedelta(days=i)
-        d_str = d.strftime('%Y-%m-%d')
-        daily_revenue_map[d_str] = 0.0
-
-    # Aggregate Legacy Commissions
-    for comm in month_legacy_commissions:
-        if comm['paid_at']:
-            # Adjust for timezone if necessary, or just take date
-            d_str = comm['paid_at'].astimezone(timezone.get_current_timezone()).date().strftime('%Y-%m-%d')
-            if d_str in daily_revenue_map:
-                daily_revenue_map[d_str] += float(comm['amount'])
-
-    # Aggregate New Payments
-    for pay in month_payments:
-        if pay['created_at']:
-             d_str = pay['created_at'].astimezone(timezone.get_current_timezone()).date().strftime('%Y-%m-%d')
-             if d_str in daily_revenue_map:
-                 daily_revenue_map[d_str] += float(pay['commission_amount'])
-                 
-    # 3. Build the sorted lists for Chart.js
-    # Range is 29 down to 0 (oldest to newest) - NO wait, today is index 0 in previous logic? 
-    # Previous: range(29, -1, -1) -> i=29 is 29 days ago. i=0 is today.
-    # So we want oldest first.
-    
     for i in range(29, -1, -1):
-        date = today - timedelta(days=i)
-        date_str = date.strftime('%Y-%m-%d')
+        date = local_today - timedelta(days=i)
         revenue_chart_labels.append(date.strftime('%b %d'))
-        revenue_chart_data.append(daily_revenue_map.get(date_str, 0.0))
+        revenue_chart_data.append(float(daily_revenue.get(date, 0)))
         
     # 🥧 Chart Data: Categories
     category_labels = [item['category'] for item in category_stats]
@@ -3593,6 +3184,7 @@ def admin_dashboard(request):
         'category_labels': category_labels,
         'category_counts': category_counts,
         'system_status': system_status,
+        'stats_refreshed_at': stats['refreshed_at'],
     }
 
     return render(request, 'admin_dashboard_modern.html', context)
@@ -3621,10 +3213,8 @@ def admin_users(request):
             Q(username__icontains=search)
         )
     
-    # Pagination
-    paginator = Paginator(users, 25)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    # ✅ OPTIMIZED: Keyset pagination on (date_joined, id)
+    page_obj = KeysetPaginator(users, 25, count='approximate').get_page(request.GET)
     
     context = {
         'users': page_obj,
@@ -3663,10 +3253,8 @@ def admin_tasks(request):
             Q(poster__fullname__icontains=search)
         )
     
-    # Pagination
-    paginator = Paginator(tasks, 25)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    # ✅ OPTIMIZED: Keyset pagination on (created_at, id)
+    page_obj = KeysetPaginator(tasks, 25, count='approximate').get_page(request.GET)
     
     context = {
         'tasks': page_obj,
@@ -3959,22 +3547,23 @@ def api_submit_feedback(request, task_id):
             rated=rated_user
         ).first()
         
-        if existing_rating:
-            # Update existing rating
-            existing_rating.score = score
-            existing_rating.feedback = feedback
-            existing_rating.save()
-            action = 'updated'
-        else:
-            # Create new rating
-            Rating.objects.create(
-                task=task,
-                rater=request.user,
-                rated=rated_user,
-                score=score,
-                feedback=feedback
-            )
-            action = 'created'
+        with transaction.atomic():
+            if existing_rating:
+                # Update existing rating
+                existing_rating.score = score
+                existing_rating.feedback = feedback
+                existing_rating.save()
+                action = 'updated'
+            else:
+                # Create new rating
+                Rating.objects.create(
+                    task=task,
+                    rater=request.user,
+                    rated=rated_user,
+                    score=score,
+                    feedback=feedback
+                )
+                action = 'created'
         
         # Send notification to rated user
         Notification.objects.create(
@@ -4219,20 +3808,12 @@ def api_send_message(request):
                 'payment_required': True
             })
         
-        # Determine attachment type
-        attachment_type = 'file'
-        if attachment:
-            ext = attachment.name.split('.')[-1].lower()
-            if ext in ['jpg', 'jpeg', 'png', 'gif', 'webp']:
-                attachment_type = 'image'
-
-        # Create message
+        # Create message (attachment_type is derived in Message.save)
         message = Message.objects.create(
             task=task,
             sender=request.user,
             message=message_content,
-            attachment=attachment,
-            attachment_type=attachment_type
+            attachment=attachment
         )
         
         # Create notification for the other party (defer to background to avoid blocking response)
@@ -4242,9 +3823,9 @@ def api_send_message(request):
             if recipient:
                 # Use on_commit to defer notification creation until after transaction commits
                 from django.db import transaction
-                transaction.on_commit(lambda: Notification.objects.create(
-                    user=recipient,
-                    type='system_message',
+                transaction.on_commit(lambda: notify(
+                    recipient,
+                    'system_message',
                     title=f'New message in "{task.title}"',
                     message=f'{request.user.fullname} sent you a message.',
                     related_task=task
@@ -4255,13 +3836,6 @@ def api_send_message(request):
         # Calculate remaining messages
         messages_remaining = max(0, 5 - message_count - 1) if message_count < 5 else None
         
-        # Determine attachment type
-        attachment_type = 'file'
-        if message.attachment:
-            ext = message.attachment.name.split('.')[-1].lower()
-            if ext in ['jpg', 'jpeg', 'png', 'gif', 'webp']:
-                attachment_type = 'image'
-
         return JsonResponse({
             'success': True,
             'message_id': str(message.id),
@@ -4270,7 +3844,7 @@ def api_send_message(request):
             'sender': request.user.fullname,
             'messages_remaining': messages_remaining,
             'attachment_url': message.attachment.url if message.attachment else None,
-            'attachment_type': attachment_type
+            'attachment_type': message.attachment_type or 'file'
         })
         
     except Task.DoesNotExist:
@@ -4286,101 +3860,110 @@ def api_send_message(request):
 
 @login_required
 def api_get_messages(request, task_id):
-    """API endpoint to fetch messages for a task (for polling) - OPTIMIZED"""
+    """
+    API endpoint to fetch messages for a task (for polling) - OPTIMIZED
+    
+    Query Parameters:
+    - after: message id or ISO timestamp; only newer messages are returned
+    
+    Responses carry an ETag of the conversation's last message, so an
+    unchanged poll sent with If-None-Match gets 304 without serialization.
+    """
     try:
-        task = get_object_or_404(Task, id=task_id)
+        # Participant ids only - no Task/User instances needed to authorize
+        participants = Task.objects.filter(id=task_id).values_list('poster_id', 'doer_id').first()
+        if participants is None:
+            return JsonResponse({'success': False, 'error': 'Task not found'}, status=404)
         
         # Check if user can access messages
-        if request.user not in [task.poster, task.doer]:
+        if request.user.id not in participants:
             return JsonResponse({'success': False, 'error': 'Not authorized'})
         
-        # Optimize: Only fetch last 20 messages (not 50) to reduce payload
-        # Most polling requests will only need 1-2 new messages
-        messages = Message.objects.filter(task=task).select_related('sender').order_by('-created_at')[:20]
-        messages = list(reversed(messages))  # Reverse to get chronological order
+        # ✅ OPTIMIZED: ETag from the last message ((task, created_at) index)
+        thread = Message.objects.filter(task_id=task_id)
+        last_id = thread.order_by('-created_at', '-id').values_list('id', flat=True).first()
+        etag = quote_etag(str(last_id or 'empty'))
+        not_modified = get_conditional_response(request, etag=etag)
+        if not_modified is not None:
+            not_modified['ETag'] = etag
+            return not_modified
+        
+        after = request.GET.get('after')
+        if after and after == str(last_id):
+            # Cursor already at the newest message
+            messages = []
+        elif after:
+            # Incremental sync: only messages newer than the cursor
+            messages = ChatPush.messages_after(task_id, after)
+            if messages is None:
+                return JsonResponse({'success': False, 'error': 'Invalid cursor'}, status=400)
+        else:
+            # Optimize: Only fetch last 20 messages (not 50) to reduce payload
+            messages = thread.select_related('sender').order_by('-created_at', '-id')[:20]
+            messages = list(reversed(messages))  # Reverse to get chronological order
         
         # Serialize messages with minimal data
-        messages_data = []
-        for msg in messages:
-            attachment_type = 'file'
-            if msg.attachment:
-                ext = msg.attachment.name.split('.')[-1].lower()
-                if ext in ['jpg', 'jpeg', 'png', 'gif', 'webp']:
-                    attachment_type = 'image'
-            
-            messages_data.append({
-                'id': str(msg.id),
-                'sender_id': str(msg.sender.id),
-                'sender_name': msg.sender.fullname,
-                'message': msg.message,
-                'created_at': msg.created_at.isoformat(),
-                'attachment_url': msg.attachment.url if msg.attachment else None,
-                'attachment_type': attachment_type
-            })
+        messages_data = [ChatPush.serialize_message(msg) for msg in messages]
         
-        return JsonResponse({
+        response = JsonResponse({
             'success': True,
             'messages': messages_data,
-            'count': len(messages_data)
+            'count': len(messages_data),
+            'cursor': messages_data[-1]['id'] if messages_data else after
         })
+        response['ETag'] = etag
+        response['Cache-Control'] = 'private, no-cache'
+        return response
         
     except Exception as e:
         logger.error(f"Error fetching messages: {str(e)}")
         return JsonResponse({'success': False, 'error': str(e)})
 
 
+@login_required
+@require_http_methods(["GET"])
+def api_chat_stream(request, task_id):
+    """
+    Server-Sent Events stream of chat deltas for a task (replaces polling)
+    
+    Sends new messages and chat access changes as they are published.
+    On reconnect the browser sends Last-Event-ID and missed messages are
+    replayed from the database once. Without a shared broker the stream
+    would miss other workers' messages, so it answers 204 and EventSource
+    stops reconnecting (the page polls instead).
+    """
+    task = get_object_or_404(Task, id=task_id)
+    
+    if request.user.id not in (task.poster_id, task.doer_id):
+        return JsonResponse({'success': False, 'error': 'Not authorized'}, status=403)
+    
+    if not ChatPush.enabled():
+        return HttpResponse(status=204)
+    
+    last_event_id = request.headers.get('Last-Event-ID') or request.GET.get('after')
+    response = StreamingHttpResponse(
+        ChatPush.stream(task, last_event_id=last_event_id),
+        content_type='text/event-stream'
+    )
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # Disable nginx buffering
+    return response
+
+
 # ==================== PAYMONGO LIVE INTEGRATION ====================
 
-def make_paymongo_request(endpoint, payload, max_retries=3):
+def make_paymongo_request(endpoint, payload, idempotency_key=None):
     """
-    Helper function to make PayMongo API requests with retry logic
-    """
-    import time
-    
-    secret_key = settings.PAYMONGO_SECRET_KEY
-    auth_header = base64.b64encode(f"{secret_key}:".encode()).decode()
-    headers = {
-        "accept": "application/json",
-        "content-type": "application/json",
-        "authorization": f"Basic {auth_header}"
-    }
+    Helper function to make PayMongo POST requests
     
-    for attempt in range(max_retries):
-        try:
-            response = requests.post(
-                f"https://api.paymongo.com/v1{endpoint}",
-                headers=headers,
-                data=json.dumps(payload),
-                timeout=10
-            )
-            
-            if response.status_code == 200:
-                return response
-            elif response.status_code >= 500 and attempt < max_retries - 1:
-                # Server error, retry with exponential backoff
-                wait_time = 2 ** attempt
-                logger.warning(f"PayMongo server error, retrying in {wait_time}s (attempt {attempt + 1}/{max_retries})")
-                time.sleep(wait_time)
-                continue
-            else:
-                return response
-                
-        except requests.exceptions.Timeout:
-            if attempt < max_retries - 1:
-                wait_time = 2 ** attempt
-                logger.warning(f"PayMongo timeout, retrying in {wait_time}s (attempt {attempt + 1}/{max_retries})")
-                time.sleep(wait_time)
-            else:
-                raise
-        except requests.exceptions.ConnectionError:
-            if attempt < max_retries - 1:
-                wait_time = 2 ** attempt
-                logger.warning(f"PayMongo connection error, retrying in {wait_time}s (attempt {attempt + 1}/{max_retries})")
-                time.sleep(wait_time)
-            else:
-                raise
+    ✅ OPTIMIZED: Goes through the shared PayMongo transport (pooled
+    session, timeouts, circuit breaker, latency metrics). Creates carry an
+    Idempotency-Key so they are retried safely on 5xx/timeouts.
+    Raises CircuitOpenError while PayMongo is failing.
+    """
+    from .paymongo import get_transport, new_idempotency_key
     
-    return None
+    return get_transport().request('POST', endpoint, payload, idempotency_key=idempotency_key or new_idempotency_key())
 
 
 @csrf_exempt
@@ -4483,19 +4066,7 @@ def create_gcash_payment(request):
             }
         }
 
-        # Use live secret key
-        secret_key = settings.PAYMONGO_SECRET_KEY
-        auth_header = base64.b64encode(f"{secret_key}:".encode()).decode()
-
-        response = requests.post(
-            "https://api.paymongo.com/v1/sources",
-            headers={
-                "accept": "application/json",
-                "content-type": "application/json",
-                "authorization": f"Basic {auth_header}"
-            },
-            data=json.dumps(payload)
-        )
+        response = make_paymongo_request("/sources", payload)
 
         if response.status_code == 200:
             result = response.json()
@@ -4511,6 +4082,8 @@ def create_gcash_payment(request):
             logger.error(f"GCash payment creation failed: {response.text}")
             return JsonResponse({'error': 'Payment creation failed'}, status=500)
             
+    except CircuitOpenError:
+        return JsonResponse({'error': 'Payment service temporarily unavailable, please try again shortly'}, status=503)
     except Exception as e:
         logger.error(f"GCash payment creation error: {str(e)}")
         return JsonResponse({'error': str(e)}, status=500)
@@ -4632,359 +4205,48 @@ def paymongo_webhook(request):
     
     STEP 3 & STEP 5B: PayMongo webhook processing
     Includes webhook signature verification for security
+    
+    ✅ OPTIMIZED: Ingest-then-process. The verified event is stored in
+    InboundWebhookEvent (provider retries are deduplicated by event id)
+    and the response goes out immediately; core.webhooks applies events
+    in a worker, in order per task.
     """
+    from .webhooks import WebhookQueue, verify_signature
+    
     if request.method != 'POST':
         return JsonResponse({'error': 'POST only'}, status=405)
     
+    # 🔐 VERIFY WEBHOOK SIGNATURE
+    webhook_secret = settings.PAYMONGO_WEBHOOK_SECRET
+    if webhook_secret:
+        signature = request.headers.get('X-Paymongo-Signature', '')
+        if not verify_signature(request.body, signature, webhook_secret):
+            logger.error("❌ Invalid webhook signature")
+            return JsonResponse({'error': 'Invalid signature'}, status=401)
+    else:
+        logger.warning("⚠️ PAYMONGO_WEBHOOK_SECRET not configured - skipping signature verification")
+    
     try:
-        # 🔐 VERIFY WEBHOOK SIGNATURE
-        webhook_secret = settings.PAYMONGO_WEBHOOK_SECRET
-        if webhook_secret:
-            # Get signature from header
-            signature = request.headers.get('X-Paymongo-Signature', '')
-            
-            # Calculate expected signature
-            body = request.body
-            expected_signature = hmac.new(
-                webhook_secret.encode(),
-                body,
-                hashlib.sha256
-            ).hexdigest()
-            
-            # Verify signature
-            if not hmac.compare_digest(signature, expected_signature):
-                logger.error(f"❌ Invalid webhook signature. Expected: {expected_signature}, Got: {signature}")
-                return JsonResponse({'error': 'Invalid signature'}, status=401)
-            
-            logger.info(f"✅ Webhook signature verified")
-        else:
-            logger.warning("⚠️ PAYMONGO_WEBHOOK_SECRET not configured - skipping signature verification")
-        
-        event = json.loads(request.body)
-        event_type = event["data"]["attributes"]["type"]
-        
-        logger.info(f"🔔 PayMongo webhook received: {event_type}")
-        logger.info(f"Webhook payload: {json.dumps(event, indent=2)}")
-        
-        if event_type == "payment.paid":
-            # Extract information from payment description
-            description = event["data"]["attributes"]["data"]["attributes"]["description"]
-            amount_centavos = event["data"]["attributes"]["data"]["attributes"]["amount"]
-            amount_pesos = amount_centavos / 100
-            source_id = event["data"]["attributes"]["data"]["id"]
-            
-            logger.info(f"💰 Payment received: ₱{amount_pesos} - Description: {description}")
-            logger.info(f"Source ID: {source_id}")
-            
-            from .models import Task, SystemCommission, Payment
-            
-            # 🔹 STEP 3: ₱2 System Fee Payment OR 10% Commission Payment
-            if "System Fee" in description or "Commission" in description or amount_pesos == 2.0:
-                logger.info("📝 Processing as SYSTEM FEE payment")
-                
-                # Extract task ID from description
-                # Format: "ErrandExpress System Fee - Task Title" or "ErrandExpress System Fee - {task_id}"
-                try:
-                    # Try to extract UUID from description
-                    import re
-                    uuid_pattern = r'[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}'
-                    match = re.search(uuid_pattern, description)
-                    
-                    if match:
-                        task_id = match.group(0)
-                    else:
-                        # Fallback: try to get from last part
-                        task_id = description.split(" ")[-1]
-                    
-                    logger.info(f"Extracted task_id: {task_id}")
-                    
-                    task = Task.objects.get(id=task_id)
-                    commission = SystemCommission.objects.get(task=task)
-                    
-                    # Mark ₱2 commission as paid
-                    commission.status = 'paid'
-                    commission.paid_at = timezone.now()
-                    commission.paymongo_payment_id = source_id
-                    commission.save()
-                    
-                    # 💰 ADD REVENUE TO SYSTEM WALLET
-                    from .models import SystemWallet
-                    wallet = SystemWallet.get_or_create_wallet()
-                    wallet.add_revenue(
-                        amount=amount_pesos,
-                        description=f"System fee from task: {task.title}"
-                    )
-                    logger.info(f"💰 Revenue added to wallet: ₱{amount_pesos}")
-                    
-                    # 🔔 UNLOCK CHAT AUTOMATICALLY
-                    task.chat_unlocked = True
-                    task.save()
-                    
-                    # Notify poster
-                    Notification.objects.create(
-                        user=task.poster,
-                        type='payment_confirmed',
-                        title='₱2 System Fee Paid! 💳',
-                        message=f'System fee paid successfully. Chat unlocked for "{task.title}"',
-                        related_task=task
-                    )
-                    
-                    logger.info(f"✅ System fee payment CONFIRMED - chat unlocked for task {task_id}")
-                    
-                except (Task.DoesNotExist, SystemCommission.DoesNotExist) as e:
-                    logger.error(f"❌ Task or commission not found for ₱2 payment. Task ID: {task_id}, Error: {str(e)}")
-                except Exception as e:
-                    logger.error(f"❌ Error processing system fee payment: {str(e)}")
-            
-            # 🔹 STEP 5B: Task Doer Payment (GCash/Card) - NEW
-            elif "Task Payment" in description or ("ErrandExpress Task Payment" in description):
-                logger.info("📝 Processing as TASK DOER PAYMENT")
-                
-                # Extract task ID and payment ID from description
-                try:
-                    import re
-                    uuid_pattern = r'[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}'
-                    matches = re.findall(uuid_pattern, description)
-                    
-                    task_id = None
-                    payment_id = None
-                    
-                    if len(matches) >= 2:
-                        task_id = matches[0]
-                        payment_id = matches[1]
-                    elif len(matches) == 1:
-                        task_id = matches[0]
-                    else:
-                        # Fallback: try to extract from quotes
-                        task_id = description.split('"')[1] if '"' in description else description.split(" ")[-1]
-                    
-                    logger.info(f"Extracted task_id: {task_id}, payment_id: {payment_id}")
-                    
-                    task = Task.objects.get(id=task_id)
-                    
-                    # Try to get existing payment by ID first
-                    if payment_id:
-                        try:
-                            payment = Payment.objects.get(id=payment_id)
-                            logger.info(f"Found existing payment record: {payment_id}")
-                        except Payment.DoesNotExist:
-                            logger.warning(f"Payment ID {payment_id} not found, creating new record")
-                            payment = None
-                    else:
-                        payment = None
-                    
-                    # If no payment found, try to get by task
-                    if not payment:
-                        try:
-                            payment = Payment.objects.get(task=task, status='pending_payment')
-                            logger.info(f"Found pending payment for task: {payment.id}")
-                        except Payment.DoesNotExist:
-                            logger.warning(f"No pending payment found for task, creating new record")
-                            payment = None
-                    
-                    # Create payment if it doesn't exist
-                    if not payment:
-                        payment = Payment.objects.create(
-                            task=task,
-                            payer=task.poster,
-                            receiver=task.doer,
-                            amount=task.price,
-                            method='gcash',
-                            status='pending_payment'
-                        )
-                        logger.info(f"Created new payment record: {payment.id}")
-                    
-                    # Mark task doer payment as paid
-                    payment.status = 'paid'
-                    payment.paid_at = timezone.now()
-                    payment.paymongo_source_id = source_id
-                    payment.save()
-                    
-                    logger.info(f"✅ Payment record updated: {payment.id}, status=paid")
-                    
-                    # 💰 ADD COMMISSION TO SYSTEM WALLET
-                    from .models import SystemWallet
-                    from decimal import Decimal
-                    commission_amount = Decimal(str(task.price)) * Decimal('0.10')
-                    wallet.add_revenue(
-                        amount=commission_amount,
-                        description=f"Commission from task payment: {task.title}"
-                    )
-                    logger.info(f"💰 Commission added to wallet: ₱{commission_amount}")
-                    
-                    # Complete the task
-                    task.status = 'completed'
-                    task.completed_at = timezone.now()
-                    task.save()
-                    logger.info(f"✅ Task marked as completed: {task_id}")
-                    
-                    # Calculate Net Amount for Doer (100% of Task Price)
-                    # Amount Pesos is Total (110%)
-                    net_amount = amount_pesos / 1.10
-                    
-                    # Notify doer about payment
-                    Notification.objects.create(
-                        user=task.doer,
-                        type='payment_received',
-                        title='Payment Received! 💰',
-                        message=f'You received ₱{net_amount:,.2f} for completing "{task.title}". Task poster can now rate you.',
-                        related_task=task
-                    )
-                    logger.info(f"✅ Notification sent to task doer {task.doer.id}")
-                    
-                    # Notify task poster that payment is confirmed
-                    Notification.objects.create(
-                        user=task.poster,
-                        type='payment_confirmed',
-                        title='Task Doer Payment Confirmed! 💳',
-                        message=f'Payment of ₱{amount_pesos:,.2f} (incl. fees) sent to {task.doer.fullname}. You can now rate them.',
-                        related_task=task
-                    )
-                    logger.info(f"✅ Notification sent to task poster {task.poster.id}")
-                    
-                    logger.info(f"✅ Task doer payment CONFIRMED - task {task_id} payment verified")
-                    
-                except Task.DoesNotExist:
-                    logger.error(f"❌ Task not found for payment: {task_id}")
-                except Exception as e:
-                    logger.error(f"❌ Error processing task doer payment: {str(e)}", exc_info=True)
-            
-            # 🔹 STEP 5B: Main Task Payment (PayMongo/GCash)
-            elif "Task Payment" in description or (amount_pesos > 2.0 and amount_pesos < 100000):
-                logger.info(f"📝 Processing as MAIN TASK PAYMENT: ₱{amount_pesos}")
-                
-                try:
-                    # Try to find payment by source_id first (most reliable)
-                    payment = None
-                    try:
-                        payment = Payment.objects.get(
-                            paymongo_source_id=source_id,
-                            status='pending_payment'
-                        )
-                        logger.info(f"Found payment by source_id: {payment.id}")
-                    except Payment.DoesNotExist:
-                        logger.info("Payment not found by source_id, trying task ID extraction...")
-                        
-                        # Fallback: Extract task ID from description
-                        import re
-                        uuid_pattern = r'[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}'
-                        match = re.search(uuid_pattern, description)
-                        
-                        if match:
-                            task_id = match.group(0)
-                            logger.info(f"Extracted task_id from description: {task_id}")
-                            
-                            # Find the pending payment record
-                            payment = Payment.objects.get(
-                                task__id=task_id,
-                                method='paymongo',  # Fixed: use 'paymongo' method
-                                status='pending_payment'
-                            )
-                            logger.info(f"Found payment by task_id: {payment.id}")
-                    
-                    if not payment:
-                        logger.error("Could not find payment record")
-                        return JsonResponse({'error': 'Payment not found'}, status=404)
-                    
-                    # Verify amount matches
-                    if float(payment.amount) != amount_pesos:
-                        logger.error(f"Amount mismatch: expected ₱{payment.amount}, got ₱{amount_pesos}")
-                        return JsonResponse({'error': 'Amount mismatch'}, status=400)
-                    
-                    # Mark main task payment as confirmed
-                    payment.status = 'confirmed'  # Fixed: use 'confirmed' not 'paid'
-                    payment.paid_at = timezone.now()
-                    payment.paymongo_payment_id = source_id
-                    payment.save()
-                    
-                    logger.info(f"✅ Payment confirmed: {payment.id}")
-                    
-                    # 💰 ADD COMMISSION TO SYSTEM WALLET
-                    from .models import SystemWallet
-                    from decimal import Decimal
-                    wallet = SystemWallet.get_or_create_wallet()
-                    commission_amount = payment.commission_amount  # Already calculated in Payment.save()
-                    wallet.add_revenue(
-                        amount=commission_amount,
-                        description=f"Commission from task payment: {payment.task.title}"
-                    )
-                    logger.info(f"💰 Commission added to wallet: ₱{commission_amount}")
-                    
-                    # 🔔 COMPLETE TASK AUTOMATICALLY
-                    task = payment.task
-                    task.status = 'completed'
-                    task.completed_at = timezone.now()
-                    task.save()
-                    
-                    logger.info(f"✅ Task completed: {task.id}")
-                    
-                    # Notify task poster (payer)
-                    Notification.objects.create(
-                        user=payment.payer,  # Fixed: use 'payer' not 'poster'
-                        type='payment_confirmed',
-                        title='Task Payment Confirmed! 💰',
-                        message=f'GCash payment of ₱{amount_pesos} confirmed. Task "{task.title}" completed!',
-                        related_task=task
-                    )
-                    
-                    # Notify task doer (receiver)
-                    Notification.objects.create(
-                        user=payment.receiver,  # Fixed: use 'receiver' not 'doer'
-                        type='payment_received',
-                        title='Payment Received! 🎉',
-                        message=f'You received ₱{amount_pesos} for task "{task.title}". Task completed!',
-                        related_task=task
-                    )
-                    
-                    # 🔹 STEP 6: Prompt for ratings
-                    Notification.objects.create(
-                        user=payment.payer,  # Fixed: use 'payer' not 'poster'
-                        type='rate_reminder',
-                        title='Please Rate Your Doer',
-                        message=f'Task "{task.title}" completed. Please rate {payment.receiver.fullname}.',
-                        related_task=task
-                    )
-                    
-                    Notification.objects.create(
-                        user=payment.receiver,  # Fixed: use 'receiver' not 'doer'
-                        type='rate_reminder',
-                        title='Please Rate Your Poster',
-                        message=f'Task "{task.title}" completed. Please rate {payment.payer.fullname}.',
-                        related_task=task
-                    )
-                    
-                    logger.info(f"✅ Task payment CONFIRMED - task {task.id} completed automatically via webhook")
-                    
-                except Payment.DoesNotExist:
-                    logger.error(f"❌ Payment record not found for task payment")
-                except Task.DoesNotExist:
-                    logger.error(f"❌ Task not found for payment")
-                except Exception as e:
-                    logger.error(f"❌ Error processing task payment: {str(e)}", exc_info=True)
-
-        
-        elif event_type == "source.chargeable":
-            # Handle GCash payment source creation
-            logger.info("🔔 GCash payment source is chargeable")
-        
-        return JsonResponse({"status": "received"})
-        
-    except json.JSONDecodeError as e:
+        event, created = WebhookQueue.ingest(request.body)
+    except ValueError as e:
         logger.error(f"❌ Invalid JSON in webhook: {str(e)}")
         return JsonResponse({'error': 'Invalid JSON'}, status=400)
-    except Exception as e:
-        logger.error(f"❌ Webhook processing error: {str(e)}")
-        logger.error(f"Traceback: {traceback.format_exc()}")
-        return JsonResponse({'error': str(e)}, status=500)
+    
+    if created:
+        logger.info(f"🔔 PayMongo webhook queued: {event.event_type} ({event.event_id})")
+        transaction.on_commit(WebhookQueue.schedule_processing)
+    
+    return JsonResponse({"status": "received", "duplicate": not created})
 
 
 @login_required
 def pending_ratings(request):
     """View to list all tasks that require a rating from the user"""
-    pending_tasks = check_pending_ratings(request.user)
+    # ✅ OPTIMIZED: One query; the template reads both participants
+    pending_tasks = list(check_pending_ratings(request.user).select_related('poster', 'doer'))
     
     # If no pending tasks, redirect back to dashboard
-    if not pending_tasks.exists():
+    if not pending_tasks:
         messages.success(request, "You're all caught up on ratings!")
         return redirect('dashboard')
         
@@ -5126,25 +4388,15 @@ def create_task_payment_intent(request):
             }
         }
 
-        # Use live secret key
-        secret_key = settings.PAYMONGO_SECRET_KEY
-        auth_header = base64.b64encode(f"{secret_key}:".encode()).decode()
-
-        response = requests.post(
-            "https://api.paymongo.com/v1/payment_intents",
-            headers={
-                "accept": "application/json",
-                "content-type": "application/json",
-                "authorization": f"Basic {auth_header}"
-            },
-            data=json.dumps(payload)
-        )
+        response = make_paymongo_request("/payment_intents", payload)
 
         logger.info(f"Task payment intent created for payment {payment_id}: ₱{payment.amount}")
         return JsonResponse(response.json())
         
     except Payment.DoesNotExist:
         return JsonResponse({'error': 'Payment not found'}, status=404)
+    except CircuitOpenError:
+        return JsonResponse({'error': 'Payment service temporarily unavailable, please try again shortly'}, status=503)
     except Exception as e:
         logger.error(f"Task payment intent creation failed: {str(e)}")
         return JsonResponse({'error': str(e)}, status=500)
@@ -5214,20 +4466,9 @@ def create_task_gcash_payment(request):
             logger.error("PAYMONGO_SECRET_KEY not configured")
             return JsonResponse({'error': 'Payment service not configured'}, status=500)
         
-        auth_header = base64.b64encode(f"{secret_key}:".encode()).decode()
-
         logger.info(f"Payload: {json.dumps(payload, indent=2)}")
 
-        response = requests.post(
-            "https://api.paymongo.com/v1/sources",
-            headers={
-                "accept": "application/json",
-                "content-type": "application/json",
-                "authorization": f"Basic {auth_header}"
-            },
-            json=payload,
-            timeout=10
-        )
+        response = make_paymongo_request("/sources", payload)
 
         logger.info(f"PayMongo response status: {response.status_code}")
         logger.info(f"PayMongo response: {response.text}")
@@ -5262,6 +4503,8 @@ def create_task_gcash_payment(request):
     except json.JSONDecodeError:
         logger.error("Invalid JSON in request body")
         return JsonResponse({'error': 'Invalid request format'}, status=400)
+    except CircuitOpenError:
+        return JsonResponse({'error': 'Payment service temporarily unavailable, please try again shortly'}, status=503)
     except Exception as e:
         logger.error(f"Task GCash payment creation error: {str(e)}", exc_info=True)
         return JsonResponse({'error': str(e)}, status=500)
@@ -5380,30 +4623,21 @@ def system_wallet(request):
     from django.db.models import Sum, Count
     from datetime import datetime, timedelta
     
+    from .revenue import RevenueLedger
+    
     # Get all commissions
     all_commissions = SystemCommission.objects.all()
     
-    # Financial Statistics (Dual Source: SystemCommission + Payment)
+    # Financial Statistics (pre-aggregated revenue ledger)
     
     # 1. TOTAL REVENUE
-    legacy_total = all_commissions.filter(status='paid').aggregate(total=Sum('amount'))['total'] or 0
-    payment_total = Payment.objects.filter(status='confirmed').aggregate(total=Sum('commission_amount'))['total'] or 0
-    total_revenue = legacy_total + payment_total
-    
-    legacy_count = all_commissions.filter(status='paid').count()
-    payment_count = Payment.objects.filter(status='confirmed').count()
-    total_commissions_count = legacy_count + payment_count
+    revenue = RevenueLedger.window_totals(lifetime=None, month=timezone.localdate().replace(day=1))
+    total_revenue = revenue['lifetime']['total']
+    total_commissions_count = revenue['lifetime']['entries']
     
     # 2. MONTHLY REVENUE
-    current_month = timezone.now().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-    
-    legacy_month = all_commissions.filter(status='paid', paid_at__gte=current_month).aggregate(total=Sum('amount'))['total'] or 0
-    payment_month = Payment.objects.filter(status='confirmed', confirmed_at__gte=current_month).aggregate(total=Sum('commission_amount'))['total'] or 0
-    monthly_revenue = legacy_month + payment_month
-    
-    legacy_month_count = all_commissions.filter(status='paid', paid_at__gte=current_month).count()
-    payment_month_count = Payment.objects.filter(status='confirmed', confirmed_at__gte=current_month).count()
-    monthly_commissions_count = legacy_month_count + payment_month_count
+    monthly_revenue = revenue['month']['total']
+    monthly_commissions_count = revenue['month']['entries']
     
     # 3. PENDING REVENUE
     legacy_pending = all_commissions.filter(status='unpaid').aggregate(total=Sum('amount'))['total'] or 0
@@ -5417,10 +4651,12 @@ def system_wallet(request):
     # Recent transactions
     recent_commissions = all_commissions.select_related('task', 'task__poster').order_by('-created_at')[:20]
     
-    # Statistics
-    active_users = User.objects.filter(is_active=True).count()
-    completed_tasks = Task.objects.filter(status='completed').count()
-    total_tasks = Task.objects.exclude(status='open').count()
+    # Statistics (analytics rollup snapshot)
+    from .analytics import AnalyticsRollupService
+    stats = AnalyticsRollupService.summary()
+    active_users = stats['users'].get('active', 0)
+    completed_tasks = stats['tasks'].get('status:completed', 0)
+    total_tasks = stats['tasks'].get('all', 0) - stats['tasks'].get('status:open', 0)
     success_rate = round((completed_tasks / total_tasks * 100) if total_tasks > 0 else 0, 1)
     avg_transaction = round(total_revenue / total_commissions_count, 2) if total_commissions_count > 0 else 0
     
@@ -5517,6 +4753,7 @@ def messages_list(request, task_id=None):
             if task.poster == user or task.doer == user:
                 # Delete all messages for this task
                 Message.objects.filter(task=task).delete()
+                ConversationService.clear(task.id)
                 messages.success(request, 'Conversation deleted successfully')
             else:
                 messages.error(request, 'You do not have permission to delete this conversation')
@@ -5546,9 +4783,9 @@ def messages_list(request, task_id=None):
                         # Create notification for the other party
                         recipient = task.doer if task.poster == user else task.poster
                         if recipient:
-                            Notification.objects.create(
-                                user=recipient,
-                                type='system_message',
+                            notify(
+                                recipient,
+                                'system_message',
                                 title=f'New message in "{task.title}"',
                                 message=f'{user.fullname} sent you a message.',
                                 related_task=task
@@ -5568,7 +4805,7 @@ def messages_list(request, task_id=None):
         return redirect('messages_chat', task_id=task_id)
     
     # Get all tasks where user has chat access
-    from django.db.models import Prefetch, Count, Q
+    from django.db.models import FilteredRelation, Q
     
     tasks_queryset = Task.objects.none()
     
@@ -5586,26 +4823,29 @@ def messages_list(request, task_id=None):
             doer__isnull=True
         ).select_related('poster', 'doer')
 
-    # Optimize: annotate unread count and prefetch last message/payment
-    # 1. Annotate unread count
+    # ✅ OPTIMIZED: Last message and unread count come from this user's
+    # ConversationSummary row (one LEFT JOIN) instead of prefetching every
+    # message and counting unread ones across the Message table
     tasks_with_chat = tasks_queryset.annotate(
-        unread_cnt=Count(
-            'messages', 
-            filter=Q(messages__is_read=False) & ~Q(messages__sender=user)
-        )
-    ).order_by('-updated_at')
-
-    # 2. Prefetch messages and select related payment
-    # Use select_related for 'payment' (OneToOne) to avoid N+1 and use LEFT JOIN
-    tasks_with_chat = tasks_with_chat.select_related('payment').prefetch_related(
-        Prefetch('messages', queryset=Message.objects.order_by('-created_at'), to_attr='cached_messages')
-    )
+        my_conversation=FilteredRelation(
+            'conversation_summaries', condition=Q(conversation_summaries__user=user)
+        ),
+        unread_cnt=Coalesce(F('my_conversation__unread_count'), 0),
+        last_message_preview=F('my_conversation__last_message_preview'),
+        last_message_at=F('my_conversation__last_message_at'),
+        last_sender_id=F('my_conversation__last_sender_id'),
+    ).select_related('payment').order_by('-updated_at')
     
     # Get last message and unread count for each task
     conversations = []
     for task in tasks_with_chat:
-        # Use prefetched messages (cached_messages is a list ordered by -created_at)
-        last_message = task.cached_messages[0] if task.cached_messages else None
+        last_message = None
+        if task.last_message_at:
+            last_message = {
+                'message': task.last_message_preview,
+                'created_at': task.last_message_at,
+                'sender_id': task.last_sender_id,
+            }
         
         # Use annotated unread count
         unread_count = task.unread_cnt
@@ -5655,8 +4895,8 @@ def messages_list(request, task_id=None):
             if user in [active_task.poster, active_task.doer]:
                 # Get all messages for this task
                 active_messages = Message.objects.filter(task=active_task).order_by('created_at')
-                # Mark messages as read
-                Message.objects.filter(task=active_task).exclude(sender=user).update(is_read=True)
+                # Mark conversation as read
+                ConversationService.mark_read(active_task.id, user)
                 # Get other user
                 other_user = active_task.doer if user == active_task.poster else active_task.poster
                 # Check chat access
@@ -5667,7 +4907,7 @@ def messages_list(request, task_id=None):
         # Auto-select first conversation
         active_task = conversations[0]['task']
         active_messages = Message.objects.filter(task=active_task).order_by('created_at')
-        Message.objects.filter(task=active_task).exclude(sender=user).update(is_read=True)
+        ConversationService.mark_read(active_task.id, user)
         other_user = conversations[0]['other_user']
         chat_access = check_chat_access(active_task.id, user)
     
@@ -5699,6 +4939,7 @@ def messages_list(request, task_id=None):
         'chat_access': chat_access,
         'show_pay_button': show_pay_button,
         'message_form': MessageForm(),
+        'chat_push': ChatPush.enabled(),
     }
     
     return render(request, 'messages/list.html', context)
@@ -5721,8 +4962,8 @@ def chat_view(request, task_id):
     # Get all messages for this task
     task_messages = Message.objects.filter(task=task).order_by('created_at')
     
-    # Mark messages as read
-    Message.objects.filter(task=task).exclude(sender=user).update(is_read=True)
+    # Mark conversation as read
+    ConversationService.mark_read(task.id, user)
     
     # Get all conversations for sidebar
     if user.role == 'task_doer':
@@ -5746,6 +4987,7 @@ def chat_view(request, task_id):
         'other_user': other_user,
         'all_tasks': all_tasks,
         'message_form': MessageForm(),
+        'chat_push': ChatPush.enabled(),
     }
     
     return render(request, 'chat_modern.html', context)
@@ -5756,7 +4998,6 @@ def payments_dashboard(request):
     """Comprehensive payments dashboard with statistics and history"""
     user = request.user
     from django.db.models import Sum, Count, Q
-    from datetime import datetime, timedelta
     
     # Get all payments for the user
     if user.role == 'task_doer':
@@ -5775,122 +5016,58 @@ def payments_dashboard(request):
             'task', 'task__poster', 'task__doer'
         ).order_by('-created_at')
     
-    # Calculate statistics
-    total_payments = all_payments.aggregate(
-        total=Sum('amount'),
-        count=Count('id')
-    )
-    
-    confirmed_payments = all_payments.filter(status='confirmed').aggregate(
-        total=Sum('amount'),
-        count=Count('id')
-    )
-    
-    pending_payments_agg = all_payments.filter(
-        Q(status='pending_payment') | Q(status='pending_confirmation')
-    ).aggregate(
-        total=Sum('amount'),
-        count=Count('id')
-    )
-    
-    # This month's payments
-    first_day_of_month = datetime.now().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-    month_payments = all_payments.filter(
-        created_at__gte=first_day_of_month,
-        status='confirmed'
-    ).aggregate(
-        total=Sum('amount'),
-        count=Count('id')
+    # ✅ OPTIMIZED: All payment statistics in one conditional aggregate
+    pending_q = Q(status__in=TaskParticipationService.OPEN_PAYMENT_STATUSES)
+    first_day_of_month = timezone.localtime().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    month_q = Q(status='confirmed', created_at__gte=first_day_of_month)
+    totals = all_payments.order_by().aggregate(
+        total_count=Count('id'),
+        confirmed_total=Sum('amount', filter=Q(status='confirmed')),
+        confirmed_count=Count('id', filter=Q(status='confirmed')),
+        pending_total=Sum('amount', filter=pending_q),
+        pending_count=Count('id', filter=pending_q),
+        month_total=Sum('amount', filter=month_q),
+        month_count=Count('id', filter=month_q),
     )
     
     # Calculate success rate
-    total_count = total_payments['count'] or 0
-    completed_count = confirmed_payments['count'] or 0
+    total_count = totals['total_count'] or 0
+    completed_count = totals['confirmed_count'] or 0
     success_rate = (completed_count / total_count * 100) if total_count > 0 else 0
     
     stats = {
-        'total_amount': confirmed_payments['total'] or 0,
-        'pending_amount': pending_payments_agg['total'] or 0,
-        'pending_count': pending_payments_agg['count'] or 0,
-        'month_amount': month_payments['total'] or 0,
-        'month_count': month_payments['count'] or 0,
+        'total_amount': totals['confirmed_total'] or 0,
+        'pending_amount': totals['pending_total'] or 0,
+        'pending_count': totals['pending_count'] or 0,
+        'month_amount': totals['month_total'] or 0,
+        'month_count': totals['month_count'] or 0,
         'success_rate': success_rate,
         'total_count': total_count,
         'completed_count': completed_count,
     }
     
-    # Get pending payments (tasks completed but not paid)
-    if user.role == 'task_poster':
-        pending_tasks = Task.objects.filter(
-            poster=user,
-            status='completed'
-        ).select_related('doer')
-        
-        pending_payments_list = []
-        for task in pending_tasks:
-            # Check if poster has already rated the doer
-            already_rated = Rating.objects.filter(
-                task=task,
-                rater=user,
-                rated=task.doer
-            ).exists()
-            
-            # Skip tasks that have already been rated
-            if already_rated:
-                continue
-            
-            try:
-                payment = Payment.objects.get(task=task)
-                if payment.status in ['pending_payment', 'pending_confirmation']:
-                    pending_payments_list.append({
-                        'task': task,
-                        'payment': payment,
-                        'other_user': task.doer
-                    })
-            except Payment.DoesNotExist:
-                pending_payments_list.append({
-                    'task': task,
-                    'payment': None,
-                    'other_user': task.doer
-                })
-    elif user.role == 'task_doer':
-        pending_tasks = Task.objects.filter(
-            doer=user,
-            status='completed'
-        ).select_related('poster')
-        
-        pending_payments_list = []
-        for task in pending_tasks:
-            # Check if doer has already rated the poster
-            already_rated = Rating.objects.filter(
-                task=task,
-                rater=user,
-                rated=task.poster
-            ).exists()
-            
-            # Skip tasks that have already been rated
-            if already_rated:
-                continue
-            
-            try:
-                payment = Payment.objects.get(task=task)
-                if payment.status in ['pending_payment', 'pending_confirmation']:
-                    pending_payments_list.append({
-                        'task': task,
-                        'payment': payment,
-                        'other_user': task.poster
-                    })
-            except Payment.DoesNotExist:
-                pending_payments_list.append({
-                    'task': task,
-                    'payment': None,
-                    'other_user': task.poster
-                })
+    # Get pending payments (tasks completed but not rated yet, unpaid or awaiting confirmation)
+    # ✅ OPTIMIZED: Rating and payment state from one annotated query (core.participation)
+    # instead of a Rating.exists() and Payment.get() per completed task
+    if user.role in ('task_poster', 'task_doer'):
+        own_tasks = Task.objects.filter(poster=user) if user.role == 'task_poster' else Task.objects.filter(doer=user)
+        pending_tasks = TaskParticipationService.unrated(user, own_tasks).filter(
+            Q(payment_status__isnull=True) | Q(payment_status__in=TaskParticipationService.OPEN_PAYMENT_STATUSES)
+        ).select_related('poster', 'doer', 'payment')
+        
+        pending_payments_list = [
+            {
+                'task': task,
+                'payment': task.payment if task.payment_status else None,
+                'other_user': task.doer if user.role == 'task_poster' else task.poster
+            }
+            for task in pending_tasks
+        ]
     else:
         pending_payments_list = []
     
-    # Get payment history (limit to 50 most recent)
-    payment_history = all_payments[:50]
+    # ✅ OPTIMIZED: Payment history in keyset pages of 50 on (created_at, id)
+    payment_history = KeysetPaginator(all_payments, 50).get_page(request.GET)
     
     context = {
         'stats': stats,
@@ -0,0 +1,405 @@
+"""
+PayMongo Webhook Ingestion for ErrandExpress
+paymongo_webhook only verifies the signature and stores the raw event in
+InboundWebhookEvent (unique on the PayMongo event id, so provider retries
+are dropped) before answering 200. WebhookQueue processes stored events
+from a worker (or the process-webhook-events cron job where no worker
+runs), in order per task; WebhookProcessor holds the payment logic.
+"""
+
+from django.conf import settings
+from django.db import transaction, IntegrityError
+from django.db.models import Q, Min
+from django.utils import timezone
+from datetime import timedelta
+import hashlib
+import hmac
+import json
+import re
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+UUID_PATTERN = re.compile(r'[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}')
+
+
+class WebhookProcessingError(Exception):
+    """Event cannot be applied (recorded on the event; replayable)"""
+
+
+def verify_signature(body, signature, secret):
+    expected_signature = hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+    return hmac.compare_digest(signature, expected_signature)
+
+
+class WebhookProcessor:
+    """Applies one PayMongo event. Returns an outcome label; raises on failure."""
+
+    @classmethod
+    def handle(cls, payload):
+        event_type = payload["data"]["attributes"]["type"]
+
+        if event_type == "source.chargeable":
+            # Handle GCash payment source creation
+            logger.info("🔔 GCash payment source is chargeable")
+            return 'ignored'
+        if event_type != "payment.paid":
+            return 'ignored'
+
+        # Extract information from payment description
+        resource = payload["data"]["attributes"]["data"]
+        description = resource["attributes"].get("description") or ''
+        amount_pesos = resource["attributes"]["amount"] / 100
+        source_id = resource["id"]
+
+        logger.info(f"💰 Payment received: ₱{amount_pesos} - Description: {description}")
+
+        # 🔹 STEP 3: ₱2 System Fee Payment OR 10% Commission Payment
+        if "System Fee" in description or "Commission" in description or amount_pesos == 2.0:
+            return cls.system_fee_paid(description, amount_pesos, source_id)
+        # 🔹 STEP 5B: Task Doer Payment (GCash/Card)
+        if "Task Payment" in description:
+            return cls.task_doer_payment_paid(description, amount_pesos, source_id)
+        # 🔹 STEP 5B: Main Task Payment (PayMongo/GCash)
+        if 2.0 < amount_pesos < 100000:
+            return cls.task_payment_paid(description, amount_pesos, source_id)
+        return 'ignored'
+
+    @classmethod
+    def system_fee_paid(cls, description, amount_pesos, source_id):
+        from core.models import Task, SystemCommission
+        from core.notifications import notify
+
+        # Format: "ErrandExpress System Fee - {task_id}" (fallback: last word)
+        match = UUID_PATTERN.search(description)
+        task_id = match.group(0) if match else description.split(" ")[-1]
+
+        task = Task.objects.get(id=task_id)
+        commission = SystemCommission.objects.select_for_update().get(task=task)
+        if commission.status == 'paid':
+            return 'already_applied'
+
+        # Mark commission as paid
+        commission.status = 'paid'
+        commission.paid_at = timezone.now()
+        commission.paymongo_payment_id = source_id
+        commission.save()  # 💰 revenue ledger entry via post_save
+
+        # 🔔 UNLOCK CHAT AUTOMATICALLY
+        task.chat_unlocked = True
+        task.save(update_fields=['chat_unlocked', 'updated_at'])
+
+        notify(
+            task.poster_id, 'payment_confirmed',
+            title='₱2 System Fee Paid! 💳',
+            message=f'System fee paid successfully. Chat unlocked for "{task.title}"',
+            related_task=task
+        )
+        logger.info(f"✅ System fee payment CONFIRMED - chat unlocked for task {task_id}")
+        return 'system_fee'
+
+    @classmethod
+    def task_doer_payment_paid(cls, description, amount_pesos, source_id):
+        from core.models import Task, Payment
+        from core.notifications import NotificationDispatcher
+
+        # Description carries the task id and (usually) the payment id
+        matches = UUID_PATTERN.findall(description)
+        if matches:
+            task_id = matches[0]
+            payment_id = matches[1] if len(matches) >= 2 else None
+        else:
+            task_id = description.split('"')[1] if '"' in description else description.split(" ")[-1]
+            payment_id = None
+
+        task = Task.objects.select_related('poster', 'doer').get(id=task_id)
+
+        payment = None
+        if payment_id:
+            payment = Payment.objects.select_for_update().filter(id=payment_id).first()
+        if not payment:
+            payment = Payment.objects.select_for_update().filter(task=task, status='pending_payment').first()
+        if payment and payment.status in ('paid', 'confirmed'):
+            return 'already_applied'
+        if not payment:
+            payment = Payment.objects.create(
+                task=task,
+                payer=task.poster,
+                receiver=task.doer,
+                amount=task.price,
+                method='gcash',
+                status='pending_payment'
+            )
+            logger.info(f"Created new payment record: {payment.id}")
+
+        # Mark task doer payment as paid
+        payment.status = 'paid'
+        payment.paid_at = timezone.now()
+        payment.paymongo_source_id = source_id
+        payment.save()  # 💰 revenue ledger entry via post_save
+
+        # Complete the task
+        task.status = 'completed'
+        task.completed_at = timezone.now()
+        task.save()
+
+        # Net Amount for Doer (100% of Task Price); amount_pesos is the total (110%)
+        net_amount = amount_pesos / 1.10
+
+        with NotificationDispatcher() as dispatcher:
+            dispatcher.add(
+                task.doer_id, 'payment_received',
+                title='Payment Received! 💰',
+                message=f'You received ₱{net_amount:,.2f} for completing "{task.title}". Task poster can now rate you.',
+                related_task=task
+            )
+            dispatcher.add(
+                task.poster_id, 'payment_confirmed',
+                title='Task Doer Payment Confirmed! 💳',
+                message=f'Payment of ₱{amount_pesos:,.2f} (incl. fees) sent to {task.doer.fullname}. You can now rate them.',
+                related_task=task
+            )
+        logger.info(f"✅ Task doer payment CONFIRMED - task {task_id} payment verified")
+        return 'task_doer_payment'
+
+    @classmethod
+    def task_payment_paid(cls, description, amount_pesos, source_id):
+        from core.models import Payment
+        from core.notifications import NotificationDispatcher
+
+        # Find payment by source_id first (most reliable), then by task id in the description
+        payments = Payment.objects.select_for_update().select_related('task', 'payer', 'receiver')
+        payment = payments.filter(paymongo_source_id=source_id).first()
+        if not payment:
+            match = UUID_PATTERN.search(description)
+            if match:
+                payment = payments.filter(task__id=match.group(0), method='paymongo').first()
+        if not payment:
+            raise WebhookProcessingError('Payment not found')
+        if payment.status == 'confirmed':
+            return 'already_applied'
+        if payment.status != 'pending_payment':
+            raise WebhookProcessingError(f'Payment {payment.id} is {payment.status}')
+
+        # Verify amount matches
+        if float(payment.amount) != amount_pesos:
+            raise WebhookProcessingError(f'Amount mismatch: expected ₱{payment.amount}, got ₱{amount_pesos}')
+
+        # Mark main task payment as confirmed
+        payment.status = 'confirmed'
+        payment.paid_at = timezone.now()
+        payment.paymongo_payment_id = source_id
+        payment.save()  # 💰 revenue ledger entry via post_save
+
+        # 🔔 COMPLETE TASK AUTOMATICALLY
+        task = payment.task
+        task.status = 'completed'
+        task.completed_at = timezone.now()
+        task.save()
+
+        with NotificationDispatcher() as dispatcher:
+            dispatcher.add(
+                payment.payer_id, 'payment_confirmed',
+                title='Task Payment Confirmed! 💰',
+                message=f'GCash payment of ₱{amount_pesos} confirmed. Task "{task.title}" completed!',
+                related_task=task
+            )
+            dispatcher.add(
+                payment.receiver_id, 'payment_received',
+                title='Payment Received! 🎉',
+                message=f'You received ₱{amount_pesos} for task "{task.title}". Task completed!',
+                related_task=task
+            )
+            # 🔹 STEP 6: Prompt for ratings
+            dispatcher.add(
+                payment.payer_id, 'rate_reminder',
+                title='Please Rate Your Doer',
+                message=f'Task "{task.title}" completed. Please rate {payment.receiver.fullname}.',
+                related_task=task
+            )
+            dispatcher.add(
+                payment.receiver_id, 'rate_reminder',
+                title='Please Rate Your Poster',
+                message=f'Task "{task.title}" completed. Please rate {payment.payer.fullname}.',
+                related_task=task
+            )
+        logger.info(f"✅ Task payment CONFIRMED - task {task.id} completed automatically via webhook")
+        return 'task_payment'
+
+
+class WebhookQueue:
+    """Ingest, claim, process and replay InboundWebhookEvent rows"""
+
+    # Failed events are retried (one attempt per worker pass) up to this many times
+    MAX_ATTEMPTS = 5
+
+    BATCH_SIZE = 100
+
+    # 'processing' rows older than this belong to a dead worker
+    STALE_AFTER = timedelta(minutes=5)
+
+    @staticmethod
+    def ordering_key(payload):
+        """Events sharing a key are applied in arrival order (task id, else the payment resource id)"""
+        try:
+            resource = payload["data"]["attributes"]["data"]
+        except (KeyError, TypeError):
+            return payload.get("data", {}).get("id", '')
+        match = UUID_PATTERN.search((resource.get("attributes") or {}).get("description") or '')
+        return match.group(0) if match else str(resource.get("id", ''))
+
+    @classmethod
+    def ingest(cls, body):
+        """
+        Store a verified webhook body. Raises ValueError for malformed JSON.
+
+        Returns: (event, created) - created is False for provider retries
+        """
+        from core.models import InboundWebhookEvent
+
+        payload = json.loads(body)
+        data = payload.get("data") if isinstance(payload, dict) else None
+        if not isinstance(data, dict):
+            raise ValueError('Missing data object')
+        event_id = data.get("id") or hashlib.sha256(body).hexdigest()
+
+        try:
+            with transaction.atomic():
+                event = InboundWebhookEvent.objects.create(
+                    event_id=event_id,
+                    event_type=(data.get("attributes") or {}).get("type", ''),
+                    ordering_key=cls.ordering_key(payload),
+                    payload=payload
+                )
+            return event, True
+        except IntegrityError:
+            return None, False
+
+    @staticmethod
+    def schedule_processing():
+        """
+        Kick the worker after an ingest commits; the periodic job picks up
+        anything missed. Without a worker (CELERY_WORKERS off) the
+        process-webhook-events cron job drains the queue, never the request.
+        """
+        if not getattr(settings, 'CELERY_WORKERS', False):
+            return
+        try:
+            from core.tasks import process_webhook_events
+            process_webhook_events.apply_async(retry=False)
+        except Exception as e:
+            logger.warning(f"Could not enqueue webhook processing: {str(e)}")
+
+    @classmethod
+    def _claimable(cls, now):
+        return (
+            Q(status='pending') |
+            Q(status='failed', attempts__lt=cls.MAX_ATTEMPTS) |
+            Q(status='processing', claimed_at__lt=now - cls.STALE_AFTER)
+        )
+
+    @classmethod
+    def claim(cls, limit=None, now=None, exclude_ids=()):
+        """
+        Lock and mark a batch as processing (SKIP LOCKED across workers).
+        An event is held back while an older unfinished event for its
+        ordering key is outside the batch, so keys stay in order.
+        """
+        from core.models import InboundWebhookEvent
+
+        now = now or timezone.now()
+        claimable = cls._claimable(now)
+        with transaction.atomic():
+            rows = list(
+                InboundWebhookEvent.objects.select_for_update(skip_locked=True)
+                .filter(claimable)
+                .exclude(id__in=exclude_ids)
+                .order_by('received_at')[:limit or cls.BATCH_SIZE]
+            )
+            if not rows:
+                return []
+
+            first_outside = dict(
+                InboundWebhookEvent.objects.filter(ordering_key__in={row.ordering_key for row in rows})
+                .filter(claimable | Q(status='processing'))
+                .exclude(id__in=[row.id for row in rows])
+                .values('ordering_key')
+                .annotate(first=Min('received_at'))
+                .values_list('ordering_key', 'first')
+            )
+            claimed = [
+                row for row in rows
+                if row.ordering_key not in first_outside or row.received_at < first_outside[row.ordering_key]
+            ]
+            InboundWebhookEvent.objects.filter(id__in=[row.id for row in claimed]).update(
+                status='processing', claimed_at=now
+            )
+        return claimed
+
+    @classmethod
+    def process_event(cls, event):
+        """Apply one claimed event in its own transaction; returns True on success"""
+        from core.models import InboundWebhookEvent
+
+        try:
+            with transaction.atomic():
+                outcome = WebhookProcessor.handle(event.payload)
+                InboundWebhookEvent.objects.filter(id=event.id).update(
+                    status='ignored' if outcome == 'ignored' else 'processed',
+                    outcome=outcome,
+                    attempts=event.attempts + 1,
+                    last_error='',
+                    processed_at=timezone.now()
+                )
+            return True
+        except Exception as e:
+            logger.error(f"❌ Webhook event {event.event_id} failed: {str(e)}")
+            InboundWebhookEvent.objects.filter(id=event.id).update(
+                status='failed',
+                attempts=event.attempts + 1,
+                last_error=f'{type(e).__name__}: {e}'[:2000]
+            )
+            return False
+
+    @classmethod
+    def process_pending(cls, limit=None, now=None):
+        """
+        Drain the queue. Each failed event gets one attempt per pass, and
+        later events for its ordering key wait for it.
+
+        Returns: {'processed', 'failed', 'deferred', 'elapsed_ms'}
+        """
+        from core.models import InboundWebhookEvent
+
+        started = time.monotonic()
+        result = {'processed': 0, 'failed': 0, 'deferred': 0}
+        attempted = []
+        while True:
+            batch = cls.claim(limit=limit, now=now, exclude_ids=attempted)
+            if not batch:
+                break
+
+            failed_keys = set()
+            deferred = []
+            for event in batch:
+                attempted.append(event.id)
+                if event.ordering_key in failed_keys:
+                    deferred.append(event.id)
+                elif cls.process_event(event):
+                    result['processed'] += 1
+                else:
+                    result['failed'] += 1
+                    failed_keys.add(event.ordering_key)
+
+            if deferred:
+                InboundWebhookEvent.objects.filter(id__in=deferred).update(status='pending', claimed_at=None)
+                result['deferred'] += len(deferred)
+
+        result['elapsed_ms'] = round((time.monotonic() - started) * 1000, 1)
+        return result
+
+    @classmethod
+    def replay(cls, queryset):
+        """Reset events (failed, or processed for a re-run) to pending. Returns: count"""
+        return queryset.update(status='pending', attempts=0, last_error='', claimed_at=None, processed_at=None)
@@ -17,6 +17,7 @@ app.config_from_object('django.conf:settings', namespace='CELERY')
 app.autodiscover_tasks()
 
 # Celery Beat Schedule (periodic tasks)
+# Hosts without a beat process run these through /api/cron/<name>/ (keep vercel.json crons in sync)
 app.conf.beat_schedule = {
     'send-deadline-reminders': {
         'task': 'core.tasks.send_deadline_reminders',
@@ -38,6 +39,26 @@ app.conf.beat_schedule = {
         'task': 'core.tasks.reconcile_pending_payments',
         'schedule': crontab(minute='*/30'),  # Every 30 minutes
     },
+    'process-task-assignments': {
+        'task': 'core.tasks.process_task_assignments',
+        'schedule': crontab(minute='*'),  # Every minute (3-minute application window)
+    },
+    'process-webhook-events': {
+        'task': 'core.tasks.process_webhook_events',
+        'schedule': crontab(minute='*'),  # Every minute (safety net for ingest-triggered runs)
+    },
+    'rollup-revenue-ledger': {
+        'task': 'core.tasks.rollup_revenue_ledger',
+        'schedule': crontab(minute='*/5'),  # Every 5 minutes (dashboards add the unrolled tail)
+    },
+    'refresh-analytics-rollups': {
+        'task': 'core.tasks.refresh_analytics_rollups',
+        'schedule': crontab(minute='*/15'),  # Every 15 minutes (dashboard counters)
+    },
+    'refresh-tag-facets': {
+        'task': 'core.tasks.refresh_tag_facets',
+        'schedule': crontab(minute='*/15'),  # Every 15 minutes (browse tag counts)
+    },
     'cleanup-old-notifications': {
         'task': 'core.tasks.cleanup_old_notifications',
         'schedule': crontab(hour=2, minute=0),  # Daily at 2 AM
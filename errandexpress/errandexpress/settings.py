@@ -2,6 +2,7 @@
 Django settings for ErrandExpress project.
 """
 import os
+import sys
 from pathlib import Path
 from dotenv import load_dotenv
 import dj_database_url
@@ -61,6 +62,8 @@ except ImportError:
 MIDDLEWARE = [
     # "corsheaders.middleware.CorsMiddleware",  # Temporarily disabled
     "django.middleware.security.SecurityMiddleware",
+    "core.middleware.QueryBudgetMiddleware",
+    "core.middleware.CacheStatsMiddleware",
     "whitenoise.middleware.WhiteNoiseMiddleware",  # Add for Vercel static files
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -203,19 +206,83 @@ CORS_ALLOWED_ORIGINS = [
 CORS_ALLOW_CREDENTIALS = True
 
 # ✅ PERFORMANCE: Caching Configuration
-# Using LocMemCache for development (no Redis required)
-# For production, switch to Redis for better performance
-CACHES = {
-    'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-        'LOCATION': 'errandexpress-cache',
-        'TIMEOUT': 60,  # Default cache timeout: 60 seconds
-        'OPTIONS': {
-            'MAX_ENTRIES': 1000
+# Cache backends (core.caching), picked by URL:
+#   locmem://               per-process memory (default; invalidations stay in one process)
+#   file:///var/tmp/errand  shared by the processes on one host; every write globs the
+#                           directory to cull, so it is capped at FILE_CACHE_MAX_ENTRIES
+#   redis://host:6379/1     shared by every worker on every host (production)
+TESTING = 'test' in sys.argv[1:2]
+CACHE_URL = os.getenv('CACHE_URL', 'locmem://')
+FILE_CACHE_MAX_ENTRIES = 1000
+
+
+def cache_backend(url, name, timeout, max_entries):
+    if url.startswith(('redis://', 'rediss://', 'unix://')):
+        return {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': url,
+            'TIMEOUT': timeout,
+            'KEY_PREFIX': 'errandexpress',
+        }
+    if url.startswith('file://'):
+        return {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.path.join(url[len('file://'):], name),
+            'TIMEOUT': timeout,
+            'OPTIONS': {'MAX_ENTRIES': min(max_entries, FILE_CACHE_MAX_ENTRIES)},
         }
+    return {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': f'errandexpress-{name}',
+        'TIMEOUT': timeout,
+        'OPTIONS': {'MAX_ENTRIES': max_entries},
     }
+
+
+CACHES = {
+    'default': cache_backend(CACHE_URL, 'cache', timeout=60, max_entries=20000),
+    # Per-user navbar counters (core.badges); may live on a separate Redis.
+    # Only a Redis stats cache keeps them exact; other backends expire them after 60s
+    'stats': cache_backend(os.getenv('STATS_CACHE_URL', CACHE_URL), 'stats', timeout=24 * 60 * 60, max_entries=60000),
+}
+
+# Per-request cache hit/miss/latency reporting (core.middleware.CacheStatsMiddleware)
+CACHE_STATS_ENABLED = os.getenv('CACHE_STATS_ENABLED', str(DEBUG)) == 'True'
+
+# Per-request query budgets and N+1 detection (core.middleware.QueryBudgetMiddleware):
+# 'warn' logs violations, 'raise' turns them into errors (default under manage.py test).
+# On by default only with DEBUG; when enabled in production, check a fraction of requests
+QUERY_BUDGET_ENABLED = os.getenv('QUERY_BUDGET_ENABLED', str(DEBUG)) == 'True'
+QUERY_BUDGET_SAMPLE_RATE = float(os.getenv('QUERY_BUDGET_SAMPLE_RATE', '1.0' if DEBUG or TESTING else '0.05'))
+QUERY_BUDGET_MODE = os.getenv('QUERY_BUDGET_MODE', 'raise' if TESTING else 'warn')
+QUERY_BUDGET_DEFAULT = int(os.getenv('QUERY_BUDGET_DEFAULT', '30'))
+# One statement shape repeated this often in a request is an N+1 loop
+QUERY_BUDGET_REPEAT_THRESHOLD = int(os.getenv('QUERY_BUDGET_REPEAT_THRESHOLD', '10'))
+# Budgets by URL name, where a view legitimately needs more (or should need less)
+QUERY_BUDGETS = {
+    'home': 10,
+    'dashboard': 25,
+    'browse_tasks': 15,
+    'task_detail': 12,
+    'my_tasks': 15,
+    'notifications': 8,
+    'api_notifications_recent': 6,
+    'api_notifications_count': 5,
+    'api_dashboard_widgets': 15,
+    'api_tasks_updates': 8,
+    'api_get_messages': 8,
+    'payments_dashboard': 8,
+    'task_monitoring': 8,
+    'system_wallet': 40,
 }
 
+# Pub/Sub for server push (core.pubsub): memory:// for a single process,
+# redis://... when several workers serve chat streams. Chat pages only
+# switch from polling to SSE with redis://, and each open stream then holds
+# one gunicorn thread (--workers x --threads in the Dockerfile) for up to
+# ChatPush.MAX_STREAM_SECONDS
+PUBSUB_URL = os.getenv('PUBSUB_URL', 'memory://')
+
 # REST Framework settings
 REST_FRAMEWORK = {
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
@@ -230,6 +297,7 @@ SUPABASE_KEY = os.getenv("SUPABASE_KEY")
 PAYMONGO_SECRET_KEY = os.getenv("PAYMONGO_SECRET_KEY")
 PAYMONGO_PUBLIC_KEY = os.getenv("PAYMONGO_PUBLIC_KEY")
 PAYMONGO_WEBHOOK_SECRET = os.getenv("PAYMONGO_WEBHOOK_SECRET")
+PAYMONGO_API_BASE = os.getenv("PAYMONGO_API_BASE", "https://api.paymongo.com/v1")
 
 # Google Forms/Sheets settings
 GOOGLE_SHEETS_CREDENTIALS = os.getenv("GOOGLE_SHEETS_CREDENTIALS")
@@ -247,6 +315,12 @@ CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = 'UTC'
 
+# Set where worker and beat processes run (Dockerfile PROCESS_TYPE=worker/beat).
+# Without them, periodic jobs (including the stored PayMongo webhook queue)
+# run through the Vercel cron endpoint (CRON_SECRET)
+CELERY_WORKERS = os.getenv('CELERY_WORKERS', 'False') == 'True'
+CRON_SECRET = os.getenv('CRON_SECRET')
+
 # Logging configuration
 # Vercel has a read-only filesystem, so we only use console logging in production
 LOGGING = {
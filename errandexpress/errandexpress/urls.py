@@ -10,6 +10,8 @@ urlpatterns = [
     path('admin/', RedirectView.as_view(pattern_name='admin_dashboard', permanent=False)),
     path('admin/database/', admin.site.urls),
     path('health/', views.health_check, name='health_check'),
+    path('api/dashboard/widgets/', views.api_dashboard_widgets, name='api_dashboard_widgets'),
+    path('api/admin/paymongo-metrics/', views.api_paymongo_metrics, name='api_paymongo_metrics'),
     path('', views.home, name='home'),
     path('signup/', views.signup_view, name='signup'),
     path('login/', views.login_view, name='login'),
@@ -117,11 +119,13 @@ urlpatterns = [
     path('api/unlock-chat/<uuid:task_id>/', views.api_unlock_chat_after_payment, name='api_unlock_chat'),
     path('api/send-message/', views.api_send_message, name='api_send_message'),
     path('api/messages/<uuid:task_id>/', views.api_get_messages, name='api_get_messages'),
+    path('api/messages/<uuid:task_id>/stream/', views.api_chat_stream, name='api_chat_stream'),
     
     # PayMongo Live Integration
     path('api/create-payment-intent/', views.create_payment_intent, name='create_payment_intent'),
     path('api/create-gcash-payment/', views.create_gcash_payment, name='create_gcash_payment'),
     path('webhook/paymongo/', views.paymongo_webhook, name='paymongo_webhook'),
+    path('api/cron/<slug:job>/', views.run_periodic_job, name='run_periodic_job'),
     path('test-paymongo/', views.test_paymongo_integration, name='test_paymongo'),
     
     # Task Completion Payment APIs